@@ -1,14 +1,17 @@
 import dash
 import dash_bootstrap_components as dbc
 from flask import jsonify, request
-from urllib import request as urllib_request
-import re
-import time
-from html import unescape
 
 # Importar configurações de segurança
+import data_access
+import dashboard_model
+import metricas
+import quote_cache
 from config import Config
-from security import add_security_headers, check_production_readiness
+from db import verify_user
+from logs import get_logger
+from quote_service import get_quote, get_quotes
+from security import add_security_headers, check_production_readiness, rate_limit, rate_limiter
 
 estilos = ["https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css", "https://fonts.googleapis.com/icon?family=Material+Icons", dbc.themes.COSMO]
 dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates@V1.0.4/dbc.min.css"
@@ -23,10 +26,6 @@ app.config['suppress_callback_exceptions'] = True
 app.scripts.config.serve_locally = True
 server = app.server
 
-# Cache simples em memória para cotações (TTL em segundos)
-QUOTE_CACHE_TTL_SECONDS = 60
-_quote_cache = {}
-
 # Configurar secret key do Flask
 server.secret_key = Config.SECRET_KEY
 
@@ -35,6 +34,38 @@ server.secret_key = Config.SECRET_KEY
 def apply_security_headers(response):
     return add_security_headers(response)
 
+# Tempo, tempo no banco e bytes de cada callback (ver metricas.py)
+if Config.CALLBACK_METRICS_ENABLED:
+    metricas.instrumentar(app)
+
+
+@server.route('/admin/metricas/callbacks', methods=['GET', 'DELETE'])
+@rate_limit(max_attempts=Config.RATE_LIMIT_LOGIN_ATTEMPTS, window_minutes=Config.RATE_LIMIT_WINDOW_MINUTES)
+def api_metricas_callbacks():
+    """Métricas dos callbacks deste worker e contadores dos caches locais.
+
+    Só para administradores, com HTTP Basic (usuário e senha do app).
+    DELETE zera as métricas dos callbacks.
+    """
+    auth = request.authorization
+    user = verify_user(auth.username, auth.password) if auth and auth.username and auth.password else None
+    if not user or not user['is_admin']:
+        return jsonify({'error': 'Acesso restrito a administradores'}), 401, {'WWW-Authenticate': 'Basic realm="metricas"'}
+    # O limite vale para tentativas de senha, não para quem já se autenticou
+    rate_limiter.reset(request.remote_addr, request.endpoint)
+
+    if request.method == 'DELETE':
+        metricas.zerar()
+        return '', 204
+    return jsonify({
+        **metricas.resumo(),
+        'caches': {
+            'dados': data_access.cache_info(),
+            'dashboard': dashboard_model.model_info(),
+            'cotacoes': quote_cache.cache_info(),
+        },
+    })
+
 
 @server.route('/api/investimentos/cotacao', methods=['GET'])
 def api_cotacao_investimento():
@@ -43,121 +74,41 @@ def api_cotacao_investimento():
     if not ticker:
         return jsonify({'error': 'Parâmetro ticker é obrigatório'}), 400
 
-    # Cache por ticker (60s)
-    now_ts = time.time()
-    cached = _quote_cache.get(ticker)
-    if cached and (now_ts - cached.get('ts', 0) <= QUOTE_CACHE_TTL_SECONDS):
-        return jsonify(cached['payload'])
-
-    ticker_lower = ticker.lower()
-
-    # Tenta páginas mais comuns no Status Invest
-    candidate_urls = [
-        f"https://statusinvest.com.br/fundos-imobiliarios/{ticker_lower}",
-        f"https://statusinvest.com.br/acoes/{ticker_lower}",
-        f"https://statusinvest.com.br/fiagros/{ticker_lower}",
-        f"https://statusinvest.com.br/fundos-de-investimento/{ticker_lower}",
-        f"https://statusinvest.com.br/bdrs/{ticker_lower}",
-        f"https://statusinvest.com.br/criptomoedas/{ticker_lower}",
-    ]
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36",
-        "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
-    }
-
-    def _fetch_html(url):
-        req = urllib_request.Request(url, headers=headers)
-        with urllib_request.urlopen(req, timeout=12) as response:
-            return response.read().decode('utf-8', errors='ignore')
-
-    def _is_not_found_page(html_content):
-        text = html_content.lower()
-        return (
-            "ops. . ." in text
-            and "nã" in text
-            and "encontramos o que voc" in text
-        )
-
-    def _to_float_br(value):
-        raw = (value or "").strip()
-        if not raw:
-            return None
-        raw = raw.replace("R$", "").replace(" ", "")
-        # Formato BR: 1.234,56 -> 1234.56
-        raw = raw.replace(".", "").replace(",", ".")
-        try:
-            return float(raw)
-        except Exception:
-            return None
-
-    def _extract_price(html_content):
-        decoded = unescape(html_content)
-
-        patterns = [
-            r'"price"\s*:\s*"?([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)"?',
-            r'"lastPrice"\s*:\s*"?([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)"?',
-            r'cot[aã]?[cç][aã]o[^\d]{0,80}R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)',
-            r'class="value"[^>]*>\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)\s*<',
-            r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, decoded, flags=re.IGNORECASE | re.DOTALL)
-            if match:
-                price = _to_float_br(match.group(1))
-                if price is not None:
-                    return price
-
-        return None
-
-    try:
-        resolved_url = None
-        html_content = None
-
-        for url in candidate_urls:
-            try:
-                html_try = _fetch_html(url)
-            except Exception:
-                continue
-
-            if _is_not_found_page(html_try):
-                continue
-
-            # Garante que a página realmente se refere ao ticker consultado
-            if ticker in html_try.upper() or f"data-code=\"{ticker}\"" in html_try.upper():
-                resolved_url = url
-                html_content = html_try
-                break
-
-        if not html_content:
-            return jsonify({'error': 'Ticker não encontrado no Status Invest', 'ticker': ticker}), 404
-
-        price = _extract_price(html_content)
-        if price is None:
-            return jsonify({'error': 'Não foi possível extrair cotação no Status Invest', 'ticker': ticker}), 502
-
-        payload = {
-            'ticker': ticker,
-            'price': price,
-            'currency': 'BRL',
-            'source': 'status-invest',
-            'url': resolved_url
-        }
-
-        _quote_cache[ticker] = {
-            'ts': now_ts,
-            'payload': payload
-        }
-
-        return jsonify(payload)
-    except Exception as error:
-        return jsonify({'error': f'Falha ao consultar cotação no Status Invest: {error}', 'ticker': ticker}), 502
+    status, payload = get_quote(ticker)
+    return jsonify(payload), status
+
+
+@server.route('/api/investimentos/cotacoes', methods=['GET', 'POST'])
+@rate_limit(max_attempts=Config.QUOTE_BATCH_RATE_LIMIT_PER_MINUTE, window_minutes=1)
+def api_cotacoes_investimentos():
+    """Endpoint para buscar a cotação de vários ativos de uma vez.
+
+    Aceita ?tickers=PETR4,MXRF11 ou um JSON {"tickers": [...]} e responde
+    {"results": {ticker: {"status": ..., ...}}} com o mesmo payload do
+    endpoint de um ticker para cada um. Cada lote pode disparar até
+    QUOTE_BATCH_MAX_TICKERS x 6 buscas, por isso há limite de consultas por IP.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        tickers = body.get('tickers') or []
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            return jsonify({'error': 'Campo tickers deve ser uma lista de textos'}), 400
+    else:
+        tickers = (request.args.get('tickers') or '').split(',')
+
+    tickers = [t for t in tickers if t.strip()]
+    if not tickers:
+        return jsonify({'error': 'Parâmetro tickers é obrigatório'}), 400
+    if len(set(t.strip().upper() for t in tickers)) > Config.QUOTE_BATCH_MAX_TICKERS:
+        return jsonify({'error': f'No máximo {Config.QUOTE_BATCH_MAX_TICKERS} tickers por consulta'}), 400
+
+    results = get_quotes(tickers)
+    return jsonify({'results': {ticker: {'status': status, **payload} for ticker, (status, payload) in results.items()}})
 
 # Verificar prontidão para produção
 if Config.ENVIRONMENT == 'production':
     is_ready, issues = check_production_readiness()
     if not is_ready:
-        print("⚠️  AVISOS DE SEGURANÇA:")
+        log = get_logger(__name__)
         for issue in issues:
-            print(f"  - {issue}")
\ No newline at end of file
+            log.warning('Aviso de segurança', aviso=issue)
\ No newline at end of file
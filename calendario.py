@@ -0,0 +1,101 @@
+"""
+Calendário de dias úteis (feriados nacionais do mercado financeiro)
+
+Os feriados vêm de um CSV (data, nome; ver scripts/gerar_feriados.py). Na
+construção é montado o array de contagens acumuladas de dias úteis desde a
+origem do calendário, então a quantidade de dias úteis entre duas datas
+quaisquer é a diferença entre duas posições (O(1), vetorizável para milhares
+de pares). Datas fora do intervalo pré-calculado caem em np.busday_count.
+"""
+import os
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Ordinal de 1970-01-01, a época de datetime64[D]
+_EPOCA = date(1970, 1, 1).toordinal()
+
+
+def _para_datetime64(ordinais):
+    return (np.asarray(ordinais, dtype=np.int64) - _EPOCA).astype('datetime64[D]')
+
+
+class CalendarioDiasUteis:
+    """Dias úteis (segunda a sexta, exceto feriados) com contagem por prefixos"""
+
+    def __init__(self, feriados=(), inicio=date(1990, 1, 1), fim=date(2100, 1, 1)):
+        """
+        Args:
+            feriados: datas que não são dias úteis
+            inicio, fim: intervalo [inicio, fim) com contagem pré-calculada
+        """
+        self._origem = inicio.toordinal()
+        self._feriados = np.unique(_para_datetime64([data.toordinal() for data in feriados]))
+        dias = _para_datetime64(np.arange(self._origem, fim.toordinal()))
+        self._uteis = np.is_busday(dias, holidays=self._feriados)
+        # _prefixos[k] = dias úteis em [origem, origem + k)
+        self._prefixos = np.concatenate(([0], np.cumsum(self._uteis, dtype=np.int64)))
+
+    @classmethod
+    def de_csv(cls, caminho, **kwargs):
+        """Carrega os feriados de um CSV com coluna data (linhas com # são ignoradas)"""
+        df = pd.read_csv(caminho, comment='#', skipinitialspace=True)
+        if 'data' not in df.columns:
+            raise ValueError(f"Coluna 'data' ausente em {caminho}")
+        return cls(pd.to_datetime(df['data'], format='%Y-%m-%d').dt.date, **kwargs)
+
+    def eh_dia_util(self, data):
+        posicao = data.toordinal() - self._origem
+        if 0 <= posicao < len(self._uteis):
+            return bool(self._uteis[posicao])
+        return bool(np.is_busday(_para_datetime64(data.toordinal()), holidays=self._feriados))
+
+    def dias_uteis(self, inicio, fim):
+        """Dias úteis em [inicio, fim) entre duas datas (negativo se fim < inicio)"""
+        return int(self.contar(inicio.toordinal(), fim.toordinal()))
+
+    def contar(self, inicios, fins):
+        """
+        Versão vetorizada de dias_uteis
+        
+        Args:
+            inicios, fins: datas como ordinais (date.toordinal), arrays ou escalares
+        
+        Returns:
+            np.ndarray (ou escalar) de inteiros com os dias úteis em [início, fim)
+        """
+        return self._prefixo(fins) - self._prefixo(inicios)
+
+    def _prefixo(self, ordinais):
+        """Dias úteis desde a origem até cada ordinal (negativo antes da origem)"""
+        posicoes = np.asarray(ordinais, dtype=np.int64) - self._origem
+        ultimo = len(self._prefixos) - 1
+        dentro = (posicoes >= 0) & (posicoes <= ultimo)
+        if np.all(dentro):
+            return self._prefixos[posicoes]
+        # busday_count com fim < início conta (fim, início], então antes da origem
+        # conta-se [data, origem) e troca o sinal
+        datas = _para_datetime64(posicoes + self._origem)
+        origem = _para_datetime64(self._origem)
+        fora = np.where(posicoes < 0, -np.busday_count(datas, origem, holidays=self._feriados),
+                        np.busday_count(origem, datas, holidays=self._feriados))
+        return np.where(dentro, self._prefixos[np.clip(posicoes, 0, ultimo)], fora)
+
+
+@lru_cache(maxsize=1)
+def calendario_padrao():
+    """Calendário com os feriados de Config.FERIADOS_CSV (carregado uma vez por
+    processo); sem o arquivo, só fins de semana deixam de ser dias úteis
+    """
+    caminho = Config.FERIADOS_CSV
+    if not caminho or not os.path.exists(caminho):
+        log.warning('Arquivo de feriados não encontrado; considerando só fins de semana', caminho=caminho)
+        return CalendarioDiasUteis()
+    return CalendarioDiasUteis.de_csv(caminho)
@@ -7,6 +7,9 @@ from dash import html, dcc, Input, Output, State
 from dash.exceptions import PreventUpdate
 from app import app
 from db import get_cartoes, create_cartao, update_cartao, delete_cartao
+from logs import get_logger
+
+log = get_logger(__name__)
 
 # =========  Layout  =========== #
 layout = dbc.Container([
@@ -79,7 +82,7 @@ def listar_cartoes(user):
     try:
         cartoes = get_cartoes(user['id'])
     except Exception as e:
-        print(f"[CARTOES] Erro ao buscar cartões: {e}")
+        log.error('Erro ao buscar cartões', user_id=user['id'], erro=e)
         return dbc.Alert([
             html.H5("Erro ao carregar cartões", className="alert-heading"),
             html.P(f"Ocorreu um erro: {str(e)}"),
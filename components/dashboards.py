@@ -1,5 +1,4 @@
 # Standard library imports
-import calendar
 from datetime import date, datetime, timedelta
 
 # Third party imports
@@ -14,7 +13,8 @@ from dash_bootstrap_templates import ThemeChangerAIO, template_from_url
 
 # Local imports
 from app import app
-from constants import GRAPH_MARGIN, StatusDespesa
+from constants import GRAPH_MARGIN
+from dashboard_model import get_model
 from globals import *
 
 card_icon = {
@@ -36,86 +36,6 @@ else:
 end_date = (next_month - timedelta(days=1)).date()
 
 
-def _normalize_status_value(value):
-    if pd.isna(value):
-        return StatusDespesa.A_VENCER
-
-    text = str(value).strip().lower()
-
-    if text in {"pago", "paga", "paid", "1", "true", "sim", "yes"}:
-        return StatusDespesa.PAGO
-    if text in {"vencido", "vencida", "overdue", "atrasado", "2"}:
-        return StatusDespesa.VENCIDO
-    if text in {"a vencer", "avencer", "aberto", "pendente", "0", "false", "nao", "não", "no"}:
-        return StatusDespesa.A_VENCER
-
-    return StatusDespesa.A_VENCER
-
-
-def _normalize_efetuado_value(value):
-    if pd.isna(value):
-        return 0
-
-    text = str(value).strip().lower()
-    if text in {"1", "true", "sim", "s", "yes", "y", "pago", "recebido"}:
-        return 1
-    if text in {"0", "false", "nao", "não", "n", "no", "pendente"}:
-        return 0
-
-    try:
-        return 1 if float(text) == 1 else 0
-    except Exception:
-        return 0
-
-
-def _normalize_despesas_for_saldo(df):
-    """Normaliza despesas e mantém apenas colunas necessárias para regras de saldo."""
-    if df.empty:
-        return df
-
-    if 'Status' in df.columns:
-        df['Status'] = df['Status'].apply(_normalize_status_value)
-    elif 'Efetuado' in df.columns:
-        df['Efetuado'] = df['Efetuado'].apply(_normalize_efetuado_value)
-        df['Status'] = df['Efetuado'].apply(lambda x: StatusDespesa.PAGO if x == 1 else StatusDespesa.A_VENCER)
-    else:
-        df['Status'] = StatusDespesa.A_VENCER
-
-    if 'Valor' in df.columns:
-        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
-
-    return df
-
-
-def _normalize_receitas_for_saldo(df):
-    """Normaliza receitas e mantém apenas colunas necessárias para regras de saldo."""
-    if df.empty:
-        return df
-
-    if 'Efetuado' not in df.columns:
-        df['Efetuado'] = 1
-    else:
-        df['Efetuado'] = df['Efetuado'].apply(_normalize_efetuado_value)
-
-    if 'Valor' in df.columns:
-        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
-
-    return df
-
-
-def _apply_saldo_rules(df_despesas, df_receitas):
-    """Aplica regra de saldo: despesas em aberto e receitas efetivadas."""
-    df_despesas = _normalize_despesas_for_saldo(df_despesas)
-    df_receitas = _normalize_receitas_for_saldo(df_receitas)
-
-    if not df_despesas.empty and 'Status' in df_despesas.columns:
-        df_despesas = df_despesas[df_despesas['Status'] != StatusDespesa.PAGO]
-
-    if not df_receitas.empty and 'Efetuado' in df_receitas.columns:
-        df_receitas = df_receitas[df_receitas['Efetuado'] == 1]
-
-    return df_despesas, df_receitas
-
 # =========  Layout  =========== #
 layout = dbc.Col([
         dbc.Row([
@@ -240,41 +160,27 @@ layout = dbc.Col([
 
 
 # =========  Callbacks  =========== #
+# Todos os callbacks leem do mesmo DashboardModel (normalizado uma vez por
+# versão dos dados do usuário); ver dashboard_model.py.
+
 # Dropdown Receita
 @app.callback([Output("dropdown-receita", "options"),
     Output("dropdown-receita", "value"),
     Output("p-receita-dashboards", "children")],
     [Input("store-receitas", "data"),
     Input('date-picker-config', 'start_date'),
-    Input('date-picker-config', 'end_date')])
-def populate_dropdownvalues_receitas(data, start_date, end_date):
-    df = pd.DataFrame(data)
-    
-    # Excluir receitas que são destinadas a planos específicos
-    if not df.empty and 'plano_id' in df.columns:
-        df = df[df['plano_id'].isna()]
-    
-    if df.empty or 'Categoria' not in df.columns or 'Valor' not in df.columns:
+    Input('date-picker-config', 'end_date')],
+    State("store-despesas", "data"))
+def populate_dropdownvalues_receitas(data, start_date, end_date, data_despesa):
+    model = get_model(data_despesa, data)
+
+    # Regra consistente com saldo: receitas efetivadas, sem as destinadas a planos
+    resumo = model.resumo_receitas(start_date, end_date)
+    if resumo is None:
         return [[], [], "R$ 0"]
 
-    # Regra consistente com saldo: considerar apenas receitas efetivadas
-    df = _normalize_receitas_for_saldo(df)
-    if 'Efetuado' in df.columns:
-        df = df[df['Efetuado'] == 1]
-    
-    # Filtrar por período se houver dados de data
-    if 'Data' in df.columns and start_date and end_date:
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-        start = pd.to_datetime(start_date, errors='coerce')
-        end = pd.to_datetime(end_date, errors='coerce')
-        if not pd.isna(start) and not pd.isna(end):
-            mask = (df['Data'] >= start) & (df['Data'] <= end)
-            df = df.loc[mask]
-    
-    valor = df['Valor'].sum()
-    val = df.Categoria.unique().tolist()
-
-    return [([{"label": x, "value": x} for x in df.Categoria.unique()]), val, f"R$ {valor:.2f}"]
+    val, valor = resumo
+    return [([{"label": x, "value": x} for x in val]), val, f"R$ {valor:.2f}"]
 
 # Dropdown Despesa
 @app.callback([Output("dropdown-despesa", "options"),
@@ -283,34 +189,17 @@ def populate_dropdownvalues_receitas(data, start_date, end_date):
     Output("p-despesa-dashboards", "children")],
     [Input("store-despesas", "data"),
     Input('date-picker-config', 'start_date'),
-    Input('date-picker-config', 'end_date')])
-def populate_dropdownvalues_despesas(data, start_date, end_date):
-    df = pd.DataFrame(data)
-    
-    if df.empty or 'Categoria' not in df.columns or 'Valor' not in df.columns:
+    Input('date-picker-config', 'end_date')],
+    State("store-receitas", "data"))
+def populate_dropdownvalues_despesas(data, start_date, end_date, data_receita):
+    model = get_model(data, data_receita)
+
+    # Totais: todas as despesas do período; em aberto: apenas as não pagas
+    resumo = model.resumo_despesas(start_date, end_date)
+    if resumo is None:
         return [[], [], "R$ 0", "R$ 0"]
 
-    df_normalized = _normalize_despesas_for_saldo(df.copy())
-    
-    # Filtrar por período ANTES de separar totais e abertas
-    if 'Data' in df_normalized.columns and start_date and end_date:
-        df_normalized['Data'] = pd.to_datetime(df_normalized['Data'], errors='coerce')
-        start = pd.to_datetime(start_date, errors='coerce')
-        end = pd.to_datetime(end_date, errors='coerce')
-        if not pd.isna(start) and not pd.isna(end):
-            mask = (df_normalized['Data'] >= start) & (df_normalized['Data'] <= end)
-            df_normalized = df_normalized.loc[mask]
-    
-    # DESPESAS TOTAIS: todas do período
-    df_total = df_normalized.copy()
-    
-    # DESPESAS EM ABERTO: apenas as não pagas do período
-    df_abertas = df_normalized[df_normalized['Status'] != StatusDespesa.PAGO] if 'Status' in df_normalized.columns else df_normalized
-
-    valor_total = df_total['Valor'].sum() if not df_total.empty else 0
-    valor_abertas = df_abertas['Valor'].sum() if not df_abertas.empty else 0
-    val = df_normalized.Categoria.unique().tolist() if not df_normalized.empty else []
-
+    val, valor_total, valor_abertas = resumo
     return [([{"label": x, "value": x} for x in val]), val, f"R$ {valor_total:.2f}", f"R$ {valor_abertas:.2f}"]
 
 # VALOR - saldo
@@ -318,63 +207,17 @@ def populate_dropdownvalues_despesas(data, start_date, end_date):
     Output("p-saldo-dashboards", "children"),
     [Input("store-despesas", "data"),
     Input("store-receitas", "data"),
-    Input('date-picker-config', 'start_date'),
-    Input('date-picker-config', 'end_date'),
     Input("store-user", "data")])
-def saldo_total(despesas, receitas, start_date, end_date, user):
-    df_despesas = pd.DataFrame(despesas)
-    df_receitas = pd.DataFrame(receitas)
-    
-    # Excluir receitas que são destinadas a planos específicos
-    if not df_receitas.empty and 'plano_id' in df_receitas.columns:
-        df_receitas = df_receitas[df_receitas['plano_id'].isna()]
-    
-    # Normalização
-    df_despesas = _normalize_despesas_for_saldo(df_despesas)
-    df_receitas = _normalize_receitas_for_saldo(df_receitas)
-
+def saldo_total(despesas, receitas, user):
     # LÓGICA CORRETA DE SALDO:
     # Saldo = Receitas efetivadas - Despesas PAGAS (exceto as pagas no cartão, pois viram fatura)
     # As despesas pagas no cartão NÃO saem do saldo imediatamente, só quando pagar a fatura
-    
-    # Receitas efetivadas (todas as efetivadas, independente de período)
-    if not df_receitas.empty and 'Efetuado' in df_receitas.columns:
-        df_receitas_efetivadas = df_receitas[df_receitas['Efetuado'] == 1]
-    else:
-        df_receitas_efetivadas = df_receitas
-    
-    # Despesas pagas (Status == PAGO) mas EXCLUINDO as que foram pagas no cartão
-    # Porque despesas pagas no cartão não saem do saldo agora, só quando pagar a fatura
-    if not df_despesas.empty and 'Status' in df_despesas.columns:
-        df_despesas_pagas = df_despesas[df_despesas['Status'] == StatusDespesa.PAGO]
-        
-        # Excluir despesas pagas no cartão (que não são faturas)
-        # Despesas no cartão geram faturas, e são as faturas que diminuem o saldo
-        if 'forma_pagamento' in df_despesas_pagas.columns:
-            df_despesas_pagas = df_despesas_pagas[
-                (df_despesas_pagas['forma_pagamento'] != 'cartao') | 
-                (df_despesas_pagas.get('eh_fatura', 0) == 1)
-            ]
-    else:
-        df_despesas_pagas = pd.DataFrame()
-
-    valor_receitas = df_receitas_efetivadas['Valor'].sum() if not df_receitas_efetivadas.empty and 'Valor' in df_receitas_efetivadas.columns else 0
-    valor_despesas_pagas = df_despesas_pagas['Valor'].sum() if not df_despesas_pagas.empty and 'Valor' in df_despesas_pagas.columns else 0
-    
-    # Buscar saldo inicial do usuário
-    saldo_inicial = 0
     if user and 'id' in user:
-        from db import connect_db
-        conn = connect_db()
-        cur = conn.cursor()
-        cur.execute("SELECT saldo_inicial FROM users WHERE id = %s", (user['id'],))
-        result = cur.fetchone()
-        conn.close()
-        if result and result[0]:
-            saldo_inicial = float(result[0])
-    
-    # Saldo = Saldo inicial + Receitas efetivadas - Despesas pagas (dinheiro/faturas)
-    saldo = saldo_inicial + valor_receitas - valor_despesas_pagas
+        # Saldo inicial + totais mantidos por trigger em saldos_usuarios (uma leitura por chave)
+        from db import get_saldo
+        saldo = get_saldo(user['id'])['saldo']
+    else:
+        saldo = get_model(despesas, receitas).saldo_transacoes()
 
     return f"R$ {saldo:.2f}"
     
@@ -387,63 +230,13 @@ def saldo_total(despesas, receitas, start_date, end_date, user):
     Input("dropdown-receita", "value"),
     Input(ThemeChangerAIO.ids.radio("theme"), "value")])
 def update_output(data_despesa, data_receita, despesa, receita, theme):
-    df_ds = pd.DataFrame(data_despesa)
-    df_rc = pd.DataFrame(data_receita)
-    
-    # Excluir receitas que são destinadas a planos específicos
-    if not df_rc.empty and 'plano_id' in df_rc.columns:
-        df_rc = df_rc[df_rc['plano_id'].isna()]
+    model = get_model(data_despesa, data_receita)
 
-    # Regras consistentes com saldo (despesas em aberto e receitas efetivadas)
-    df_ds, df_rc = _apply_saldo_rules(df_ds, df_rc)
+    # Receitas efetivadas (sem planos) acumuladas, já filtradas por categoria
+    df_rc = model.serie_receitas(receita)
 
-    # Validar se DataFrames têm colunas necessárias
     fig = go.Figure()
-    
-    if df_ds.empty or 'Data' not in df_ds.columns or 'Valor' not in df_ds.columns or 'Categoria' not in df_ds.columns:
-        df_ds = pd.DataFrame(columns=['Data', 'Valor', 'Categoria', 'Mes', 'Acumulo'])
-    else:
-        df_ds = df_ds.sort_values(by='Data', ascending=True)
-        df_ds["Data"] = pd.to_datetime(df_ds["Data"], errors="coerce")
-        df_ds["Mes"] = df_ds["Data"].dt.month
-    
-    if df_rc.empty or 'Data' not in df_rc.columns or 'Valor' not in df_rc.columns or 'Categoria' not in df_rc.columns:
-        df_rc = pd.DataFrame(columns=['Data', 'Valor', 'Categoria', 'Mes', 'Acumulo'])
-    else:
-        df_rc = df_rc.sort_values(by='Data', ascending=True)
-        df_rc["Data"] = pd.to_datetime(df_rc["Data"], errors="coerce")
-        df_rc["Mes"] = df_rc["Data"].dt.month
-
-    # garante listas de categorias selecionadas
-    if not receita:
-        receita = df_rc['Categoria'].unique().tolist() if not df_rc.empty and len(df_rc) > 0 else []
-    if not despesa:
-        despesa = df_ds['Categoria'].unique().tolist() if not df_ds.empty and len(df_ds) > 0 else []
-
-    # aplica filtros por categoria antes de calcular acumulados
-    if not df_ds.empty and len(despesa) > 0:
-        df_ds = df_ds[df_ds['Categoria'].isin(despesa)]
-    if not df_rc.empty and len(receita) > 0:
-        df_rc = df_rc[df_rc['Categoria'].isin(receita)]
-
-    # calcula acumulados após filtro
-    if not df_ds.empty and len(df_ds) > 0:
-        df_ds['Acumulo'] = df_ds['Valor'].cumsum()
-    if not df_rc.empty and len(df_rc) > 0:
-        df_rc['Acumulo'] = df_rc['Valor'].cumsum()
-
-    # saldo mensal a partir dos dados filtrados
-    if not df_rc.empty and not df_ds.empty and len(df_rc) > 0 and len(df_ds) > 0:
-        df_receitas_mes = df_rc.groupby("Mes")["Valor"].sum()
-        df_despesas_mes = df_ds.groupby("Mes")["Valor"].sum()
-        df_saldo_mes = df_receitas_mes - df_despesas_mes
-        df_saldo_mes = df_saldo_mes.reset_index(name='Valor')
-        df_saldo_mes['Acumulado'] = df_saldo_mes['Valor'].cumsum()
-        # converte número do mês para abreviação de forma segura
-        df_saldo_mes['Mes'] = df_saldo_mes['Mes'].apply(lambda x: calendar.month_abbr[int(x)] if not pd.isna(x) else '')
-    
-    # Adiciona trace apenas se há dados
-    if not df_rc.empty and len(df_rc) > 0 and 'Acumulo' in df_rc.columns:
+    if not df_rc.empty:
         fig.add_trace(go.Scatter(name='Receitas', x=df_rc['Data'], y=df_rc['Acumulo'], fill='tonextx', mode='lines'))
 
     fig.update_layout(margin=GRAPH_MARGIN, template=template_from_url(theme))
@@ -462,65 +255,14 @@ def update_output(data_despesa, data_receita, despesa, receita, theme):
     Input(ThemeChangerAIO.ids.radio("theme"), "value")]    
 )
 def graph2_show(data_receita, data_despesa, receita, despesa, start_date, end_date, theme):
-    df_ds = pd.DataFrame(data_despesa)
-    df_rc = pd.DataFrame(data_receita)
-    
-    # Excluir receitas que são destinadas a planos específicos
-    if not df_rc.empty and 'plano_id' in df_rc.columns:
-        df_rc = df_rc[df_rc['plano_id'].isna()]
-
-    # Regras consistentes com saldo (despesas em aberto e receitas efetivadas)
-    df_ds, df_rc = _apply_saldo_rules(df_ds, df_rc)
-
-    # Validar colunas necessárias
-    if df_rc.empty or 'Categoria' not in df_rc.columns or 'Valor' not in df_rc.columns or 'Data' not in df_rc.columns:
-        df_rc = pd.DataFrame(columns=['Data', 'Valor', 'Categoria', 'Output'])
-    else:
-        # adiciona coluna Output para legenda
-        df_rc['Output'] = 'Receitas'
-    
-    if df_ds.empty or 'Categoria' not in df_ds.columns or 'Valor' not in df_ds.columns or 'Data' not in df_ds.columns:
-        df_ds = pd.DataFrame(columns=['Data', 'Valor', 'Categoria', 'Output'])
-    else:
-        # adiciona coluna Output para legenda
-        df_ds['Output'] = 'Despesas'
+    model = get_model(data_despesa, data_receita)
 
-    # concatena e normaliza datas
-    df_final = pd.concat([df_rc, df_ds], ignore_index=True, sort=False) if len([df for df in [df_rc, df_ds] if not df.empty])>0 else pd.DataFrame()
+    # Receitas efetivadas e despesas em aberto do período, filtradas por categoria
+    df_final = model.barras(start_date, end_date, receita, despesa)
     if df_final.empty:
-        fig = px.bar(pd.DataFrame(columns=['Data','Valor','Output']), x="Data", y="Valor", color='Output', barmode="group")
-        fig.update_layout(margin=GRAPH_MARGIN, template=template_from_url(theme))
-        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        return fig
-
-    # garante que Data seja datetime
-    df_final['Data'] = pd.to_datetime(df_final['Data'], errors='coerce')
-
-    # interpreta start/end
-    start = pd.to_datetime(start_date, errors='coerce')
-    end = pd.to_datetime(end_date, errors='coerce')
-
-    if not pd.isna(start) and not pd.isna(end):
-        mask = (df_final['Data'] >= start) & (df_final['Data'] <= end)
-        df_final = df_final.loc[mask]
+        df_final = pd.DataFrame(columns=['Data', 'Valor', 'Output'])
 
-    # categorias padrão (se nenhum filtro selecionado)
-    if not receita:
-        receita = df_rc['Categoria'].unique().tolist() if not df_rc.empty and len(df_rc) > 0 else []
-    if not despesa:
-        despesa = df_ds['Categoria'].unique().tolist() if not df_ds.empty and len(df_ds) > 0 else []
-
-    # aplica filtro de categorias
-    if not df_final.empty and (len(receita) > 0 or len(despesa) > 0):
-        df_final = df_final[df_final['Categoria'].isin(receita) | df_final['Categoria'].isin(despesa)]
-
-    if df_final.empty:
-        fig = px.bar(pd.DataFrame(columns=['Data','Valor','Output']), x="Data", y="Valor", color='Output', barmode="group")
-        fig.update_layout(margin=GRAPH_MARGIN, template=template_from_url(theme))
-        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        return fig
-
-    fig = px.bar(df_final.sort_values('Data'), x="Data", y="Valor", color='Output', barmode="group")        
+    fig = px.bar(df_final, x="Data", y="Valor", color='Output', barmode="group")
     fig.update_layout(margin=GRAPH_MARGIN, template=template_from_url(theme))
     fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
 
@@ -532,18 +274,15 @@ def graph2_show(data_receita, data_despesa, receita, despesa, start_date, end_da
     Output('graph3', "figure"),
     [Input('store-receitas', 'data'),
     Input('dropdown-receita', 'value'),
-    Input(ThemeChangerAIO.ids.radio("theme"), "value")]
+    Input(ThemeChangerAIO.ids.radio("theme"), "value")],
+    State('store-despesas', 'data')
 )
-def pie_receita(data_receita, receita, theme):
-    df = pd.DataFrame(data_receita)
-
+def pie_receita(data_receita, receita, theme, data_despesa):
     # Regras consistentes com saldo para receitas
-    df = _normalize_receitas_for_saldo(df)
-    if not df.empty and 'Efetuado' in df.columns:
-        df = df[df['Efetuado'] == 1]
+    df = get_model(data_despesa, data_receita).pizza('receitas', receita)
     
     # Verifica se o DataFrame está vazio ou não tem dados
-    if df.empty or 'Categoria' not in df.columns:
+    if df is None:
         fig = go.Figure()
         fig.update_layout(
             title={'text': "Receitas"},
@@ -553,8 +292,6 @@ def pie_receita(data_receita, receita, theme):
             plot_bgcolor='rgba(0,0,0,0)'
         )
         return fig
-    
-    df = df[df['Categoria'].isin(receita)]
 
     fig = px.pie(df, values=df.Valor, names=df.Categoria, hole=.2)
     fig.update_layout(title={'text': "Receitas"})
@@ -568,18 +305,15 @@ def pie_receita(data_receita, receita, theme):
     Output('graph4', "figure"),
     [Input('store-despesas', 'data'),
     Input('dropdown-despesa', 'value'),
-    Input(ThemeChangerAIO.ids.radio("theme"), "value")]
+    Input(ThemeChangerAIO.ids.radio("theme"), "value")],
+    State('store-receitas', 'data')
 )
-def pie_despesa(data_despesa, despesa, theme):
-    df = pd.DataFrame(data_despesa)
-
+def pie_despesa(data_despesa, despesa, theme, data_receita):
     # Regras consistentes com saldo para despesas
-    df = _normalize_despesas_for_saldo(df)
-    if not df.empty and 'Status' in df.columns:
-        df = df[df['Status'] != StatusDespesa.PAGO]
+    df = get_model(data_despesa, data_receita).pizza('despesas', despesa)
     
     # Verifica se o DataFrame está vazio ou não tem dados
-    if df.empty or 'Categoria' not in df.columns:
+    if df is None:
         fig = go.Figure()
         fig.update_layout(
             title={'text': "Despesas"},
@@ -589,8 +323,6 @@ def pie_despesa(data_despesa, despesa, theme):
             plot_bgcolor='rgba(0,0,0,0)'
         )
         return fig
-    
-    df = df[df['Categoria'].isin(despesa)]
 
     fig = px.pie(df, values=df.Valor, names=df.Categoria, hole=.2)
     fig.update_layout(title={'text': "Despesas"})
@@ -607,13 +339,14 @@ def pie_despesa(data_despesa, despesa, theme):
     [Input("store-despesas", "data"),
      Input("store-user", "data"),
      Input('date-picker-config', 'start_date'),
-     Input('date-picker-config', 'end_date')]
+     Input('date-picker-config', 'end_date')],
+    State("store-receitas", "data")
 )
-def mostrar_alertas_orcamento(despesas, user, start_date, end_date):
+def mostrar_alertas_orcamento(despesas, user, start_date, end_date, receitas):
     if not user or 'id' not in user:
         return None
     
-    from db import get_orcamentos, get_gastos_por_categoria
+    from db import get_orcamentos
     
     # Pegar mês e ano do período selecionado
     try:
@@ -630,8 +363,8 @@ def mostrar_alertas_orcamento(despesas, user, start_date, end_date):
     if not orcamentos:
         return None
     
-    # Buscar gastos
-    gastos = get_gastos_por_categoria(user['id'], mes, ano)
+    # Gastos do mês a partir do modelo compartilhado (sem nova consulta ao banco)
+    gastos = get_model(despesas, receitas).gastos_por_categoria(mes, ano)
     
     # Criar alertas
     alertas = []
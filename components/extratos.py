@@ -1,3 +1,5 @@
+import math
+
 import dash
 import dash_bootstrap_components as dbc
 import pandas as pd
@@ -6,7 +8,8 @@ import plotly.graph_objects as go
 from dash import dash_table, dcc, html
 from dash.dependencies import Input, Output, State
 from dash_bootstrap_templates import template_from_url, ThemeChangerAIO
-from db import table_to_df, delete_transacao, update_transacao
+from db import COLUNAS_EXTRATO, delete_transacao, get_pagina_transacoes, update_transacoes_lote
+from data_access import is_token, resolve_frame
 
 # Local imports
 from app import app
@@ -15,16 +18,24 @@ from constants import (
     StatusDespesa, EFETUADO_SIM, EFETUADO_NAO, FIXO_SIM, FIXO_NAO
 )
 
-from utils.validators import (
-    yesno_to_int, parse_float_value, normalize_date,
-    normalize_string, validate_status
+from utils.validators import yesno_to_int
+from utils.alteracoes import diff_transacoes
+from utils.normalizers import (
+    PAGO, normalize_status_series, normalize_efetuado_series, yesno_to_int_series
 )
+from utils.filtros_tabela import parse_filter_query
+from logs import get_logger
+
+log = get_logger(__name__)
 
 # =========  Layout  =========== #
 layout = dbc.Col([
     # Store para rastrear deleções manuais
     dcc.Store(id='deleted-receitas-ids', data=[]),
     dcc.Store(id='deleted-despesas-ids', data=[]),
+    # Cursores de keyset das páginas já visitadas (ver _pagina_extrato)
+    dcc.Store(id='cursores-receitas', data={}),
+    dcc.Store(id='cursores-despesas', data={}),
     
     # Filtro de período
     dbc.Row([
@@ -77,12 +88,16 @@ layout = dbc.Col([
             data=[],
             editable=True,
             row_deletable=True,
-            filter_action="native",
-            sort_action="native",
+            # Paginação, filtros e ordenação no servidor (atualizar_dados_*)
+            filter_action="custom",
+            filter_query='',
+            sort_action="custom",
             sort_mode="single",
-            page_action="native",
+            sort_by=[],
+            page_action="custom",
             page_current=0,
-            page_size=10,
+            page_size=TABLE_PAGE_SIZE,
+            page_count=1,
             style_cell_conditional=[
                 {'if': {'column_id': 'id'}, 'width': '0px', 'minWidth': '0px', 'maxWidth': '0px', 'overflow': 'hidden'}
             ],
@@ -141,12 +156,16 @@ layout = dbc.Col([
             data=[],
             editable=True,
             row_deletable=True,
-            filter_action="native",
-            sort_action="native",
+            # Paginação, filtros e ordenação no servidor (atualizar_dados_*)
+            filter_action="custom",
+            filter_query='',
+            sort_action="custom",
             sort_mode="single",
-            page_action="native",
+            sort_by=[],
+            page_action="custom",
             page_current=0,
-            page_size=10,
+            page_size=TABLE_PAGE_SIZE,
+            page_count=1,
             style_cell_conditional=[
                 {'if': {'column_id': 'id'}, 'width': '0px', 'minWidth': '0px', 'maxWidth': '0px', 'overflow': 'hidden'}
             ],
@@ -227,160 +246,174 @@ layout = dbc.Col([
 
 # =========  Callbacks  =========== #
 # Helpers
-def _normalize_row(row):
-    """Normaliza uma linha de dados para atualização no banco"""
-    # Normaliza Status para despesas
-    status = validate_status(row.get("Status"))
-    
-    # Para receitas, Efetuado ainda existe
-    efetuado = yesno_to_int(row.get("Efetuado"))
-    
-    result = {
-        "Valor": parse_float_value(row.get("Valor")),
-        "Fixo": yesno_to_int(row.get("Fixo")),
-        "Data": normalize_date(row.get("Data")),
-        "Categoria": normalize_string(row.get("Categoria")),
-        "Descrição": normalize_string(row.get("Descrição")),
-    }
-    
-    # Adiciona Efetuado apenas se existir (para receitas)
-    if efetuado is not None:
-        result["Efetuado"] = efetuado
-    
-    # Adiciona Status apenas se existir (para despesas)
-    if status is not None:
-        result["Status"] = status
-    
-    # Adiciona forma_pagamento e cartao_id para despesas
-    if 'forma_pagamento' in row:
-        forma_pag = row.get('forma_pagamento', 'dinheiro')
-        result["forma_pagamento"] = forma_pag if forma_pag and forma_pag != '-' else 'dinheiro'
-        
-        # Se for cartão, salva o cartao_id
-        if forma_pag == 'cartao' and 'cartao_id' in row:
-            cartao_id = row.get('cartao_id')
-            if cartao_id and str(cartao_id).strip() and cartao_id != '-':
-                try:
-                    result["cartao_id"] = int(cartao_id)
-                    
-                    # Calcular fatura_mes e fatura_ano baseado na Data
-                    if result.get("Data"):
-                        from datetime import datetime
-                        data = result["Data"]
-                        if isinstance(data, str):
-                            data_obj = datetime.strptime(data, "%Y-%m-%d")
-                            result["fatura_mes"] = data_obj.month
-                            result["fatura_ano"] = data_obj.year
-                            print(f"[EXTRATOS] Calculado fatura_mes={result['fatura_mes']}, fatura_ano={result['fatura_ano']} da Data={data}")
-                except (ValueError, TypeError):
-                    result["cartao_id"] = None
-            else:
-                result["cartao_id"] = None
-        else:
-            result["cartao_id"] = None
-    
-    print(f"[EXTRATOS] _normalize_row resultado: {result}")
-    return result
-
-# Tabela receitas - atualizar dados
+def _filtros_extrato(filter_query):
+    """Termos do filter_query no formato gravado no banco"""
+    filtros = []
+    for coluna, operador, valor in parse_filter_query(filter_query):
+        # Efetuado/Fixo aparecem como Sim/Não, mas são gravados como 1/0
+        if coluna in ('Efetuado', 'Fixo'):
+            valor = yesno_to_int(valor)
+            if valor is None:
+                continue
+            operador = '!=' if operador == '!=' else '='
+        filtros.append((coluna, operador, valor))
+    return filtros
+
+
+def _pagina_extrato(table, token, user, start_date, end_date, page_current, page_size, sort_by, filter_query, cursores):
+    """Página da DataTable lida no banco: (DataFrame, page_count, pagina, cursores).
+
+    `cursores` guarda, por página, o [valor, id] da última linha da página
+    anterior, para que avançar/voltar entre páginas já visitadas use keyset,
+    o total de linhas da consulta e os ids da página entregue. Total e
+    cursores valem enquanto a versão dos dados (token do store) não muda:
+    uma inclusão ou exclusão desloca as fronteiras das páginas. Mudou
+    filtro, ordenação, período ou tamanho da página, os cursores são
+    descartados e a tabela volta à primeira página; sem cursor, a página é
+    lida por OFFSET. `pagina` é a página entregue, limitada a page_count - 1
+    (a exclusão que encolhe o total não deixa a tabela numa página vazia).
+    """
+    colunas = list(COLUNAS_EXTRATO[table])
+    user_id = user['id'] if user and 'id' in user else (token['user_id'] if is_token(token) else None)
+    if user_id is None:
+        return pd.DataFrame(columns=colunas), 1, 0, {}
+
+    ordenacao = [sort_by[0]['column_id'], sort_by[0]['direction']] if sort_by else None
+    consulta = [filter_query or '', ordenacao, start_date, end_date, page_size]
+    versao = token['version'] if is_token(token) else None
+    pagina = page_current or 0
+    if not cursores or cursores.get('consulta') != consulta:
+        cursores = {'consulta': consulta, 'paginas': {}}
+        pagina = 0
+    elif cursores.get('versao') != versao:
+        cursores = {'consulta': consulta, 'paginas': {}}
+    total = cursores.get('total') if versao is not None else None
+    size = page_size or TABLE_PAGE_SIZE
+
+    def ler(pagina, total):
+        return get_pagina_transacoes(
+            table, user_id, size,
+            filtros=_filtros_extrato(filter_query),
+            ordenacao=ordenacao,
+            cursor=cursores['paginas'].get(str(pagina)) if pagina else None,
+            pagina=pagina,
+            data_inicio=start_date if start_date and end_date else None,
+            data_fim=end_date if start_date and end_date else None,
+            total=total,
+        )
+
+    resultado = ler(pagina, total)
+    page_count = max(1, math.ceil(resultado['total'] / size))
+    if pagina >= page_count:
+        pagina = page_count - 1
+        resultado = ler(pagina, resultado['total'])
+    if resultado['cursor']:
+        cursores['paginas'][str(pagina + 1)] = resultado['cursor']
+    cursores['total'], cursores['versao'] = resultado['total'], versao
+    # Linhas entregues: o "Salvar" compara a página editada com elas
+    cursores['ids'] = [linha['id'] for linha in resultado['linhas']]
+
+    return pd.DataFrame(resultado['linhas'], columns=colunas), page_count, pagina, cursores
+
+
+# Tabela receitas - atualizar dados (só a página visível)
 @app.callback(
     Output('datatable-receitas', 'data'),
+    Output('datatable-receitas', 'page_count'),
+    Output('datatable-receitas', 'page_current'),
+    Output('cursores-receitas', 'data'),
     [Input('store-receitas', 'data'),
      Input('date-picker-extratos', 'start_date'),
-     Input('date-picker-extratos', 'end_date')]
+     Input('date-picker-extratos', 'end_date'),
+     Input('datatable-receitas', 'page_current'),
+     Input('datatable-receitas', 'page_size'),
+     Input('datatable-receitas', 'sort_by'),
+     Input('datatable-receitas', 'filter_query')],
+    State('store-user', 'data'),
+    State('cursores-receitas', 'data')
 )
-def atualizar_dados_receitas(data, start_date, end_date):
-    df = pd.DataFrame(data)
-    if df.empty:
-        df = pd.DataFrame(columns=["id", "Valor", "Efetuado", "Fixo", "Data", "Categoria", "Descrição", "user_id"])
-    
-    df['Data'] = pd.to_datetime(df['Data']).dt.date
-    
-    # Aplicar filtro de período
-    if start_date and end_date:
-        start = pd.to_datetime(start_date).date()
-        end = pd.to_datetime(end_date).date()
-        df = df[(df['Data'] >= start) & (df['Data'] <= end)]
-
-    df['Efetuado'] = df['Efetuado'].astype(object)
-    df.loc[df['Efetuado'] == 0, 'Efetuado'] = EFETUADO_NAO
-    df.loc[df['Efetuado'] == 1, 'Efetuado'] = EFETUADO_SIM
+def atualizar_dados_receitas(data, start_date, end_date, page_current, page_size, sort_by, filter_query, user, cursores):
+    df, page_count, pagina, cursores = _pagina_extrato('receitas', data, user, start_date, end_date,
+                                               page_current, page_size, sort_by, filter_query, cursores)
 
-    df['Fixo'] = df['Fixo'].astype(object)
-    df.loc[df['Fixo'] == 0, 'Fixo'] = FIXO_NAO
-    df.loc[df['Fixo'] == 1, 'Fixo'] = FIXO_SIM
+    df['Efetuado'] = normalize_efetuado_series(df['Efetuado']).map({1: EFETUADO_SIM, 0: EFETUADO_NAO})
+    df['Fixo'] = yesno_to_int_series(df['Fixo']).map({1: FIXO_SIM, 0: FIXO_NAO})
 
     df = df.fillna('-')
-    df = df.drop(columns=[c for c in ["user_id"] if c in df.columns])
-    df = df.sort_values(by='Data', ascending=True)
-    
-    return df.to_dict('records')
+    return df.to_dict('records'), page_count, pagina if pagina != page_current else dash.no_update, cursores
 
-# Tabela despesas - atualizar dados
+# Tabela despesas - atualizar dados (só a página visível)
 @app.callback(
     Output('datatable-despesas', 'data'),
+    Output('datatable-despesas', 'page_count'),
+    Output('datatable-despesas', 'page_current'),
+    Output('cursores-despesas', 'data'),
     [Input('store-despesas', 'data'),
      Input('date-picker-extratos', 'start_date'),
      Input('date-picker-extratos', 'end_date'),
-     Input('store-user', 'data')]
+     Input('store-user', 'data'),
+     Input('datatable-despesas', 'page_current'),
+     Input('datatable-despesas', 'page_size'),
+     Input('datatable-despesas', 'sort_by'),
+     Input('datatable-despesas', 'filter_query')],
+    State('cursores-despesas', 'data')
 )
-def atualizar_dados_despesas(data, start_date, end_date, user):
-    df = pd.DataFrame(data)
-    if df.empty:
-        df = pd.DataFrame(columns=["id", "Valor", "Status", "Fixo", "Data", "Categoria", "Descrição", "user_id", "forma_pagamento", "cartao_id"])
-    
-    df['Data'] = pd.to_datetime(df['Data']).dt.date
-    
-    # Aplicar filtro de período
-    if start_date and end_date:
-        start = pd.to_datetime(start_date).date()
-        end = pd.to_datetime(end_date).date()
-        df = df[(df['Data'] >= start) & (df['Data'] <= end)]
+def atualizar_dados_despesas(data, start_date, end_date, user, page_current, page_size, sort_by, filter_query, cursores):
+    df, page_count, pagina, cursores = _pagina_extrato('despesas', data, user, start_date, end_date,
+                                               page_current, page_size, sort_by, filter_query, cursores)
 
-    # Se tiver Status, usa ele; senão mantém Efetuado (migração)
-    if 'Status' not in df.columns:
-        df['Status'] = df.get('Efetuado', 0).apply(lambda x: StatusDespesa.PAGO if x == 1 else StatusDespesa.A_VENCER)
-    
     # Normaliza Status (garante que não tenha valores inválidos)
-    df['Status'] = df['Status'].fillna(StatusDespesa.A_VENCER)
+    df['Status'] = normalize_status_series(df['Status'])
 
-    df['Fixo'] = df['Fixo'].astype(object)
-    df.loc[df['Fixo'] == 0, 'Fixo'] = FIXO_NAO
-    df.loc[df['Fixo'] == 1, 'Fixo'] = FIXO_SIM
+    df['Fixo'] = yesno_to_int_series(df['Fixo']).map({1: FIXO_SIM, 0: FIXO_NAO})
     
     # Forma de pagamento (padrão: dinheiro para registros antigos)
-    if 'forma_pagamento' not in df.columns:
-        df['forma_pagamento'] = 'dinheiro'
     df['forma_pagamento'] = df['forma_pagamento'].fillna('dinheiro')
     
-    # Manter cartao_id como está (será usado para edição)
-    if 'cartao_id' not in df.columns:
-        df['cartao_id'] = None
-    
     # Limpar cartao_id se Status não é "Pago" (garantir consistência)
-    if 'Status' in df.columns and 'cartao_id' in df.columns:
-        df.loc[df['Status'] != StatusDespesa.PAGO, 'cartao_id'] = None
-        df.loc[df['Status'] != StatusDespesa.PAGO, 'forma_pagamento'] = 'dinheiro'
+    df.loc[df['Status'] != PAGO, 'cartao_id'] = None
+    df.loc[df['Status'] != PAGO, 'forma_pagamento'] = 'dinheiro'
     
     # Converter para string vazia se for None/NaN para exibir no DataTable
     df['cartao_id'] = df['cartao_id'].apply(lambda x: int(x) if pd.notna(x) and x else '')
 
     df = df.fillna('-')
-    # Remove colunas desnecessárias mas MANTÉM cartao_id
-    df = df.drop(columns=[c for c in ["user_id", "Efetuado"] if c in df.columns])
-    df = df.sort_values(by='Data', ascending=True)
+    return df.to_dict('records'), page_count, pagina if pagina != page_current else dash.no_update, cursores
+
+def _salvar_edicoes(table, current_data, all_data, user_id, cursores):
+    """Grava o changeset da página (diff_transacoes contra as linhas do store
+    entregues à DataTable): alterações em um único update_transacoes_lote e
+    linhas removidas (X) com delete_transacao. Retorna (atualizados, deletados)."""
+    ids_entregues = set((cursores or {}).get('ids') or [])
+    if not ids_entregues or not all_data:
+        return 0, 0
+
+    df = resolve_frame(all_data, table)
+    if df.empty:
+        return 0, 0
+    changeset = diff_transacoes(current_data or [], df[df['id'].isin(ids_entregues)], table)
+
+    atualizados = 0
+    if changeset['alteradas']:
+        resultados = update_transacoes_lote(table, list(changeset['alteradas'].items()), user_id)
+        atualizados = sum(1 for r in resultados if r['resultado'] == 'atualizada')
+    for rid in changeset['removidas']:
+        delete_transacao(table, rid, user_id)
+    return atualizados, len(changeset['removidas'])
 
-    return df.to_dict('records')
 
 # Rastrear remoções de linhas na tabela de receitas
+# data_timestamp só muda em edições do usuário: trocar de página também
+# substitui `data`, e isso não é remoção
 @app.callback(
     Output('deleted-receitas-ids', 'data'),
-    Input('datatable-receitas', 'data'),
+    Input('datatable-receitas', 'data_timestamp'),
+    State('datatable-receitas', 'data'),
     State('datatable-receitas', 'data_previous'),
     State('deleted-receitas-ids', 'data'),
     prevent_initial_call=True
 )
-def track_receitas_deletions(current_data, previous_data, deleted_ids):
+def track_receitas_deletions(data_timestamp, current_data, previous_data, deleted_ids):
     if previous_data is None or current_data is None:
         return deleted_ids or []
     
@@ -437,7 +470,7 @@ def deletar_receitas(n_clicks, deleted_ids, user, refresh):
             delete_transacao('receitas', rid, user['id'])
             deletados += 1
         except Exception as e:
-            print(f"Erro ao deletar receita {rid}: {e}")
+            log.error('Erro ao deletar receita', id=rid, erro=e)
     
     if deletados > 0:
         return (refresh or 0) + 1, dbc.Alert(f"✓ {deletados} receita(s) deletada(s)", color="success", duration=4000), []
@@ -455,9 +488,10 @@ def deletar_receitas(n_clicks, deleted_ids, user, refresh):
     State('store-receitas', 'data'),
     State('store-user', 'data'),
     State('store-refresh-receitas', 'data'),
+    State('cursores-receitas', 'data'),
     prevent_initial_call=True
 )
-def sync_receitas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
+def sync_receitas(n_clicks, current_data, deleted_ids, all_data, user, refresh, cursores):
     if not n_clicks:
         return dash.no_update, "", dash.no_update
     if not user or 'id' not in user:
@@ -465,33 +499,11 @@ def sync_receitas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
     if not current_data:
         return dash.no_update, dbc.Alert("Sem dados para salvar", color="warning", duration=3000), dash.no_update
     
-    # Mapear TODOS os registros do store (fonte de verdade)
-    all_records = {}
-    if all_data:
-        for r in all_data:
-            try:
-                if r.get('id') is not None and str(r.get('id')).strip():
-                    all_records[int(r['id'])] = r
-            except (ValueError, TypeError):
-                continue
-    
-    deletados = 0
-    atualizados = 0
-    
-    # Processar atualizações comparando tabela atual com store
-    if current_data:
-        for row in current_data:
-            try:
-                if row.get('id') is not None and str(row.get('id')).strip():
-                    rid = int(row['id'])
-                    if rid in all_records:
-                        new_row = _normalize_row(row)
-                        old_row = _normalize_row(all_records[rid])
-                        if new_row != old_row:
-                            update_transacao('receitas', rid, new_row, user['id'])
-                            atualizados += 1
-            except (ValueError, TypeError):
-                continue
+    try:
+        atualizados, deletados = _salvar_edicoes('receitas', current_data, all_data, user['id'], cursores)
+    except Exception as e:
+        log.exception('Erro ao salvar receitas', user_id=user['id'])
+        return dash.no_update, dbc.Alert("Erro ao salvar alterações", color="danger", duration=4000), dash.no_update
     
     if atualizados > 0 or deletados > 0:
         msg_parts = []
@@ -505,14 +517,17 @@ def sync_receitas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
         return dash.no_update, dbc.Alert("Nenhuma alteração detectada", color="info", duration=3000), dash.no_update
 
 # Rastrear remoções de linhas na tabela de despesas
+# data_timestamp só muda em edições do usuário: trocar de página também
+# substitui `data`, e isso não é remoção
 @app.callback(
     Output('deleted-despesas-ids', 'data'),
-    Input('datatable-despesas', 'data'),
+    Input('datatable-despesas', 'data_timestamp'),
+    State('datatable-despesas', 'data'),
     State('datatable-despesas', 'data_previous'),
     State('deleted-despesas-ids', 'data'),
     prevent_initial_call=True
 )
-def track_despesas_deletions(current_data, previous_data, deleted_ids):
+def track_despesas_deletions(data_timestamp, current_data, previous_data, deleted_ids):
     if previous_data is None or current_data is None:
         return deleted_ids or []
     
@@ -569,7 +584,7 @@ def deletar_despesas(n_clicks, deleted_ids, user, refresh):
             delete_transacao('despesas', rid, user['id'])
             deletados += 1
         except Exception as e:
-            print(f"Erro ao deletar despesa {rid}: {e}")
+            log.error('Erro ao deletar despesa', id=rid, erro=e)
     
     if deletados > 0:
         return (refresh or 0) + 1, dbc.Alert(f"✓ {deletados} despesa(s) deletada(s)", color="success", duration=4000), []
@@ -587,9 +602,10 @@ def deletar_despesas(n_clicks, deleted_ids, user, refresh):
     State('store-despesas', 'data'),
     State('store-user', 'data'),
     State('store-refresh-despesas', 'data'),
+    State('cursores-despesas', 'data'),
     prevent_initial_call=True
 )
-def sync_despesas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
+def sync_despesas(n_clicks, current_data, deleted_ids, all_data, user, refresh, cursores):
     if not n_clicks:
         return dash.no_update, "", dash.no_update
     if not user or 'id' not in user:
@@ -597,33 +613,11 @@ def sync_despesas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
     if not current_data:
         return dash.no_update, dbc.Alert("Sem dados para salvar", color="warning", duration=3000), dash.no_update
     
-    # Mapear TODOS os registros do store (fonte de verdade)
-    all_records = {}
-    if all_data:
-        for r in all_data:
-            try:
-                if r.get('id') is not None and str(r.get('id')).strip():
-                    all_records[int(r['id'])] = r
-            except (ValueError, TypeError):
-                continue
-    
-    deletados = 0
-    atualizados = 0
-    
-    # Processar atualizações comparando tabela atual com store
-    if current_data:
-        for row in current_data:
-            try:
-                if row.get('id') is not None and str(row.get('id')).strip():
-                    rid = int(row['id'])
-                    if rid in all_records:
-                        new_row = _normalize_row(row)
-                        old_row = _normalize_row(all_records[rid])
-                        if new_row != old_row:
-                            update_transacao('despesas', rid, new_row, user['id'])
-                            atualizados += 1
-            except (ValueError, TypeError):
-                continue
+    try:
+        atualizados, deletados = _salvar_edicoes('despesas', current_data, all_data, user['id'], cursores)
+    except Exception as e:
+        log.exception('Erro ao salvar despesas', user_id=user['id'])
+        return dash.no_update, dbc.Alert("Erro ao salvar alterações", color="danger", duration=4000), dash.no_update
     
     if atualizados > 0 or deletados > 0:
         msg_parts = []
@@ -645,7 +639,7 @@ def sync_despesas(n_clicks, current_data, deleted_ids, all_data, user, refresh):
     Input(ThemeChangerAIO.ids.radio("theme"), "value")]
 )
 def bar_chart(data, start_date, end_date, theme):
-    df = pd.DataFrame(data)
+    df = resolve_frame(data, 'despesas')
     
     if not df.empty:
         df['Data'] = pd.to_datetime(df['Data'])
@@ -689,7 +683,7 @@ def bar_chart(data, start_date, end_date, theme):
     Input('date-picker-extratos', 'end_date')]
 )
 def display_desp(data, start_date, end_date):
-    df = pd.DataFrame(data)
+    df = resolve_frame(data, 'despesas')
     
     if not df.empty:
         df['Data'] = pd.to_datetime(df['Data'])
@@ -751,12 +745,8 @@ def update_cartoes_dropdown(user, despesas_data):
             # Adicionar opção vazia no início
             cartoes_options.insert(0, {'label': '-', 'value': ''})
             dropdown_base['cartao_id']['options'] = cartoes_options
-            
-            print(f"[EXTRATOS] Dropdown atualizado com {len(cartoes_options)} opções de cartão")
         
         return dropdown_base
     except Exception as e:
-        print(f"[EXTRATOS] Erro ao atualizar dropdown de cartões: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception('Erro ao atualizar dropdown de cartões')
         return dropdown_base
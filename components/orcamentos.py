@@ -10,6 +10,9 @@ from db import (
     get_orcamentos, set_orcamento, delete_orcamento,
     get_gastos_por_categoria, table_to_df
 )
+from logs import get_logger
+
+log = get_logger(__name__)
 
 # =========  Layout  =========== #
 layout = dbc.Col([
@@ -272,5 +275,5 @@ def deletar_orcamento(n_clicks, user, refresh):
         delete_orcamento(orcamento_id, user['id'])
         return (refresh or 0) + 1
     except Exception as e:
-        print(f"Erro ao deletar orçamento: {e}")
+        log.error('Erro ao deletar orçamento', id=orcamento_id, erro=e)
         return dash.no_update
@@ -1,8 +1,5 @@
 # Standard library imports
 from datetime import datetime
-import json
-from urllib import request as urllib_request
-from urllib.parse import urlencode
 
 # Third party imports
 import dash_bootstrap_components as dbc
@@ -11,7 +8,6 @@ import plotly.graph_objects as go
 from dash import dcc, html, dash_table
 from dash.dependencies import Input, Output, State
 import dash
-from flask import request as flask_request
 
 # Local imports
 from app import app
@@ -21,9 +17,11 @@ from db import (
     get_aportes_by_user,
     get_anotacoes_planos, save_anotacoes_planos,
     calculate_plano_valor_acumulado, table_to_df,
-    calcular_rendimento_investimento, atualizar_valores_investimentos
+    calcular_rendimento_investimento, garantir_valores_investimentos
 )
+from calendario import calendario_padrao
 from constants import TipoInvestimento, TipoRendimento, TAXA_CDI_ANUAL
+from quote_service import get_quote
 
 # =========  Layout  =========== #
 layout = dbc.Col([
@@ -448,8 +446,9 @@ def load_user_planos(user, refresh):
     
     user_id = user['id']
     
-    # Atualizar valores dos investimentos com base nos rendimentos
-    atualizar_valores_investimentos(user_id)
+    # Valores dos investimentos: revalorizados diariamente pelo agendador
+    # (scheduler.py); aqui só recalcula se ainda não foram valorizados hoje
+    garantir_valores_investimentos(user_id)
     
     planos = get_planos_by_user(user_id)
     montantes = get_montantes_by_user(user_id)
@@ -1041,8 +1040,8 @@ def save_aporte(n, montante_id, montante_id_select, data_aporte, valor_aporte, q
         ticker=ticker
     )
 
-    # Recalcula imediatamente para refletir novo saldo do investimento
-    atualizar_valores_investimentos(user['id'])
+    # O aporte marca os investimentos do usuário para revalorização, feita
+    # pela recarga de /planos disparada abaixo
 
     return (refresh or 0) + 1
 
@@ -1064,12 +1063,10 @@ def buscar_cotacao_aporte(n_clicks, ticker):
     ticker = str(ticker).strip().upper()
 
     try:
-        base_url = flask_request.host_url.rstrip('/')
-        query = urlencode({'ticker': ticker})
-        url = f"{base_url}/api/investimentos/cotacao?{query}"
-
-        with urllib_request.urlopen(url, timeout=10) as response:
-            payload = json.loads(response.read().decode('utf-8'))
+        # Mesmo serviço do endpoint /api/investimentos/cotacao, chamado no processo
+        status, payload = get_quote(ticker)
+        if status != 200:
+            return dash.no_update, f"Erro ao buscar cotação: {payload.get('error', status)}"
 
         preco = payload.get('price')
         symbol = payload.get('ticker', ticker)
@@ -1194,20 +1191,19 @@ def calcular_rendimentos_display(valor_inicial, tipo_rendimento, taxa, data_inic
     valor_inicial = float(valor_inicial) if valor_inicial else 0
     taxa = float(taxa) if taxa else 0
     
-    # Calcula dias decorridos desde o início
+    # Calcula dias decorridos (corridos, para o IOF) e dias úteis desde o início
+    dias = dias_uteis = 0
     if data_inicio:
         try:
             data_inicio_obj = datetime.strptime(data_inicio.split('T')[0], '%Y-%m-%d').date()
-            dias = (date.today() - data_inicio_obj).days
-            if dias < 0:
-                dias = 0
+            if data_inicio_obj < date.today():
+                dias = (date.today() - data_inicio_obj).days
+                dias_uteis = calendario_padrao().dias_uteis(data_inicio_obj, date.today())
         except:
-            dias = 0
-    else:
-        dias = 0
+            dias = dias_uteis = 0
     
     resultado = calcular_rendimento_investimento(
-        valor_inicial, tipo_rendimento, taxa, dias
+        valor_inicial, tipo_rendimento, taxa, dias, dias_uteis
     )
     
     return (
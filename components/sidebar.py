@@ -22,6 +22,9 @@ from db import (
     insert_transacao, table_to_df, update_user_profile_photo
 )
 from globals import cat_despesa, cat_receita
+from logs import get_logger
+
+log = get_logger(__name__)
 
 
 # ========= Layout ========= #
@@ -483,7 +486,7 @@ def load_cartoes_user(user):
         cartoes = get_cartoes(user['id'])
         return [{"label": c['nome'], "value": c['id']} for c in cartoes if c.get('ativo', 1)]
     except Exception as e:
-        print(f"[SIDEBAR] Erro ao carregar cartões: {e}")
+        log.error('Erro ao carregar cartões', user_id=user['id'], erro=e)
         return []
 
 # Pop-up perfis
@@ -632,13 +635,11 @@ def add_category_despesa(n, n2, is_open, txt, check_delete, data, user, refresh_
     user_id = user['id'] if user and 'id' in user else None
     
     triggered = dash.callback_context.triggered_id
-    print(f"[CALLBACK] add_category_despesa - TRIGGERED: {triggered}, n={n}, n2={n2}, txt='{txt}', user_id={user_id}, refresh_cat_despesas={refresh_cat_despesas}")
 
     # lista atual baseada no store (que já deve ser do usuário) ou vazia
     cat_despesa = [item['Categoria'] for item in data if 'Categoria' in item] if data else []
 
     if n and triggered == "add-category-despesa":
-        print(f"[CALLBACK] Botão 'Adicionar' foi clicado!")
         if user_id is None:
             txt1 = "Faça login para adicionar categorias."
             style1 = {'color': 'red'}
@@ -647,17 +648,15 @@ def add_category_despesa(n, n2, is_open, txt, check_delete, data, user, refresh_
             style1 = {'color': 'red'}
         else:
             try:
-                print(f"[CALLBACK] Tentando inserir categoria '{txt}' para user_id={user_id}")
                 insert_cat('cat_despesa', txt, user_id)
                 txt1 = f'A categoria {txt} foi adicionada com sucesso!'
                 style1 = {'color': 'green'}
             except Exception as e:
-                print(f"[CALLBACK] Erro ao inserir categoria: {e}")
+                log.error('Erro ao inserir categoria', user_id=user_id, categoria=txt, erro=e)
                 txt1 = f'Erro ao adicionar categoria: {e}'
                 style1 = {'color': 'red'}
 
     if n2 and triggered == "remove-category-despesa":
-        print(f"[CALLBACK] Botão 'Remover' foi clicado!")
         if user_id is None:
             txt1 = "Faça login para remover categorias."
             style1 = {'color': 'red'}
@@ -668,15 +667,9 @@ def add_category_despesa(n, n2, is_open, txt, check_delete, data, user, refresh_
     # atualiza lista completa de categorias apenas do usuário
     if user_id is None:
         df_cat_despesa = pd.DataFrame(columns=['Categoria'])
-        print(f"[CALLBACK] user_id é None, usando DataFrame vazio")
     else:
         df_cat_despesa = table_to_df('cat_despesa', user_id=user_id)
-        print(f"[CALLBACK] table_to_df retornou: shape={df_cat_despesa.shape}, columns={df_cat_despesa.columns.tolist()}, empty={df_cat_despesa.empty}")
-        if not df_cat_despesa.empty:
-            print(f"[CALLBACK] Primeiras linhas do DataFrame:\n{df_cat_despesa.head()}")
-        
         if df_cat_despesa.empty or 'Categoria' not in df_cat_despesa.columns:
-            print(f"[CALLBACK] DataFrame vazio ou sem coluna Categoria, criando vazio")
             df_cat_despesa = pd.DataFrame(columns=['Categoria'])
     
     opt_despesa = [{"label": i, "value": i} for i in df_cat_despesa['Categoria'].tolist()]
@@ -691,7 +684,7 @@ def add_category_despesa(n, n2, is_open, txt, check_delete, data, user, refresh_
     else:
         new_refresh = refresh_cat_despesas
     
-    print(f"[CALLBACK] add_category_despesa - triggered_id={triggered_id}, new_refresh={new_refresh}, opt_despesa={opt_despesa}")
+    log.debug('add_category_despesa', triggered_id=triggered_id, user_id=user_id, categorias=len(opt_despesa))
 
     return [txt1, style1, opt_despesa, selected_value, opt_despesa, [], new_refresh]
 
@@ -782,22 +775,11 @@ def add_category_receita(n, n2, is_open, txt, check_delete, data, user, refresh_
         State("switches-input-receita", "value"),
         State("select_receita", "value"),
         State("select_plano_receita", "value"),
-        State('store-receitas', 'data'),
         State('store-user', 'data'),
         State('store-refresh-receitas', 'data')
     ]
 )
-def salve_form_receita(n, descricao, valor, date, switches, categoria, plano_id, dict_receitas, user, refresh_receitas):
-    # garante colunas esperadas e insere linha de forma segura
-    expected_cols = ['Valor', 'Efetuado', 'Fixo', 'Data', 'Categoria', 'Descrição', 'user_id']
-    df_receitas = pd.DataFrame(dict_receitas)
-    if df_receitas.empty:
-        df_receitas = pd.DataFrame(columns=expected_cols)
-    else:
-        for c in expected_cols:
-            if c not in df_receitas.columns:
-                df_receitas[c] = None
-
+def salve_form_receita(n, descricao, valor, date, switches, categoria, plano_id, user, refresh_receitas):
     if n and not(valor == "" or valor == None):
         valor = round(float(valor), 2)
         date_iso = pd.to_datetime(date).strftime('%Y-%m-%d')
@@ -833,21 +815,10 @@ def salve_form_receita(n, descricao, valor, date, switches, categoria, plano_id,
         State("input-parcelas", "value"),
         State("select-forma-pagamento", "value"),
         State("select-cartao", "value"),
-        State('store-despesas', 'data'),
         State('store-user', 'data'),
         State('store-refresh-despesas', 'data')
     ])
-def salve_form_despesa(n, descricao, valor, date, switches, categoria, status, num_parcelas, forma_pagamento, cartao_id, dict_despesas, user, refresh_despesas):
-    # garante colunas esperadas e insere linha de forma segura
-    expected_cols = ['Valor', 'Status', 'Fixo', 'Data', 'Categoria', 'Descrição', 'user_id']
-    df_despesas = pd.DataFrame(dict_despesas)
-    if df_despesas.empty:
-        df_despesas = pd.DataFrame(columns=expected_cols)
-    else:
-        for c in expected_cols:
-            if c not in df_despesas.columns:
-                df_despesas[c] = None
-
+def salve_form_despesa(n, descricao, valor, date, switches, categoria, status, num_parcelas, forma_pagamento, cartao_id, user, refresh_despesas):
     if n and not(valor == "" or valor == None):
         from datetime import datetime
         from db import insert_despesa_parcelada, insert_despesa_com_cartao
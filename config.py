@@ -31,8 +31,62 @@ class BaseConfig:
     
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR}/finance.db')
-    
-    # Logging
+
+    # Pool de conexões (por processo / worker do gunicorn)
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))            # conexões mantidas abertas
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))           # limite total (min + overflow)
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10))   # espera no checkout
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 1800))   # recicla conexões antigas
+
+    # Cache de receitas/despesas por usuário (por processo), chave (user_id, data_version)
+    DATA_CACHE_MAX_ENTRIES = int(os.getenv('DATA_CACHE_MAX_ENTRIES', 256))
+
+    # Modelos derivados do dashboard (por processo); 0 desliga a memoização
+    DASHBOARD_MODEL_MAX_ENTRIES = int(os.getenv('DASHBOARD_MODEL_MAX_ENTRIES', 64))
+
+    # Cotações (/api/investimentos/cotacao): as páginas candidatas do Status
+    # Invest são buscadas em paralelo, com timeout por página e prazo total
+    STATUS_INVEST_BASE_URL = os.getenv('STATUS_INVEST_BASE_URL', 'https://statusinvest.com.br')
+    QUOTE_FETCH_TIMEOUT_SECONDS = float(os.getenv('QUOTE_FETCH_TIMEOUT_SECONDS', 8))
+    QUOTE_DEADLINE_SECONDS = float(os.getenv('QUOTE_DEADLINE_SECONDS', 10))
+    QUOTE_FETCH_WORKERS = int(os.getenv('QUOTE_FETCH_WORKERS', 16))
+    # Lote (/api/investimentos/cotacoes): tickers por consulta, buscas
+    # simultâneas no processo (todos os lotes juntos) e consultas por minuto
+    # de cada IP
+    QUOTE_BATCH_MAX_TICKERS = int(os.getenv('QUOTE_BATCH_MAX_TICKERS', 50))
+    QUOTE_BATCH_CONCURRENCY = int(os.getenv('QUOTE_BATCH_CONCURRENCY', 4))
+    QUOTE_BATCH_RATE_LIMIT_PER_MINUTE = int(os.getenv('QUOTE_BATCH_RATE_LIMIT_PER_MINUTE', 20))
+
+    # Cache de cotações (quote_cache.py): LRU com TTL, cache negativo para
+    # tickers inexistentes e, com o caminho de um arquivo SQLite, compartilhado
+    # entre os workers do host (vazio = memória de cada processo)
+    QUOTE_CACHE_TTL_SECONDS = int(os.getenv('QUOTE_CACHE_TTL_SECONDS', 60))
+    QUOTE_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv('QUOTE_CACHE_NEGATIVE_TTL_SECONDS', 600))
+    QUOTE_CACHE_MAX_ENTRIES = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 1024))
+    QUOTE_CACHE_SQLITE_PATH = os.getenv('QUOTE_CACHE_SQLITE_PATH', '')
+
+    # Histórico das taxas CDI/Selic/IPCA usado na valorização dos investimentos
+    # (taxas_historicas.py); vazio usa as taxas constantes de constants.py
+    TAXAS_HISTORICAS_CSV = os.getenv('TAXAS_HISTORICAS_CSV', str(BASE_DIR / 'data' / 'taxas_historicas.csv'))
+
+    # Feriados do calendário de dias úteis usado nos rendimentos (calendario.py)
+    FERIADOS_CSV = os.getenv('FERIADOS_CSV', str(BASE_DIR / 'data' / 'feriados.csv'))
+
+    # Revalorização diária dos investimentos (scheduler.py): a thread do
+    # agendador roda em cada processo, mas um advisory lock garante uma
+    # execução por vez; cada passada só processa quem ainda não foi valorizado hoje
+    REVALORIZACAO_AGENDADA = os.getenv('REVALORIZACAO_AGENDADA', 'True') == 'True'
+    REVALORIZACAO_INTERVALO_SEGUNDOS = int(os.getenv('REVALORIZACAO_INTERVALO_SEGUNDOS', 3600))
+    REVALORIZACAO_ATRASO_INICIAL_SEGUNDOS = int(os.getenv('REVALORIZACAO_ATRASO_INICIAL_SEGUNDOS', 60))
+    REVALORIZACAO_LOTE_USUARIOS = int(os.getenv('REVALORIZACAO_LOTE_USUARIOS', 200))
+
+    # Métricas dos callbacks do Dash (metricas.py): tempo, tempo no banco e
+    # bytes por callback em /admin/metricas/callbacks; com intervalo > 0 o
+    # resumo também vai para o log a cada tantos segundos
+    CALLBACK_METRICS_ENABLED = os.getenv('CALLBACK_METRICS_ENABLED', 'True') == 'True'
+    CALLBACK_METRICS_LOG_INTERVAL_SECONDS = int(os.getenv('CALLBACK_METRICS_LOG_INTERVAL_SECONDS', 0))
+
+    # Logging (logs.py): nível do logger 'finance_app' e formato das linhas
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
@@ -57,7 +111,7 @@ class DevelopmentConfig(BaseConfig):
     HOT_RELOAD = True
     
     # Log mais detalhado
-    LOG_LEVEL = 'DEBUG'
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
 
 
 class ProductionConfig(BaseConfig):
@@ -77,7 +131,7 @@ class ProductionConfig(BaseConfig):
     DATABASE_URL = os.getenv('DATABASE_URL', '').replace('postgres://', 'postgresql://')
     
     # Logs menos verbosos
-    LOG_LEVEL = 'WARNING'
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING')
     
     # Admin configurável
     DEFAULT_ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
@@ -116,6 +170,9 @@ class TestingConfig(BaseConfig):
     # Desabilita rate limiting em testes
     RATE_LIMIT_ENABLED = False
 
+    # Sem thread de revalorização em testes
+    REVALORIZACAO_AGENDADA = False
+
 
 # Dicionário de configurações
 config_by_name = {
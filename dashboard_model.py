@@ -0,0 +1,321 @@
+"""
+Modelo derivado compartilhado pelos callbacks do dashboard
+
+Cards, dropdowns, gráficos, pizzas e alertas do dashboard partem dos mesmos
+stores de receitas/despesas e aplicam as mesmas regras de saldo. Em vez de
+cada callback reconstruir e normalizar os DataFrames, todos leem de um
+DashboardModel construído uma única vez por (user_id, data_version).
+
+Os recortes que dependem de período e de categorias (totais dos cards,
+séries dos gráficos, gastos por categoria) também são memoizados dentro do
+modelo, com chave (recorte, período, categorias).
+
+Os DataFrames devolvidos pelo modelo são compartilhados: o callback deve
+copiá-los antes de alterar.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import Config
+from data_access import is_token, resolve_frame
+from logs import get_logger
+from utils.normalizers import (
+    PAGO, A_VENCER, normalize_status_series, normalize_efetuado_series, status_from_efetuado
+)
+
+log = get_logger(__name__)
+
+# Recortes memoizados por modelo (período x categorias)
+MAX_DERIVADOS_POR_MODELO = 64
+
+# (user_id, versão despesas, versão receitas) -> DashboardModel
+_models = OrderedDict()
+_lock = threading.Lock()
+_stats = {
+    'builds': 0,             # modelos construídos (normalização completa)
+    'hits': 0,               # callbacks atendidos por um modelo já construído
+    'derived_builds': 0,     # recortes calculados
+    'derived_hits': 0,       # recortes reaproveitados
+    'rows_normalized': 0,    # linhas normalizadas
+    'rows_reused': 0,        # linhas que deixaram de ser normalizadas de novo
+}
+
+
+# ---------- Normalização (regras de saldo) ---------- #
+
+def _normalize_despesas_for_saldo(df):
+    """Normaliza despesas e mantém apenas colunas necessárias para regras de saldo."""
+    if df.empty:
+        return df
+
+    if 'Status' in df.columns:
+        df['Status'] = normalize_status_series(df['Status'])
+    elif 'Efetuado' in df.columns:
+        df['Efetuado'] = normalize_efetuado_series(df['Efetuado'])
+        df['Status'] = status_from_efetuado(df['Efetuado'])
+    else:
+        df['Status'] = A_VENCER
+
+    if 'Valor' in df.columns:
+        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
+
+    return df
+
+
+def _normalize_receitas_for_saldo(df):
+    """Normaliza receitas e mantém apenas colunas necessárias para regras de saldo."""
+    if df.empty:
+        return df
+
+    if 'Efetuado' not in df.columns:
+        df['Efetuado'] = 1
+    else:
+        df['Efetuado'] = normalize_efetuado_series(df['Efetuado'])
+
+    if 'Valor' in df.columns:
+        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').fillna(0)
+
+    return df
+
+
+def _tem_colunas(df, colunas):
+    return not df.empty and all(c in df.columns for c in colunas)
+
+
+def _filtrar_periodo(df, start_date, end_date):
+    """Filtra por Data (já datetime) quando as duas datas são válidas"""
+    if df.empty or 'Data' not in df.columns or not start_date or not end_date:
+        return df
+    start = pd.to_datetime(start_date, errors='coerce')
+    end = pd.to_datetime(end_date, errors='coerce')
+    if pd.isna(start) or pd.isna(end):
+        return df
+    return df.loc[(df['Data'] >= start) & (df['Data'] <= end)]
+
+
+def _categorias(df):
+    if df.empty or 'Categoria' not in df.columns:
+        return []
+    return df['Categoria'].unique().tolist()
+
+
+def _soma(df):
+    return df['Valor'].sum() if not df.empty and 'Valor' in df.columns else 0
+
+
+# ---------- Modelo ---------- #
+
+class DashboardModel:
+    """Receitas/despesas normalizadas de um usuário e seus recortes"""
+
+    def __init__(self, df_despesas, df_receitas):
+        despesas = _normalize_despesas_for_saldo(df_despesas)
+        receitas = _normalize_receitas_for_saldo(df_receitas)
+        for df in (despesas, receitas):
+            if not df.empty and 'Data' in df.columns:
+                df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
+
+        self.despesas = despesas
+        self.receitas = receitas
+        self.linhas = len(despesas) + len(receitas)
+
+        # Receitas destinadas a planos não entram em saldo, cards e gráficos
+        if not receitas.empty and 'plano_id' in receitas.columns:
+            self.receitas_sem_plano = receitas[receitas['plano_id'].isna()]
+        else:
+            self.receitas_sem_plano = receitas
+
+        if not receitas.empty and 'Efetuado' in receitas.columns:
+            self.receitas_efetivadas = receitas[receitas['Efetuado'] == 1]
+            self.receitas_saldo = self.receitas_sem_plano[self.receitas_sem_plano['Efetuado'] == 1]
+        else:
+            self.receitas_efetivadas = receitas
+            self.receitas_saldo = self.receitas_sem_plano
+
+        if not despesas.empty and 'Status' in despesas.columns:
+            self.despesas_abertas = despesas[despesas['Status'] != PAGO]
+            despesas_pagas = despesas[despesas['Status'] == PAGO]
+            # Despesas pagas no cartão só saem do saldo quando a fatura é paga
+            if 'forma_pagamento' in despesas_pagas.columns:
+                despesas_pagas = despesas_pagas[
+                    (despesas_pagas['forma_pagamento'] != 'cartao') |
+                    (despesas_pagas.get('eh_fatura', 0) == 1)
+                ]
+        else:
+            self.despesas_abertas = despesas
+            despesas_pagas = pd.DataFrame()
+
+        self.valor_receitas_saldo = _soma(self.receitas_saldo)
+        self.valor_despesas_pagas = _soma(despesas_pagas)
+
+        self._derivados = OrderedDict()
+
+    def _derivado(self, chave, calcular):
+        with _lock:
+            if chave in self._derivados:
+                self._derivados.move_to_end(chave)
+                _stats['derived_hits'] += 1
+                return self._derivados[chave]
+        valor = calcular()
+        with _lock:
+            _stats['derived_builds'] += 1
+            self._derivados[chave] = valor
+            while len(self._derivados) > MAX_DERIVADOS_POR_MODELO:
+                self._derivados.popitem(last=False)
+        return valor
+
+    def saldo_transacoes(self):
+        """Receitas efetivadas (sem planos) - despesas pagas fora do cartão"""
+        return self.valor_receitas_saldo - self.valor_despesas_pagas
+
+    def resumo_receitas(self, start_date, end_date):
+        """(categorias, valor) das receitas efetivadas no período; None se não há receitas"""
+        def calcular():
+            if not _tem_colunas(self.receitas_sem_plano, ('Categoria', 'Valor')):
+                return None
+            df = _filtrar_periodo(self.receitas_saldo, start_date, end_date)
+            return _categorias(df), _soma(df)
+        return self._derivado(('resumo_receitas', start_date, end_date), calcular)
+
+    def resumo_despesas(self, start_date, end_date):
+        """(categorias, valor total, valor em aberto) no período; None se não há despesas"""
+        def calcular():
+            if not _tem_colunas(self.despesas, ('Categoria', 'Valor')):
+                return None
+            df = _filtrar_periodo(self.despesas, start_date, end_date)
+            df_abertas = df[df['Status'] != PAGO] if 'Status' in df.columns else df
+            return _categorias(df), _soma(df), _soma(df_abertas)
+        return self._derivado(('resumo_despesas', start_date, end_date), calcular)
+
+    def serie_receitas(self, categorias):
+        """Receitas efetivadas ordenadas por data com o acumulado (gráfico 1)"""
+        chave = ('serie_receitas', tuple(categorias or ()))
+
+        def calcular():
+            if not _tem_colunas(self.receitas_saldo, ('Data', 'Valor', 'Categoria')):
+                return pd.DataFrame(columns=['Data', 'Valor', 'Categoria', 'Acumulo'])
+            df = self.receitas_saldo.sort_values(by='Data', ascending=True)
+            if categorias:
+                df = df[df['Categoria'].isin(categorias)]
+            df = df[['Data', 'Valor', 'Categoria']].copy()
+            df['Acumulo'] = df['Valor'].cumsum()
+            return df
+        return self._derivado(chave, calcular)
+
+    def barras(self, start_date, end_date, receita, despesa):
+        """Receitas efetivadas e despesas em aberto do período (gráfico 2)"""
+        chave = ('barras', start_date, end_date, tuple(receita or ()), tuple(despesa or ()))
+
+        def calcular():
+            colunas = ('Data', 'Valor', 'Categoria')
+            partes = []
+            for df, rotulo in ((self.receitas_saldo, 'Receitas'), (self.despesas_abertas, 'Despesas')):
+                if _tem_colunas(df, colunas):
+                    partes.append(df[list(colunas)].assign(Output=rotulo))
+            if not partes:
+                return pd.DataFrame(columns=['Data', 'Valor', 'Output'])
+
+            df_final = pd.concat(partes, ignore_index=True, sort=False)
+            df_final = _filtrar_periodo(df_final, start_date, end_date)
+
+            # categorias padrão (se nenhum filtro selecionado)
+            cats_receita = receita or _categorias(self.receitas_saldo)
+            cats_despesa = despesa or _categorias(self.despesas_abertas)
+            if not df_final.empty and (cats_receita or cats_despesa):
+                df_final = df_final[df_final['Categoria'].isin(cats_receita) | df_final['Categoria'].isin(cats_despesa)]
+            return df_final.sort_values('Data')
+        return self._derivado(chave, calcular)
+
+    def pizza(self, table, categorias):
+        """Receitas efetivadas ou despesas em aberto das categorias; None se vazio"""
+        chave = ('pizza', table, tuple(categorias or ()))
+
+        def calcular():
+            df = self.receitas_efetivadas if table == 'receitas' else self.despesas_abertas
+            if df.empty or 'Categoria' not in df.columns:
+                return None
+            return df[df['Categoria'].isin(categorias or [])]
+        return self._derivado(chave, calcular)
+
+    def gastos_por_categoria(self, mes, ano):
+        """Total de despesas (qualquer status) por categoria no mês, como db.get_gastos_por_categoria"""
+        def calcular():
+            if not _tem_colunas(self.despesas, ('Data', 'Valor', 'Categoria')):
+                return {}
+            datas = self.despesas['Data']
+            df = self.despesas[(datas.dt.month == mes) & (datas.dt.year == ano)]
+            return df.groupby('Categoria')['Valor'].sum().to_dict()
+        return self._derivado(('gastos', mes, ano), calcular)
+
+
+def _chave(despesas, receitas):
+    """(user_id, versão despesas, versão receitas) quando os dois stores são tokens"""
+    if not (is_token(despesas) and is_token(receitas)):
+        return None
+    if despesas['user_id'] != receitas['user_id']:
+        return None
+    return despesas['user_id'], despesas['version'], receitas['version']
+
+
+def get_model(despesas, receitas):
+    """DashboardModel dos stores store-despesas/store-receitas.
+
+    Com tokens de versão, o modelo é construído uma vez e reaproveitado por
+    todos os callbacks até a próxima escrita do usuário. Listas de registros
+    (sem versão) geram um modelo avulso, sem cache.
+    """
+    chave = _chave(despesas, receitas)
+    max_entries = Config.DASHBOARD_MODEL_MAX_ENTRIES
+    if chave is not None and max_entries > 0:
+        with _lock:
+            model = _models.get(chave)
+            if model is not None:
+                _models.move_to_end(chave)
+                _stats['hits'] += 1
+                _stats['rows_reused'] += model.linhas
+                return model
+
+    t0 = time.perf_counter()
+    model = DashboardModel(resolve_frame(despesas, 'despesas'), resolve_frame(receitas, 'receitas'))
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    with _lock:
+        _stats['builds'] += 1
+        _stats['rows_normalized'] += model.linhas
+        if chave is not None and max_entries > 0:
+            # Versões antigas do mesmo usuário não serão mais pedidas
+            for old_key in [k for k in _models if k[0] == chave[0] and k != chave]:
+                del _models[old_key]
+            _models[chave] = model
+            while len(_models) > max_entries:
+                _models.popitem(last=False)
+
+    if chave is not None:
+        log.debug('Modelo construído', user_id=chave[0], versao=chave[1], linhas=model.linhas,
+                  ms=round(elapsed_ms, 1))
+    return model
+
+
+def invalidate_models(user_id=None):
+    """Remove do cache local os modelos de um usuário (ou de todos)"""
+    with _lock:
+        if user_id is None:
+            _models.clear()
+            return
+        for key in [k for k in _models if k[0] == user_id]:
+            del _models[key]
+
+
+def model_info():
+    """Contadores do modelo: construções x reaproveitamentos e linhas poupadas"""
+    with _lock:
+        return {**_stats, 'entries': len(_models)}
+
+
+def reset_model_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,171 @@
+"""
+Camada de acesso aos dados do usuário autenticado
+
+Receitas, despesas e categorias são lidas sob demanda e sempre filtradas por
+user_id. Nada é carregado na importação do módulo, então o boot de cada
+worker do gunicorn não depende do volume total de linhas do banco.
+
+Receitas e despesas ficam em um cache no servidor (por processo), com chave
+(user_id, data_version). Os dcc.Store 'store-receitas'/'store-despesas'
+guardam apenas um token {'table', 'user_id', 'version'}; os callbacks obtêm
+o DataFrame com resolve_frame(). Toda escrita em receitas/despesas
+incrementa users.data_version via trigger, o que invalida o cache em
+todos os workers.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import Config
+from db import table_to_df, update_status_vencidos, get_user_data_version
+
+TABELAS_TRANSACOES = ('receitas', 'despesas')
+TABELAS_CATEGORIAS = ('cat_receita', 'cat_despesa')
+
+# (user_id, version) -> {'receitas': DataFrame, 'despesas': DataFrame}
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0, 'loads': 0}
+
+
+def load_transacoes(table, user_id):
+    """Retorna as transações (com id) do usuário como lista de registros"""
+    if table not in TABELAS_TRANSACOES:
+        raise ValueError(f"Tabela de transações inválida: {table}")
+    if user_id is None:
+        return []
+    return get_frame(table, user_id).to_dict('records')
+
+
+def load_categorias(table, user_id):
+    """Retorna as categorias do usuário como lista de registros"""
+    if table not in TABELAS_CATEGORIAS:
+        raise ValueError(f"Tabela de categorias inválida: {table}")
+    if user_id is None:
+        return []
+    return table_to_df(table, user_id=user_id).to_dict('records')
+
+
+def load_user_data(user_id, atualizar_vencidos=True):
+    """Dados dos stores de um único usuário.
+
+    Receitas e despesas voltam como tokens de versão (ver make_token);
+    categorias, que são pequenas, como lista de registros. Se
+    atualizar_vencidos=True, marca como 'Vencido' as despesas 'A vencer'
+    com data passada antes de ler a versão.
+    """
+    if user_id is None:
+        return {'receitas': {}, 'despesas': {}, 'cat_receita': [], 'cat_despesa': []}
+
+    if atualizar_vencidos:
+        update_status_vencidos(user_id)
+
+    version = get_user_data_version(user_id)
+    return {
+        'receitas': make_token('receitas', user_id, version),
+        'despesas': make_token('despesas', user_id, version),
+        'cat_receita': load_categorias('cat_receita', user_id),
+        'cat_despesa': load_categorias('cat_despesa', user_id),
+    }
+
+
+# ---------- Cache de transações por (user_id, versão) ---------- #
+
+def make_token(table, user_id, version):
+    """Token guardado no dcc.Store no lugar da tabela inteira"""
+    return {'table': table, 'user_id': user_id, 'version': version}
+
+
+def is_token(data):
+    return isinstance(data, dict) and 'table' in data and 'user_id' in data and 'version' in data
+
+
+def resolve_frame(data, table=None):
+    """Converte o conteúdo de store-receitas/store-despesas em DataFrame.
+
+    Aceita o token de versão (caminho normal) ou uma lista de registros.
+    Sempre retorna uma cópia: o callback pode alterar o DataFrame à vontade.
+    """
+    if is_token(data):
+        if table is not None and data['table'] != table:
+            raise ValueError(f"Token de '{data['table']}' usado como '{table}'")
+        return get_frame(data['table'], data['user_id'], data['version'])
+    if not data:
+        return pd.DataFrame()
+    return pd.DataFrame(data)
+
+
+def resolve_records(data, table=None):
+    """Como resolve_frame, mas retorna lista de registros"""
+    if is_token(data):
+        return resolve_frame(data, table).to_dict('records')
+    return data or []
+
+
+def get_frame(table, user_id, version=None):
+    """DataFrame (cópia) das transações do usuário, a partir do cache.
+
+    Se a versão pedida não está em cache (token antigo, outro worker
+    escreveu), usa a versão atual do banco; só recarrega a tabela quando
+    (user_id, versão atual) também não está em cache.
+    """
+    if table not in TABELAS_TRANSACOES:
+        raise ValueError(f"Tabela de transações inválida: {table}")
+
+    if version is not None:
+        df = _cache_get(user_id, version, table)
+        if df is not None:
+            return df.copy()
+
+    version_atual = get_user_data_version(user_id)
+    if version_atual != version:
+        df = _cache_get(user_id, version_atual, table)
+        if df is not None:
+            return df.copy()
+
+    with _cache_lock:
+        _cache_stats['misses'] += 1
+        _cache_stats['loads'] += 1
+    df = table_to_df(table, user_id=user_id, include_id=True)
+    _cache_put(user_id, version_atual, table, df)
+    return df.copy()
+
+
+def _cache_get(user_id, version, table):
+    key = (user_id, version)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or table not in entry:
+            return None
+        _cache.move_to_end(key)
+        _cache_stats['hits'] += 1
+        return entry[table]
+
+
+def _cache_put(user_id, version, table, df):
+    key = (user_id, version)
+    with _cache_lock:
+        # Versões antigas do mesmo usuário não serão mais pedidas
+        for old_key in [k for k in _cache if k[0] == user_id and k[1] != version]:
+            del _cache[old_key]
+        _cache.setdefault(key, {})[table] = df
+        _cache.move_to_end(key)
+        while len(_cache) > max(1, Config.DATA_CACHE_MAX_ENTRIES):
+            _cache.popitem(last=False)
+
+
+def invalidate_user(user_id=None):
+    """Remove do cache local os dados de um usuário (ou de todos)"""
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+            return
+        for key in [k for k in _cache if k[0] == user_id]:
+            del _cache[key]
+
+
+def cache_info():
+    """Contadores do cache local (hits, misses, loads, entries)"""
+    with _cache_lock:
+        return {**_cache_stats, 'entries': len(_cache)}
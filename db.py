@@ -1,9 +1,31 @@
 import pandas as pd
 from werkzeug.security import generate_password_hash, check_password_hash
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from config import Config
+from logs import get_logger
+# Cálculo de rendimento: reexportado para quem importa de db (components/planos)
+from rendimentos import calcular_iof, calcular_rendimento_investimento, valorizar_investimentos
+from taxas_historicas import historico_padrao
+
+# NUMERIC -> float: valores monetários ficam em NUMERIC(14,2) no banco, mas o
+# app (pandas, somas, formatação) trabalha com float
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'DEC2FLOAT',
+    lambda value, cur: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(DEC2FLOAT)
+
+log = get_logger(__name__)
 
 # PostgreSQL Database URL
 DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/finance_app')
@@ -12,27 +34,136 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://localhost/finance_app')
 if DATABASE_URL.startswith('postgres://'):
     DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
 
-# SQLAlchemy engine para uso com pandas
+# SQLAlchemy engine (singleton por processo). O pool de conexões do engine
+# também atende connect_db()/get_conn(), então pandas e psycopg2 compartilham
+# as mesmas conexões abertas.
 _engine = None
+_engine_lock = threading.Lock()
+
+
+def _engine_url():
+    """URL do engine forçando o driver psycopg2 (o mesmo usado pelos helpers)"""
+    url = make_url(DATABASE_URL)
+    if url.drivername in ('postgresql', 'postgres'):
+        url = url.set(drivername='postgresql+psycopg2')
+    return url
+
+
+# Tempo gasto no banco pela thread atual (execute/executemany de qualquer
+# cursor do pool, inclusive os do pandas): metricas.py mede a diferença
+# antes/depois de cada callback
+_tempo_db = threading.local()
+_CURSORES_CRONOMETRADOS = {}
+
+
+def tempo_db():
+    """(segundos, consultas) acumulados no banco pela thread atual"""
+    return getattr(_tempo_db, 'segundos', 0.0), getattr(_tempo_db, 'consultas', 0)
+
+
+def _somar_tempo_db(t0):
+    _tempo_db.segundos = getattr(_tempo_db, 'segundos', 0.0) + time.perf_counter() - t0
+    _tempo_db.consultas = getattr(_tempo_db, 'consultas', 0) + 1
+
+
+def _cursor_cronometrado(base):
+    """Subclasse de `base` (cursor, RealDictCursor...) que cronometra execute/executemany"""
+    classe = _CURSORES_CRONOMETRADOS.get(base)
+    if classe is None:
+        class CursorCronometrado(base):
+            def execute(self, query, vars=None):
+                t0 = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    _somar_tempo_db(t0)
+
+            def executemany(self, query, vars_list):
+                t0 = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    _somar_tempo_db(t0)
+
+        classe = _CURSORES_CRONOMETRADOS.setdefault(base, CursorCronometrado)
+    return classe
+
+
+class ConexaoCronometrada(psycopg2.extensions.connection):
+    """Conexão do pool cujos cursores somam o tempo das consultas em tempo_db()"""
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = _cursor_cronometrado(base)
+        return super().cursor(*args, **kwargs)
+
 
 def get_engine():
-    """Retorna SQLAlchemy engine (singleton)"""
+    """Retorna SQLAlchemy engine (singleton) com pool de conexões"""
     global _engine
     if _engine is None:
-        _engine = create_engine(DATABASE_URL)
-        print('[DB] SQLAlchemy engine criado')
+        with _engine_lock:
+            if _engine is None:
+                pool_min = max(1, Config.DB_POOL_MIN_SIZE)
+                pool_max = max(pool_min, Config.DB_POOL_MAX_SIZE)
+                _engine = create_engine(
+                    _engine_url(),
+                    pool_size=pool_min,
+                    max_overflow=pool_max - pool_min,
+                    pool_timeout=Config.DB_POOL_TIMEOUT_SECONDS,
+                    pool_recycle=Config.DB_POOL_RECYCLE_SECONDS,
+                    pool_pre_ping=True,
+                    pool_use_lifo=True,   # reusa a conexão mais recente; as ociosas expiram
+                    connect_args={'connection_factory': ConexaoCronometrada},
+                )
+                log.info('SQLAlchemy engine criado', pool_min=pool_min, pool_max=pool_max)
     return _engine
 
 
+def _reset_pool_after_fork():
+    """Descarta (sem fechar) as conexões herdadas do processo pai.
+
+    Workers do gunicorn são criados via fork; o socket de uma conexão herdada
+    não pode ser usado por dois processos. dispose(close=False) abandona essas
+    conexões no filho e o pool abre novas sob demanda.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
 def connect_db():
-    """Conecta ao banco de dados PostgreSQL usando psycopg2 para operações diretas"""
+    """Obtém uma conexão psycopg2 do pool (conn.close() devolve ao pool)"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        print('[DB] Conectado ao PostgreSQL')
-        return conn
+        return get_engine().raw_connection()
     except Exception as e:
-        print(f'[DB] ERRO ao conectar PostgreSQL: {e}')
+        log.error('Erro ao conectar PostgreSQL', erro=e)
+        raise
+
+
+@contextmanager
+def get_conn():
+    """Context manager para uma conexão do pool.
+
+    Faz commit ao final do bloco, rollback se houver exceção e sempre
+    devolve a conexão ao pool:
+
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(...)
+    """
+    conn = connect_db()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
         raise
+    finally:
+        conn.close()
 
 
 def init_db():
@@ -51,10 +182,10 @@ def init_db():
     # Receitas table
     cur.execute("""CREATE TABLE IF NOT EXISTS receitas (
         id SERIAL PRIMARY KEY,
-        Valor REAL,
+        Valor NUMERIC(14,2),
         Efetuado INTEGER,
         Fixo INTEGER,
-        Data TEXT,
+        Data DATE,
         Categoria TEXT,
         Descrição TEXT,
         user_id INTEGER,
@@ -65,10 +196,10 @@ def init_db():
     # Despesas table
     cur.execute("""CREATE TABLE IF NOT EXISTS despesas (
         id SERIAL PRIMARY KEY,
-        Valor REAL,
+        Valor NUMERIC(14,2),
         Status TEXT,
         Fixo INTEGER,
-        Data TEXT,
+        Data DATE,
         Categoria TEXT,
         Descrição TEXT,
         user_id INTEGER,
@@ -93,7 +224,7 @@ def init_db():
     cur.execute("""CREATE TABLE IF NOT EXISTS orcamentos (
         id SERIAL PRIMARY KEY,
         categoria TEXT,
-        valor_limite REAL,
+        valor_limite NUMERIC(14,2),
         mes INTEGER,
         ano INTEGER,
         user_id INTEGER,
@@ -106,7 +237,7 @@ def init_db():
         nome TEXT NOT NULL,
         user_id INTEGER NOT NULL,
         ativo INTEGER DEFAULT 1,
-        limite REAL DEFAULT 0,
+        limite NUMERIC(14,2) DEFAULT 0,
         dia_vencimento INTEGER DEFAULT 10,
         dia_fechamento INTEGER DEFAULT 5,
         UNIQUE(nome, user_id)
@@ -126,14 +257,14 @@ def init_db():
     
     # Adicionar campo saldo_inicial nos users (se não existir)
     cur.execute("""ALTER TABLE users 
-        ADD COLUMN IF NOT EXISTS saldo_inicial REAL DEFAULT 0""")
+        ADD COLUMN IF NOT EXISTS saldo_inicial NUMERIC(14,2) DEFAULT 0""")
 
     conn.commit()
 
     # Se não houver usuários, cria um admin padrão
     if get_user_count(conn) == 0:
         admin_id = create_user('admin', 'admin', conn=conn, is_admin=1)
-        print(f"[DB] Created default admin user 'admin' (id={admin_id}) with password 'admin'. Change it ASAP.")
+        log.warning("Usuário admin padrão criado com a senha 'admin'; troque-a o quanto antes", user_id=admin_id)
 
     # Atribui registros existentes ao admin se user_id for NULL
     admin = get_user_by_username('admin', conn=conn)
@@ -148,21 +279,309 @@ def init_db():
     try:
         init_planos_tables()
     except Exception as e:
-        print('[DB] warning: init_planos_tables failed:', e)
+        log.warning('init_planos_tables falhou', erro=e)
 
     conn.close()
 
+    # Aplica migrações versionadas pendentes (tipos de coluna, índices)
+    try:
+        run_migrations()
+    except Exception as e:
+        log.warning('run_migrations falhou', erro=e)
+
     # Garante que a coluna username nas tabelas de transações esteja preenchida a partir de users
     try:
         backfill_usernames()
     except Exception as e:
-        print('[DB] warning: backfill_usernames failed:', e)
+        log.warning('backfill_usernames falhou', erro=e)
     
     # Limpa categorias órfãs (sem user_id) - evita problemas de categorias globais
     try:
         cleanup_orphan_categories()
     except Exception as e:
-        print('[DB] warning: cleanup_orphan_categories failed:', e)
+        log.warning('cleanup_orphan_categories falhou', erro=e)
+
+
+# ---------- Migrações versionadas ---------- #
+
+# Chave do advisory lock que serializa migrações entre workers do gunicorn
+_MIGRATIONS_LOCK_ID = 482_910_001
+
+# Datas antigas foram gravadas como TEXT (ISO, às vezes DD/MM/YYYY); valores
+# que não são datas válidas viram NULL em vez de abortar a migração
+_SQL_TEXTO_PARA_DATA = r"""
+    CREATE OR REPLACE FUNCTION pg_temp.texto_para_data(valor TEXT) RETURNS DATE AS $$
+    BEGIN
+        IF valor ~ '^\d{4}-\d{2}-\d{2}' THEN
+            RETURN substring(valor FROM 1 FOR 10)::date;
+        ELSIF valor ~ '^\d{2}/\d{2}/\d{4}' THEN
+            RETURN to_date(substring(valor FROM 1 FOR 10), 'DD/MM/YYYY');
+        END IF;
+        RETURN NULL;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+
+def _column_type(cur, table, column):
+    """Retorna o data_type de uma coluna no schema corrente (ou None)"""
+    cur.execute(
+        """SELECT data_type FROM information_schema.columns
+           WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s""",
+        (table, column)
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _migration_001_tipos_transacoes(cur):
+    """Data TEXT -> DATE e colunas monetárias REAL -> NUMERIC(14,2)"""
+    cur.execute(_SQL_TEXTO_PARA_DATA)
+    for table in ('receitas', 'despesas'):
+        if _column_type(cur, table, 'data') == 'text':
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN data TYPE DATE USING pg_temp.texto_para_data(data)")
+
+    colunas_monetarias = [
+        ('receitas', 'valor'),
+        ('despesas', 'valor'),
+        ('orcamentos', 'valor_limite'),
+        ('cartoes', 'limite'),
+        ('users', 'saldo_inicial'),
+    ]
+    for table, column in colunas_monetarias:
+        if _column_type(cur, table, column) in ('real', 'double precision'):
+            cur.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC(14,2) USING round({column}::numeric, 2)")
+
+
+def _migration_002_indices_transacoes(cur):
+    """Índices compostos para as consultas por usuário, período e fatura"""
+    # table_to_df(user_id=...), filtros por período e get_gastos_por_categoria
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receitas_user_data ON receitas (user_id, data)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_despesas_user_data ON despesas (user_id, data)")
+    # gerar_fatura_cartao / atualizar_todas_faturas
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_despesas_fatura
+        ON despesas (user_id, cartao_id, fatura_mes, fatura_ano, eh_fatura)""")
+    # update_status_vencidos só olha despesas 'A vencer'
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_despesas_a_vencer
+        ON despesas (user_id, data) WHERE status = 'A vencer'""")
+    # calculate_plano_valor_acumulado
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_receitas_user_plano
+        ON receitas (user_id, plano_id) WHERE plano_id IS NOT NULL""")
+
+
+def _migration_003_versao_dados_usuario(cur):
+    """users.data_version: incrementada a cada escrita em receitas/despesas.
+
+    Triggers por statement (com transition tables) incrementam a versão de
+    todos os usuários afetados na mesma transação da escrita; o cache de
+    dados em data_access usa (user_id, data_version) como chave.
+    """
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION fn_incrementa_data_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE users SET data_version = data_version + 1
+                WHERE id IN (SELECT user_id FROM linhas_novas);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE users SET data_version = data_version + 1
+                WHERE id IN (SELECT user_id FROM linhas_novas UNION SELECT user_id FROM linhas_antigas);
+            ELSE
+                UPDATE users SET data_version = data_version + 1
+                WHERE id IN (SELECT user_id FROM linhas_antigas);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('receitas', 'despesas'):
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_versao_ins ON {table}")
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_versao_upd ON {table}")
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_versao_del ON {table}")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_versao_ins AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS linhas_novas
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementa_data_version()""")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_versao_upd AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementa_data_version()""")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_versao_del AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS linhas_antigas
+            FOR EACH STATEMENT EXECUTE FUNCTION fn_incrementa_data_version()""")
+
+
+# Regras de saldo (as mesmas de dashboard_model/utils.normalizers): receitas
+# efetivadas fora de planos; despesas pagas, exceto compras no cartão que
+# não são a própria fatura (essas só saem do saldo quando a fatura é paga).
+_SQL_RECEITA_CONTA_SALDO = "efetuado = 1 AND plano_id IS NULL"
+_SQL_DESPESA_CONTA_SALDO = (
+    "lower(trim(status)) IN ('pago', 'paga', 'paid', '1', 'true', 'sim', 'yes') "
+    "AND (COALESCE(forma_pagamento, '') <> 'cartao' OR COALESCE(eh_fatura, 0) = 1)"
+)
+
+
+def _sql_funcao_saldo(funcao, coluna, regra):
+    """Trigger por statement que aplica em saldos_usuarios o delta das linhas afetadas"""
+    def upsert(origem):
+        return f"""
+            INSERT INTO saldos_usuarios AS s (user_id, {coluna})
+            SELECT user_id, SUM(delta) FROM ({origem}) d
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id ORDER BY user_id
+            ON CONFLICT (user_id) DO UPDATE
+                SET {coluna} = s.{coluna} + EXCLUDED.{coluna}, atualizado_em = CURRENT_TIMESTAMP;"""
+    novas = f"SELECT user_id, COALESCE(valor, 0) AS delta FROM linhas_novas WHERE {regra}"
+    antigas = f"SELECT user_id, -COALESCE(valor, 0) AS delta FROM linhas_antigas WHERE {regra}"
+    return f"""
+        CREATE OR REPLACE FUNCTION {funcao}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN{upsert(novas)}
+            ELSIF TG_OP = 'UPDATE' THEN{upsert(novas + ' UNION ALL ' + antigas)}
+            ELSE{upsert(antigas)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def _sql_recalcula_saldos(filtro_usuario=''):
+    """Reconstrói saldos_usuarios a partir das transações (todas ou de um usuário)"""
+    return f"""
+        INSERT INTO saldos_usuarios AS s (user_id, receitas, despesas)
+        SELECT user_id, SUM(receita), SUM(despesa) FROM (
+            SELECT user_id, COALESCE(valor, 0) AS receita, 0 AS despesa
+            FROM receitas WHERE {_SQL_RECEITA_CONTA_SALDO}
+            UNION ALL
+            SELECT user_id, 0, COALESCE(valor, 0)
+            FROM despesas WHERE {_SQL_DESPESA_CONTA_SALDO}
+        ) t
+        WHERE user_id IS NOT NULL {filtro_usuario}
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+            SET receitas = EXCLUDED.receitas, despesas = EXCLUDED.despesas,
+                atualizado_em = CURRENT_TIMESTAMP
+    """
+
+
+def _migration_004_saldos_usuarios(cur):
+    """saldos_usuarios: totais que entram no saldo, mantidos por trigger.
+
+    O saldo do dashboard passa a ser uma leitura por chave primária, sem
+    percorrer o histórico. Os triggers criados aqui bloqueiam escritas em
+    receitas/despesas até o commit, então o preenchimento inicial é
+    consistente.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS saldos_usuarios (
+        user_id INTEGER PRIMARY KEY,
+        receitas NUMERIC(16,2) NOT NULL DEFAULT 0,
+        despesas NUMERIC(16,2) NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    cur.execute(_sql_funcao_saldo('fn_saldo_receitas', 'receitas', _SQL_RECEITA_CONTA_SALDO))
+    cur.execute(_sql_funcao_saldo('fn_saldo_despesas', 'despesas', _SQL_DESPESA_CONTA_SALDO))
+    for table, funcao in (('receitas', 'fn_saldo_receitas'), ('despesas', 'fn_saldo_despesas')):
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_saldo_ins ON {table}")
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_saldo_upd ON {table}")
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_saldo_del ON {table}")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_saldo_ins AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS linhas_novas
+            FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()""")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_saldo_upd AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS linhas_antigas NEW TABLE AS linhas_novas
+            FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()""")
+        cur.execute(f"""CREATE TRIGGER trg_{table}_saldo_del AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS linhas_antigas
+            FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()""")
+    cur.execute("DELETE FROM saldos_usuarios")
+    cur.execute(_sql_recalcula_saldos())
+
+
+def _migration_005_valorizacao_investimentos(cur):
+    """users.investimentos_valorizados_em: data da última revalorização dos
+    investimentos do usuário (ver atualizar_valores_investimentos).
+
+    NULL significa "precisa revalorizar": é o valor inicial e também o que as
+    escritas em montantes/aportes gravam para forçar um novo cálculo.
+    """
+    cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS investimentos_valorizados_em DATE")
+
+
+def _migration_006_categorias_tickers(cur):
+    """ticker_categorias: página do Status Invest (categoria do ativo) em que
+    cada ticker já foi encontrado, para as próximas cotações buscarem só ela
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ticker_categorias (
+            ticker TEXT PRIMARY KEY,
+            categoria TEXT NOT NULL,
+            url TEXT NOT NULL,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        )""")
+
+
+def _migration_007_indices_paginacao_extratos(cur):
+    """Índices (user_id, data, id): páginas dos extratos lidas por keyset,
+    na ordem do índice, sem ordenar o histórico inteiro do usuário
+    """
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receitas_user_data_id ON receitas (user_id, data, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_despesas_user_data_id ON despesas (user_id, data, id)")
+    # Os (user_id, data) da 002 são prefixo dos novos: só custariam escrita
+    cur.execute("DROP INDEX IF EXISTS idx_receitas_user_data")
+    cur.execute("DROP INDEX IF EXISTS idx_despesas_user_data")
+
+
+# (versão, nome, função) - nunca reordenar nem alterar uma migração já publicada
+MIGRATIONS = [
+    (1, 'tipos_transacoes', _migration_001_tipos_transacoes),
+    (2, 'indices_transacoes', _migration_002_indices_transacoes),
+    (3, 'versao_dados_usuario', _migration_003_versao_dados_usuario),
+    (4, 'saldos_usuarios', _migration_004_saldos_usuarios),
+    (5, 'valorizacao_investimentos', _migration_005_valorizacao_investimentos),
+    (6, 'categorias_tickers', _migration_006_categorias_tickers),
+    (7, 'indices_paginacao_extratos', _migration_007_indices_paginacao_extratos),
+]
+
+
+def run_migrations(conn=None):
+    """Aplica, em ordem, as migrações ainda não registradas em schema_migrations.
+
+    Cada migração roda em sua própria transação junto com o registro da versão,
+    então uma falha não deixa o schema pela metade. Retorna as versões aplicadas.
+    """
+    close = False
+    if conn is None:
+        conn = connect_db()
+        close = True
+    cur = conn.cursor()
+    cur.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        aplicado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    conn.commit()
+
+    aplicadas = []
+    try:
+        for version, nome, func in MIGRATIONS:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATIONS_LOCK_ID,))
+            cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+            if cur.fetchone():
+                conn.commit()
+                continue
+            func(cur)
+            cur.execute("INSERT INTO schema_migrations (version, nome) VALUES (%s, %s)", (version, nome))
+            conn.commit()
+            aplicadas.append(version)
+            log.info('Migração aplicada', versao=f'{version:03d}', nome=nome)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if close:
+            conn.close()
+    return aplicadas
 
 
 def table_to_df(table, user_id=None, include_id=False):
@@ -171,14 +590,12 @@ def table_to_df(table, user_id=None, include_id=False):
     
     if user_id is not None:
         query = f"SELECT * FROM {table} WHERE user_id = %(user_id)s"
-        print(f"[DB] table_to_df - Executando: {query} com user_id={user_id}")
         df = pd.read_sql_query(query, engine, params={"user_id": user_id})
     else:
         query = f"SELECT * FROM {table}"
-        print(f"[DB] table_to_df - Executando: {query}")
         df = pd.read_sql_query(query, engine)
     
-    print(f"[DB] table_to_df - Resultado: {len(df)} linhas, colunas={df.columns.tolist()}")
+    log.debug('table_to_df', tabela=table, user_id=user_id, linhas=len(df))
     
     # Capitalizar apenas colunas específicas usadas em transações (receitas/despesas)
     # Mantém o resto em minúsculas como vem do banco
@@ -195,12 +612,10 @@ def table_to_df(table, user_id=None, include_id=False):
 
 def df_to_table(df, table):
     """Substitui tabela inteira com DataFrame"""
-    conn = connect_db()
     if 'Data' in df.columns:
         df = df.copy()
         df['Data'] = df['Data'].astype(str)
-    df.to_sql(table, conn, if_exists='replace', index=False)
-    conn.close()
+    df.to_sql(table, get_engine(), if_exists='replace', index=False)
 
 
 # ---------- Helpers para usuários ---------- #
@@ -242,6 +657,19 @@ def create_user(username, password, conn=None, is_admin=0):
     return uid
 
 
+def get_user_data_version(user_id):
+    """Retorna a versão dos dados (receitas/despesas) do usuário.
+
+    A versão é incrementada por trigger a cada escrita nessas tabelas, então
+    serve de chave de invalidação para caches entre workers.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT data_version FROM users WHERE id = %s", (user_id,))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
 def get_user_by_username(username, conn=None):
     """Busca usuário por username"""
     close = False
@@ -269,20 +697,17 @@ def verify_user(username, password):
 
 def update_user_profile_photo(user_id, photo_data):
     """Atualiza a foto de perfil de um usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET profile_photo = %s WHERE id = %s", (photo_data, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE users SET profile_photo = %s WHERE id = %s", (photo_data, user_id))
 
 
 def get_user_profile_photo(user_id):
     """Retorna a foto de perfil de um usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT profile_photo FROM users WHERE id = %s", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT profile_photo FROM users WHERE id = %s", (user_id,))
+        row = cur.fetchone()
     if row and row[0]:
         return row[0]
     return '/assets/img_hom.png'
@@ -290,12 +715,10 @@ def get_user_profile_photo(user_id):
 
 def update_user_password(user_id, new_password):
     """Atualiza a senha de um usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    pw_hash = generate_password_hash(new_password)
-    cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (pw_hash, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        pw_hash = generate_password_hash(new_password)
+        cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (pw_hash, user_id))
     return True
 
 
@@ -304,94 +727,64 @@ def update_user_password(user_id, new_password):
 def update_status_vencidos(user_id=None):
     """Atualiza despesas com status 'A vencer' para 'Vencido' quando a data já passou"""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    hoje = datetime.now().strftime('%Y-%m-%d')
-    
-    if user_id:
-        cur.execute("UPDATE despesas SET status = 'Vencido' WHERE status = 'A vencer' AND data < %s AND user_id = %s", (hoje, user_id))
-    else:
-        cur.execute("UPDATE despesas SET status = 'Vencido' WHERE status = 'A vencer' AND data < %s", (hoje,))
+    with get_conn() as conn:
+        cur = conn.cursor()
+        hoje = datetime.now().strftime('%Y-%m-%d')
     
-    conn.commit()
-    conn.close()
+        if user_id:
+            cur.execute("UPDATE despesas SET status = 'Vencido' WHERE status = 'A vencer' AND data < %s AND user_id = %s", (hoje, user_id))
+        else:
+            cur.execute("UPDATE despesas SET status = 'Vencido' WHERE status = 'A vencer' AND data < %s", (hoje,))
 
 
 def insert_cat(table, categoria, user_id):
     """Insere categoria se não existir para o usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(f"SELECT COUNT(*) FROM {table} WHERE Categoria = %s AND user_id = %s", (categoria, user_id))
-    count = cur.fetchone()[0]
-    print(f"[DB] insert_cat - Verificando categoria '{categoria}' na tabela '{table}' para user_id={user_id}: count={count}")
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {table} WHERE Categoria = %s AND user_id = %s", (categoria, user_id))
+        count = cur.fetchone()[0]
     
-    if count == 0:
-        cur.execute(f"INSERT INTO {table} (Categoria, user_id) VALUES (%s,%s)", (categoria, user_id))
-        conn.commit()
-        print(f"[DB] insert_cat - Categoria '{categoria}' inserida com sucesso!")
-    else:
-        print(f"[DB] insert_cat - Categoria '{categoria}' já existe para este usuário")
-    
-    conn.close()
+        if count == 0:
+            cur.execute(f"INSERT INTO {table} (Categoria, user_id) VALUES (%s,%s)", (categoria, user_id))
+        log.debug('insert_cat', tabela=table, categoria=categoria, user_id=user_id, inserida=count == 0)
 
 
 def delete_cat(table, categoria, user_id):
     """Deleta categoria do usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(f"DELETE FROM {table} WHERE Categoria = %s AND user_id = %s", (categoria, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM {table} WHERE Categoria = %s AND user_id = %s", (categoria, user_id))
 
 
 def insert_transacao(table, valor, status, fixo, data, categoria, descricao, user_id, plano_id=None):
     """Insere transação (receita ou despesa)"""
-    conn = connect_db()
-    cur = conn.cursor()
-    if table == 'despesas':
-        cur.execute(f"INSERT INTO {table} (Valor, Status, Fixo, Data, Categoria, Descrição, user_id) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-                    (valor, status, fixo, data, categoria, descricao, user_id))
-    else:
-        cur.execute(f"INSERT INTO {table} (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id, plano_id) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
-                    (valor, status, fixo, data, categoria, descricao, user_id, plano_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if table == 'despesas':
+            cur.execute(f"INSERT INTO {table} (Valor, Status, Fixo, Data, Categoria, Descrição, user_id) VALUES (%s,%s,%s,%s,%s,%s,%s)",
+                        (valor, status, fixo, data, categoria, descricao, user_id))
+        else:
+            cur.execute(f"INSERT INTO {table} (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id, plano_id) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
+                        (valor, status, fixo, data, categoria, descricao, user_id, plano_id))
 
 
-def update_transacao(table, row_id, fields, user_id):
-    """Atualiza transação existente (com suporte a cartões)"""
-    if not fields:
-        return
-    allowed = {"Valor", "Efetuado", "Fixo", "Data", "Categoria", "Descrição", "Status", 
-               "forma_pagamento", "cartao_id", "fatura_mes", "fatura_ano"}
-    payload = {k: v for k, v in fields.items() if k in allowed}
-    if not payload:
-        return
-    try:
-        row_id = int(row_id)
-    except Exception:
-        return
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Buscar registro atual para detectar mudanças
-    cur.execute(f"SELECT Status, cartao_id, fatura_mes, fatura_ano, forma_pagamento FROM {table} WHERE id = %s AND user_id = %s", (row_id, user_id))
-    registro_atual = cur.fetchone()
-    
-    if registro_atual:
-        status_anterior = registro_atual[0]
-        cartao_id_anterior = registro_atual[1]
-        fatura_mes_anterior = registro_atual[2]
-        fatura_ano_anterior = registro_atual[3]
-        forma_pagamento_anterior = registro_atual[4]
-    else:
-        status_anterior = None
-        cartao_id_anterior = None
-        fatura_mes_anterior = None
-        fatura_ano_anterior = None
-        forma_pagamento_anterior = None
-    
+# Colunas editáveis de receitas/despesas e o tipo de cada uma (casts do
+# UPDATE em lote: em VALUES, um NULL sem cast não tem tipo)
+_TIPOS_COLUNAS_TRANSACAO = {
+    "Valor": "numeric", "Efetuado": "integer", "Fixo": "integer", "Data": "date",
+    "Categoria": "text", "Descrição": "text", "Status": "text", "forma_pagamento": "text",
+    "cartao_id": "integer", "fatura_mes": "integer", "fatura_ano": "integer",
+}
+
+
+def _normalizar_payload(payload, registro_atual):
+    """Regras de cartão de update_transacao aplicadas ao payload (alterado no lugar).
+
+    `registro_atual` são as colunas de _COLUNAS_COMPRA_CARTAO seguidas de Data
+    (None em receitas ou se a linha não existe).
+    """
+    status_anterior = registro_atual[1] if registro_atual else None
+
     # Limpar cartao_id vazio ou None
     if "cartao_id" in payload:
         if payload["cartao_id"] == '' or payload["cartao_id"] is None:
@@ -401,81 +794,153 @@ def update_transacao(table, row_id, fields, user_id):
                 payload["cartao_id"] = int(payload["cartao_id"])
             except (ValueError, TypeError):
                 payload["cartao_id"] = None
-    
+
     # Se Status muda de "Pago" para outro status, limpar campos de cartão
     if "Status" in payload and payload["Status"] != "Pago" and status_anterior == "Pago":
         payload["cartao_id"] = None
         payload["forma_pagamento"] = "dinheiro"
         payload["fatura_mes"] = None
         payload["fatura_ano"] = None
-        print(f"[DB] Status mudou de Pago para {payload['Status']}, limpando campos de cartão")
-    
+        log.debug('Status deixou de ser Pago; campos de cartão limpos', status=payload['Status'])
+
     # Se forma_pagamento não é cartao, limpar campos relacionados
     elif "forma_pagamento" in payload and payload["forma_pagamento"] != "cartao":
         payload["cartao_id"] = None
         payload["fatura_mes"] = None
         payload["fatura_ano"] = None
-    
+
     # Se tem cartao_id mas não tem fatura_mes/fatura_ano, calcular
     if "cartao_id" in payload and payload["cartao_id"]:
         if "fatura_mes" not in payload or "fatura_ano" not in payload:
             from datetime import datetime
-            # Se tem Data no payload, usar ela
-            if "Data" in payload:
-                data = payload["Data"]
+            # Se tem Data no payload, usar ela; senão, a data gravada
+            data = payload["Data"] if "Data" in payload else (registro_atual[6] if registro_atual else None)
+            if data:
                 if isinstance(data, str):
                     data = datetime.strptime(data, "%Y-%m-%d")
                 payload["fatura_mes"] = data.month
                 payload["fatura_ano"] = data.year
-            else:
-                # Se não tem Data no payload, buscar do banco
-                cur.execute(f"SELECT Data FROM {table} WHERE id = %s AND user_id = %s", (row_id, user_id))
-                result = cur.fetchone()
-                if result:
-                    data = result[0]
-                    if isinstance(data, str):
-                        data = datetime.strptime(data, "%Y-%m-%d")
-                    payload["fatura_mes"] = data.month
-                    payload["fatura_ano"] = data.year
-    
-    set_clause = ", ".join([f"{col} = %s" for col in payload.keys()])
-    values = list(payload.values()) + [row_id, user_id]
-    cur.execute(f"UPDATE {table} SET {set_clause} WHERE id = %s AND user_id = %s", values)
-    conn.commit()
-    
-    print(f"[DB] update_transacao - payload final: {payload}")
-    print(f"[DB] Verificando geração de fatura: table={table}, Status={payload.get('Status')}, cartao_id={payload.get('cartao_id')}, fatura_mes={payload.get('fatura_mes')}, fatura_ano={payload.get('fatura_ano')}")
+    return payload
+
+
+def update_transacao(table, row_id, fields, user_id):
+    """Atualiza transação existente (com suporte a cartões).
+
+    Em despesas, a fatura do cartão afetada é ajustada pela diferença (±Valor)
+    na mesma transação do UPDATE (ver _ajustar_fatura).
+    """
+    if not fields:
+        return
+    payload = {k: v for k, v in fields.items() if k in _TIPOS_COLUNAS_TRANSACAO}
+    if not payload:
+        return
+    try:
+        row_id = int(row_id)
+    except Exception:
+        return
     
-    # Se mudou para Pago com cartão, gerar/atualizar fatura
-    if table == "despesas" and "Status" in payload and payload["Status"] == "Pago":
-        if "cartao_id" in payload and payload["cartao_id"]:
-            if "fatura_mes" in payload and "fatura_ano" in payload:
-                # Garantir que os valores são inteiros
-                try:
-                    cartao_id = int(payload["cartao_id"])
-                    fatura_mes = int(payload["fatura_mes"])
-                    fatura_ano = int(payload["fatura_ano"])
-                    print(f"[DB] Chamando gerar_fatura_cartao: user_id={user_id}, cartao_id={cartao_id}, mes={fatura_mes}, ano={fatura_ano}")
-                    gerar_fatura_cartao(user_id, cartao_id, fatura_mes, fatura_ano)
-                except Exception as e:
-                    print(f"[DB] Erro ao gerar fatura: {e}")
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print(f"[DB] Fatura não gerada: faltam fatura_mes ou fatura_ano no payload")
+    with get_conn() as conn:
+        cur = conn.cursor()
+    
+        # Buscar registro atual para detectar mudanças (campos de cartão só existem em despesas)
+        registro_atual = None
+        if table == "despesas":
+            _bloquear_faturas(cur, user_id)
+            cur.execute(f"SELECT {_COLUNAS_COMPRA_CARTAO}, Data FROM despesas WHERE id = %s AND user_id = %s FOR UPDATE",
+                        (row_id, user_id))
+            registro_atual = cur.fetchone()
+    
+        _normalizar_payload(payload, registro_atual)
+    
+        set_clause = ", ".join([f"{col} = %s" for col in payload.keys()])
+        values = list(payload.values()) + [row_id, user_id]
+        if table == "despesas":
+            cur.execute(f"UPDATE despesas SET {set_clause} WHERE id = %s AND user_id = %s RETURNING {_COLUNAS_COMPRA_CARTAO}",
+                        values)
+            _aplicar_contribuicoes(cur, user_id, [registro_atual], [cur.fetchone()])
         else:
-            print(f"[DB] Fatura não gerada: cartao_id ausente ou vazio no payload")
+            cur.execute(f"UPDATE {table} SET {set_clause} WHERE id = %s AND user_id = %s", values)
     
-    # Se tinha cartão antes e agora não tem mais (mudou status ou forma_pagamento), recalcular fatura
-    if table == "despesas" and cartao_id_anterior and fatura_mes_anterior and fatura_ano_anterior:
-        if payload.get("cartao_id") is None or payload.get("Status") != "Pago":
-            try:
-                print(f"[DB] Recalculando fatura do cartão {cartao_id_anterior} após mudança de status")
-                gerar_fatura_cartao(user_id, int(cartao_id_anterior), int(fatura_mes_anterior), int(fatura_ano_anterior))
-            except Exception as e:
-                print(f"[DB] Erro ao recalcular fatura: {e}")
-    
-    conn.close()
+    log.debug('update_transacao', tabela=table, id=row_id, payload=payload)
+
+
+def update_transacoes_lote(table, alteracoes, user_id):
+    """Aplica várias edições de receitas/despesas em uma única transação.
+
+    `alteracoes` é uma lista de (row_id, fields), com as mesmas regras de
+    update_transacao por linha. As linhas são travadas com um único SELECT
+    ... FOR UPDATE e atualizadas com um UPDATE ... FROM (VALUES ...) por
+    conjunto de colunas alteradas (execute_values); em despesas, as faturas
+    afetadas são ajustadas uma vez só, no fim, pela soma dos deltas de
+    todas as linhas (_aplicar_contribuicoes). Qualquer erro desfaz o lote
+    inteiro.
+
+    Retorna um resultado por item de `alteracoes`, na mesma ordem:
+    {'id': row_id, 'resultado': 'atualizada' | 'nao_encontrada' | 'ignorada'}
+    ('ignorada': id inválido ou nenhum campo editável).
+    """
+    if table not in ('receitas', 'despesas'):
+        raise ValueError(f"Tabela de transações inválida: {table}")
+
+    resultados = []
+    payloads = {}
+    for row_id, fields in alteracoes:
+        try:
+            row_id = int(row_id)
+        except (TypeError, ValueError):
+            resultados.append({'id': row_id, 'resultado': 'ignorada'})
+            continue
+        payload = {k: v for k, v in (fields or {}).items() if k in _TIPOS_COLUNAS_TRANSACAO}
+        if payload:
+            payloads.setdefault(row_id, {}).update(payload)
+        resultados.append({'id': row_id, 'resultado': 'atualizada' if payload else 'ignorada'})
+    if not payloads:
+        return resultados
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        ids = sorted(payloads)
+        if table == "despesas":
+            _bloquear_faturas(cur, user_id)
+            cur.execute(f"""SELECT id, {_COLUNAS_COMPRA_CARTAO}, Data FROM despesas
+                            WHERE user_id = %s AND id = ANY(%s) ORDER BY id FOR UPDATE""", (user_id, ids))
+            registros = {linha[0]: linha[1:] for linha in cur.fetchall()}
+        else:
+            cur.execute(f"SELECT id FROM {table} WHERE user_id = %s AND id = ANY(%s) ORDER BY id FOR UPDATE",
+                        (user_id, ids))
+            registros = {linha[0]: None for linha in cur.fetchall()}
+
+        # Linhas agrupadas pelo conjunto de colunas que mudam
+        grupos = {}
+        for row_id in ids:
+            if row_id in registros:
+                payload = _normalizar_payload(payloads[row_id], registros[row_id])
+                colunas = tuple(sorted(payload))
+                grupos.setdefault(colunas, []).append([row_id] + [payload[c] for c in colunas])
+
+        depois = []
+        retorno = ", ".join(f"t.{coluna.strip()}" for coluna in _COLUNAS_COMPRA_CARTAO.split(","))
+        for colunas, linhas in grupos.items():
+            template = "(" + ", ".join(["%s::integer"] + [f"%s::{_TIPOS_COLUNAS_TRANSACAO[c]}" for c in colunas]) + ")"
+            sql = (f"UPDATE {table} AS t SET {', '.join(f'{c} = v.{c}' for c in colunas)} "
+                   f"FROM (VALUES %s) AS v(id, {', '.join(colunas)}) "
+                   f"WHERE t.id = v.id AND t.user_id = {int(user_id)}")
+            if table == "despesas":
+                depois += execute_values(cur, f"{sql} RETURNING {retorno}", linhas,
+                                         template=template, page_size=len(linhas), fetch=True)
+            else:
+                execute_values(cur, sql, linhas, template=template, page_size=len(linhas))
+
+        if table == "despesas":
+            _aplicar_contribuicoes(cur, user_id, [registros[row_id] for row_id in ids if row_id in registros], depois)
+
+    for item in resultados:
+        if item['resultado'] == 'atualizada' and item['id'] not in registros:
+            item['resultado'] = 'nao_encontrada'
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('update_transacoes_lote', tabela=table, linhas=len(resultados),
+                  atualizadas=sum(r['resultado'] == 'atualizada' for r in resultados))
+    return resultados
 
 
 def delete_transacao(table, row_id, user_id):
@@ -484,156 +949,410 @@ def delete_transacao(table, row_id, user_id):
         row_id = int(row_id)
     except Exception:
         return
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(f"DELETE FROM {table} WHERE id = %s AND user_id = %s", (row_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if table == "despesas":
+            # Compra paga no cartão sai da fatura na mesma transação
+            _bloquear_faturas(cur, user_id)
+            cur.execute(f"DELETE FROM despesas WHERE id = %s AND user_id = %s RETURNING {_COLUNAS_COMPRA_CARTAO}",
+                        (row_id, user_id))
+            _aplicar_contribuicoes(cur, user_id, antes=[cur.fetchone()])
+        else:
+            cur.execute(f"DELETE FROM {table} WHERE id = %s AND user_id = %s", (row_id, user_id))
 
 
 def insert_despesa_parcelada(valor, status, fixo, data, categoria, descricao, user_id, num_parcelas, forma_pagamento='dinheiro', cartao_id=None, fatura_mes=None, fatura_ano=None):
-    """Insere despesas parceladas nos meses subsequentes"""
-    from datetime import datetime
-    from dateutil.relativedelta import relativedelta
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Converte a data string para datetime
-    data_inicial = datetime.strptime(data, '%Y-%m-%d')
+    """Insere despesas parceladas nos meses subsequentes (ver insert_serie_recorrente).
+
+    fatura_mes/fatura_ano são mantidos por compatibilidade: no cartão, cada
+    parcela entra na fatura do próprio mês.
+    """
+    insert_serie_recorrente('despesas', user_id, data, num_parcelas, {
+        'Valor': valor, 'Status': status, 'Fixo': fixo, 'Categoria': categoria, 'Descrição': descricao,
+        'forma_pagamento': forma_pagamento, 'cartao_id': cartao_id,
+    })
+    log.debug('Parcelas de despesa inseridas', user_id=user_id, parcelas=num_parcelas)
+
+
+def insert_despesa_com_cartao(valor, status, fixo, data, categoria, descricao, user_id, forma_pagamento='dinheiro', cartao_id=None, fatura_mes=None, fatura_ano=None):
+    """Insere despesa com suporte a forma de pagamento e cartão de crédito"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        _bloquear_faturas(cur, user_id)
     
-    # Insere cada parcela
-    for i in range(num_parcelas):
-        # Calcula a data da parcela (adiciona i meses à data inicial)
-        data_parcela = data_inicial + relativedelta(months=i)
-        data_parcela_str = data_parcela.strftime('%Y-%m-%d')
-        
-        # Atualiza a descrição para incluir o número da parcela
-        if num_parcelas > 1:
-            descricao_parcela = f"{descricao} - Parcela {i+1}/{num_parcelas}"
+        eh_fatura = 0
+        # Insere a despesa e, se for compra paga no cartão, soma na fatura do mês
+        cur.execute(f"""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING {_COLUNAS_COMPRA_CARTAO}
+        """, (valor, status, fixo, data, categoria, descricao, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura))
+        _aplicar_contribuicoes(cur, user_id, depois=[cur.fetchone()])
+
+
+# ---------- Séries recorrentes ---------- #
+
+# Colunas comuns aos itens de uma série, por tabela (Data, user_id e, em
+# despesas, os campos de fatura são preenchidos por insert_serie_recorrente)
+_COLUNAS_SERIE = {
+    'despesas': ('Valor', 'Status', 'Fixo', 'Categoria', 'Descrição', 'forma_pagamento', 'cartao_id'),
+    'receitas': ('Valor', 'Efetuado', 'Fixo', 'Categoria', 'Descrição', 'plano_id'),
+}
+
+
+def datas_serie_mensal(data_inicial, num_itens):
+    """Datas de uma série mensal a partir de data_inicial ('YYYY-MM-DD' ou date).
+
+    O dia é limitado ao último dia de cada mês, sempre a partir do dia
+    inicial (31/01 -> 29/02 -> 31/03), como data_inicial + relativedelta(months=i).
+    """
+    import calendar
+    from datetime import date
+    if isinstance(data_inicial, str):
+        data_inicial = date.fromisoformat(data_inicial[:10])
+    datas = []
+    for i in range(num_itens):
+        ano, mes = divmod(data_inicial.month - 1 + i, 12)
+        ano += data_inicial.year
+        mes += 1
+        datas.append(date(ano, mes, min(data_inicial.day, calendar.monthrange(ano, mes)[1])))
+    return datas
+
+
+def insert_serie_recorrente(table, user_id, data, num_itens, campos, sufixo_parcela=True):
+    """Insere uma série mensal de transações (parcelas ou recorrências) de uma vez.
+
+    `campos` traz os valores comuns a todos os itens (colunas de
+    _COLUNAS_SERIE[table]); a Data avança um mês por item (datas_serie_mensal)
+    e, com mais de um item e sufixo_parcela, a Descrição ganha ' - Parcela i/n'.
+    Em despesas no cartão (forma_pagamento='cartao'), fatura_mes/fatura_ano
+    acompanham o mês de cada item e as faturas afetadas são ajustadas uma vez
+    por período, na mesma transação do INSERT multi-linha. Retorna os ids.
+    """
+    if table not in _COLUNAS_SERIE:
+        raise ValueError(f"Tabela sem suporte a séries: {table}")
+    num_itens = int(num_itens)
+    if num_itens < 1:
+        return []
+    colunas = [c for c in _COLUNAS_SERIE[table] if c in campos]
+    descricao = campos.get('Descrição')
+    no_cartao = table == 'despesas' and campos.get('forma_pagamento') == 'cartao' and bool(campos.get('cartao_id'))
+
+    linhas = []
+    for i, data_item in enumerate(datas_serie_mensal(data, num_itens)):
+        valores = dict(campos)
+        if sufixo_parcela and num_itens > 1 and 'Descrição' in campos:
+            valores['Descrição'] = f"{descricao} - Parcela {i+1}/{num_itens}"
+        linha = [valores[c] for c in colunas] + [data_item, user_id]
+        if table == 'despesas':
+            linha += [data_item.month, data_item.year, 0] if no_cartao else [None, None, 0]
+        linhas.append(linha)
+
+    colunas_sql = colunas + ['Data', 'user_id']
+    if table == 'despesas':
+        colunas_sql += ['fatura_mes', 'fatura_ano', 'eh_fatura']
+        retorno = f"id, {_COLUNAS_COMPRA_CARTAO}"
+    else:
+        retorno = "id"
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if table == 'despesas':
+            _bloquear_faturas(cur, user_id)
+        # page_size cobre a série inteira: um único statement
+        inseridas = execute_values(
+            cur,
+            f"INSERT INTO {table} ({', '.join(colunas_sql)}) VALUES %s RETURNING {retorno}",
+            linhas, page_size=len(linhas), fetch=True
+        )
+        if table == 'despesas':
+            _aplicar_contribuicoes(cur, user_id, depois=[linha[1:] for linha in inseridas])
+    return [linha[0] for linha in inseridas]
+
+
+# ---------- Extratos (paginação no servidor) ---------- #
+
+# Colunas das DataTables de extratos -> coluna no banco (a lista também é a
+# whitelist de filtros e ordenação: nada vindo do navegador entra no SQL)
+COLUNAS_EXTRATO = {
+    'receitas': {'id': 'id', 'Valor': 'valor', 'Efetuado': 'efetuado', 'Fixo': 'fixo', 'Data': 'data',
+                 'Categoria': 'categoria', 'Descrição': 'descrição'},
+    'despesas': {'id': 'id', 'Valor': 'valor', 'Status': 'status', 'Fixo': 'fixo', 'Data': 'data',
+                 'Categoria': 'categoria', 'Descrição': 'descrição',
+                 'forma_pagamento': 'forma_pagamento', 'cartao_id': 'cartao_id'},
+}
+_COLUNAS_EXTRATO_TEXTO = {'categoria', 'descrição', 'status', 'forma_pagamento'}
+_COLUNAS_EXTRATO_INTEIRAS = {'id', 'efetuado', 'fixo', 'cartao_id'}
+
+
+def _valor_filtro(coluna, valor):
+    """Valor do filtro no tipo da coluna, ou None se não convertível"""
+    from datetime import date
+    try:
+        if coluna == 'data':
+            return date.fromisoformat(str(valor).strip()[:10])
+        if coluna == 'valor':
+            return float(str(valor).replace(',', '.'))
+        if coluna in _COLUNAS_EXTRATO_INTEIRAS:
+            return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+    return str(valor)
+
+
+def _where_extrato(colunas, user_id, filtros, data_inicio, data_fim):
+    """Cláusula WHERE (e parâmetros) do período e dos filtros da DataTable"""
+    condicoes = ["user_id = %s"]
+    params = [user_id]
+    if data_inicio and data_fim:
+        condicoes.append("data BETWEEN %s AND %s")
+        params += [str(data_inicio)[:10], str(data_fim)[:10]]
+
+    for coluna_id, operador, valor in filtros or ():
+        coluna = colunas.get(coluna_id)
+        if coluna is None:
+            continue
+        if operador in ('contains', 'datestartswith'):
+            texto = str(valor).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            padrao = f"%{texto}%" if operador == 'contains' else f"{texto}%"
+            if coluna in _COLUNAS_EXTRATO_TEXTO and operador == 'contains':
+                condicoes.append(f"{coluna} ILIKE %s")
+            else:
+                condicoes.append(f"{coluna}::text LIKE %s")
+            params.append(padrao)
+        elif operador in ('=', '!=', '<', '<=', '>', '>='):
+            valor = _valor_filtro(coluna, valor)
+            if valor is None:
+                continue
+            condicoes.append(f"{coluna} {operador} %s")
+            params.append(valor)
+    return " AND ".join(condicoes), params
+
+
+def get_pagina_transacoes(table, user_id, page_size, filtros=None, ordenacao=None,
+                          cursor=None, pagina=0, data_inicio=None, data_fim=None, total=None):
+    """Uma página das transações do usuário para as DataTables de extratos.
+
+    Ordena por (coluna de ordenação, id) - por padrão (Data, id) - e filtra no
+    banco pelo período e pelos termos de utils.filtros_tabela. Com `cursor`
+    ([valor, id] da última linha da página anterior) a página é lida por
+    keyset: o custo depende do tamanho da página, não do histórico. Sem
+    cursor (salto direto para uma página), usa OFFSET pagina * page_size.
+    `total`, se já conhecido (mesma consulta, mesma versão dos dados), evita
+    o COUNT.
+
+    Retorna {'linhas': [dict, ...], 'total': linhas que passam nos filtros,
+    'cursor': [valor, id] da última linha, ou None}.
+    """
+    if table not in COLUNAS_EXTRATO:
+        raise ValueError(f"Tabela de extrato inválida: {table}")
+    colunas = COLUNAS_EXTRATO[table]
+    page_size = max(1, int(page_size))
+
+    coluna_id, direcao = ordenacao or ('Data', 'asc')
+    if coluna_id not in colunas:
+        coluna_id = 'Data'
+    ordem = colunas[coluna_id]
+    desc = str(direcao).lower() == 'desc'
+    comparacao = '<' if desc else '>'
+    sentido = 'DESC' if desc else 'ASC'
+
+    where, params = _where_extrato(colunas, user_id, filtros, data_inicio, data_fim)
+    apelidos = ", ".join(f'{coluna} AS "{nome}"' for nome, coluna in colunas.items())
+    select = f"SELECT {apelidos} FROM {table}"
+
+    with get_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        if total is None:
+            cur.execute(f"SELECT COUNT(*) AS total FROM {table} WHERE {where}", params)
+            total = cur.fetchone()['total']
+
+        if not cursor:
+            # NULLs ficam no fim nas duas direções, lidos à parte como no
+            # keyset: ORDER BY {ordem} DESC NULLS LAST não casa com a leitura
+            # de trás para frente do índice (que dá NULLS FIRST) e obrigaria a
+            # ordenar o histórico inteiro a cada salto de página
+            inicio = max(0, int(pagina)) * page_size
+            cur.execute(
+                f"""{select} WHERE {where} AND {ordem} IS NOT NULL
+                    ORDER BY {ordem} {sentido}, id {sentido} LIMIT %s OFFSET %s""",
+                params + [page_size, inicio]
+            )
+            linhas = cur.fetchall()
+            if len(linhas) < page_size:
+                if linhas or not inicio:
+                    nao_nulos = inicio + len(linhas)
+                else:
+                    cur.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE {where} AND {ordem} IS NOT NULL", params)
+                    nao_nulos = cur.fetchone()['n']
+                cur.execute(
+                    f"{select} WHERE {where} AND {ordem} IS NULL ORDER BY id {sentido} LIMIT %s OFFSET %s",
+                    params + [page_size - len(linhas), inicio + len(linhas) - nao_nulos]
+                )
+                linhas += cur.fetchall()
         else:
-            descricao_parcela = descricao
-        
-        # Se for cartão, atualiza fatura_mes e fatura_ano para cada parcela
-        parcela_fatura_mes = None
-        parcela_fatura_ano = None
-        if cartao_id and forma_pagamento == 'cartao':
-            parcela_fatura_mes = data_parcela.month
-            parcela_fatura_ano = data_parcela.year
-        
-        # Insere a parcela
+            # NULLs ficam no fim nas duas direções. A comparação de linhas
+            # ((coluna, id) > (valor, id)) é um intervalo do índice; as linhas
+            # sem valor só são lidas quando as com valor acabam
+            valor, ultimo_id = cursor
+            linhas = []
+            if valor is not None:
+                cur.execute(
+                    f"""{select} WHERE {where} AND ({ordem}, id) {comparacao} (%s, %s)
+                        ORDER BY {ordem} {sentido}, id {sentido} LIMIT %s""",
+                    params + [valor, ultimo_id, page_size]
+                )
+                linhas = cur.fetchall()
+            if len(linhas) < page_size:
+                nulos = f" AND {ordem} IS NULL" + (f" AND id {comparacao} %s" if valor is None else "")
+                cur.execute(
+                    f"{select} WHERE {where}{nulos} ORDER BY id {sentido} LIMIT %s",
+                    params + ([ultimo_id] if valor is None else []) + [page_size - len(linhas)]
+                )
+                linhas += cur.fetchall()
+        linhas = [dict(linha) for linha in linhas]
+
+    # Data em ISO: as linhas e o cursor vão para o navegador (JSON)
+    for linha in linhas:
+        if linha['Data'] is not None:
+            linha['Data'] = linha['Data'].isoformat()
+    proximo = [linhas[-1][coluna_id], linhas[-1]['id']] if linhas else None
+    return {'linhas': linhas, 'total': total, 'cursor': proximo}
+
+
+# ---------- Saldo ---------- #
+
+def get_saldo(user_id):
+    """Saldo do usuário em O(1): saldo_inicial + totais mantidos em saldos_usuarios.
+
+    Retorna dict com saldo_inicial, receitas, despesas e saldo (floats).
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
         cur.execute(
-            """INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura) 
-               VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,0)""",
-            (valor, status, fixo, data_parcela_str, categoria, descricao_parcela, user_id, forma_pagamento, cartao_id, parcela_fatura_mes, parcela_fatura_ano)
+            """SELECT COALESCE(u.saldo_inicial, 0), COALESCE(s.receitas, 0), COALESCE(s.despesas, 0)
+               FROM users u LEFT JOIN saldos_usuarios s ON s.user_id = u.id
+               WHERE u.id = %s""",
+            (user_id,)
         )
-        
-        # Se for cartão e está pago, gerar a fatura
-        if cartao_id and status == 'Pago' and parcela_fatura_mes and parcela_fatura_ano:
-            gerar_fatura_cartao(user_id, cartao_id, parcela_fatura_mes, parcela_fatura_ano)
-    
-    conn.commit()
-    conn.close()
-    print(f"[DB] Inseridas {num_parcelas} parcelas de despesa para o usuário {user_id}")
+        row = cur.fetchone()
+    return _saldo_dict(row)
 
 
-def insert_despesa_com_cartao(valor, status, fixo, data, categoria, descricao, user_id, forma_pagamento='dinheiro', cartao_id=None, fatura_mes=None, fatura_ano=None):
-    """Insere despesa com suporte a forma de pagamento e cartão de crédito"""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    eh_fatura = 0
-    # Insere a despesa
-    cur.execute("""
-        INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (valor, status, fixo, data, categoria, descricao, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura))
-    
-    conn.commit()
-    conn.close()
-    
-    # Se for cartão e está pago, gerar/atualizar fatura automaticamente
-    if cartao_id and forma_pagamento == 'cartao' and status == 'Pago' and fatura_mes and fatura_ano:
-        gerar_fatura_cartao(user_id, cartao_id, fatura_mes, fatura_ano)
+def calcular_saldo(user_id):
+    """Mesmo resultado de get_saldo, agregando o histórico em um único SELECT"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""SELECT COALESCE(u.saldo_inicial, 0),
+                   (SELECT COALESCE(SUM(valor), 0) FROM receitas
+                    WHERE user_id = u.id AND {_SQL_RECEITA_CONTA_SALDO}),
+                   (SELECT COALESCE(SUM(valor), 0) FROM despesas
+                    WHERE user_id = u.id AND {_SQL_DESPESA_CONTA_SALDO})
+               FROM users u WHERE u.id = %s""",
+            (user_id,)
+        )
+        row = cur.fetchone()
+    return _saldo_dict(row)
+
+
+def recalcular_saldo(user_id=None):
+    """Reconstrói saldos_usuarios (de um usuário ou de todos) a partir das transações.
+
+    Só é necessário após escritas que não disparam trigger (ex.: TRUNCATE).
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # Bloqueia escritas concorrentes enquanto os totais são refeitos
+        cur.execute("LOCK TABLE receitas, despesas IN SHARE MODE")
+        if user_id is None:
+            cur.execute("DELETE FROM saldos_usuarios")
+            cur.execute(_sql_recalcula_saldos())
+        else:
+            cur.execute("UPDATE saldos_usuarios SET receitas = 0, despesas = 0 WHERE user_id = %s", (user_id,))
+            cur.execute(_sql_recalcula_saldos("AND user_id = %(user_id)s"), {'user_id': user_id})
+    log.info('Saldos recalculados', user_id='todos' if user_id is None else user_id)
+
+
+def _saldo_dict(row):
+    saldo_inicial, receitas, despesas = (float(v) for v in row) if row else (0.0, 0.0, 0.0)
+    return {
+        'saldo_inicial': saldo_inicial,
+        'receitas': receitas,
+        'despesas': despesas,
+        'saldo': saldo_inicial + receitas - despesas,
+    }
 
 
 # ---------- Funções de Orçamento ---------- #
 
 def set_orcamento(categoria, valor_limite, mes, ano, user_id):
     """Define ou atualiza orçamento para uma categoria em um mês/ano específico"""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute(
-            """INSERT INTO orcamentos (categoria, valor_limite, mes, ano, user_id) 
-               VALUES (%s, %s, %s, %s, %s)
-               ON CONFLICT (categoria, mes, ano, user_id) 
-               DO UPDATE SET valor_limite = EXCLUDED.valor_limite""",
-            (categoria, valor_limite, mes, ano, user_id)
-        )
-        conn.commit()
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """INSERT INTO orcamentos (categoria, valor_limite, mes, ano, user_id) 
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (categoria, mes, ano, user_id) 
+                   DO UPDATE SET valor_limite = EXCLUDED.valor_limite""",
+                (categoria, valor_limite, mes, ano, user_id)
+            )
     except Exception as e:
-        conn.rollback()
-        print(f"[DB] Erro ao definir orçamento: {e}")
+        log.error('Erro ao definir orçamento', erro=e)
         raise
-    finally:
-        conn.close()
 
 
 def get_orcamentos(user_id, mes=None, ano=None):
     """Retorna orçamentos do usuário, opcionalmente filtrados por mês/ano"""
-    conn = connect_db()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    with get_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    if mes and ano:
-        cur.execute(
-            "SELECT * FROM orcamentos WHERE user_id = %s AND mes = %s AND ano = %s ORDER BY categoria",
-            (user_id, mes, ano)
-        )
-    else:
-        cur.execute(
-            "SELECT * FROM orcamentos WHERE user_id = %s ORDER BY ano DESC, mes DESC, categoria",
-            (user_id,)
-        )
+        if mes and ano:
+            cur.execute(
+                "SELECT * FROM orcamentos WHERE user_id = %s AND mes = %s AND ano = %s ORDER BY categoria",
+                (user_id, mes, ano)
+            )
+        else:
+            cur.execute(
+                "SELECT * FROM orcamentos WHERE user_id = %s ORDER BY ano DESC, mes DESC, categoria",
+                (user_id,)
+            )
     
-    rows = cur.fetchall()
-    conn.close()
+        rows = cur.fetchall()
     return [dict(row) for row in rows]
 
 
 def delete_orcamento(orcamento_id, user_id):
     """Deleta orçamento específico"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM orcamentos WHERE id = %s AND user_id = %s", (orcamento_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM orcamentos WHERE id = %s AND user_id = %s", (orcamento_id, user_id))
 
 
 def get_gastos_por_categoria(user_id, mes, ano):
     """Retorna total gasto por categoria em um mês/ano específico"""
-    conn = connect_db()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # Calcula primeiro e último dia do mês
-    from datetime import date
-    primeiro_dia = date(ano, mes, 1).strftime('%Y-%m-%d')
-    if mes == 12:
-        ultimo_dia = date(ano, 12, 31).strftime('%Y-%m-%d')
-    else:
-        from datetime import timedelta
-        ultimo_dia = (date(ano, mes + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
+    with get_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+    
+        # Calcula primeiro e último dia do mês
+        from datetime import date
+        primeiro_dia = date(ano, mes, 1).strftime('%Y-%m-%d')
+        if mes == 12:
+            ultimo_dia = date(ano, 12, 31).strftime('%Y-%m-%d')
+        else:
+            from datetime import timedelta
+            ultimo_dia = (date(ano, mes + 1, 1) - timedelta(days=1)).strftime('%Y-%m-%d')
     
-    cur.execute(
-        """SELECT categoria, SUM(valor) as total_gasto
-           FROM despesas
-           WHERE user_id = %s AND data >= %s AND data <= %s
-           GROUP BY categoria""",
-        (user_id, primeiro_dia, ultimo_dia)
-    )
+        cur.execute(
+            """SELECT categoria, SUM(valor) as total_gasto
+               FROM despesas
+               WHERE user_id = %s AND data >= %s AND data <= %s
+               GROUP BY categoria""",
+            (user_id, primeiro_dia, ultimo_dia)
+        )
     
-    rows = cur.fetchall()
-    conn.close()
+        rows = cur.fetchall()
     return {row['categoria']: row['total_gasto'] for row in rows}
 
 
@@ -681,10 +1400,12 @@ def delete_user(user_id, conn=None):
     cur = conn.cursor()
     # Deletar na ordem correta (tabelas dependentes primeiro)
     cur.execute("DELETE FROM planos WHERE user_id = %s", (user_id,))
+    cur.execute("DELETE FROM montante_aportes WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM montantes WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM anotacoes_planos WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM receitas WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM despesas WHERE user_id = %s", (user_id,))
+    cur.execute("DELETE FROM saldos_usuarios WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM cat_receita WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM cat_despesa WHERE user_id = %s", (user_id,))
     cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
@@ -802,6 +1523,11 @@ def init_planos_tables():
         FOREIGN KEY (montante_id) REFERENCES montantes (id),
         FOREIGN KEY (user_id) REFERENCES users (id)
     )""")
+
+    # Consultas por usuário (get_montantes_by_user, get_aportes_by_user,
+    # atualizar_valores_investimentos) e por investimento (get_montante_aportes)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_montantes_user ON montantes (user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_montante_aportes_user ON montante_aportes (user_id, montante_id)")
     
     conn.commit()
     conn.close()
@@ -821,50 +1547,43 @@ def get_planos_by_user(user_id):
 def insert_plano(nome, valor_total, valor_acumulado, categoria_despesa, user_id):
     """Insere um novo plano"""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    cur.execute(
-        "INSERT INTO planos (nome, valor_total, valor_acumulado, categoria_despesa, user_id, created_at) VALUES (%s,%s,%s,%s,%s,%s) RETURNING id",
-        (nome, valor_total, valor_acumulado, categoria_despesa, user_id, created_at)
-    )
-    plano_id = cur.fetchone()[0]
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cur.execute(
+            "INSERT INTO planos (nome, valor_total, valor_acumulado, categoria_despesa, user_id, created_at) VALUES (%s,%s,%s,%s,%s,%s) RETURNING id",
+            (nome, valor_total, valor_acumulado, categoria_despesa, user_id, created_at)
+        )
+        plano_id = cur.fetchone()[0]
     return plano_id
 
 
 def update_plano(plano_id, nome, valor_total, valor_acumulado, categoria_despesa):
     """Atualiza um plano existente"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE planos SET nome = %s, valor_total = %s, valor_acumulado = %s, categoria_despesa = %s WHERE id = %s",
-        (nome, valor_total, valor_acumulado, categoria_despesa, plano_id)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE planos SET nome = %s, valor_total = %s, valor_acumulado = %s, categoria_despesa = %s WHERE id = %s",
+            (nome, valor_total, valor_acumulado, categoria_despesa, plano_id)
+        )
 
 
 def delete_plano(plano_id, user_id):
     """Deleta um plano"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM planos WHERE id = %s AND user_id = %s", (plano_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM planos WHERE id = %s AND user_id = %s", (plano_id, user_id))
 
 
 def calculate_plano_valor_acumulado(plano_id, user_id):
     """Calcula o valor acumulado de um plano baseado nas receitas destinadas a esse plano"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT SUM(Valor) FROM receitas WHERE plano_id = %s AND Efetuado = 1 AND user_id = %s",
-        (plano_id, user_id)
-    )
-    result = cur.fetchone()[0]
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT SUM(Valor) FROM receitas WHERE plano_id = %s AND Efetuado = 1 AND user_id = %s",
+            (plano_id, user_id)
+        )
+        result = cur.fetchone()[0]
     return result if result else 0
 
 
@@ -885,58 +1604,57 @@ def get_montantes_by_user(user_id):
 def insert_montante(instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial, user_id):
     """Insere um novo investimento/montante"""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    cur.execute(
-        """INSERT INTO montantes (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, 
-                                   data_inicio, valor_inicial, user_id, created_at) 
-           VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id""",
-        (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial, user_id, created_at)
-    )
-    montante_id = cur.fetchone()[0]
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cur.execute(
+            """INSERT INTO montantes (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, 
+                                       data_inicio, valor_inicial, user_id, created_at) 
+               VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id""",
+            (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial, user_id, created_at)
+        )
+        montante_id = cur.fetchone()[0]
+        _invalidar_valorizacao(cur, user_id)
     return montante_id
 
 
 def update_montante(montante_id, instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial):
     """Atualiza um investimento/montante existente"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute(
-        """UPDATE montantes SET instituicao = %s, nome_investimento = %s, tipo = %s, valor = %s, tipo_rendimento = %s, 
-                                taxa_percentual = %s, data_inicio = %s, valor_inicial = %s 
-           WHERE id = %s""",
-        (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial, montante_id)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """UPDATE montantes SET instituicao = %s, nome_investimento = %s, tipo = %s, valor = %s, tipo_rendimento = %s, 
+                                    taxa_percentual = %s, data_inicio = %s, valor_inicial = %s 
+               WHERE id = %s""",
+            (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual, data_inicio, valor_inicial, montante_id)
+        )
+        cur.execute("SELECT user_id FROM montantes WHERE id = %s", (montante_id,))
+        row = cur.fetchone()
+        if row:
+            _invalidar_valorizacao(cur, row[0])
 
 
 def delete_montante(montante_id, user_id):
     """Deleta um montante"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM montante_aportes WHERE montante_id = %s AND user_id = %s", (montante_id, user_id))
-    cur.execute("DELETE FROM montantes WHERE id = %s AND user_id = %s", (montante_id, user_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM montante_aportes WHERE montante_id = %s AND user_id = %s", (montante_id, user_id))
+        cur.execute("DELETE FROM montantes WHERE id = %s AND user_id = %s", (montante_id, user_id))
+        _invalidar_valorizacao(cur, user_id)
 
 
 def insert_montante_aporte(montante_id, valor, data_aporte, user_id, quantidade=None, preco_unitario=None, ticker=None):
     """Insere um aporte em um investimento existente"""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    cur.execute(
-        """INSERT INTO montante_aportes (montante_id, valor, data_aporte, quantidade, preco_unitario, ticker, user_id, created_at)
-           VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
-        (montante_id, valor, data_aporte, quantidade, preco_unitario, ticker, user_id, created_at)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cur.execute(
+            """INSERT INTO montante_aportes (montante_id, valor, data_aporte, quantidade, preco_unitario, ticker, user_id, created_at)
+               VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
+            (montante_id, valor, data_aporte, quantidade, preco_unitario, ticker, user_id, created_at)
+        )
+        _invalidar_valorizacao(cur, user_id)
 
 
 def get_montante_aportes(montante_id, user_id):
@@ -969,308 +1687,407 @@ def get_aportes_by_user(user_id):
 
 def get_anotacoes_planos(user_id):
     """Retorna as anotações de planos de um usuário"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("SELECT conteudo FROM anotacoes_planos WHERE user_id = %s", (user_id,))
-    row = cur.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT conteudo FROM anotacoes_planos WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
     return row[0] if row else ""
 
 
 def save_anotacoes_planos(user_id, conteudo):
     """Salva as anotações de planos de um usuário"""
     from datetime import datetime
-    conn = connect_db()
-    cur = conn.cursor()
-    updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with get_conn() as conn:
+        cur = conn.cursor()
+        updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    # Verifica se já existe
-    cur.execute("SELECT id FROM anotacoes_planos WHERE user_id = %s", (user_id,))
-    exists = cur.fetchone()
-    
-    if exists:
-        cur.execute("UPDATE anotacoes_planos SET conteudo = %s, updated_at = %s WHERE user_id = %s",
-                   (conteudo, updated_at, user_id))
-    else:
-        cur.execute("INSERT INTO anotacoes_planos (conteudo, user_id, updated_at) VALUES (%s,%s,%s)",
-                   (conteudo, user_id, updated_at))
+        # Verifica se já existe
+        cur.execute("SELECT id FROM anotacoes_planos WHERE user_id = %s", (user_id,))
+        exists = cur.fetchone()
     
-    conn.commit()
-    conn.close()
+        if exists:
+            cur.execute("UPDATE anotacoes_planos SET conteudo = %s, updated_at = %s WHERE user_id = %s",
+                       (conteudo, updated_at, user_id))
+        else:
+            cur.execute("INSERT INTO anotacoes_planos (conteudo, user_id, updated_at) VALUES (%s,%s,%s)",
+                       (conteudo, user_id, updated_at))
 
 
-# ========= Funções de Cálculo de Rendimento ========= #
+def _invalidar_valorizacao(cur, user_id):
+    """Marca os investimentos do usuário para revalorização na próxima leitura"""
+    cur.execute("UPDATE users SET investimentos_valorizados_em = NULL WHERE id = %s", (user_id,))
 
-def calcular_iof(rendimento, dias_decorridos):
-    """
-    Calcula o IOF (Imposto sobre Operações Financeiras) sobre o rendimento
-    
-    Args:
-        rendimento: Valor do rendimento obtido
-        dias_decorridos: Número de dias desde o início do investimento
-    
-    Returns:
-        float: Valor do IOF a ser descontado (0 se dias >= 30)
-    """
-    from constants import TABELA_IOF
-    
-    # Não há IOF após 30 dias
-    if dias_decorridos >= 30:
-        return 0
-    
-    # Rendimentos negativos ou zero não têm IOF
-    if rendimento <= 0:
-        return 0
-    
-    # Busca a alíquota na tabela
-    # Para dias entre 1 e 30, usar a alíquota correspondente
-    # Para dia 0, usar alíquota do dia 1
-    dias_iof = max(1, min(30, dias_decorridos))
-    aliquota = TABELA_IOF.get(dias_iof, 0)
-    
-    # Calcula o IOF
-    iof = rendimento * (aliquota / 100)
-    
-    return round(iof, 2)
 
+def atualizar_valores_investimentos(user_id=None):
+    """Atualiza os valores dos investimentos de um usuário (user_id), de vários
+    (lista de ids) ou de todos (None) com base nos rendimentos.
 
-def calcular_rendimento_investimento(valor_inicial, tipo_rendimento, taxa_percentual, dias_decorridos):
-    """
-    Calcula o rendimento de um investimento
-    
-    Args:
-        valor_inicial: Valor inicial investido
-        tipo_rendimento: Tipo de rendimento (% do CDI, Taxa fixa, etc.)
-        taxa_percentual: Taxa/percentual do rendimento
-        dias_decorridos: Número de dias desde o início do investimento
-    
-    Returns:
-        dict com valor_atual, rendimento_total, rendimento_diario, rendimento_mensal, rendimento_anual
+    Os investimentos e todos os seus aportes vêm em duas queries (sem uma query
+    de aportes por investimento), são valorizados juntos com NumPy
+    (rendimentos.valorizar_investimentos, com o histórico de taxas de
+    taxas_historicas.historico_padrao) e gravados com um único UPDATE. Os
+    usuários processados ficam com investimentos_valorizados_em = hoje.
+    Retorna {montante_id: (valor, iof_descontado)}.
     """
-    from constants import TAXA_CDI_ANUAL, TAXA_SELIC_ANUAL, TAXA_IPCA_ANUAL
-    
-    if not valor_inicial or valor_inicial <= 0:
-        return {
-            'valor_atual': 0,
-            'rendimento_total': 0,
-            'rendimento_diario': 0,
-            'rendimento_mensal': 0,
-            'rendimento_anual': 0
-        }
-    
-    taxa_anual = 0
-    
-    # Determina a taxa anual baseada no tipo de rendimento
-    if tipo_rendimento == "Sem rendimento":
-        taxa_anual = 0
-    
-    elif tipo_rendimento == "% do CDI":
-        # Ex: 100% do CDI com CDI a 10.65% a.a.
-        taxa_anual = (taxa_percentual / 100) * TAXA_CDI_ANUAL
-    
-    elif tipo_rendimento == "Taxa fixa (% a.a.)":
-        taxa_anual = taxa_percentual
-    
-    elif tipo_rendimento == "IPCA + (% a.a.)":
-        taxa_anual = TAXA_IPCA_ANUAL + taxa_percentual
-    
-    elif tipo_rendimento == "100% da Selic":
-        taxa_anual = TAXA_SELIC_ANUAL
-    
-    elif tipo_rendimento == "Poupança (0.5% a.m.)":
-        taxa_anual = 0.5 * 12  # 6% a.a.
-    
-    # Conversão para taxa diária (juros compostos)
-    taxa_diaria = (1 + taxa_anual/100) ** (1/252) - 1  # 252 dias úteis no ano
-    
-    # Cálculo do montante com juros compostos
-    valor_atual = valor_inicial * ((1 + taxa_diaria) ** dias_decorridos)
-    rendimento_total = valor_atual - valor_inicial
-    
-    # Cálculo do IOF sobre o rendimento
-    iof_descontado = calcular_iof(rendimento_total, dias_decorridos)
-    
-    # Valor líquido após IOF
-    rendimento_liquido = rendimento_total - iof_descontado
-    valor_liquido = valor_inicial + rendimento_liquido
-    
-    # Estimativas de rendimento
-    rendimento_diario = valor_atual * taxa_diaria
-    rendimento_mensal = valor_atual * ((1 + taxa_diaria) ** 21 - 1)  # 21 dias úteis no mês
-    rendimento_anual = valor_atual * ((1 + taxa_diaria) ** 252 - 1)  # 252 dias úteis no ano
-    
-    return {
-        'valor_atual': round(valor_atual, 2),
-        'valor_liquido': round(valor_liquido, 2),  # Valor após desconto do IOF
-        'rendimento_total': round(rendimento_total, 2),
-        'rendimento_liquido': round(rendimento_liquido, 2),  # Rendimento após IOF
-        'iof_descontado': round(iof_descontado, 2),
-        'rendimento_diario': round(rendimento_diario, 2),
-        'rendimento_mensal': round(rendimento_mensal, 2),
-        'rendimento_anual': round(rendimento_anual, 2)
-    }
-
+    from datetime import date
 
-def atualizar_valores_investimentos(user_id):
-    """Atualiza os valores de todos os investimentos de um usuário com base nos rendimentos"""
-    from datetime import datetime, date
-    
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    # Busca todos os investimentos do usuário
-    cur.execute(
-        """SELECT id, valor_inicial, tipo_rendimento, taxa_percentual, data_inicio 
-           FROM montantes WHERE user_id = %s AND data_inicio IS NOT NULL""",
-        (user_id,)
-    )
-    
-    investimentos = cur.fetchall()
-    
     hoje = date.today()
-    
-    for inv in investimentos:
-        inv_id, valor_inicial, tipo_rendimento, taxa_percentual, data_inicio_str = inv
-
-        if not data_inicio_str:
-            continue
-
-        # Base inicial do investimento (aporte original)
-        aportes = []
-        if valor_inicial and valor_inicial > 0:
-            aportes.append({
-                'valor': float(valor_inicial),
-                'data_aporte': data_inicio_str
-            })
-
-        # Aportes adicionais
+    if user_id is None:
+        filtro, filtro_users = "", ""
+    elif isinstance(user_id, (list, tuple, set)):
+        filtro, filtro_users = " AND user_id = ANY(%(user_id)s)", " WHERE id = ANY(%(user_id)s)"
+        user_id = [int(uid) for uid in user_id]
+    else:
+        filtro, filtro_users = " AND user_id = %(user_id)s", " WHERE id = %(user_id)s"
+    params = {'user_id': user_id, 'hoje': hoje}
+    resultado = {}
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # Marca antes de ler: uma escrita concorrente em montantes/aportes
+        # espera este UPDATE e volta a marcar NULL depois do commit
+        cur.execute(f"UPDATE users SET investimentos_valorizados_em = %(hoje)s{filtro_users}", params)
         cur.execute(
-            """SELECT valor, data_aporte FROM montante_aportes
-               WHERE montante_id = %s AND user_id = %s
-               ORDER BY data_aporte ASC, id ASC""",
-            (inv_id, user_id)
+            f"""SELECT id, user_id, tipo_rendimento, taxa_percentual, valor_inicial, data_inicio
+                FROM montantes WHERE data_inicio IS NOT NULL AND data_inicio <> ''{filtro}""",
+            params
         )
-        for valor_aporte, data_aporte in cur.fetchall():
-            if valor_aporte and data_aporte:
-                aportes.append({
-                    'valor': float(valor_aporte),
-                    'data_aporte': data_aporte
-                })
-
-        if not aportes:
-            continue
-
-        valor_total_liquido = 0
-        iof_total = 0
+        investimentos = cur.fetchall()
+        if not investimentos:
+            return resultado
+        cur.execute(
+            f"""SELECT montante_id, user_id, valor, data_aporte FROM montante_aportes
+                WHERE valor <> 0 AND data_aporte IS NOT NULL AND data_aporte <> ''{filtro}
+                ORDER BY montante_id, data_aporte ASC, id ASC""",
+            params
+        )
+        aportes_por_investimento = {}
+        for montante_id, aporte_user_id, valor, data_aporte in cur.fetchall():
+            aportes_por_investimento.setdefault((montante_id, aporte_user_id), []).append((valor, data_aporte))
+
+        # Uma posição por aporte: o valor inicial (na data de início) e depois
+        # os aportes adicionais, na ordem do cálculo por investimento
+        ids, tipos, taxas, valores, datas = [], [], [], [], []
+        for inv_id, inv_user_id, tipo_rendimento, taxa_percentual, valor_inicial, data_inicio in investimentos:
+            aportes = [(valor_inicial, data_inicio)] if valor_inicial and valor_inicial > 0 else []
+            aportes += aportes_por_investimento.get((inv_id, inv_user_id), [])
+            for valor, data_aporte in aportes:
+                ids.append(inv_id)
+                tipos.append(tipo_rendimento)
+                taxas.append(taxa_percentual)
+                valores.append(valor)
+                datas.append(data_aporte)
+
+        resultado = valorizar_investimentos(ids, tipos, taxas, valores, datas, hoje, historico_padrao())
+        if resultado:
+            # Atualiza valor consolidado dos investimentos
+            execute_values(
+                cur,
+                """UPDATE montantes AS m SET valor = v.valor, iof_descontado = v.iof
+                   FROM (VALUES %s) AS v(id, valor, iof) WHERE m.id = v.id""",
+                [(inv_id, valor, iof) for inv_id, (valor, iof) in resultado.items()],
+                page_size=len(resultado)
+            )
+    return resultado
 
-        for aporte in aportes:
-            try:
-                data_aporte = datetime.strptime(aporte['data_aporte'], '%Y-%m-%d').date()
-            except Exception:
-                continue
 
-            dias_decorridos = (hoje - data_aporte).days
-            if dias_decorridos < 0:
-                dias_decorridos = 0
+def garantir_valores_investimentos(user_id):
+    """Revaloriza os investimentos do usuário só se ainda não foram valorizados
+    hoje (ou se montantes/aportes mudaram desde então). Retorna True se recalculou.
 
-            resultado_aporte = calcular_rendimento_investimento(
-                aporte['valor'],
-                tipo_rendimento or "Sem rendimento",
-                taxa_percentual or 0,
-                dias_decorridos
-            )
+    Usado no caminho de leitura (/planos): no dia a dia quem revaloriza é o
+    agendador (scheduler.py) e a página só faz esta checagem.
+    """
+    from datetime import date
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT investimentos_valorizados_em FROM users WHERE id = %s", (user_id,))
+        row = cur.fetchone()
+    if row is None or (row[0] is not None and row[0] >= date.today()):
+        return False
+    atualizar_valores_investimentos(user_id)
+    return True
 
-            valor_total_liquido += resultado_aporte['valor_liquido']
-            iof_total += resultado_aporte['iof_descontado']
 
-        # Atualiza valor consolidado do investimento
+def get_usuarios_valorizacao_pendente(limite):
+    """Até `limite` ids de usuários com investimentos ainda não valorizados hoje"""
+    from datetime import date
+    with get_conn() as conn:
+        cur = conn.cursor()
         cur.execute(
-            "UPDATE montantes SET valor = %s, iof_descontado = %s WHERE id = %s",
-            (round(valor_total_liquido, 2), round(iof_total, 2), inv_id)
+            """SELECT u.id FROM users u
+               WHERE (u.investimentos_valorizados_em IS NULL OR u.investimentos_valorizados_em < %s)
+                 AND EXISTS (SELECT 1 FROM montantes m WHERE m.user_id = u.id)
+               ORDER BY u.id
+               LIMIT %s""",
+            (date.today(), limite)
         )
-    
-    conn.commit()
-    conn.close()
+        return [row[0] for row in cur.fetchall()]
 
 
 # =========  Cartões de Crédito  =========== #
 
 def get_cartoes(user_id):
     """Retorna todos os cartões do usuário"""
-    conn = connect_db()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("SELECT * FROM cartoes WHERE user_id = %s ORDER BY nome", (user_id,))
-    cartoes = cur.fetchall()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT * FROM cartoes WHERE user_id = %s ORDER BY nome", (user_id,))
+        cartoes = cur.fetchall()
     result = [dict(c) for c in cartoes]
-    print(f"[DB] get_cartoes(user_id={user_id}) retornou {len(result)} cartões: {result}")
+    log.debug('get_cartoes', user_id=user_id, cartoes=len(result))
     return result
 
 
 def create_cartao(nome, user_id, limite=0, dia_vencimento=10, dia_fechamento=5):
     """Cria um novo cartão de crédito"""
-    conn = connect_db()
-    cur = conn.cursor()
     try:
-        cur.execute(
-            """INSERT INTO cartoes (nome, user_id, limite, dia_vencimento, dia_fechamento, ativo) 
-               VALUES (%s, %s, %s, %s, %s, 1) RETURNING id""",
-            (nome, user_id, limite, dia_vencimento, dia_fechamento)
-        )
-        cartao_id = cur.fetchone()[0]
-        conn.commit()
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """INSERT INTO cartoes (nome, user_id, limite, dia_vencimento, dia_fechamento, ativo) 
+                   VALUES (%s, %s, %s, %s, %s, 1) RETURNING id""",
+                (nome, user_id, limite, dia_vencimento, dia_fechamento)
+            )
+            cartao_id = cur.fetchone()[0]
         return cartao_id
     except Exception as e:
-        conn.rollback()
-        print(f"[DB] Erro ao criar cartão: {e}")
+        log.error('Erro ao criar cartão', erro=e)
         raise
-    finally:
-        conn.close()
 
 
 def update_cartao(cartao_id, nome=None, limite=None, dia_vencimento=None, dia_fechamento=None, ativo=None):
     """Atualiza um cartão de crédito"""
-    conn = connect_db()
-    cur = conn.cursor()
+    with get_conn() as conn:
+        cur = conn.cursor()
     
-    updates = []
-    params = []
+        updates = []
+        params = []
     
-    if nome is not None:
-        updates.append("nome = %s")
-        params.append(nome)
-    if limite is not None:
-        updates.append("limite = %s")
-        params.append(limite)
-    if dia_vencimento is not None:
-        updates.append("dia_vencimento = %s")
-        params.append(dia_vencimento)
-    if dia_fechamento is not None:
-        updates.append("dia_fechamento = %s")
-        params.append(dia_fechamento)
-    if ativo is not None:
-        updates.append("ativo = %s")
-        params.append(ativo)
+        if nome is not None:
+            updates.append("nome = %s")
+            params.append(nome)
+        if limite is not None:
+            updates.append("limite = %s")
+            params.append(limite)
+        if dia_vencimento is not None:
+            updates.append("dia_vencimento = %s")
+            params.append(dia_vencimento)
+        if dia_fechamento is not None:
+            updates.append("dia_fechamento = %s")
+            params.append(dia_fechamento)
+        if ativo is not None:
+            updates.append("ativo = %s")
+            params.append(ativo)
     
-    if not updates:
-        conn.close()
-        return
+        if not updates:
+            return
     
-    params.append(cartao_id)
-    query = f"UPDATE cartoes SET {', '.join(updates)} WHERE id = %s"
+        params.append(cartao_id)
+        query = f"UPDATE cartoes SET {', '.join(updates)} WHERE id = %s"
     
-    cur.execute(query, params)
-    conn.commit()
-    conn.close()
+        cur.execute(query, params)
 
 
 def delete_cartao(cartao_id):
     """Desativa um cartão (soft delete)"""
-    conn = connect_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE cartoes SET ativo = 0 WHERE id = %s", (cartao_id,))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE cartoes SET ativo = 0 WHERE id = %s", (cartao_id,))
+
+
+# Faturas de cartão: gerar_fatura_cartao, atualizar_todas_faturas e as escritas
+# em despesas que ajustam faturas (_ajustar_fatura) do mesmo usuário são
+# serializadas por este advisory lock
+_FATURAS_LOCK_ID = 482_910_002
+
+# Recalcula as faturas de um usuário (ver atualizar_todas_faturas): os
+# períodos são os (cartão, mês, ano) com compras no cartão; o total soma as
+# compras pagas; o vencimento é o dia_vencimento do mês seguinte, limitado
+# ao último dia do mês. Os CTEs de escrita atuam em conjuntos disjuntos.
+# {filtro_periodos} restringe o recálculo a alguns períodos.
+_SQL_FATURAS_TEMPLATE = """
+    WITH totais AS (
+        -- Uma única passada agrupada: o período existe se houver compra
+        -- (eh_fatura 0 ou nulo, o mesmo critério de gerar_fatura_cartao), e o
+        -- total soma as compras pagas
+        SELECT d.cartao_id, d.fatura_mes, d.fatura_ano, c.nome,
+               COALESCE(SUM(d.valor) FILTER (WHERE d.status = 'Pago'), 0) AS total,
+               (make_date(d.fatura_ano, d.fatura_mes, 1) + INTERVAL '1 month')::date AS proximo_mes,
+               COALESCE(c.dia_vencimento, 10) AS dia_vencimento
+        FROM despesas d
+        JOIN cartoes c ON c.id = d.cartao_id AND c.user_id = %(user_id)s
+        WHERE d.user_id = %(user_id)s
+          AND d.fatura_mes IS NOT NULL
+          AND d.fatura_ano IS NOT NULL
+          AND COALESCE(d.eh_fatura, 0) = 0{filtro_periodos}
+        GROUP BY d.cartao_id, d.fatura_mes, d.fatura_ano, c.nome, c.dia_vencimento
+    ),
+    calculadas AS (
+        SELECT cartao_id, fatura_mes, fatura_ano, total,
+               proximo_mes + LEAST(dia_vencimento,
+                   EXTRACT(DAY FROM proximo_mes + INTERVAL '1 month - 1 day')::int) - 1 AS vencimento,
+               'Fatura ' || nome || ' - ' || lpad(fatura_mes::text, 2, '0') || '/' || fatura_ano AS descricao,
+               'Cartão ' || nome AS categoria
+        FROM totais{periodos_sem_compras}
+    ),
+    existentes AS (
+        SELECT DISTINCT ON (cartao_id, fatura_mes, fatura_ano) id, cartao_id, fatura_mes, fatura_ano
+        FROM despesas
+        WHERE user_id = %(user_id)s AND eh_fatura = 1
+        ORDER BY cartao_id, fatura_mes, fatura_ano, id
+    ),
+    removidas AS (
+        DELETE FROM despesas f
+        USING calculadas c
+        WHERE f.user_id = %(user_id)s AND f.eh_fatura = 1 AND c.total = 0
+          AND f.cartao_id = c.cartao_id AND f.fatura_mes = c.fatura_mes AND f.fatura_ano = c.fatura_ano
+        RETURNING f.id
+    ),
+    atualizadas AS (
+        UPDATE despesas f
+        SET Valor = c.total, Data = c.vencimento, Descrição = c.descricao
+        FROM calculadas c
+        JOIN existentes e USING (cartao_id, fatura_mes, fatura_ano)
+        WHERE f.id = e.id AND c.total <> 0
+        RETURNING f.id
+    ),
+    criadas AS (
+        INSERT INTO despesas
+            (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento,
+             cartao_id, fatura_mes, fatura_ano, eh_fatura)
+        SELECT c.total, 'A vencer', 0, c.vencimento, c.categoria, c.descricao, %(user_id)s, 'dinheiro',
+               c.cartao_id, c.fatura_mes, c.fatura_ano, 1
+        FROM calculadas c
+        LEFT JOIN existentes e USING (cartao_id, fatura_mes, fatura_ano)
+        WHERE c.total <> 0 AND e.id IS NULL
+        RETURNING id
+    )
+    SELECT (SELECT COUNT(*) FROM removidas),
+           (SELECT COUNT(*) FROM atualizadas),
+           (SELECT COUNT(*) FROM criadas)
+"""
+_SQL_ATUALIZA_FATURAS = _SQL_FATURAS_TEMPLATE.format(filtro_periodos="", periodos_sem_compras="")
+# Períodos pedidos que ficaram sem nenhuma compra (a única compra trocou de
+# cartão ou deixou de ser paga) entram com total 0: a fatura é removida,
+# como _ajustar_fatura faz quando o delta zera a fatura
+_SQL_ATUALIZA_FATURAS_PERIODOS = _SQL_FATURAS_TEMPLATE.format(filtro_periodos="""
+          AND (d.cartao_id, d.fatura_mes, d.fatura_ano) IN (
+              SELECT * FROM unnest(%(cartoes)s::int[], %(meses)s::int[], %(anos)s::int[]))""", periodos_sem_compras="""
+        UNION ALL
+        SELECT p.cartao_id, p.fatura_mes, p.fatura_ano, 0, NULL::date, NULL, NULL
+        FROM unnest(%(cartoes)s::int[], %(meses)s::int[], %(anos)s::int[]) AS p(cartao_id, fatura_mes, fatura_ano)
+        WHERE NOT EXISTS (SELECT 1 FROM totais t
+                          WHERE (t.cartao_id, t.fatura_mes, t.fatura_ano) = (p.cartao_id, p.fatura_mes, p.fatura_ano))""")
+
+
+# Colunas de uma despesa que definem sua participação na fatura do cartão
+# (ver _contribuicao_fatura), na ordem usada nos RETURNING
+_COLUNAS_COMPRA_CARTAO = "Valor, Status, cartao_id, fatura_mes, fatura_ano, eh_fatura"
+
+
+def _vencimento_fatura(dia_vencimento, mes, ano):
+    """Vencimento da fatura de mes/ano: dia_vencimento do mês seguinte (padrão 10),
+    limitado ao último dia do mês"""
+    import calendar
+    proximo_mes, proximo_ano = (1, ano + 1) if mes == 12 else (mes + 1, ano)
+    dia = min(int(dia_vencimento or 10), calendar.monthrange(proximo_ano, proximo_mes)[1])
+    return f"{proximo_ano}-{proximo_mes:02d}-{dia:02d}"
+
+
+def _bloquear_faturas(cur, user_id):
+    """Advisory lock de faturas do usuário até o fim da transação do cursor"""
+    if user_id is not None:
+        cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (_FATURAS_LOCK_ID, int(user_id)))
+
+
+def _contribuicao_fatura(linha):
+    """((cartao_id, mes, ano), valor) com que uma despesa entra na fatura, ou None.
+
+    Mesma regra do total de gerar_fatura_cartao: compra paga, com cartão e
+    período definidos, que não seja a própria fatura.
+    """
+    if not linha:
+        return None
+    valor, status, cartao_id, mes, ano, eh_fatura = linha[:6]
+    if status != 'Pago' or not cartao_id or not mes or not ano or eh_fatura:
+        return None
+    return (int(cartao_id), int(mes), int(ano)), float(valor or 0)
+
+
+def _aplicar_contribuicoes(cur, user_id, antes=(), depois=()):
+    """Ajusta as faturas pela troca das linhas `antes` pelas linhas `depois`
+    (colunas de _COLUNAS_COMPRA_CARTAO; vazio para inserção/remoção).
+
+    Os deltas são somados por período. Com um único período afetado (a
+    edição comum), a fatura recebe o delta (_ajustar_fatura); com vários
+    (parcelas, troca de cartão), os períodos afetados são recalculados em um
+    único statement set-based.
+    """
+    deltas = {}
+    for linhas, sinal in ((antes, -1), (depois, 1)):
+        for linha in linhas:
+            contribuicao = _contribuicao_fatura(linha)
+            if contribuicao:
+                chave, valor = contribuicao
+                deltas[chave] = deltas.get(chave, 0) + sinal * valor
+    deltas = {chave: delta for chave, delta in deltas.items() if round(delta, 2)}
+    if len(deltas) == 1:
+        (cartao_id, mes, ano), delta = deltas.popitem()
+        _ajustar_fatura(cur, user_id, cartao_id, mes, ano, delta)
+    elif deltas:
+        cartoes, meses, anos = (list(coluna) for coluna in zip(*deltas))
+        cur.execute(_SQL_ATUALIZA_FATURAS_PERIODOS,
+                    {'user_id': int(user_id), 'cartoes': cartoes, 'meses': meses, 'anos': anos})
+        removidas, atualizadas, criadas = cur.fetchone()
+        log.debug('Faturas recalculadas', periodos=len(deltas), removidas=removidas,
+                  atualizadas=atualizadas, criadas=criadas)
+
+
+def _ajustar_fatura(cur, user_id, cartao_id, mes, ano, delta):
+    """Soma `delta` à fatura do cartão em mes/ano usando o cursor (e a transação)
+    de quem alterou a despesa.
+
+    O chamador deve ter o advisory lock de faturas do usuário. Se a fatura
+    zerar, ela é removida; se ainda não existir, é criada com o total das
+    compras pagas do período (não só o delta), como em gerar_fatura_cartao.
+    """
+    delta = round(delta, 2)
+    if not delta:
+        return
+    cur.execute("""
+        UPDATE despesas SET Valor = Valor + %s
+        WHERE id = (SELECT MIN(id) FROM despesas
+                    WHERE user_id = %s AND cartao_id = %s AND fatura_mes = %s AND fatura_ano = %s AND eh_fatura = 1)
+        RETURNING Valor
+    """, (delta, user_id, cartao_id, mes, ano))
+    fatura = cur.fetchone()
+
+    if fatura is None:
+        cur.execute("""
+            SELECT COALESCE(SUM(Valor), 0) FROM despesas
+            WHERE user_id = %s AND cartao_id = %s AND fatura_mes = %s AND fatura_ano = %s
+              AND Status = 'Pago' AND (eh_fatura = 0 OR eh_fatura IS NULL)
+        """, (user_id, cartao_id, mes, ano))
+        total = float(cur.fetchone()[0])
+        cur.execute("SELECT nome, dia_vencimento FROM cartoes WHERE id = %s AND user_id = %s", (cartao_id, user_id))
+        cartao = cur.fetchone()
+        if total <= 0 or not cartao:
+            return
+        nome, dia_vencimento = cartao
+        cur.execute("""
+            INSERT INTO despesas
+            (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+            VALUES (%s, 'A vencer', 0, %s, %s, %s, %s, 'dinheiro', %s, %s, %s, 1)
+        """, (total, _vencimento_fatura(dia_vencimento, mes, ano), f'Cartão {nome}',
+              f"Fatura {nome} - {mes:02d}/{ano}", user_id, cartao_id, mes, ano))
+        log.debug('Fatura criada', cartao_id=cartao_id, mes=mes, ano=ano, total=total)
+    elif float(fatura[0]) <= 0:
+        cur.execute("""
+            DELETE FROM despesas
+            WHERE user_id = %s AND cartao_id = %s AND fatura_mes = %s AND fatura_ano = %s AND eh_fatura = 1
+        """, (user_id, cartao_id, mes, ano))
+        log.debug('Fatura zerada e removida', cartao_id=cartao_id, mes=mes, ano=ano)
+    else:
+        log.debug('Fatura ajustada', cartao_id=cartao_id, mes=mes, ano=ano, delta=delta, total=fatura[0])
 
 
 def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
@@ -1287,11 +2104,13 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
         mes = int(mes)
         ano = int(ano)
     except (ValueError, TypeError) as e:
-        print(f"[DB] Erro ao converter tipos em gerar_fatura_cartao: {e}")
+        log.warning('gerar_fatura_cartao com parâmetros inválidos', erro=e)
         return None
     
     conn = connect_db()
     cur = conn.cursor(cursor_factory=RealDictCursor)
+    # Serializa com atualizar_todas_faturas do mesmo usuário (evita fatura duplicada)
+    _bloquear_faturas(cur, user_id)
     
     # Buscar informações do cartão
     cur.execute("SELECT * FROM cartoes WHERE id = %s AND user_id = %s", (cartao_id, user_id))
@@ -1303,9 +2122,6 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
     
     cartao = dict(cartao)
     
-    print(f"[DB] gerar_fatura_cartao - user_id={user_id}, cartao_id={cartao_id}, mes={mes}, ano={ano}")
-    print(f"[DB] Cartão encontrado: {cartao['nome']}")
-    
     # Buscar todas as despesas pagas no cartão neste mês
     cur.execute("""
         SELECT SUM(Valor) as total
@@ -1321,11 +2137,10 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
     result = cur.fetchone()
     total_fatura = float(result['total']) if result and result['total'] else 0
     
-    print(f"[DB] Total de despesas no cartão para fatura {mes:02d}/{ano}: R$ {total_fatura}")
-    
     if total_fatura == 0:
         # Se não há despesas, remove fatura se existir
-        print(f"[DB] Nenhuma despesa para faturar, removendo fatura se existir")
+        log.debug('gerar_fatura_cartao: nenhuma compra, fatura removida', user_id=user_id,
+                  cartao_id=cartao_id, mes=mes, ano=ano)
         cur.execute("""
             DELETE FROM despesas 
             WHERE user_id = %s 
@@ -1339,22 +2154,7 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
         return None
     
     # Calcular data de vencimento da fatura (dia_vencimento do mês seguinte)
-    if mes == 12:
-        proximo_mes = 1
-        proximo_ano = ano + 1
-    else:
-        proximo_mes = mes + 1
-        proximo_ano = ano
-    
-    # Validar dia de vencimento (não pode exceder dias do mês)
-    import calendar
-    max_dia_mes = calendar.monthrange(proximo_ano, proximo_mes)[1]
-    dia_vencimento = min(int(cartao['dia_vencimento']), max_dia_mes)
-    
-    data_vencimento = f"{proximo_ano}-{proximo_mes:02d}-{dia_vencimento:02d}"
-    
-    print(f"[DB] Verificando se já existe fatura para cartão_id={cartao_id}, mes={mes}, ano={ano}")
-    print(f"[DB] Query params: user_id={user_id}, cartao_id={cartao_id}, fatura_mes={mes}, fatura_ano={ano}, eh_fatura=1")
+    data_vencimento = _vencimento_fatura(cartao['dia_vencimento'], mes, ano)
     
     # Verificar se já existe fatura para este cartão/mês
     cur.execute("""
@@ -1368,21 +2168,8 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
     
     fatura_existente = cur.fetchone()
     
-    print(f"[DB] Fatura existente encontrada: {dict(fatura_existente) if fatura_existente else None}")
-    
-    # Listar todas as faturas do cartão para debug
-    cur.execute("""
-        SELECT id, cartao_id, fatura_mes, fatura_ano, eh_fatura, Valor, Descrição 
-        FROM despesas 
-        WHERE user_id = %s AND cartao_id = %s AND eh_fatura = 1
-        ORDER BY fatura_ano DESC, fatura_mes DESC
-    """, (user_id, cartao_id))
-    todas_faturas = cur.fetchall()
-    print(f"[DB] Todas as faturas do cartão {cartao_id}: {[dict(f) for f in todas_faturas]}")
-    
     if fatura_existente:
         # Atualizar fatura existente
-        print(f"[DB] ✓ ATUALIZANDO fatura existente ID={fatura_existente['id']}, novo valor=R$ {total_fatura:.2f}, vencimento={data_vencimento}")
         cur.execute("""
             UPDATE despesas 
             SET Valor = %s, Data = %s, Descrição = %s
@@ -1396,8 +2183,6 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
         fatura_id = fatura_existente['id']
     else:
         # Criar nova fatura
-        print(f"[DB] ✓ CRIANDO nova fatura: valor=R$ {total_fatura:.2f}, vencimento={data_vencimento}, categoria='Cartão {cartao['nome']}'")
-        print(f"[DB] Inserindo com: user_id={user_id}, cartao_id={cartao_id}, fatura_mes={mes}, fatura_ano={ano}, eh_fatura=1")
         cur.execute("""
             INSERT INTO despesas 
             (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
@@ -1416,47 +2201,59 @@ def gerar_fatura_cartao(user_id, cartao_id, mes, ano):
         ))
         result = cur.fetchone()
         fatura_id = result['id'] if result else None
-        print(f"[DB] Fatura criada com ID={fatura_id}")
     
     conn.commit()
     conn.close()
     
-    print(f"[DB] ✓ Fatura processada: ID={fatura_id} | Compras de {mes:02d}/{ano} | Vencimento {data_vencimento} | Total R$ {total_fatura:.2f}")
-    return fatura_id
-    
+    log.debug('gerar_fatura_cartao', user_id=user_id, cartao_id=cartao_id, mes=mes, ano=ano,
+              fatura_id=fatura_id, criada=not fatura_existente, vencimento=data_vencimento, total=total_fatura)
     return fatura_id
 
 
 def atualizar_todas_faturas(user_id):
-    """Atualiza todas as faturas de cartão do usuário"""
-    from datetime import datetime
-    
-    conn = connect_db()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # Buscar todos os cartões ativos do usuário
-    cur.execute("SELECT id FROM cartoes WHERE user_id = %s AND ativo = 1", (user_id,))
-    cartoes = cur.fetchall()
-    
-    # Buscar todos os meses/anos que têm despesas no cartão
-    cur.execute("""
-        SELECT DISTINCT fatura_mes, fatura_ano, cartao_id
-        FROM despesas
-        WHERE user_id = %s 
-          AND cartao_id IS NOT NULL 
-          AND fatura_mes IS NOT NULL 
-          AND fatura_ano IS NOT NULL
-          AND eh_fatura = 0
-    """, (user_id,))
-    
-    periodos = cur.fetchall()
-    conn.close()
-    
-    # Gerar/atualizar fatura para cada período
-    for periodo in periodos:
-        gerar_fatura_cartao(
-            user_id,
-            periodo['cartao_id'],
-            periodo['fatura_mes'],
-            periodo['fatura_ano']
+    """Recalcula todas as faturas de cartão do usuário em uma única transação.
+
+    Mesmo resultado de chamar gerar_fatura_cartao para cada (cartão, mês, ano)
+    com compras no cartão, mas em um único statement: os totais são agregados
+    por período e as faturas são removidas (total zero), atualizadas ou
+    criadas de uma vez. Para atualizar um único período, use
+    gerar_fatura_cartao. Retorna dict com as contagens.
+    """
+    user_id = int(user_id)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        _bloquear_faturas(cur, user_id)
+        cur.execute(_SQL_ATUALIZA_FATURAS, {'user_id': user_id})
+        removidas, atualizadas, criadas = cur.fetchone()
+
+    resultado = {'removidas': removidas, 'atualizadas': atualizadas, 'criadas': criadas}
+    log.debug('atualizar_todas_faturas', user_id=user_id, **resultado)
+    return resultado
+
+
+# ---------- Cotações ---------- #
+def get_categoria_ticker(ticker):
+    """Categoria do Status Invest (ex.: 'acoes') em que o ticker já foi encontrado, ou None"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT categoria FROM ticker_categorias WHERE ticker = %s", (ticker,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def salvar_categoria_ticker(ticker, categoria, url):
+    """Grava (ou troca) a categoria em que o ticker foi encontrado"""
+    with get_conn() as conn:
+        conn.cursor().execute(
+            """INSERT INTO ticker_categorias (ticker, categoria, url, atualizado_em)
+               VALUES (%s, %s, %s, now())
+               ON CONFLICT (ticker) DO UPDATE
+               SET categoria = EXCLUDED.categoria, url = EXCLUDED.url, atualizado_em = EXCLUDED.atualizado_em""",
+            (ticker, categoria, url)
         )
+
+
+def remover_categoria_ticker(ticker):
+    """Esquece a categoria do ticker (ex.: a página deixou de existir)"""
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM ticker_categorias WHERE ticker = %s", (ticker,))
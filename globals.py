@@ -1,13 +1,14 @@
 from db import init_db
+from logs import get_logger
+
+log = get_logger(__name__)
 
 # Inicializa DB e carrega tabelas
-print('[INIT] Inicializando banco de dados...')
 try:
     init_db()
-    print('[INIT] Banco de dados inicializado com sucesso!')
+    log.info('Banco de dados inicializado')
 except Exception as e:
-    print(f'[INIT] ERRO CRÍTICO ao inicializar DB: {e}')
-    print('[INIT] A aplicação pode não funcionar corretamente.')
+    log.critical('Erro ao inicializar o banco; a aplicação pode não funcionar corretamente', erro=e)
 
 # listas vazias - serão preenchidas dinamicamente quando o usuário fizer login
 cat_receita = []
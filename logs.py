@@ -0,0 +1,105 @@
+"""
+Logging da aplicação
+
+Cada módulo pega o seu logger com get_logger(__name__); todos ficam sob o
+logger 'finance_app', com nível Config.LOG_LEVEL (DEBUG em desenvolvimento,
+WARNING em produção) e formato Config.LOG_FORMAT.
+
+Os registros são estruturados: além da mensagem, os campos passados como
+argumentos nomeados vão para record.campos e saem no fim da linha como
+chave=valor:
+
+    log = get_logger(__name__)
+    log.debug('fatura ajustada', cartao_id=3, mes=5, delta=-12.5)
+    # ... - finance_app.db - DEBUG - fatura ajustada | cartao_id=3 mes=5 delta=-12.5
+
+A formatação é preguiçosa: com o nível desligado a chamada volta logo na
+checagem de nível, sem montar a mensagem nem formatar os campos. Para
+campos caros de calcular (listas inteiras de registros), use
+log.isEnabledFor(logging.DEBUG) antes de montá-los.
+"""
+
+import logging
+import sys
+import threading
+
+from config import Config
+
+RAIZ = 'finance_app'
+
+# Argumentos nomeados que o logging trata; os demais viram campos do registro
+_KWARGS_LOGGING = {'exc_info', 'stack_info', 'stacklevel', 'extra'}
+
+_lock = threading.Lock()
+_configurado = False
+
+
+class FormatterEstruturado(logging.Formatter):
+    """Formatter que acrescenta os campos do registro como chave=valor"""
+
+    def format(self, record):
+        texto = super().format(record)
+        campos = getattr(record, 'campos', None)
+        if not campos:
+            return texto
+        pares = ' '.join(f'{chave}={valor}' for chave, valor in campos.items())
+        # Traceback (exc_info) continua nas linhas de baixo
+        primeira, _, resto = texto.partition('\n')
+        return f'{primeira} | {pares}' + (f'\n{resto}' if resto else '')
+
+
+class LoggerEstruturado(logging.LoggerAdapter):
+    """Logger que aceita campos como argumentos nomeados (log.info('msg', user_id=1))"""
+
+    def process(self, msg, kwargs):
+        # Só é chamado com o nível habilitado (LoggerAdapter.log checa antes)
+        campos = {k: kwargs.pop(k) for k in list(kwargs) if k not in _KWARGS_LOGGING}
+        if campos:
+            kwargs['extra'] = {**(kwargs.get('extra') or {}), 'campos': campos}
+        return msg, kwargs
+
+
+def configurar_logging(level=None, stream=None):
+    """
+    Configura o logger raiz da aplicação (handler, formato e nível)
+
+    Chamado na primeira get_logger; chamadas seguintes só trocam o nível ou o
+    destino quando informados.
+
+    Args:
+        level: Nível (nome ou número); padrão Config.LOG_LEVEL
+        stream: Destino dos registros; padrão sys.stderr
+    """
+    global _configurado
+    with _lock:
+        raiz = logging.getLogger(RAIZ)
+        if level is not None or not _configurado:
+            nivel = level if level is not None else Config.LOG_LEVEL
+            raiz.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+        if stream is not None or not _configurado:
+            # Troca só o handler da aplicação (pytest, por exemplo, pendura os seus)
+            for handler in list(raiz.handlers):
+                if isinstance(handler.formatter, FormatterEstruturado):
+                    raiz.removeHandler(handler)
+            handler = logging.StreamHandler(stream or sys.stderr)
+            handler.setFormatter(FormatterEstruturado(Config.LOG_FORMAT))
+            raiz.addHandler(handler)
+            # Não duplica no logger raiz do Python (werkzeug/gunicorn têm o seu)
+            raiz.propagate = False
+        _configurado = True
+    return raiz
+
+
+def get_logger(nome):
+    """
+    Logger do módulo, sob o logger da aplicação
+
+    Args:
+        nome: Normalmente __name__ ('db' -> 'finance_app.db')
+
+    Returns:
+        LoggerEstruturado
+    """
+    if not _configurado:
+        configurar_logging()
+    return LoggerEstruturado(logging.getLogger(f'{RAIZ}.{nome}'), {})
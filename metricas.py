@@ -0,0 +1,200 @@
+"""
+Métricas dos callbacks do Dash (por processo)
+
+Todo callback do Dash chega ao servidor como um POST em
+/_dash-update-component, cujo corpo JSON traz o id do callback ('output')
+com os inputs e states, e cuja resposta traz os outputs. Dois hooks do
+Flask (before_request/after_request) medem, para cada id de callback:
+chamadas, tempo de parede, tempo no banco (db.tempo_db, somado pelos
+cursores do pool na thread da requisição), bytes de entrada e de saída
+(o JSON de inputs/states e o de outputs, onde aparecem os stores reenviados)
+e respostas sem atualização (PreventUpdate/no_update) ou com erro.
+
+O resumo fica em GET /admin/metricas/callbacks (só administradores, via
+HTTP Basic) e, com Config.CALLBACK_METRICS_LOG_INTERVAL_SECONDS > 0, é
+registrado no log periodicamente. Os números são do worker que atendeu.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, request
+
+import db
+from config import Config
+from logs import get_logger
+
+log = get_logger(__name__)
+
+CAMINHO_CALLBACK = '/_dash-update-component'
+
+# Durações recentes guardadas por callback para os percentis
+AMOSTRAS_POR_CALLBACK = 256
+
+_lock = threading.Lock()
+_metricas = {}
+_desde = datetime.now()
+_app = None
+_thread = None
+_parar = threading.Event()
+
+
+def _novo():
+    return {'chamadas': 0, 'sem_atualizacao': 0, 'erros': 0,
+            'segundos': 0.0, 'segundos_max': 0.0, 'segundos_db': 0.0, 'consultas_db': 0,
+            'bytes_entrada': 0, 'bytes_entrada_max': 0, 'bytes_saida': 0, 'bytes_saida_max': 0,
+            'amostras': deque(maxlen=AMOSTRAS_POR_CALLBACK)}
+
+
+def registrar(callback_id, segundos, segundos_db=0.0, consultas_db=0, bytes_entrada=0, bytes_saida=0, status=200):
+    """Soma uma chamada às métricas do callback"""
+    with _lock:
+        m = _metricas.get(callback_id)
+        if m is None:
+            m = _metricas[callback_id] = _novo()
+        m['chamadas'] += 1
+        m['sem_atualizacao'] += status == 204
+        m['erros'] += status >= 500
+        m['segundos'] += segundos
+        m['segundos_max'] = max(m['segundos_max'], segundos)
+        m['segundos_db'] += segundos_db
+        m['consultas_db'] += consultas_db
+        m['bytes_entrada'] += bytes_entrada
+        m['bytes_entrada_max'] = max(m['bytes_entrada_max'], bytes_entrada)
+        m['bytes_saida'] += bytes_saida
+        m['bytes_saida_max'] = max(m['bytes_saida_max'], bytes_saida)
+        m['amostras'].append(segundos)
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] if ordenadas else 0.0
+
+
+def _nome_funcao(callback_id):
+    callback = (_app.callback_map.get(callback_id) or {}).get('callback') if _app is not None else None
+    return getattr(callback, '__name__', None)
+
+
+def resumo():
+    """
+    Métricas por callback, do maior para o menor tempo total
+
+    Returns:
+        {'desde': ISO, 'callbacks': [{'id', 'funcao', 'chamadas', 'ms_medio',
+        'ms_p50', 'ms_p95', 'ms_max', 'ms_db_medio', 'consultas_db_media',
+        'bytes_entrada_medio', 'bytes_entrada_max', 'bytes_saida_medio',
+        'bytes_saida_max', 'sem_atualizacao', 'erros', 'ms_total'}, ...]}
+    """
+    with _lock:
+        copia = {cid: {**m, 'amostras': sorted(m['amostras'])} for cid, m in _metricas.items()}
+        desde = _desde
+
+    callbacks = []
+    for cid, m in copia.items():
+        n = m['chamadas']
+        callbacks.append({
+            'id': cid,
+            'funcao': _nome_funcao(cid),
+            'chamadas': n,
+            'ms_medio': round(m['segundos'] / n * 1000, 2),
+            'ms_p50': round(_percentil(m['amostras'], 0.5) * 1000, 2),
+            'ms_p95': round(_percentil(m['amostras'], 0.95) * 1000, 2),
+            'ms_max': round(m['segundos_max'] * 1000, 2),
+            'ms_db_medio': round(m['segundos_db'] / n * 1000, 2),
+            'consultas_db_media': round(m['consultas_db'] / n, 2),
+            'bytes_entrada_medio': round(m['bytes_entrada'] / n),
+            'bytes_entrada_max': m['bytes_entrada_max'],
+            'bytes_saida_medio': round(m['bytes_saida'] / n),
+            'bytes_saida_max': m['bytes_saida_max'],
+            'sem_atualizacao': m['sem_atualizacao'],
+            'erros': m['erros'],
+            'ms_total': round(m['segundos'] * 1000, 1),
+        })
+    callbacks.sort(key=lambda c: c['ms_total'], reverse=True)
+    return {'desde': desde.isoformat(timespec='seconds'), 'callbacks': callbacks}
+
+
+def zerar():
+    global _desde
+    with _lock:
+        _metricas.clear()
+        _desde = datetime.now()
+
+
+# ========= Hooks do Flask ========= #
+
+def _antes():
+    if request.method != 'POST' or not request.path.endswith(CAMINHO_CALLBACK):
+        return
+    # get_json guarda o corpo já lido; o Dash reaproveita na hora de despachar
+    corpo = request.get_json(silent=True) or {}
+    g.metricas_callback = (corpo.get('output') or '?', time.perf_counter(), db.tempo_db())
+
+
+def _depois(response):
+    inicio = g.pop('metricas_callback', None)
+    if inicio is None:
+        return response
+    callback_id, t0, (db_antes, consultas_antes) = inicio
+    db_depois, consultas_depois = db.tempo_db()
+    registrar(callback_id, time.perf_counter() - t0,
+              segundos_db=db_depois - db_antes, consultas_db=consultas_depois - consultas_antes,
+              bytes_entrada=request.content_length or 0,
+              bytes_saida=response.calculate_content_length() or 0,
+              status=response.status_code)
+    return response
+
+
+def instrumentar(app):
+    """
+    Liga as métricas no app Dash (hooks do Flask) e, se configurado, o
+    resumo periódico no log
+
+    Args:
+        app: dash.Dash
+    """
+    global _app
+    _app = app
+    app.server.before_request(_antes)
+    app.server.after_request(_depois)
+    if Config.CALLBACK_METRICS_LOG_INTERVAL_SECONDS > 0:
+        iniciar_resumo_periodico(Config.CALLBACK_METRICS_LOG_INTERVAL_SECONDS)
+
+
+# ========= Resumo periódico ========= #
+
+def registrar_resumo(top=10):
+    """Registra no log os `top` callbacks de maior tempo total"""
+    for c in resumo()['callbacks'][:top]:
+        log.info('Callback', id=c['id'], funcao=c['funcao'], chamadas=c['chamadas'], ms_medio=c['ms_medio'],
+                 ms_p95=c['ms_p95'], ms_db_medio=c['ms_db_medio'], bytes_entrada_medio=c['bytes_entrada_medio'],
+                 bytes_saida_medio=c['bytes_saida_medio'])
+
+
+def _executar_periodicamente(intervalo):
+    while not _parar.wait(intervalo):
+        try:
+            registrar_resumo()
+        except Exception:
+            log.exception('Erro ao registrar o resumo das métricas')
+
+
+def iniciar_resumo_periodico(intervalo):
+    """Inicia (uma vez por processo) a thread que registra o resumo a cada `intervalo` segundos"""
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return _thread
+    _parar.clear()
+    _thread = threading.Thread(target=_executar_periodicamente, args=(intervalo,),
+                               name='metricas-callbacks', daemon=True)
+    _thread.start()
+    return _thread
+
+
+def parar_resumo_periodico(timeout=5):
+    """Sinaliza a thread do resumo para parar e espera até `timeout` segundos"""
+    _parar.set()
+    if _thread is not None:
+        _thread.join(timeout)
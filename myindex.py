@@ -13,20 +13,18 @@ from globals import *
 # Exportar server para Gunicorn
 server = app.server
 
-# DataFrames and Dcc.Store (loaded from SQLite)
-from db import table_to_df
+# Os dados são carregados por usuário, sob demanda (ver reload_user_stores);
+# nada de receitas/despesas é lido do banco na importação
+from data_access import load_user_data
 
-df_receitas = table_to_df('receitas')
-df_receitas_aux = df_receitas.to_dict()
-
-df_despesas = table_to_df('despesas')
-df_despesas_aux = df_despesas.to_dict()
-
-list_receitas = table_to_df('cat_receita')
-list_receitas_aux = list_receitas.to_dict()
-
-list_despesas = table_to_df('cat_despesa')
-list_despesas_aux = list_despesas.to_dict()
+# Revalorização diária dos investimentos em segundo plano (ver scheduler.py);
+# a página /planos só confere se os valores já são de hoje
+from config import Config
+from logs import get_logger
+log = get_logger(__name__)
+if Config.REVALORIZACAO_AGENDADA:
+    from scheduler import iniciar_agendador
+    iniciar_agendador()
 
 
 # =========  Layout  =========== #
@@ -124,24 +122,25 @@ def render_page_content(pathname, user):
 )
 def reload_user_stores(user, r_rec, r_des, r_cat_rec, r_cat_des):
     user_id = user['id'] if user and 'id' in user else None
-    from db import table_to_df, update_status_vencidos
     
-    print(f"[RELOAD_STORES] user_id={user_id}, r_rec={r_rec}, r_des={r_des}, r_cat_rec={r_cat_rec}, r_cat_des={r_cat_des}")
 
     if user_id is None:
         return {}, {}, {}, {}
 
-    # Atualiza status vencidos automaticamente antes de carregar dados
-    update_status_vencidos(user_id)
+    # Atualiza status vencidos automaticamente antes de carregar dados.
+    # Receitas/despesas vão para o store apenas como token de versão; os
+    # callbacks resolvem os DataFrames no cache do servidor (data_access)
+    dados = load_user_data(user_id, atualizar_vencidos=True)
 
-    df_receitas = table_to_df('receitas', user_id=user_id, include_id=True).to_dict('records')
-    df_despesas = table_to_df('despesas', user_id=user_id, include_id=True).to_dict('records')
-    list_receitas = table_to_df('cat_receita', user_id=user_id).to_dict('records')
-    list_despesas = table_to_df('cat_despesa', user_id=user_id).to_dict('records')
+    token_receitas = dados['receitas']
+    token_despesas = dados['despesas']
+    list_receitas = dados['cat_receita']
+    list_despesas = dados['cat_despesa']
     
-    print(f"[RELOAD_STORES] Carregadas {len(list_despesas)} categorias de despesa e {len(list_receitas)} categorias de receita")
+    log.debug('reload_user_stores', user_id=user_id, versao=token_receitas['version'],
+              cat_despesa=len(list_despesas), cat_receita=len(list_receitas))
 
-    return df_receitas, df_despesas, list_receitas, list_despesas
+    return token_receitas, token_despesas, list_receitas, list_despesas
 
 '''if __name__ == '__main__':
     app.run(debug=True)'''
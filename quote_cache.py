@@ -0,0 +1,222 @@
+"""
+Cache de cotações do Status Invest (/api/investimentos/cotacao)
+
+Cada ticker guarda a resposta do endpoint (status HTTP e payload) com TTL:
+cotações encontradas valem QUOTE_CACHE_TTL_SECONDS e tickers inexistentes
+(404) valem QUOTE_CACHE_NEGATIVE_TTL_SECONDS (cache negativo: um ticker
+digitado errado não dispara seis buscas a cada tentativa). O número de
+entradas é limitado por QUOTE_CACHE_MAX_ENTRIES; ao passar do limite, saem as
+usadas há mais tempo (LRU).
+
+Por padrão o cache fica em memória, por processo. Com QUOTE_CACHE_SQLITE_PATH
+ele fica em um arquivo SQLite no host, compartilhado por todos os workers do
+gunicorn: a cotação buscada por um worker é servida pelos demais. Os
+contadores de cache_info() são sempre do processo atual. O cache é só um
+atalho: se o arquivo estiver travado ou com erro, a leitura conta como miss
+e a gravação é descartada (com um aviso no log), sem derrubar a consulta.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Relógio das expirações (substituível nos testes)
+_now = time.time
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+
+
+class _MemoryBackend:
+    """Entradas em um OrderedDict (ordem = uso mais recente no fim)"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticker, now):
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                return None
+            status, payload, expires_at = entry
+            if expires_at <= now:
+                del self._entries[ticker]
+                return None
+            self._entries.move_to_end(ticker)
+            return status, payload
+
+    def put(self, ticker, status, payload, expires_at, max_entries):
+        with self._lock:
+            self._entries[ticker] = (status, payload, expires_at)
+            self._entries.move_to_end(ticker)
+            evicted = 0
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class _SQLiteBackend:
+    """Entradas em uma tabela SQLite compartilhada entre processos do mesmo host"""
+
+    name = 'sqlite'
+
+    # Espera máxima pelo lock do arquivo (sqlite3.connect(timeout=...))
+    BUSY_TIMEOUT_SECONDS = 5
+    # Um hit só regrava accessed_at (ordem do LRU) se o último registro for
+    # mais antigo que isso: leituras seguidas não disputam o lock de escrita
+    TOUCH_INTERVAL_SECONDS = 5
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS quotes (
+                    ticker TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_quotes_accessed_at ON quotes (accessed_at)")
+
+    def _connect(self):
+        # Uma conexão por thread; WAL deixa leituras de outros workers
+        # seguirem durante uma escrita
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, ticker, now):
+        conn = self._connect()
+        row = conn.execute("SELECT status, payload, expires_at, accessed_at FROM quotes WHERE ticker = ?",
+                           (ticker,)).fetchone()
+        if row is None:
+            return None
+        status, payload, expires_at, accessed_at = row
+        try:
+            if expires_at <= now:
+                conn.execute("DELETE FROM quotes WHERE ticker = ? AND expires_at <= ?", (ticker, now))
+                return None
+            if now - accessed_at >= self.TOUCH_INTERVAL_SECONDS:
+                conn.execute("UPDATE quotes SET accessed_at = ? WHERE ticker = ?", (now, ticker))
+        except sqlite3.Error:
+            # Escrita de manutenção, não essencial (outro worker pode estar
+            # gravando): a expirada sai no próximo put e o LRU fica aproximado
+            if expires_at <= now:
+                return None
+        return status, json.loads(payload)
+
+    def put(self, ticker, status, payload, expires_at, max_entries):
+        conn = self._connect()
+        now = _now()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO quotes (ticker, status, payload, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (ticker, status, json.dumps(payload), expires_at, now)
+            )
+            conn.execute("DELETE FROM quotes WHERE expires_at <= ?", (now,))
+            excess = conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0] - max_entries
+            if excess > 0:
+                conn.execute("""DELETE FROM quotes WHERE ticker IN (
+                                    SELECT ticker FROM quotes ORDER BY accessed_at LIMIT ?)""", (excess,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(excess, 0)
+
+    def clear(self):
+        self._connect().execute("DELETE FROM quotes")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = Config.QUOTE_CACHE_SQLITE_PATH
+                _backend = _SQLiteBackend(path) if path else _MemoryBackend()
+    return _backend
+
+
+def configure(sqlite_path=None):
+    """Troca o backend: arquivo SQLite compartilhado ou, com None, memória do processo"""
+    global _backend
+    with _backend_lock:
+        _backend = _SQLiteBackend(sqlite_path) if sqlite_path else _MemoryBackend()
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def get(ticker):
+    """(status, payload) em cache para o ticker, ou None se ausente/expirado"""
+    try:
+        entry = _get_backend().get(ticker, _now())
+    except sqlite3.Error as error:
+        log.warning('Cache de cotações indisponível na leitura', ticker=ticker, erro=error)
+        entry = None
+    if entry is None:
+        _count('misses')
+    else:
+        _count('negative_hits' if entry[0] == 404 else 'hits')
+    return entry
+
+
+def put(ticker, payload, status=200):
+    """Guarda a resposta do ticker; status 404 entra como cache negativo"""
+    ttl = Config.QUOTE_CACHE_NEGATIVE_TTL_SECONDS if status == 404 else Config.QUOTE_CACHE_TTL_SECONDS
+    try:
+        evicted = _get_backend().put(ticker, status, payload, _now() + ttl, max(1, Config.QUOTE_CACHE_MAX_ENTRIES))
+    except sqlite3.Error as error:
+        log.warning('Cache de cotações indisponível na gravação', ticker=ticker, erro=error)
+        return
+    if evicted:
+        _count('evictions', evicted)
+
+
+def clear():
+    """Remove todas as entradas (do backend compartilhado, se for o caso)"""
+    _get_backend().clear()
+
+
+def cache_info():
+    """Contadores do processo (hits, negative_hits, misses, evictions), entradas e backend"""
+    backend = _get_backend()
+    with _stats_lock:
+        stats = dict(_stats)
+    return {**stats, 'entries': len(backend), 'backend': backend.name}
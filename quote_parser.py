@@ -0,0 +1,108 @@
+"""
+Extração da cotação das páginas do Status Invest
+
+Os padrões são compilados uma vez, na importação. extract_price tenta
+primeiro uma varredura direcionada no HTML cru: o fragmento JSON "price"
+(localizado com str.find e casado só naquela posição) e o class="value"
+logo depois da primeira menção ao ticker. Só se nenhum dos dois der um
+preço é feita a busca completa anterior (unescape da página inteira e os
+padrões em ordem), que continua sendo a referência de compatibilidade.
+"""
+import re
+from html import unescape
+
+_NUMBER = r'([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)'
+
+# Busca completa, em ordem de preferência (a ordem original do endpoint)
+_FULL_PAGE_PATTERNS = [
+    re.compile(r'"price"\s*:\s*"?' + _NUMBER + r'"?', re.IGNORECASE | re.DOTALL),
+    re.compile(r'"lastPrice"\s*:\s*"?' + _NUMBER + r'"?', re.IGNORECASE | re.DOTALL),
+    re.compile(r'cot[aã]?[cç][aã]o[^\d]{0,80}R\$\s*' + _NUMBER, re.IGNORECASE | re.DOTALL),
+    re.compile(r'class="value"[^>]*>\s*' + _NUMBER + r'\s*<', re.IGNORECASE | re.DOTALL),
+    re.compile(r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})', re.IGNORECASE | re.DOTALL),
+]
+_JSON_PRICE = _FULL_PAGE_PATTERNS[0]
+_VALUE_CLASS = _FULL_PAGE_PATTERNS[3]
+
+# Marcadores em minúsculas: a página é convertida com .lower() uma vez só
+# (bem mais barato que buscas com re.IGNORECASE na página inteira)
+_NOT_FOUND_MARKERS = ("ops. . .", "nã", "encontramos o que voc")
+
+# Quantos caracteres depois da menção ao ticker o class="value" é procurado
+VALUE_WINDOW_CHARS = 20_000
+
+
+def to_float_br(value):
+    raw = (value or "").strip()
+    if not raw:
+        return None
+    raw = raw.replace("R$", "").replace(" ", "")
+    # Formato BR: 1.234,56 -> 1234.56
+    raw = raw.replace(".", "").replace(",", ".")
+    try:
+        return float(raw)
+    except Exception:
+        return None
+
+
+def is_not_found_page(html_content):
+    """Página "Ops... não encontramos o que você procura" do Status Invest"""
+    return _is_not_found_lower(html_content.lower())
+
+
+def _is_not_found_lower(text):
+    return all(marker in text for marker in _NOT_FOUND_MARKERS)
+
+
+def is_ticker_page(html_content, ticker):
+    """Se a página é a do ticker consultado (e não a de página não encontrada)"""
+    text = html_content.lower()
+    return not _is_not_found_lower(text) and ticker.lower() in text
+
+
+def _scan(html_content, needle, pattern, start=0, end=None):
+    """Primeiro preço válido casando `pattern` nas posições de `needle` em [start, end)"""
+    end = len(html_content) if end is None else end
+    index = html_content.find(needle, start, end)
+    while index != -1:
+        match = pattern.match(html_content, index)
+        if match:
+            price = to_float_br(match.group(1))
+            if price is not None:
+                return price
+        index = html_content.find(needle, index + 1, end)
+    return None
+
+
+def extract_price(html_content, ticker=None):
+    """Cotação (float) da página, ou None se nenhum padrão encontrar um preço"""
+    price = _scan(html_content, '"price"', _JSON_PRICE)
+    if price is not None:
+        return price
+
+    if ticker:
+        # O ticker aparece em maiúsculas na página; a regex sem diferenciar
+        # maiúsculas fica só para o caso raro de não achar
+        start = html_content.find(ticker.upper())
+        if start == -1:
+            mention = re.search(re.escape(ticker), html_content, re.IGNORECASE)
+            start = mention.start() if mention else -1
+        if start != -1:
+            price = _scan(html_content, 'class="value"', _VALUE_CLASS,
+                          start, start + VALUE_WINDOW_CHARS)
+            if price is not None:
+                return price
+
+    return extract_price_full(html_content)
+
+
+def extract_price_full(html_content):
+    """Busca completa: unescape da página e os padrões em ordem de preferência"""
+    decoded = unescape(html_content)
+    for pattern in _FULL_PAGE_PATTERNS:
+        match = pattern.search(decoded)
+        if match:
+            price = to_float_br(match.group(1))
+            if price is not None:
+                return price
+    return None
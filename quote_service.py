@@ -0,0 +1,234 @@
+"""
+Serviço de cotações de ativos (Status Invest)
+
+get_quote e get_quotes devolvem (status HTTP, payload) exatamente como os
+endpoints /api/investimentos/cotacao e /api/investimentos/cotacoes respondem,
+e são chamados diretamente pelas rotas Flask (app.py) e pelos callbacks Dash
+(components/planos.py), sem uma requisição HTTP do app para ele mesmo.
+
+Cada ticker é resolvido buscando em paralelo as páginas candidatas (ou só a
+categoria já conhecida, em ticker_categorias); os resultados passam pelo
+quote_cache. A extração do preço fica em quote_parser.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib import request as urllib_request
+from urllib.error import HTTPError
+
+import db
+import quote_cache
+from config import Config
+from logs import get_logger
+from quote_parser import extract_price, is_not_found_page, is_ticker_page
+
+log = get_logger(__name__)
+
+# Páginas do Status Invest tentadas para cada ticker (buscadas em paralelo)
+STATUS_INVEST_BASE_URL = Config.STATUS_INVEST_BASE_URL
+STATUS_INVEST_CATEGORIES = [
+    'fundos-imobiliarios',
+    'acoes',
+    'fiagros',
+    'fundos-de-investimento',
+    'bdrs',
+    'criptomoedas',
+]
+
+_STATUS_INVEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36",
+    "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+# Pool compartilhado pelas requisições de cotação (por processo): as páginas
+# candidatas de um ticker são buscadas em paralelo
+_quote_executor = ThreadPoolExecutor(max_workers=Config.QUOTE_FETCH_WORKERS, thread_name_prefix='cotacao')
+# Pool dos lotes (get_quotes), também por processo: no máximo
+# QUOTE_BATCH_CONCURRENCY tickers sendo resolvidos ao mesmo tempo, somando
+# todas as requisições de lote, para não esgotar o _quote_executor
+_batch_executor = ThreadPoolExecutor(max_workers=max(1, Config.QUOTE_BATCH_CONCURRENCY),
+                                     thread_name_prefix='cotacao-lote')
+
+
+def _fetch_html(url, timeout):
+    req = urllib_request.Request(url, headers=_STATUS_INVEST_HEADERS)
+    try:
+        with urllib_request.urlopen(req, timeout=timeout) as response:
+            return response.read().decode('utf-8', errors='ignore')
+    except HTTPError as error:
+        # Um 404 ainda é uma resposta (pode trazer a página "não encontramos");
+        # os demais status são falhas da busca
+        if error.code != 404:
+            raise
+        with error:
+            return error.read().decode('utf-8', errors='ignore')
+
+
+def _status_invest_url(category, ticker):
+    return f"{STATUS_INVEST_BASE_URL}/{category}/{ticker.lower()}"
+
+
+def _known_category(ticker):
+    """Categoria já resolvida para o ticker (tabela ticker_categorias), ou None"""
+    try:
+        category = db.get_categoria_ticker(ticker)
+    except Exception as error:
+        log.warning('Índice de tickers indisponível', ticker=ticker, erro=error)
+        return None
+    return category if category in STATUS_INVEST_CATEGORIES else None
+
+
+def _remember_category(ticker, category, url):
+    try:
+        if category is None:
+            db.remover_categoria_ticker(ticker)
+        else:
+            db.salvar_categoria_ticker(ticker, category, url)
+    except Exception as error:
+        log.warning('Falha ao gravar o índice de tickers', ticker=ticker, erro=error)
+
+
+def _resolve_status_invest_page(ticker, deadline_seconds=None):
+    """Devolve (url, html, nao_encontrado) da página do ticker no Status Invest.
+
+    Se a categoria do ticker já é conhecida (ticker_categorias), busca só essa
+    página. Senão (ou se ela não serve mais), busca as demais candidatas em
+    paralelo e fica com a primeira que responder com a página do ticker,
+    gravando a categoria para as próximas consultas; as outras buscas são
+    canceladas (as que já estão em andamento terminam no timeout do socket e
+    são descartadas). Levanta TimeoutError se o prazo acabar antes.
+
+    Sem a página do ticker, devolve (None, None, nao_encontrado):
+    nao_encontrado só é True se todas as candidatas responderam e ao menos uma
+    foi a página "não encontramos" do Status Invest. Com alguma busca em erro
+    (rede, HTTP 5xx) o ticker pode existir, e o resultado não deve ir para o
+    cache negativo.
+    """
+    deadline_seconds = Config.QUOTE_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    deadline = time.monotonic() + deadline_seconds
+    timeout = min(Config.QUOTE_FETCH_TIMEOUT_SECONDS, deadline_seconds)
+
+    categories = list(STATUS_INVEST_CATEGORIES)
+    fetch_failed = False
+    not_found = False
+    known_is_stale = False
+    known = _known_category(ticker)
+    if known:
+        url = _status_invest_url(known, ticker)
+        try:
+            html_content = _fetch_html(url, timeout)
+            if is_ticker_page(html_content, ticker):
+                return url, html_content, False
+            # A página respondeu e não é a do ticker: a categoria mudou
+            known_is_stale = True
+            not_found = is_not_found_page(html_content)
+        except Exception:
+            # Falha transitória: a categoria continua valendo
+            fetch_failed = True
+        categories.remove(known)
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError()
+    futures = {_quote_executor.submit(_fetch_html, _status_invest_url(category, ticker), min(timeout, remaining)): category
+               for category in categories}
+    try:
+        for future in as_completed(futures, timeout=remaining):
+            try:
+                html_content = future.result()
+            except Exception:
+                fetch_failed = True
+                continue
+            if is_ticker_page(html_content, ticker):
+                category = futures[future]
+                url = _status_invest_url(category, ticker)
+                _remember_category(ticker, category, url)
+                return url, html_content, False
+            not_found = not_found or is_not_found_page(html_content)
+        if known_is_stale:
+            _remember_category(ticker, None, None)
+        return None, None, not_found and not fetch_failed
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _fetch_quote(ticker, deadline_seconds=None):
+    """Busca a cotação no Status Invest (sem olhar o cache) e guarda o resultado.
+
+    Returns:
+        (status HTTP, payload) como respondido pelo endpoint de cotação
+    """
+    try:
+        try:
+            resolved_url, html_content, not_found = _resolve_status_invest_page(ticker, deadline_seconds)
+        except TimeoutError:
+            return 504, {'error': 'Tempo esgotado ao consultar o Status Invest', 'ticker': ticker}
+
+        if not html_content and not not_found:
+            # Falha ao buscar (fora do cache: a próxima consulta tenta de novo)
+            return 502, {'error': 'Falha ao consultar o Status Invest', 'ticker': ticker}
+        if not html_content:
+            payload = {'error': 'Ticker não encontrado no Status Invest', 'ticker': ticker}
+            quote_cache.put(ticker, payload, 404)
+            return 404, payload
+
+        price = extract_price(html_content, ticker)
+        if price is None:
+            return 502, {'error': 'Não foi possível extrair cotação no Status Invest', 'ticker': ticker}
+
+        payload = {
+            'ticker': ticker,
+            'price': price,
+            'currency': 'BRL',
+            'source': 'status-invest',
+            'url': resolved_url
+        }
+
+        quote_cache.put(ticker, payload)
+
+        return 200, payload
+    except Exception as error:
+        return 502, {'error': f'Falha ao consultar cotação no Status Invest: {error}', 'ticker': ticker}
+
+
+def get_quote(ticker, deadline_seconds=None):
+    """(status HTTP, payload) da cotação do ticker, do cache ou do Status Invest"""
+    # Cache por ticker (cotações e tickers inexistentes; ver quote_cache)
+    cached = quote_cache.get(ticker)
+    if cached:
+        return cached
+    return _fetch_quote(ticker, deadline_seconds)
+
+
+def get_quotes(tickers):
+    """Cotações de vários tickers: {ticker: (status HTTP, payload)}.
+
+    Tickers repetidos são consultados uma vez e os que estão em cache voltam
+    direto; os demais são buscados em paralelo no pool dos lotes (no máximo
+    QUOTE_BATCH_CONCURRENCY de cada vez no processo), dentro de um único
+    prazo (QUOTE_DEADLINE_SECONDS) para o lote todo. O que ainda estiver na
+    fila quando o prazo acabar volta com 504.
+    """
+    results = {}
+    misses = []
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()):
+        cached = quote_cache.get(ticker)
+        if cached:
+            results[ticker] = cached
+        else:
+            misses.append(ticker)
+    if not misses:
+        return results
+
+    deadline = time.monotonic() + Config.QUOTE_DEADLINE_SECONDS
+
+    def fetch_before_deadline(ticker):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return 504, {'error': 'Tempo esgotado ao consultar o Status Invest', 'ticker': ticker}
+        return _fetch_quote(ticker, remaining)
+
+    futures = [_batch_executor.submit(fetch_before_deadline, ticker) for ticker in misses]
+    for ticker, future in zip(misses, futures):
+        results[ticker] = future.result()
+    return results
@@ -0,0 +1,356 @@
+"""
+Cálculo de rendimento de investimentos (montantes e seus aportes)
+
+calcular_rendimento_investimento valoriza um aporte por vez e é usado nas
+simulações da tela de planos. valorizar_investimentos faz o mesmo para todos
+os aportes de uma vez com arrays NumPy (usado por
+db.atualizar_valores_investimentos) e devolve exatamente os mesmos centavos:
+as taxas diárias são calculadas em Python para cada (tipo, taxa) distinto e
+os poucos valores que caem a um fio de meio centavo, onde a potência
+vetorizada do NumPy (que pode diferir do pow da libm no último bit) mudaria o
+arredondamento, são recalculados pelo caminho escalar.
+
+Com um HistoricoTaxas (taxas_historicas.py), os tipos atrelados a CDI, Selic e
+IPCA são valorizados pelas taxas vigentes em cada dia do período
+(calcular_rendimento_periodo e o parâmetro historico de valorizar_investimentos);
+os demais tipos continuam com taxa constante.
+
+As taxas diárias (base 252) são compostas pelos dias úteis do período
+(calendario.py); o IOF segue a tabela regressiva por dias corridos.
+"""
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from calendario import calendario_padrao
+from constants import TABELA_IOF, TAXA_CDI_ANUAL, TAXA_SELIC_ANUAL, TAXA_IPCA_ANUAL
+
+# Alíquota de IOF indexada por dias corridos (0..30)
+_ALIQUOTAS_IOF = np.array([TABELA_IOF.get(max(1, dias), 0) for dias in range(31)], dtype=float)
+
+_DATA_ISO = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+# Distância mínima (em centavos) de um meio centavo para confiar no
+# arredondamento vetorizado; abaixo disso, o valor é recalculado em Python
+_MARGEM_MEIO_CENTAVO = 1e-6
+
+
+def calcular_iof(rendimento, dias_decorridos):
+    """
+    Calcula o IOF (Imposto sobre Operações Financeiras) sobre o rendimento
+    
+    Args:
+        rendimento: Valor do rendimento obtido
+        dias_decorridos: Número de dias corridos desde o início do investimento
+            (a tabela regressiva do IOF conta dias corridos, não dias úteis)
+    
+    Returns:
+        float: Valor do IOF a ser descontado (0 se dias >= 30)
+    """
+    # Não há IOF após 30 dias
+    if dias_decorridos >= 30:
+        return 0
+    
+    # Rendimentos negativos ou zero não têm IOF
+    if rendimento <= 0:
+        return 0
+    
+    # Busca a alíquota na tabela
+    # Para dias entre 1 e 30, usar a alíquota correspondente
+    # Para dia 0, usar alíquota do dia 1
+    dias_iof = max(1, min(30, dias_decorridos))
+    aliquota = TABELA_IOF.get(dias_iof, 0)
+    
+    # Calcula o IOF
+    iof = rendimento * (aliquota / 100)
+    
+    return round(iof, 2)
+
+
+def calcular_taxa_diaria(tipo_rendimento, taxa_percentual):
+    """
+    Taxa diária (juros compostos, 252 dias úteis) de um tipo de rendimento
+    
+    Args:
+        tipo_rendimento: Tipo de rendimento (% do CDI, Taxa fixa, etc.)
+        taxa_percentual: Taxa/percentual do rendimento
+    
+    Returns:
+        float: taxa diária (0.0004 = 0,04% ao dia)
+    """
+    taxa_anual = 0
+    
+    # Determina a taxa anual baseada no tipo de rendimento
+    if tipo_rendimento == "Sem rendimento":
+        taxa_anual = 0
+    
+    elif tipo_rendimento == "% do CDI":
+        # Ex: 100% do CDI com CDI a 10.65% a.a.
+        taxa_anual = (taxa_percentual / 100) * TAXA_CDI_ANUAL
+    
+    elif tipo_rendimento == "Taxa fixa (% a.a.)":
+        taxa_anual = taxa_percentual
+    
+    elif tipo_rendimento == "IPCA + (% a.a.)":
+        taxa_anual = TAXA_IPCA_ANUAL + taxa_percentual
+    
+    elif tipo_rendimento == "100% da Selic":
+        taxa_anual = TAXA_SELIC_ANUAL
+    
+    elif tipo_rendimento == "Poupança (0.5% a.m.)":
+        taxa_anual = 0.5 * 12  # 6% a.a.
+    
+    # Conversão para taxa diária (juros compostos)
+    return (1 + taxa_anual/100) ** (1/252) - 1  # 252 dias úteis no ano
+
+
+def calcular_rendimento_investimento(valor_inicial, tipo_rendimento, taxa_percentual, dias_decorridos,
+                                     dias_uteis=None):
+    """
+    Calcula o rendimento de um investimento
+    
+    Args:
+        valor_inicial: Valor inicial investido
+        tipo_rendimento: Tipo de rendimento (% do CDI, Taxa fixa, etc.)
+        taxa_percentual: Taxa/percentual do rendimento
+        dias_decorridos: Número de dias corridos desde o início do investimento (IOF)
+        dias_uteis: Dias úteis em que a taxa diária é composta; se None, os
+            dias úteis dos últimos `dias_decorridos` dias até hoje
+    
+    Returns:
+        dict com valor_atual, rendimento_total, rendimento_diario, rendimento_mensal, rendimento_anual
+    """
+    if not valor_inicial or valor_inicial <= 0:
+        return {
+            'valor_atual': 0,
+            'rendimento_total': 0,
+            'rendimento_diario': 0,
+            'rendimento_mensal': 0,
+            'rendimento_anual': 0
+        }
+    
+    taxa_diaria = calcular_taxa_diaria(tipo_rendimento, taxa_percentual)
+    if dias_uteis is None:
+        hoje = date.today()
+        dias_uteis = calendario_padrao().dias_uteis(date.fromordinal(hoje.toordinal() - dias_decorridos), hoje)
+    
+    # Cálculo do montante com juros compostos (só em dias úteis)
+    valor_atual = valor_inicial * ((1 + taxa_diaria) ** dias_uteis)
+    rendimento_total = valor_atual - valor_inicial
+    
+    # Cálculo do IOF sobre o rendimento
+    iof_descontado = calcular_iof(rendimento_total, dias_decorridos)
+    
+    # Valor líquido após IOF
+    rendimento_liquido = rendimento_total - iof_descontado
+    valor_liquido = valor_inicial + rendimento_liquido
+    
+    # Estimativas de rendimento
+    rendimento_diario = valor_atual * taxa_diaria
+    rendimento_mensal = valor_atual * ((1 + taxa_diaria) ** 21 - 1)  # 21 dias úteis no mês
+    rendimento_anual = valor_atual * ((1 + taxa_diaria) ** 252 - 1)  # 252 dias úteis no ano
+    
+    return {
+        'valor_atual': round(valor_atual, 2),
+        'valor_liquido': round(valor_liquido, 2),  # Valor após desconto do IOF
+        'rendimento_total': round(rendimento_total, 2),
+        'rendimento_liquido': round(rendimento_liquido, 2),  # Rendimento após IOF
+        'iof_descontado': round(iof_descontado, 2),
+        'rendimento_diario': round(rendimento_diario, 2),
+        'rendimento_mensal': round(rendimento_mensal, 2),
+        'rendimento_anual': round(rendimento_anual, 2)
+    }
+
+
+def _indexador(tipo_rendimento, taxa_percentual):
+    """(índice, percentual, spread) de um tipo de rendimento atrelado a índice, ou None"""
+    if tipo_rendimento == "% do CDI":
+        return ('cdi', float(taxa_percentual or 0), 0.0)
+    if tipo_rendimento == "100% da Selic":
+        return ('selic', 100.0, 0.0)
+    if tipo_rendimento == "IPCA + (% a.a.)":
+        return ('ipca', 100.0, float(taxa_percentual or 0))
+    return None
+
+
+def _liquido_e_iof(valor_inicial, valor_atual, dias_decorridos):
+    """Valor líquido e IOF arredondados, com a aritmética de calcular_rendimento_investimento"""
+    rendimento_total = valor_atual - valor_inicial
+    iof_descontado = calcular_iof(rendimento_total, dias_decorridos)
+    valor_liquido = valor_inicial + (rendimento_total - iof_descontado)
+    return round(valor_liquido, 2), round(iof_descontado, 2)
+
+
+def calcular_rendimento_periodo(valor_inicial, tipo_rendimento, taxa_percentual, data_inicio, data_fim, historico=None):
+    """
+    Valoriza um aporte entre duas datas
+    
+    Tipos atrelados a índice usam as taxas do histórico vigentes em cada dia do
+    período (percentual do CDI aplicado à taxa diária, IPCA + spread composto);
+    sem histórico para o índice, vale calcular_rendimento_investimento.
+    
+    Returns:
+        dict com valor_atual, valor_liquido, rendimento_total e iof_descontado
+    """
+    dias = max((data_fim - data_inicio).days, 0)
+    indexador = _indexador(tipo_rendimento, taxa_percentual)
+    if historico is None or indexador is None or not historico.possui(indexador[0]) \
+            or not valor_inicial or valor_inicial <= 0:
+        dias_uteis = max(calendario_padrao().dias_uteis(data_inicio, data_fim), 0)
+        resultado = calcular_rendimento_investimento(valor_inicial, tipo_rendimento, taxa_percentual, dias,
+                                                     dias_uteis)
+        return {chave: resultado.get(chave, 0)
+                for chave in ('valor_atual', 'valor_liquido', 'rendimento_total', 'iof_descontado')}
+
+    indice, percentual, spread = indexador
+    fim = data_fim.toordinal()
+    fator = float(historico.fatores(indice, [fim - dias], [fim], percentual, spread)[0])
+    valor_atual = valor_inicial * fator
+    valor_liquido, iof_descontado = _liquido_e_iof(valor_inicial, valor_atual, dias)
+    return {
+        'valor_atual': round(valor_atual, 2),
+        'valor_liquido': valor_liquido,
+        'rendimento_total': round(valor_atual - valor_inicial, 2),
+        'iof_descontado': iof_descontado
+    }
+
+
+def _perto_de_meio_centavo(valores):
+    centavos = np.abs(valores) * 100
+    return np.abs(centavos - np.floor(centavos) - 0.5) < _MARGEM_MEIO_CENTAVO
+
+
+def _dias_decorridos(datas, hoje):
+    """Dias desde cada data 'YYYY-MM-DD' (mínimo 0) e máscara das datas válidas.
+
+    Cada texto distinto é interpretado uma vez com datetime.strptime, como no
+    cálculo por aporte (datas em outro formato são ignoradas).
+    """
+    codigos, unicas = pd.factorize(pd.Series(datas, dtype=object), use_na_sentinel=False)
+    dias_unicos = np.zeros(len(unicas), dtype=np.int64)
+    validas_unicas = np.zeros(len(unicas), dtype=bool)
+    for i, texto in enumerate(unicas):
+        try:
+            # fromisoformat aceita exatamente o que strptime aceita no formato
+            # canônico e é bem mais rápido; o resto passa por strptime
+            if isinstance(texto, str) and _DATA_ISO.fullmatch(texto):
+                data = date.fromisoformat(texto)
+            else:
+                data = datetime.strptime(texto, '%Y-%m-%d').date()
+            dias_unicos[i] = max((hoje - data).days, 0)
+            validas_unicas[i] = True
+        except Exception:
+            pass
+    return dias_unicos[codigos], validas_unicas[codigos]
+
+
+def _fatores_historicos(historico, tipos, taxas, dias, hoje):
+    """Fator do histórico de cada aporte até hoje (NaN para tipos sem índice no histórico)"""
+    fatores = np.full(len(dias), np.nan)
+    if historico is None:
+        return fatores
+    fim = hoje.toordinal()
+    codigos, unicos = pd.MultiIndex.from_arrays([tipos, taxas]).factorize()
+    for codigo, (tipo, taxa) in enumerate(unicos):
+        indexador = _indexador(tipo, taxa)
+        if indexador is None or not historico.possui(indexador[0]):
+            continue
+        indice, percentual, spread = indexador
+        posicoes = np.flatnonzero(codigos == codigo)
+        fatores[posicoes] = historico.fatores(indice, fim - dias[posicoes], np.full(len(posicoes), fim),
+                                              percentual, spread)
+    return fatores
+
+
+def valorizar_aportes(valores, dias, tipos, taxas, fatores=None, dias_uteis=None):
+    """
+    Valoriza vários aportes de uma vez
+    
+    Args:
+        valores: valor de cada aporte
+        dias: dias corridos de cada aporte (IOF)
+        tipos, taxas: tipo de rendimento e taxa do investimento de cada aporte
+        fatores: fator de valorização já calculado por aporte (ex.: pelo
+            histórico de taxas); NaN ou None usam a taxa constante do tipo
+        dias_uteis: dias úteis de cada aporte; se None, os dos últimos `dias`
+            dias até hoje, como em calcular_rendimento_investimento
+    
+    Returns:
+        (valor_liquido, iof_descontado): arrays com os mesmos valores de
+        calcular_rendimento_investimento para cada aporte (0 para valores <= 0)
+    """
+    valores = np.asarray(valores, dtype=float)
+    dias = np.asarray(dias, dtype=np.int64)
+    if len(valores) == 0:
+        return np.zeros(0), np.zeros(0)
+    if dias_uteis is None:
+        hoje = date.today().toordinal()
+        dias_uteis = calendario_padrao().contar(hoje - dias, hoje)
+    dias_uteis = np.asarray(dias_uteis, dtype=np.int64)
+
+    # Taxa diária por (tipo, taxa) distinto, com a mesma aritmética escalar
+    tipos = [tipo or "Sem rendimento" for tipo in tipos]
+    taxas = [taxa or 0 for taxa in taxas]
+    codigos, unicos = pd.MultiIndex.from_arrays([tipos, taxas]).factorize()
+    taxa_diaria = np.array([calcular_taxa_diaria(tipo, taxa) for tipo, taxa in unicos])[codigos]
+
+    fatores = np.full(len(valores), np.nan) if fatores is None else np.asarray(fatores, dtype=float)
+    constantes = np.isnan(fatores)
+    fatores = np.where(constantes, np.power(1 + taxa_diaria, dias_uteis), fatores)
+    valor_atual = valores * fatores
+    rendimento = valor_atual - valores
+
+    com_iof = (dias < 30) & (rendimento > 0)
+    iof_bruto = rendimento * (_ALIQUOTAS_IOF[np.clip(dias, 0, 30)] / 100)
+    iof = np.where(com_iof, np.round(iof_bruto, 2), 0.0)
+    valor_liquido_bruto = valores + (rendimento - iof)
+    valor_liquido = np.round(valor_liquido_bruto, 2)
+
+    positivos = valores > 0
+    valor_liquido[~positivos] = 0.0
+    iof[~positivos] = 0.0
+
+    # Casos no limite do arredondamento: caminho escalar (resultado exato)
+    revisar = positivos & (_perto_de_meio_centavo(valor_liquido_bruto) | (com_iof & _perto_de_meio_centavo(iof_bruto)))
+    for i in np.flatnonzero(revisar):
+        valor = float(valores[i])
+        if constantes[i]:
+            valor_atual_escalar = valor * ((1 + float(taxa_diaria[i])) ** int(dias_uteis[i]))
+        else:
+            valor_atual_escalar = valor * float(fatores[i])
+        valor_liquido[i], iof[i] = _liquido_e_iof(valor, valor_atual_escalar, int(dias[i]))
+    return valor_liquido, iof
+
+
+def valorizar_investimentos(investimento_ids, tipos, taxas, valores, datas, hoje, historico=None):
+    """
+    Valor líquido e IOF consolidados de cada investimento a partir dos aportes
+    
+    As listas trazem uma posição por aporte (o valor inicial do investimento
+    conta como aporte na data de início), agrupadas por investimento e na
+    ordem dos aportes. Aportes com data em formato inválido somam zero. Com
+    `historico`, os tipos atrelados a índice seguem calcular_rendimento_periodo.
+    
+    Returns:
+        dict {investimento_id: (valor_liquido, iof_descontado)}, arredondados
+        como em db.atualizar_valores_investimentos
+    """
+    if len(investimento_ids) == 0:
+        return {}
+    dias, validas = _dias_decorridos(datas, hoje)
+    tipos = [tipo or "Sem rendimento" for tipo in tipos]
+    taxas = [taxa or 0 for taxa in taxas]
+    fatores = _fatores_historicos(historico, tipos, taxas, dias, hoje)
+    dias_uteis = calendario_padrao().contar(hoje.toordinal() - dias, hoje.toordinal())
+    valor_liquido, iof = valorizar_aportes(valores, dias, tipos, taxas, fatores, dias_uteis)
+    valor_liquido[~validas] = 0.0
+    iof[~validas] = 0.0
+
+    # bincount soma na ordem dos aportes, como o acumulador do laço escalar
+    grupos, ids = pd.factorize(pd.Series(investimento_ids))
+    totais = np.bincount(grupos, weights=valor_liquido, minlength=len(ids))
+    iof_totais = np.bincount(grupos, weights=iof, minlength=len(ids))
+    return {int(inv_id): (round(float(total), 2), round(float(iof_total), 2))
+            for inv_id, total, iof_total in zip(ids, totais, iof_totais)}
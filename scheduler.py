@@ -0,0 +1,103 @@
+"""
+Revalorização diária dos investimentos fora do caminho de leitura
+
+Os valores de montantes (valor / iof_descontado) dependem só da data, então
+são recalculados uma vez por dia para todos os usuários, em lotes, por uma
+thread em segundo plano (iniciar_agendador, chamada em myindex) ou por um
+worker externo (scripts/revalorizar_investimentos.py). A página /planos só
+confere users.investimentos_valorizados_em (db.garantir_valores_investimentos).
+
+Com vários workers do gunicorn cada processo tem sua thread, mas um advisory
+lock de sessão faz com que apenas um execute a passada por vez; as demais
+desistem e tentam de novo no próximo intervalo.
+"""
+import threading
+import time
+
+import db
+from config import Config
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Advisory lock da passada de revalorização (ver _MIGRATIONS_LOCK_ID e
+# _FATURAS_LOCK_ID em db.py)
+_REVALORIZACAO_LOCK_ID = 482_910_003
+
+_thread = None
+_parar = threading.Event()
+
+
+def revalorizar_investimentos(lote=None):
+    """Revaloriza, em lotes de usuários, os investimentos ainda não valorizados hoje.
+
+    Retorna dict com usuarios, investimentos e segundos, ou None se outra
+    passada já estiver em andamento (em qualquer processo).
+    """
+    lote = lote or Config.REVALORIZACAO_LOTE_USUARIOS
+    conn = db.connect_db()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (_REVALORIZACAO_LOCK_ID,))
+        obtido = cur.fetchone()[0]
+        conn.commit()
+        if not obtido:
+            return None
+        try:
+            t0 = time.perf_counter()
+            usuarios = investimentos = 0
+            while True:
+                # Cada lote marca seus usuários como valorizados hoje, então a
+                # próxima consulta já traz o lote seguinte
+                user_ids = db.get_usuarios_valorizacao_pendente(lote)
+                if not user_ids:
+                    break
+                investimentos += len(db.atualizar_valores_investimentos(user_ids))
+                usuarios += len(user_ids)
+            return {'usuarios': usuarios, 'investimentos': investimentos,
+                    'segundos': round(time.perf_counter() - t0, 3)}
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_REVALORIZACAO_LOCK_ID,))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def _executar_periodicamente(intervalo, atraso_inicial):
+    if _parar.wait(atraso_inicial):
+        return
+    while True:
+        try:
+            resultado = revalorizar_investimentos()
+            if resultado and resultado['usuarios']:
+                log.info('Revalorização dos investimentos', **resultado)
+        except Exception as e:
+            log.exception('Erro na revalorização dos investimentos')
+        if _parar.wait(intervalo):
+            return
+
+
+def iniciar_agendador(intervalo=None, atraso_inicial=None):
+    """Inicia (uma vez por processo) a thread que revaloriza os investimentos.
+
+    A cada `intervalo` segundos a thread faz uma passada; como a passada só
+    processa quem ainda não foi valorizado hoje, a virada do dia é coberta
+    no primeiro intervalo seguinte.
+    """
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return _thread
+    intervalo = Config.REVALORIZACAO_INTERVALO_SEGUNDOS if intervalo is None else intervalo
+    atraso_inicial = Config.REVALORIZACAO_ATRASO_INICIAL_SEGUNDOS if atraso_inicial is None else atraso_inicial
+    _parar.clear()
+    _thread = threading.Thread(target=_executar_periodicamente, args=(intervalo, atraso_inicial),
+                               name='revalorizacao-investimentos', daemon=True)
+    _thread.start()
+    return _thread
+
+
+def parar_agendador(timeout=5):
+    """Sinaliza a thread do agendador para parar e espera até `timeout` segundos"""
+    _parar.set()
+    if _thread is not None:
+        _thread.join(timeout)
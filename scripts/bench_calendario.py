@@ -0,0 +1,73 @@
+"""
+Benchmark da contagem de dias úteis entre datas: iteração dia a dia (com
+lista de feriados) x np.busday_count x prefixos pré-calculados
+(calendario.CalendarioDiasUteis.contar).
+
+Uso:
+    python scripts/bench_calendario.py [--pares 1000 10000] [--repeat 3]
+
+Não usa banco de dados; os pares de datas são sorteados nos últimos 10 anos.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from calendario import calendario_padrao, _para_datetime64
+
+
+def _dia_a_dia(inicios, fins, feriados):
+    contagens = []
+    for inicio, fim in zip(inicios, fins):
+        total, dia, fim = 0, date.fromordinal(int(inicio)), date.fromordinal(int(fim))
+        while dia < fim:
+            total += dia.weekday() < 5 and dia not in feriados
+            dia += timedelta(days=1)
+        contagens.append(total)
+    return np.array(contagens)
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pares', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    calendario = calendario_padrao()
+    print(f"[BENCH] calendário carregado em {(time.perf_counter() - t0) * 1000:.1f} ms")
+    feriados = {date.fromordinal(int(d) + date(1970, 1, 1).toordinal())
+                for d in calendario._feriados.astype(np.int64)}
+    hoje = date.today().toordinal()
+    rng = np.random.default_rng(42)
+    for pares in args.pares:
+        inicios = hoje - rng.integers(0, 3650, pares)
+        fins = np.full(pares, hoje)
+        repeat_lento = 1 if pares > 1_000 else args.repeat
+        t_iter, esperado = _medir(lambda: _dia_a_dia(inicios, fins, feriados), repeat_lento)
+        t_busday, busday = _medir(lambda: np.busday_count(_para_datetime64(inicios), _para_datetime64(fins),
+                                                          holidays=calendario._feriados), args.repeat)
+        t_prefixo, prefixo = _medir(lambda: calendario.contar(inicios, fins), args.repeat)
+        iguais = np.array_equal(esperado, busday) and np.array_equal(esperado, prefixo)
+        print(f"[BENCH] {pares} pares de datas ({'iguais' if iguais else 'DIFERENTES'})")
+        print(f"    dia a dia:       {t_iter:10.2f} ms")
+        print(f"    np.busday_count: {t_busday:10.2f} ms")
+        print(f"    prefixos:        {t_prefixo:10.2f} ms | {t_iter / t_prefixo:8.0f}x sobre dia a dia")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark do modelo derivado do dashboard: executa os callbacks de uma
+atualização completa do dashboard (dropdowns, saldo, gráficos, pizzas e
+alertas) para um usuário sintético, com e sem a memoização do
+DashboardModel, e mostra quanto trabalho duplicado foi evitado.
+
+Uso:
+    python scripts/bench_dashboard_model.py [--rows 20000] [--refreshes 5]
+
+Os dados sintéticos são inseridos em um usuário temporário e removidos ao
+final.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dash_bootstrap_components as dbc
+from dash_bootstrap_templates import load_figure_template
+
+import dashboard_model
+import data_access
+import db
+from config import Config
+
+THEME = dbc.themes.COSMO
+START, END = '2024-03-01', '2024-03-31'
+
+
+def _seed(user_id, rows):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO receitas (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id, plano_id)
+            SELECT round((random() * 5000)::numeric, 2), (random() < 0.8)::int, 0,
+                   DATE '2024-01-01' + (random() * 365)::int,
+                   (ARRAY['Salário', 'Extra', 'Investimentos'])[1 + (random() * 2)::int],
+                   'Receita ' || g, %s, CASE WHEN random() < 0.1 THEN 1 END
+            FROM generate_series(1, %s) AS g
+        """, (user_id, rows))
+        cur.execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, eh_fatura)
+            SELECT round((random() * 500)::numeric, 2),
+                   (ARRAY['Pago', 'A vencer', 'Vencido'])[1 + (random() * 2)::int], 0,
+                   DATE '2024-01-01' + (random() * 365)::int,
+                   (ARRAY['Casa', 'Lazer', 'Mercado', 'Saúde'])[1 + (random() * 3)::int],
+                   'Despesa ' || g, %s,
+                   (ARRAY['dinheiro', 'cartao', 'pix'])[1 + (random() * 2)::int], 0
+            FROM generate_series(1, %s) AS g
+        """, (user_id, rows))
+
+
+def _atualizacao(dashboards, despesas, receitas, user):
+    """Callbacks disparados por uma atualização completa do dashboard"""
+    cats_r = dashboards.populate_dropdownvalues_receitas(receitas, START, END, despesas)[1]
+    cats_d = dashboards.populate_dropdownvalues_despesas(despesas, START, END, receitas)[1]
+    dashboards.saldo_total(despesas, receitas, user)
+    dashboards.update_output(despesas, receitas, cats_d, cats_r, THEME)
+    dashboards.graph2_show(receitas, despesas, cats_r, cats_d, START, END, THEME)
+    dashboards.pie_receita(receitas, cats_r, THEME, despesas)
+    dashboards.pie_despesa(despesas, cats_d, THEME, receitas)
+    dashboards.mostrar_alertas_orcamento(despesas, user, START, END, receitas)
+
+
+def _medir(dashboards, dados, user, refreshes, max_entries):
+    Config.DASHBOARD_MODEL_MAX_ENTRIES = max_entries
+    dashboard_model.invalidate_models()
+    dashboard_model.reset_model_stats()
+    tempos = []
+    for _ in range(refreshes):
+        t0 = time.perf_counter()
+        _atualizacao(dashboards, dados['despesas'], dados['receitas'], user)
+        tempos.append(time.perf_counter() - t0)
+    return tempos, dashboard_model.model_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='receitas e despesas por tabela')
+    parser.add_argument('--refreshes', type=int, default=5)
+    args = parser.parse_args()
+
+    load_figure_template('cosmo')
+    from components import dashboards
+
+    db.init_db()
+    user_id = db.create_user(f"bench_dash_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+    try:
+        print(f"[BENCH] Inserindo {args.rows} receitas e {args.rows} despesas (user_id={user_id})...")
+        _seed(user_id, args.rows)
+        dados = data_access.load_user_data(user_id, atualizar_vencidos=False)
+        user = {'id': user_id}
+        data_access.resolve_frame(dados['despesas'], 'despesas')  # aquece o cache de dados
+        data_access.resolve_frame(dados['receitas'], 'receitas')
+
+        max_entries = Config.DASHBOARD_MODEL_MAX_ENTRIES or 64
+        for rotulo, entries in (('sem memoização', 0), ('com DashboardModel', max_entries)):
+            tempos, info = _medir(dashboards, dados, user, args.refreshes, entries)
+            print(f"[BENCH] {rotulo}: mediana {statistics.median(tempos) * 1000:.0f} ms por atualização "
+                  f"(primeira {tempos[0] * 1000:.0f} ms)")
+            print(f"    modelos construídos={info['builds']} reaproveitados={info['hits']} "
+                  f"recortes calculados={info['derived_builds']} reaproveitados={info['derived_hits']}")
+            print(f"    linhas normalizadas={info['rows_normalized']} "
+                  f"normalizações evitadas={info['rows_reused']} linhas")
+    finally:
+        db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
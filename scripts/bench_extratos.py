@@ -0,0 +1,108 @@
+"""
+Benchmark da tabela de despesas dos extratos: caminho antigo (DataFrame do
+usuário inteiro, filtro de período em pandas e todas as linhas devolvidas à
+DataTable) x página lida no banco (db.get_pagina_transacoes), pela primeira
+página, por keyset no meio do histórico (com e sem o COUNT, que o callback
+pula ao navegar entre páginas) e por OFFSET (salto direto).
+
+Uso:
+    python scripts/bench_extratos.py [--rows 10000 100000] [--page-size 10] [--repeat 10]
+
+Os dados sintéticos são inseridos em um usuário temporário e removidos ao
+final. Além do tempo, mostra o tamanho do JSON que vai para o navegador.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import db
+from logs import configurar_logging
+from utils.normalizers import PAGO, normalize_status_series, yesno_to_int_series
+
+
+def _seed(user_id, rows):
+    with db.get_conn() as conn:
+        conn.cursor().execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, eh_fatura)
+            SELECT round((random() * 500)::numeric, 2),
+                   (ARRAY['Pago', 'A vencer', 'Vencido'])[1 + (random() * 2)::int], 0,
+                   DATE '2015-01-01' + (random() * 3600)::int, 'Bench', 'Despesa ' || g, %s, 'dinheiro', 0
+            FROM generate_series(1, %s) AS g
+        """, (user_id, rows))
+
+
+def _antigo(user_id, start_date, end_date):
+    """Corpo de atualizar_dados_despesas antes da paginação no servidor"""
+    df = db.table_to_df('despesas', user_id=user_id, include_id=True)
+    df['Data'] = pd.to_datetime(df['Data']).dt.date
+    if start_date and end_date:
+        df = df[(df['Data'] >= pd.to_datetime(start_date).date()) & (df['Data'] <= pd.to_datetime(end_date).date())]
+    df['Status'] = normalize_status_series(df['Status'])
+    df['Fixo'] = yesno_to_int_series(df['Fixo']).map({1: 'Sim', 0: 'Não'})
+    df['forma_pagamento'] = df['forma_pagamento'].fillna('dinheiro')
+    df.loc[df['Status'] != PAGO, 'cartao_id'] = None
+    df['cartao_id'] = df['cartao_id'].apply(lambda x: int(x) if pd.notna(x) and x else '')
+    df = df.fillna('-').drop(columns=['user_id', 'Efetuado'], errors='ignore').sort_values(by='Data')
+    return df.to_dict('records')
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, resultado
+
+
+def _kb(linhas):
+    return len(json.dumps(linhas, default=str)) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    configurar_logging('WARNING')   # o log de depuração de db.py distorce a medição
+
+    db.init_db()
+    for rows in args.rows:
+        user_id = db.create_user(f"bench_extratos_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+        try:
+            _seed(user_id, rows)
+            with db.get_conn() as conn:
+                conn.cursor().execute("ANALYZE despesas")
+            meio = rows // args.page_size // 2
+            cursor = db.get_pagina_transacoes('despesas', user_id, args.page_size, pagina=meio - 1)['cursor']
+
+            print(f"[BENCH] {rows} despesas, página de {args.page_size} linhas")
+            for nome, func in [
+                ('antigo (tudo, pandas)', lambda: _antigo(user_id, None, None)),
+                ('antigo, período de 1 ano', lambda: _antigo(user_id, '2020-01-01', '2020-12-31')),
+                ('página 1', lambda: db.get_pagina_transacoes('despesas', user_id, args.page_size)['linhas']),
+                (f'página {meio + 1} (keyset)', lambda: db.get_pagina_transacoes(
+                    'despesas', user_id, args.page_size, cursor=cursor, pagina=meio)['linhas']),
+                (f'página {meio + 1} (keyset, sem COUNT)', lambda: db.get_pagina_transacoes(
+                    'despesas', user_id, args.page_size, cursor=cursor, pagina=meio, total=rows)['linhas']),
+                (f'página {meio + 1} (OFFSET)', lambda: db.get_pagina_transacoes(
+                    'despesas', user_id, args.page_size, pagina=meio)['linhas']),
+                ('página 1, período de 1 ano', lambda: db.get_pagina_transacoes(
+                    'despesas', user_id, args.page_size, data_inicio='2020-01-01', data_fim='2020-12-31')['linhas']),
+            ]:
+                tempo, linhas = _medir(func, args.repeat)
+                print(f"    {nome:<34} {tempo:9.2f} ms | {len(linhas):6d} linhas | {_kb(linhas):9.1f} KB")
+        finally:
+            db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
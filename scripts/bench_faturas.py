@@ -0,0 +1,108 @@
+"""
+Benchmark do recálculo de faturas: caminho por período (uma chamada de
+gerar_fatura_cartao por cartão/mês/ano, como atualizar_todas_faturas fazia)
+x recálculo em lote (atualizar_todas_faturas, um único statement).
+
+Uso:
+    python scripts/bench_faturas.py [--cartoes 3] [--meses 60] [--compras 20] [--repeat 3]
+
+Os dados sintéticos são inseridos em um usuário temporário e removidos ao
+final. Antes de cada medição as faturas são apagadas, então os dois
+caminhos fazem o mesmo trabalho (criar todas as faturas).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from logs import configurar_logging
+
+
+def _seed(user_id, cartoes, meses, compras):
+    ids = [db.create_cartao(f"Bench {i}", user_id, dia_vencimento=10 + i) for i in range(cartoes)]
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id,
+                                  forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+            SELECT round((random() * 300)::numeric, 2),
+                   CASE WHEN random() < 0.9 THEN 'Pago' ELSE 'A vencer' END, 0,
+                   (DATE '2020-01-01' + (m || ' month')::interval)::date, 'Bench', 'Compra', %(user_id)s,
+                   'cartao', c, EXTRACT(MONTH FROM DATE '2020-01-01' + (m || ' month')::interval)::int,
+                   EXTRACT(YEAR FROM DATE '2020-01-01' + (m || ' month')::interval)::int, 0
+            FROM unnest(%(cartoes)s::int[]) AS c,
+                 generate_series(0, %(meses)s - 1) AS m,
+                 generate_series(1, %(compras)s) AS k
+        """, {'user_id': user_id, 'cartoes': ids, 'meses': meses, 'compras': compras})
+
+
+def _limpar_faturas(user_id):
+    with db.get_conn() as conn:
+        conn.cursor().execute("DELETE FROM despesas WHERE user_id = %s AND eh_fatura = 1", (user_id,))
+
+
+def _por_periodo(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT DISTINCT cartao_id, fatura_mes, fatura_ano FROM despesas
+                       WHERE user_id = %s AND cartao_id IS NOT NULL
+                         AND fatura_mes IS NOT NULL AND fatura_ano IS NOT NULL AND eh_fatura = 0""",
+                    (user_id,))
+        periodos = cur.fetchall()
+    for cartao_id, mes, ano in periodos:
+        db.gerar_fatura_cartao(user_id, cartao_id, mes, ano)
+    return len(periodos)
+
+
+def _faturas(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT cartao_id, fatura_mes, fatura_ano, Valor, Data, Descrição
+                       FROM despesas WHERE user_id = %s AND eh_fatura = 1
+                       ORDER BY cartao_id, fatura_ano, fatura_mes""", (user_id,))
+        return cur.fetchall()
+
+
+def _medir(user_id, func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        _limpar_faturas(user_id)
+        t0 = time.perf_counter()
+        func(user_id)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, _faturas(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cartoes', type=int, default=3)
+    parser.add_argument('--meses', type=int, default=60)
+    parser.add_argument('--compras', type=int, default=20, help='compras por cartão/mês')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    configurar_logging('WARNING')   # o log de depuração de db.py distorce a medição
+
+    db.init_db()
+    user_id = db.create_user(f"bench_faturas_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+    try:
+        _seed(user_id, args.cartoes, args.meses, args.compras)
+        print(f"[BENCH] {args.cartoes} cartões x {args.meses} meses x {args.compras} compras")
+
+        t_periodo, faturas_periodo = _medir(user_id, _por_periodo, args.repeat)
+        t_lote, faturas_lote = _medir(user_id, db.atualizar_todas_faturas, args.repeat)
+
+        print(f"    por período (gerar_fatura_cartao): {t_periodo:8.1f} ms ({len(faturas_periodo)} faturas)")
+        print(f"    em lote (atualizar_todas_faturas): {t_lote:8.1f} ms ({len(faturas_lote)} faturas)")
+        print(f"    {t_periodo / t_lote:.1f}x | resultados {'iguais' if faturas_periodo == faturas_lote else 'DIFERENTES'}")
+    finally:
+        with db.get_conn() as conn:
+            conn.cursor().execute("DELETE FROM cartoes WHERE user_id = %s", (user_id,))
+        db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark: plano de execução e latência das consultas de receitas/despesas
+antes e depois das migrações 001 (tipos) e 002 (índices).
+
+Cria um schema temporário com o layout antigo (Data TEXT, Valor REAL, sem
+índices), popula com dados sintéticos, mede as consultas mais quentes do app
+com EXPLAIN ANALYZE, aplica as migrações e mede de novo.
+
+Uso:
+    python scripts/bench_indices_transacoes.py [--rows 1000000] [--users 1000] [--repeat 5] [--keep]
+"""
+import argparse
+import json
+import statistics
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import connect_db, _migration_001_tipos_transacoes, _migration_002_indices_transacoes
+
+SCHEMA = 'bench_indices'
+
+# Consultas equivalentes às dos helpers do db.py (valores fixos para o benchmark)
+QUERIES = [
+    ('table_to_df(despesas, user_id)',
+     "SELECT * FROM despesas WHERE user_id = 42"),
+    ('table_to_df(receitas, user_id)',
+     "SELECT * FROM receitas WHERE user_id = 42"),
+    ('get_gastos_por_categoria',
+     """SELECT categoria, SUM(valor) AS total_gasto FROM despesas
+        WHERE user_id = 42 AND data >= '2023-03-01' AND data <= '2023-03-31'
+        GROUP BY categoria"""),
+    ('gerar_fatura_cartao (total)',
+     """SELECT SUM(valor) AS total FROM despesas
+        WHERE user_id = 42 AND cartao_id = 1 AND fatura_mes = 3 AND fatura_ano = 2023
+          AND status = 'Pago' AND (eh_fatura = 0 OR eh_fatura IS NULL)"""),
+    ('update_status_vencidos (filtro)',
+     """SELECT id FROM despesas
+        WHERE status = 'A vencer' AND data < '2024-06-01' AND user_id = 42"""),
+]
+
+
+def criar_schema_legado(cur, rows, users):
+    """Cria receitas/despesas no layout anterior às migrações e popula"""
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+
+    cur.execute("""CREATE TABLE receitas (
+        id SERIAL PRIMARY KEY, Valor REAL, Efetuado INTEGER, Fixo INTEGER, Data TEXT,
+        Categoria TEXT, Descrição TEXT, user_id INTEGER, plano_id INTEGER, username TEXT
+    )""")
+    cur.execute("""CREATE TABLE despesas (
+        id SERIAL PRIMARY KEY, Valor REAL, Status TEXT, Fixo INTEGER, Data TEXT,
+        Categoria TEXT, Descrição TEXT, user_id INTEGER, username TEXT,
+        forma_pagamento TEXT DEFAULT 'dinheiro', cartao_id INTEGER,
+        fatura_mes INTEGER, fatura_ano INTEGER, eh_fatura INTEGER DEFAULT 0
+    )""")
+
+    # random() com semente fixa: distribuição reprodutível e sem correlação
+    # entre usuário, cartão e data
+    cur.execute("SELECT setseed(0.42)")
+    cur.execute("""
+        INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id,
+                              forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+        SELECT round((random() * 500)::numeric, 2),
+               (ARRAY['Pago', 'A vencer', 'Vencido'])[1 + floor(random() * 3)::int],
+               0,
+               to_char(d, 'YYYY-MM-DD'),
+               'Categoria ' || floor(random() * 12)::int,
+               'Despesa ' || g,
+               1 + floor(random() * %(users)s)::int,
+               CASE WHEN cartao THEN 'cartao' ELSE 'dinheiro' END,
+               CASE WHEN cartao THEN 1 + floor(random() * 3)::int END,
+               CASE WHEN cartao THEN extract(month FROM d)::int END,
+               CASE WHEN cartao THEN extract(year FROM d)::int END,
+               0
+        FROM (
+            SELECT g,
+                   DATE '2022-01-01' + floor(random() * 1095)::int AS d,
+                   random() < 0.25 AS cartao
+            FROM generate_series(1, %(rows)s) AS g
+        ) AS base
+    """, {'rows': rows, 'users': users})
+
+    cur.execute("""
+        INSERT INTO receitas (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id, plano_id)
+        SELECT round((random() * 3000)::numeric, 2),
+               floor(random() * 2)::int,
+               0,
+               to_char(DATE '2022-01-01' + floor(random() * 1095)::int, 'YYYY-MM-DD'),
+               'Categoria ' || floor(random() * 5)::int,
+               'Receita ' || g,
+               1 + floor(random() * %(users)s)::int,
+               CASE WHEN random() < 0.1 THEN 1 END
+        FROM generate_series(1, %(rows)s / 2) AS g
+    """, {'rows': rows, 'users': users})
+    cur.execute("ANALYZE receitas")
+    cur.execute("ANALYZE despesas")
+
+
+def _scans(plan):
+    """Lista os nós de leitura de tabela do plano (tipo + índice usado)"""
+    nodes = []
+    node_type = plan.get('Node Type', '')
+    if 'Scan' in node_type:
+        index = plan.get('Index Name')
+        nodes.append(f"{node_type} ({index})" if index else node_type)
+    for child in plan.get('Plans', []):
+        nodes.extend(_scans(child))
+    return nodes
+
+
+def medir(cur, repeat):
+    """Executa EXPLAIN ANALYZE de cada consulta; retorna mediana (ms) e scans"""
+    resultados = {}
+    for nome, sql in QUERIES:
+        tempos = []
+        scans = []
+        for _ in range(repeat):
+            cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+            explain = cur.fetchone()[0]
+            if isinstance(explain, str):
+                explain = json.loads(explain)
+            tempos.append(explain[0]['Execution Time'])
+            scans = _scans(explain[0]['Plan'])
+        resultados[nome] = (statistics.median(tempos), ', '.join(scans))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='despesas sintéticas (receitas = rows/2)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help=f'não remove o schema {SCHEMA} ao final')
+    args = parser.parse_args()
+
+    conn = connect_db()
+    cur = conn.cursor()
+    try:
+        print(f"[BENCH] Gerando {args.rows} despesas e {args.rows // 2} receitas em '{SCHEMA}'...")
+        t0 = time.perf_counter()
+        criar_schema_legado(cur, args.rows, args.users)
+        conn.commit()
+        print(f"[BENCH] Dados gerados em {time.perf_counter() - t0:.1f}s")
+
+        antes = medir(cur, args.repeat)
+
+        print("[BENCH] Aplicando migrações 001 (tipos) e 002 (índices)...")
+        t0 = time.perf_counter()
+        _migration_001_tipos_transacoes(cur)
+        _migration_002_indices_transacoes(cur)
+        cur.execute("ANALYZE receitas")
+        cur.execute("ANALYZE despesas")
+        conn.commit()
+        print(f"[BENCH] Migrações aplicadas em {time.perf_counter() - t0:.1f}s")
+
+        depois = medir(cur, args.repeat)
+
+        print()
+        print(f"{'consulta':<34} {'antes (ms)':>11} {'depois (ms)':>12} {'ganho':>8}")
+        print('-' * 68)
+        for nome, _ in QUERIES:
+            ms_antes, scan_antes = antes[nome]
+            ms_depois, scan_depois = depois[nome]
+            ganho = ms_antes / ms_depois if ms_depois else float('inf')
+            print(f"{nome:<34} {ms_antes:>11.2f} {ms_depois:>12.2f} {ganho:>7.1f}x")
+            print(f"    antes:  {scan_antes}")
+            print(f"    depois: {scan_depois}")
+    finally:
+        conn.rollback()
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
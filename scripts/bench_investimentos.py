@@ -0,0 +1,123 @@
+"""
+Benchmark da valorização de investimentos: caminho anterior (uma query de
+aportes por investimento e calcular_rendimento_periodo por aporte) x
+db.atualizar_valores_investimentos (duas queries, NumPy e um único UPDATE).
+
+Uso:
+    python scripts/bench_investimentos.py [--montantes 50 500] [--aportes 24] [--repeat 3]
+
+Os dados sintéticos são inseridos em um usuário temporário e removidos ao
+final; os dois caminhos gravam os mesmos valores.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from logs import configurar_logging
+from rendimentos import calcular_rendimento_periodo
+from taxas_historicas import historico_padrao
+
+
+def _seed(user_id, montantes, aportes):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO montantes (instituicao, nome_investimento, tipo, valor, tipo_rendimento, taxa_percentual,
+                                   data_inicio, valor_inicial, user_id)
+            SELECT 'Bench', 'Inv ' || g, 'CDB', 0,
+                   (ARRAY['%% do CDI', 'Taxa fixa (%% a.a.)', 'IPCA + (%% a.a.)', '100%% da Selic'])[1 + g %% 4],
+                   (ARRAY[100, 12.5, 6, 0])[1 + g %% 4],
+                   to_char(CURRENT_DATE - (random() * 3000)::int, 'YYYY-MM-DD'),
+                   round((random() * 50000)::numeric, 2), %(user_id)s
+            FROM generate_series(1, %(montantes)s) AS g
+        """, {'user_id': user_id, 'montantes': montantes})
+        cur.execute("""
+            INSERT INTO montante_aportes (montante_id, valor, data_aporte, user_id)
+            SELECT m.id, round((random() * 5000)::numeric, 2),
+                   to_char(CURRENT_DATE - (random() * 2000)::int, 'YYYY-MM-DD'), %(user_id)s
+            FROM montantes m, generate_series(1, %(aportes)s)
+            WHERE m.user_id = %(user_id)s
+        """, {'user_id': user_id, 'aportes': aportes})
+
+
+def _caminho_anterior(user_id):
+    """Laço por investimento (N+1 queries) e por aporte, como antes"""
+    hoje = date.today()
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT id, valor_inicial, tipo_rendimento, taxa_percentual, data_inicio
+                       FROM montantes WHERE user_id = %s AND data_inicio IS NOT NULL""", (user_id,))
+        for inv_id, valor_inicial, tipo_rendimento, taxa_percentual, data_inicio in cur.fetchall():
+            if not data_inicio:
+                continue
+            aportes = [(float(valor_inicial), data_inicio)] if valor_inicial and valor_inicial > 0 else []
+            cur.execute("""SELECT valor, data_aporte FROM montante_aportes
+                           WHERE montante_id = %s AND user_id = %s ORDER BY data_aporte ASC, id ASC""",
+                        (inv_id, user_id))
+            aportes += [(float(v), d) for v, d in cur.fetchall() if v and d]
+            if not aportes:
+                continue
+            total = iof = 0
+            for valor, data_aporte in aportes:
+                resultado = calcular_rendimento_periodo(valor, tipo_rendimento or "Sem rendimento",
+                                                        taxa_percentual or 0,
+                                                        datetime.strptime(data_aporte, '%Y-%m-%d').date(),
+                                                        hoje, historico_padrao())
+                total += resultado['valor_liquido']
+                iof += resultado['iof_descontado']
+            cur.execute("UPDATE montantes SET valor = %s, iof_descontado = %s WHERE id = %s",
+                        (round(total, 2), round(iof, 2), inv_id))
+
+
+def _estado(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, valor, iof_descontado FROM montantes WHERE user_id = %s ORDER BY id", (user_id,))
+        return cur.fetchall()
+
+
+def _medir(func, user_id, repeat):
+    tempos = []
+    for _ in range(repeat):
+        with db.get_conn() as conn:
+            conn.cursor().execute("UPDATE montantes SET valor = 0, iof_descontado = 0 WHERE user_id = %s", (user_id,))
+        t0 = time.perf_counter()
+        func(user_id)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, _estado(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--montantes', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--aportes', type=int, default=24, help='aportes por investimento')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    configurar_logging('WARNING')   # o log de depuração de db.py distorce a medição
+
+    db.init_db()
+    for montantes in args.montantes:
+        user_id = db.create_user(f"bench_inv_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+        try:
+            _seed(user_id, montantes, args.aportes)
+            t_antes, estado_antes = _medir(_caminho_anterior, user_id, args.repeat)
+            t_lote, estado_lote = _medir(db.atualizar_valores_investimentos, user_id, args.repeat)
+            print(f"[BENCH] {montantes} investimentos x {args.aportes} aportes: "
+                  f"anterior {t_antes:8.1f} ms | vetorizado {t_lote:7.1f} ms | {t_antes / t_lote:5.1f}x | "
+                  f"{'iguais' if estado_antes == estado_lote else 'DIFERENTES'}")
+        finally:
+            with db.get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute("DELETE FROM montante_aportes WHERE user_id = %s", (user_id,))
+                cur.execute("DELETE FROM montantes WHERE user_id = %s", (user_id,))
+            db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark do custo do log nos caminhos quentes de db.py: o print
+anterior (f-string com o payload inteiro, sempre) x log.debug com o nível
+desligado (produção) e ligado (desenvolvimento).
+
+Uso:
+    python scripts/bench_logs.py [--calls 100000] [--cartoes 20] [--repeat 5]
+
+Não usa banco de dados. O payload imita get_cartoes: a lista de cartões do
+usuário, que o print formatava por inteiro a cada chamada. A saída vai para
+um buffer em memória (no servidor ela iria para stdout/stderr).
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logs import configurar_logging, get_logger
+
+log = get_logger('bench')
+
+
+def _cartoes(quantidade):
+    return [{'id': i, 'nome': f'Cartão {i}', 'limite': 5000.0, 'dia_vencimento': 10,
+             'dia_fechamento': 5, 'ativo': 1, 'user_id': 1} for i in range(quantidade)]
+
+
+def _print(calls, result):
+    for _ in range(calls):
+        print(f"[DB] get_cartoes(user_id={1}) retornou {len(result)} cartões: {result}")
+
+
+def _log(calls, result):
+    for _ in range(calls):
+        log.debug('get_cartoes', user_id=1, cartoes=len(result))
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100_000)
+    parser.add_argument('--cartoes', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    result = _cartoes(args.cartoes)
+    with redirect_stdout(io.StringIO()):
+        t_print = _medir(lambda: _print(args.calls, result), args.repeat)
+    configurar_logging('WARNING', io.StringIO())
+    t_desligado = _medir(lambda: _log(args.calls, result), args.repeat)
+    configurar_logging('DEBUG', io.StringIO())
+    t_ligado = _medir(lambda: _log(args.calls, result), args.repeat)
+
+    por_chamada = 1e6 / args.calls
+    print(f"[BENCH] {args.calls} chamadas, {args.cartoes} cartões no payload")
+    print(f"    print com payload:   {t_print * por_chamada:8.2f} µs/chamada")
+    print(f"    log.debug desligado: {t_desligado * por_chamada:8.2f} µs/chamada ({t_print / t_desligado:.0f}x)")
+    print(f"    log.debug ligado:    {t_ligado * por_chamada:8.2f} µs/chamada")
+
+
+if __name__ == '__main__':
+    main()
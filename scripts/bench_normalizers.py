@@ -0,0 +1,78 @@
+"""
+Micro-benchmark da normalização de colunas: regras escalares via
+Series.apply (implementação anterior) x utils.normalizers (vetorizado).
+
+Uso:
+    python scripts/bench_normalizers.py [--rows 100000 1000000] [--repeat 3]
+
+Não usa banco de dados; as colunas são geradas com grafias misturadas
+(maiúsculas, espaços, números, booleanos e vazios), como em bases antigas.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from utils.normalizers import (
+    normalize_status_value, normalize_efetuado_value,
+    normalize_status_series, normalize_efetuado_series,
+    yesno_to_int_series, validate_status_series
+)
+from utils.validators import yesno_to_int, validate_status
+
+STATUS_AMOSTRA = ['Pago', 'pago', ' PAGO ', 'A vencer', 'a vencer', 'Vencido', 'atrasado',
+                  'aberto', None, np.nan, 1, 0, 2, 'xyz']
+EFETUADO_AMOSTRA = [1, 0, '1', '0', 'Sim', 'não', 'recebido', 1.0, 0.0, True, False, None, np.nan, 'talvez']
+
+CASOS = [
+    ('status', STATUS_AMOSTRA, normalize_status_value, normalize_status_series),
+    ('efetuado', EFETUADO_AMOSTRA, normalize_efetuado_value, normalize_efetuado_series),
+    ('yesno_to_int', EFETUADO_AMOSTRA, yesno_to_int, yesno_to_int_series),
+    ('validate_status', STATUS_AMOSTRA, validate_status, validate_status_series),
+]
+
+
+def _coluna(amostra, rows, seed=42):
+    rng = np.random.default_rng(seed)
+    valores = np.empty(len(amostra), dtype=object)
+    valores[:] = amostra
+    return pd.Series(valores[rng.integers(0, len(amostra), rows)], dtype=object)
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"[BENCH] {rows} linhas")
+        for nome, amostra, escalar, vetorizada in CASOS:
+            serie = _coluna(amostra, rows)
+            esperado = serie.apply(escalar)
+            obtido = vetorizada(serie)
+            # apply converte None em NaN quando o resultado é numérico
+            iguais = obtido.tolist() == [None if pd.isna(v) else v for v in esperado.astype(object)]
+
+            t_apply = _medir(lambda: serie.apply(escalar), args.repeat)
+            t_vetor = _medir(lambda: vetorizada(serie), args.repeat)
+            print(f"    {nome:<16} apply {t_apply * 1000:8.1f} ms | vetorizado {t_vetor * 1000:7.1f} ms "
+                  f"| {t_apply / t_vetor:5.1f}x | {'equivalente' if iguais else 'DIVERGENTE'}")
+
+
+if __name__ == '__main__':
+    main()
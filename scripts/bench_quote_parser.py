@@ -0,0 +1,99 @@
+"""
+Benchmark da extração de cotação: implementação anterior do endpoint
+(unescape da página inteira e cinco re.search em ordem, mais .lower()/.upper()
+da página para validar) x quote_parser (padrões pré-compilados e varredura
+direcionada antes da busca completa).
+
+Uso:
+    python scripts/bench_quote_parser.py [--repeat 200]
+
+Não usa rede: lê as páginas salvas em tests/fixtures/status_invest.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from html import unescape
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_parser import extract_price, is_ticker_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures', 'status_invest')
+PAGINAS = [('acao_petr4.html', 'PETR4'), ('fii_mxrf11.html', 'MXRF11'), ('bdr_aapl34.html', 'AAPL34')]
+
+
+# ----- implementação anterior (closures de api_cotacao_investimento) ----- #
+def _is_not_found_page(html_content):
+    text = html_content.lower()
+    return "ops. . ." in text and "nã" in text and "encontramos o que voc" in text
+
+
+def _to_float_br(value):
+    raw = (value or "").strip()
+    if not raw:
+        return None
+    raw = raw.replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
+    try:
+        return float(raw)
+    except Exception:
+        return None
+
+
+def _extract_price(html_content):
+    decoded = unescape(html_content)
+    patterns = [
+        r'"price"\s*:\s*"?([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)"?',
+        r'"lastPrice"\s*:\s*"?([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)"?',
+        r'cot[aã]?[cç][aã]o[^\d]{0,80}R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)',
+        r'class="value"[^>]*>\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2}|[0-9]+[\.,][0-9]+)\s*<',
+        r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, decoded, flags=re.IGNORECASE | re.DOTALL)
+        if match:
+            price = _to_float_br(match.group(1))
+            if price is not None:
+                return price
+    return None
+
+
+def _anterior(html_content, ticker):
+    if _is_not_found_page(html_content):
+        return None
+    if ticker in html_content.upper() or f"data-code=\"{ticker}\"" in html_content.upper():
+        return _extract_price(html_content)
+    return None
+
+
+def _novo(html_content, ticker):
+    return extract_price(html_content, ticker) if is_ticker_page(html_content, ticker) else None
+
+
+def _medir(func, html_content, ticker, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resultado = func(html_content, ticker)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    for nome, ticker in PAGINAS:
+        with open(os.path.join(FIXTURES, nome), encoding='utf-8') as arquivo:
+            html_content = arquivo.read()
+        t_antes, preco_antes = _medir(_anterior, html_content, ticker, args.repeat)
+        t_novo, preco_novo = _medir(_novo, html_content, ticker, args.repeat)
+        print(f"[BENCH] {nome:<18} {len(html_content) // 1024:4d} KB | anterior {t_antes:7.3f} ms | "
+              f"quote_parser {t_novo:7.3f} ms | {t_antes / t_novo:6.1f}x | "
+              f"{'mesmo preço' if preco_antes == preco_novo else f'DIFERENTE ({preco_antes} x {preco_novo})'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark do card de saldo: leitura O(1) em saldos_usuarios (db.get_saldo)
+x agregação do histórico em SQL (db.calcular_saldo) x caminho antigo em
+pandas (carregar receitas/despesas do usuário e filtrar no Python).
+
+Uso:
+    python scripts/bench_saldo.py [--rows 10000 100000] [--repeat 20]
+
+Os dados sintéticos são inseridos em um usuário temporário e removidos ao
+final.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from dashboard_model import DashboardModel
+
+
+def _seed(user_id, rows):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO receitas (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id)
+            SELECT round((random() * 5000)::numeric, 2), (random() < 0.8)::int, 0,
+                   DATE '2020-01-01' + (random() * 1800)::int, 'Bench', 'Receita ' || g, %s
+            FROM generate_series(1, %s) AS g
+        """, (user_id, rows))
+        cur.execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento, eh_fatura)
+            SELECT round((random() * 500)::numeric, 2),
+                   (ARRAY['Pago', 'A vencer', 'Vencido'])[1 + (random() * 2)::int], 0,
+                   DATE '2020-01-01' + (random() * 1800)::int, 'Bench', 'Despesa ' || g, %s,
+                   (ARRAY['dinheiro', 'cartao', 'pix'])[1 + (random() * 2)::int], 0
+            FROM generate_series(1, %s) AS g
+        """, (user_id, rows))
+
+
+def _pandas(user_id):
+    model = DashboardModel(db.table_to_df('despesas', user_id=user_id),
+                           db.table_to_df('receitas', user_id=user_id))
+    return model.saldo_transacoes()
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db.init_db()
+    for rows in args.rows:
+        user_id = db.create_user(f"bench_saldo_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+        try:
+            t0 = time.perf_counter()
+            _seed(user_id, rows)
+            carga = time.perf_counter() - t0
+            assert abs(db.get_saldo(user_id)['saldo'] - db.calcular_saldo(user_id)['saldo']) < 0.01
+
+            print(f"[BENCH] {rows} receitas + {rows} despesas (inserção com triggers: {carga:.2f}s)")
+            print(f"    get_saldo (saldos_usuarios): {_medir(lambda: db.get_saldo(user_id), args.repeat):8.2f} ms")
+            print(f"    calcular_saldo (agregação):  {_medir(lambda: db.calcular_saldo(user_id), args.repeat):8.2f} ms")
+            print(f"    pandas (caminho antigo):     {_medir(lambda: _pandas(user_id), max(1, args.repeat // 5)):8.2f} ms")
+        finally:
+            db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
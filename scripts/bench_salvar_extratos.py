@@ -0,0 +1,116 @@
+"""
+Benchmark do "Salvar Alterações" dos extratos: uma chamada de
+update_transacao por linha editada (caminho anterior dos callbacks sync_*)
+x update_transacoes_lote (uma transação para o lote todo).
+
+Uso:
+    python scripts/bench_salvar_extratos.py [--linhas 50 200] [--repeat 3]
+
+Metade das despesas editadas foi paga no cartão (em 12 meses), então as
+faturas também são ajustadas. Os dados sintéticos são inseridos em um
+usuário temporário e removidos ao final.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from logs import configurar_logging
+
+
+def _seed(user_id, linhas):
+    cartao = db.create_cartao('Bench', user_id)
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id,
+                                  forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+            SELECT 10 + g, 'Pago', 0, make_date(2024, 1 + g %% 12, 5), 'Bench', 'Despesa ' || g, %(user_id)s,
+                   CASE WHEN g %% 2 = 0 THEN 'cartao' ELSE 'dinheiro' END,
+                   CASE WHEN g %% 2 = 0 THEN %(cartao)s END,
+                   CASE WHEN g %% 2 = 0 THEN 1 + g %% 12 END,
+                   CASE WHEN g %% 2 = 0 THEN 2024 END, 0
+            FROM generate_series(1, %(linhas)s) AS g
+            RETURNING id
+        """, {'user_id': user_id, 'cartao': cartao, 'linhas': linhas})
+        ids = [linha[0] for linha in cur.fetchall()]
+    db.atualizar_todas_faturas(user_id)
+    return ids
+
+
+def _alteracoes(ids, rodada):
+    return [(row_id, {'Valor': 20.0 + i + rodada, 'Descrição': f'Editada {i}/{rodada}'}) for i, row_id in enumerate(ids)]
+
+
+def _por_linha(user_id, alteracoes):
+    for row_id, fields in alteracoes:
+        db.update_transacao('despesas', row_id, dict(fields), user_id)
+
+
+def _lote(user_id, alteracoes):
+    db.update_transacoes_lote('despesas', alteracoes, user_id)
+
+
+def _medir(user_id, ids, func, repeat, inicio):
+    tempos = []
+    conexoes = 0
+    get_conn = db.get_conn
+
+    def contar(*args, **kwargs):
+        nonlocal conexoes
+        conexoes += 1
+        return get_conn(*args, **kwargs)
+
+    db.get_conn = contar
+    try:
+        for rodada in range(repeat):
+            alteracoes = _alteracoes(ids, inicio + rodada)
+            t0 = time.perf_counter()
+            func(user_id, alteracoes)
+            tempos.append(time.perf_counter() - t0)
+    finally:
+        db.get_conn = get_conn
+    return statistics.median(tempos) * 1000, conexoes // repeat
+
+
+def _faturas(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT fatura_mes, Valor FROM despesas WHERE user_id = %s AND eh_fatura = 1
+                       ORDER BY fatura_mes""", (user_id,))
+        return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    configurar_logging('WARNING')   # o log de depuração de db.py distorce a medição
+
+    db.init_db()
+    for linhas in args.linhas:
+        user_id = db.create_user(f"bench_salvar_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+        try:
+            ids = _seed(user_id, linhas)
+            t_linha, c_linha = _medir(user_id, ids, _por_linha, args.repeat, 0)
+            faturas_linha = _faturas(user_id)
+            t_lote, c_lote = _medir(user_id, ids, _lote, args.repeat, 0)
+            faturas_lote = _faturas(user_id)
+
+            print(f"[BENCH] {linhas} despesas editadas ({linhas // 2} no cartão, {len(faturas_lote)} faturas)")
+            print(f"    update_transacao por linha: {t_linha:8.1f} ms ({c_linha} conexões)")
+            print(f"    update_transacoes_lote:     {t_lote:8.1f} ms ({c_lote} conexão)")
+            print(f"    {t_linha / t_lote:.1f}x | faturas {'iguais' if faturas_linha == faturas_lote else 'DIFERENTES'}")
+        finally:
+            with db.get_conn() as conn:
+                conn.cursor().execute("DELETE FROM cartoes WHERE user_id = %s", (user_id,))
+            db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark da inserção de parcelas: um INSERT por parcela (implementação
+anterior de insert_despesa_parcelada) x insert_serie_recorrente (um único
+INSERT multi-linha e um ajuste de fatura por período).
+
+Uso:
+    python scripts/bench_serie.py [--parcelas 12 120] [--repeat 10]
+
+As parcelas são compras pagas no cartão, inseridas em um usuário temporário
+removido ao final.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from logs import configurar_logging
+
+CAMPOS = {'Valor': 99.9, 'Status': 'Pago', 'Fixo': 1, 'Categoria': 'Bench', 'Descrição': 'compra',
+          'forma_pagamento': 'cartao'}
+
+
+def _linha_a_linha(user_id, cartao_id, parcelas):
+    """Caminho anterior: INSERT e ajuste de fatura para cada parcela"""
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        db._bloquear_faturas(cur, user_id)
+        for i, data in enumerate(db.datas_serie_mensal('2024-01-31', parcelas)):
+            cur.execute(
+                f"""INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id, forma_pagamento,
+                                         cartao_id, fatura_mes, fatura_ano, eh_fatura)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,0) RETURNING {db._COLUNAS_COMPRA_CARTAO}""",
+                (CAMPOS['Valor'], CAMPOS['Status'], CAMPOS['Fixo'], data, CAMPOS['Categoria'],
+                 f"compra - Parcela {i+1}/{parcelas}", user_id, 'cartao', cartao_id, data.month, data.year)
+            )
+            db._aplicar_contribuicoes(cur, user_id, depois=[cur.fetchone()])
+
+
+def _em_lote(user_id, cartao_id, parcelas):
+    db.insert_serie_recorrente('despesas', user_id, '2024-01-31', parcelas, dict(CAMPOS, cartao_id=cartao_id))
+
+
+def _limpar(user_id):
+    with db.get_conn() as conn:
+        conn.cursor().execute("DELETE FROM despesas WHERE user_id = %s", (user_id,))
+
+
+def _estado(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT Data, Descrição, Valor, fatura_mes, fatura_ano, eh_fatura FROM despesas
+                       WHERE user_id = %s ORDER BY eh_fatura, Data""", (user_id,))
+        return cur.fetchall()
+
+
+def _medir(func, user_id, cartao_id, parcelas, repeat):
+    tempos = []
+    for _ in range(repeat):
+        _limpar(user_id)
+        t0 = time.perf_counter()
+        func(user_id, cartao_id, parcelas)
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, _estado(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parcelas', type=int, nargs='+', default=[12, 120])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    configurar_logging('WARNING')   # o log de depuração de db.py distorce a medição
+
+    db.init_db()
+    user_id = db.create_user(f"bench_serie_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex)
+    try:
+        cartao_id = db.create_cartao('Bench', user_id, dia_vencimento=10)
+        for parcelas in args.parcelas:
+            t_linha, estado_linha = _medir(_linha_a_linha, user_id, cartao_id, parcelas, args.repeat)
+            t_lote, estado_lote = _medir(_em_lote, user_id, cartao_id, parcelas, args.repeat)
+            print(f"[BENCH] {parcelas} parcelas no cartão: linha a linha {t_linha:7.1f} ms | "
+                  f"em lote {t_lote:6.1f} ms | {t_linha / t_lote:4.1f}x | "
+                  f"{'iguais' if estado_linha == estado_lote else 'DIFERENTES'}")
+    finally:
+        with db.get_conn() as conn:
+            conn.cursor().execute("DELETE FROM cartoes WHERE user_id = %s", (user_id,))
+        db.delete_user(user_id)
+
+
+if __name__ == '__main__':
+    main()
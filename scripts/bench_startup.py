@@ -0,0 +1,126 @@
+"""
+Benchmark de inicialização: tempo de import de myindex (o que o gunicorn faz
+em cada worker) e pico de memória (RSS) em um processo limpo.
+
+Também registra toda leitura feita via table_to_df durante o import, para
+garantir que nenhum dado de receitas/despesas é carregado no boot.
+
+Uso:
+    python scripts/bench_startup.py [--repeat 3] [--seed-rows 0] [--sem-banco]
+
+--seed-rows N insere N despesas sintéticas (em um user_id reservado) antes de
+medir e as remove ao final, para comparar o boot com bancos de tamanhos
+diferentes.
+
+--sem-banco mede sem PostgreSQL: o init_db do boot (globals.py) vira no-op e
+qualquer outra conexão aberta durante o import falha e é registrada. É o modo
+do teste de inicialização quando não há banco disponível (CI).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = 'STARTUP_RESULT='
+SEED_USER_ID = -4242
+
+# Executado em um processo novo: instrumenta table_to_df e importa myindex
+_PROBE = r'''
+import json, resource, sys, time, traceback
+t0 = time.perf_counter()
+import db
+leituras = []
+conexoes = []
+if '--sem-banco' in sys.argv:
+    db.init_db = lambda: None
+    def _get_engine_sem_banco():
+        conexoes.append(''.join(traceback.format_stack(limit=8)[:-1]))
+        raise RuntimeError('bench_startup --sem-banco: o import tentou conectar ao banco')
+    db.get_engine = _get_engine_sem_banco
+_table_to_df = db.table_to_df
+def _table_to_df_instrumentado(table, user_id=None, include_id=False):
+    df = _table_to_df(table, user_id=user_id, include_id=include_id)
+    leituras.append({'table': table, 'user_id': user_id, 'rows': len(df)})
+    return df
+db.table_to_df = _table_to_df_instrumentado
+import myindex
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(%r + json.dumps({'seconds': elapsed, 'max_rss_kb': rss_kb, 'reads': leituras, 'connections': conexoes}))
+''' % RESULT_PREFIX
+
+
+def medir_startup(timeout=120, sem_banco=False):
+    """Importa myindex em um subprocesso; retorna dict com seconds, max_rss_kb,
+    reads e connections (conexões tentadas no import, só com sem_banco)"""
+    proc = subprocess.run(
+        [sys.executable, '-c', _PROBE] + (['--sem-banco'] if sem_banco else []),
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env={**os.environ, 'PYTHONPATH': ROOT},
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Import de myindex falhou (exit={proc.returncode}):\n{proc.stderr[-2000:]}")
+
+
+def _seed(rows):
+    from db import get_conn
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id)
+            SELECT round((random() * 500)::numeric, 2), 'Pago', 0,
+                   DATE '2022-01-01' + (g %% 1095), 'Bench', 'Despesa ' || g, %s
+            FROM generate_series(1, %s) AS g
+        """, (SEED_USER_ID, rows))
+
+
+def _unseed():
+    from db import get_conn
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM despesas WHERE user_id = %s", (SEED_USER_ID,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed-rows', type=int, default=0)
+    parser.add_argument('--sem-banco', action='store_true')
+    args = parser.parse_args()
+    if args.sem_banco and args.seed_rows:
+        parser.error('--seed-rows precisa do banco')
+
+    if args.seed_rows:
+        print(f"[BENCH] Inserindo {args.seed_rows} despesas sintéticas (user_id={SEED_USER_ID})...")
+        _seed(args.seed_rows)
+    try:
+        resultados = [medir_startup(sem_banco=args.sem_banco) for _ in range(args.repeat)]
+    finally:
+        if args.seed_rows:
+            _unseed()
+
+    tempos = [r['seconds'] for r in resultados]
+    rss = [r['max_rss_kb'] for r in resultados]
+    leituras = resultados[-1]['reads']
+    print(f"[BENCH] import myindex: mediana {statistics.median(tempos):.2f}s "
+          f"(min {min(tempos):.2f}s, max {max(tempos):.2f}s)")
+    print(f"[BENCH] pico de RSS: {statistics.median(rss) / 1024:.1f} MiB")
+    print(f"[BENCH] leituras via table_to_df no import: {len(leituras)}")
+    for leitura in leituras:
+        print(f"    {leitura['table']} user_id={leitura['user_id']} linhas={leitura['rows']}")
+    if args.sem_banco:
+        print(f"[BENCH] conexões tentadas no import: {len(resultados[-1]['connections'])}")
+        for pilha in resultados[-1]['connections']:
+            print(pilha)
+
+
+if __name__ == '__main__':
+    main()
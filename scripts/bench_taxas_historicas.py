@@ -0,0 +1,72 @@
+"""
+Benchmark do fator de valorização pelo histórico de taxas: composição dia a
+dia por aporte (percorrendo as taxas vigentes em cada dia útil) x razão entre
+posições do fator acumulado (HistoricoTaxas.fatores, um gather vetorizado).
+
+Uso:
+    python scripts/bench_taxas_historicas.py [--aportes 1000 5000] [--repeat 3]
+
+Não usa banco de dados; usa o histórico de Config.TAXAS_HISTORICAS_CSV e
+aportes com datas sorteadas nos últimos 6 anos.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from calendario import calendario_padrao
+from config import Config
+from taxas_historicas import HistoricoTaxas
+
+
+def _dia_a_dia(historico, calendario, inicios, fim):
+    fatores = []
+    for inicio in inicios:
+        fator = 1.0
+        for dia in range(int(inicio), fim):
+            if not calendario.eh_dia_util(date.fromordinal(dia)):
+                continue
+            diaria = (1 + historico.taxa_em('cdi', date.fromordinal(dia)) / 100) ** (1 / 252) - 1
+            fator *= 1 + 1.1 * diaria
+        fatores.append(fator)
+    return np.array(fatores)
+
+
+def _medir(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aportes', type=int, nargs='+', default=[1_000, 5_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    historico = HistoricoTaxas.de_csv(Config.TAXAS_HISTORICAS_CSV)
+    fim = date.today().toordinal()
+    rng = np.random.default_rng(42)
+    for aportes in args.aportes:
+        inicios = fim - rng.integers(0, 6 * 365, aportes)
+        fins = np.full(aportes, fim)
+        historico._acumulados.clear()
+        t_acumulado, fatores = _medir(lambda: historico.fatores('cdi', inicios, fins, 110.0), args.repeat)
+        t_diario, esperado = _medir(lambda: _dia_a_dia(historico, calendario_padrao(), inicios, fim), 1)
+        iguais = np.allclose(fatores, esperado, rtol=1e-12, atol=0)
+        print(f"[BENCH] {aportes} aportes")
+        print(f"    dia a dia:          {t_diario:10.1f} ms")
+        print(f"    fator acumulado:    {t_acumulado:10.2f} ms | {t_diario / t_acumulado:7.0f}x "
+              f"| {'equivalente' if iguais else 'DIVERGENTE'}")
+
+
+if __name__ == '__main__':
+    main()
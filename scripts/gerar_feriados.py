@@ -0,0 +1,71 @@
+"""
+Gera data/feriados.csv com os feriados nacionais que não são dias úteis no
+mercado financeiro (mesmo critério do calendário ANBIMA): feriados fixos,
+Carnaval (segunda e terça), Sexta-feira Santa e Corpus Christi.
+
+Uso:
+    python scripts/gerar_feriados.py [--inicio 2001] [--fim 2078] [--saida data/feriados.csv]
+"""
+import argparse
+import csv
+import os
+import sys
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXOS = [
+    ((1, 1), 'Confraternização Universal', None),
+    ((4, 21), 'Tiradentes', None),
+    ((5, 1), 'Dia do Trabalho', None),
+    ((9, 7), 'Independência do Brasil', None),
+    ((10, 12), 'Nossa Senhora Aparecida', None),
+    ((11, 2), 'Finados', None),
+    ((11, 15), 'Proclamação da República', None),
+    ((11, 20), 'Dia Nacional de Zumbi e da Consciência Negra', 2024),  # Lei 14.759/2023
+    ((12, 25), 'Natal', None),
+]
+
+MOVEIS = [(-48, 'Carnaval'), (-47, 'Carnaval'), (-2, 'Paixão de Cristo'), (60, 'Corpus Christi')]
+
+
+def pascoa(ano):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados(ano):
+    resultado = [(date(ano, mes, dia), nome) for (mes, dia), nome, desde in FIXOS if desde is None or ano >= desde]
+    resultado += [(pascoa(ano) + timedelta(days=deslocamento), nome) for deslocamento, nome in MOVEIS]
+    return sorted(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--inicio', type=int, default=2001)
+    parser.add_argument('--fim', type=int, default=2078)
+    parser.add_argument('--saida', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                         'data', 'feriados.csv'))
+    args = parser.parse_args()
+
+    linhas = [linha for ano in range(args.inicio, args.fim + 1) for linha in feriados(ano)]
+    with open(args.saida, 'w', newline='', encoding='utf-8') as arquivo:
+        arquivo.write(f"# Feriados nacionais (dias não úteis) de {args.inicio} a {args.fim}, "
+                      f"gerados por scripts/gerar_feriados.py\n")
+        escritor = csv.writer(arquivo, lineterminator='\n')
+        escritor.writerow(['data', 'nome'])
+        escritor.writerows((data.isoformat(), nome) for data, nome in linhas)
+    print(f"[FERIADOS] {len(linhas)} feriados gravados em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Worker de revalorização dos investimentos (alternativa à thread do app).
+
+Executa uma passada de scheduler.revalorizar_investimentos: todos os usuários
+cujos investimentos ainda não foram valorizados hoje, em lotes. Para rodar
+via cron, desligue a thread do app com REVALORIZACAO_AGENDADA=False.
+
+Uso:
+    python scripts/revalorizar_investimentos.py [--lote 200]
+"""
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from scheduler import revalorizar_investimentos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lote', type=int, default=None, help='usuários por lote')
+    args = parser.parse_args()
+
+    db.init_db()
+    resultado = revalorizar_investimentos(args.lote)
+    if resultado is None:
+        print("[AGENDADOR] Outra revalorização já está em andamento")
+        sys.exit(1)
+    print(f"[AGENDADOR] {resultado['usuarios']} usuários, {resultado['investimentos']} investimentos "
+          f"revalorizados em {resultado['segundos']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -55,11 +55,12 @@ class RateLimiter:
         current_time = time.time()
         window_seconds = window_minutes * 60
         
-        # Limpa tentativas antigas
+        # Limpa tentativas antigas deste endpoint (as dos outros têm a sua
+        # própria janela e são limpas nas chamadas deles)
         if ip_address in self.attempts:
             self.attempts[ip_address] = [
                 (ts, ep) for ts, ep in self.attempts[ip_address]
-                if current_time - ts < window_seconds and ep == endpoint
+                if ep != endpoint or current_time - ts < window_seconds
             ]
         else:
             self.attempts[ip_address] = []
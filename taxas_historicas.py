@@ -0,0 +1,137 @@
+"""
+Histórico das taxas de referência (CDI, Selic, IPCA) com fatores acumulados
+
+As séries vêm de um CSV (data, indice, taxa_anual): cada linha é a taxa anual
+vigente a partir daquela data, até a próxima linha do mesmo índice (ex.: as
+decisões do Copom). Antes da primeira data vale a primeira taxa e depois da
+última, a última.
+
+Para cada indexador (índice, percentual, spread) é montado uma vez o array do
+fator acumulado dia a dia desde a primeira data da série (a taxa diária só é
+aplicada nos dias úteis do calendário de calendario.py); o fator entre duas
+datas quaisquer é a razão entre duas posições desse array, então valorizar
+milhares de aportes é um único gather vetorizado (HistoricoTaxas.fatores).
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from calendario import calendario_padrao
+from config import Config
+from logs import get_logger
+
+INDICES = ('cdi', 'selic', 'ipca')
+
+log = get_logger(__name__)
+
+_COLUNAS = ['data', 'indice', 'taxa_anual']
+
+
+class HistoricoTaxas:
+    """Séries de taxa anual (% a.a.) por índice, vigentes a partir de cada data"""
+
+    def __init__(self, series, calendario=None):
+        """
+        Args:
+            series: {indice: [(date, taxa_anual), ...]} (ordem qualquer)
+            calendario: CalendarioDiasUteis (padrão: calendario_padrao())
+        """
+        self._calendario = calendario or calendario_padrao()
+        self._series = {}
+        for indice, pontos in series.items():
+            pontos = sorted(pontos)
+            if not pontos:
+                continue
+            origem = pontos[0][0].toordinal()
+            deslocamentos = np.array([data.toordinal() - origem for data, _ in pontos], dtype=np.int64)
+            if np.any(np.diff(deslocamentos) == 0):
+                raise ValueError(f"Taxa duplicada na mesma data para o índice '{indice}'")
+            taxas = np.array([float(taxa) for _, taxa in pontos])
+            self._series[indice] = (origem, deslocamentos, taxas)
+        self._acumulados = {}
+
+    @classmethod
+    def de_csv(cls, caminho, calendario=None):
+        """Carrega o histórico de um CSV com colunas data, indice, taxa_anual (linhas com # são ignoradas)"""
+        df = pd.read_csv(caminho, comment='#', skipinitialspace=True, dtype={'indice': str})
+        faltando = [coluna for coluna in _COLUNAS if coluna not in df.columns]
+        if faltando:
+            raise ValueError(f"Colunas ausentes em {caminho}: {', '.join(faltando)}")
+        datas = pd.to_datetime(df['data'], format='%Y-%m-%d').dt.date
+        indices = df['indice'].str.strip().str.lower()
+        desconhecidos = sorted(set(indices) - set(INDICES))
+        if desconhecidos:
+            raise ValueError(f"Índices desconhecidos em {caminho}: {', '.join(desconhecidos)}")
+        series = {}
+        for data, indice, taxa in zip(datas, indices, df['taxa_anual'].astype(float)):
+            series.setdefault(indice, []).append((data, taxa))
+        return cls(series, calendario)
+
+    def possui(self, indice):
+        return indice in self._series
+
+    def indices(self):
+        return sorted(self._series)
+
+    def taxa_em(self, indice, data):
+        """Taxa anual do índice vigente na data"""
+        origem, deslocamentos, taxas = self._series[indice]
+        posicao = np.searchsorted(deslocamentos, data.toordinal() - origem, side='right') - 1
+        return float(taxas[max(posicao, 0)])
+
+    def _acumulado(self, indice, percentual, spread):
+        """Fator acumulado por dia desde a origem da série e os log-fatores por dia útil das pontas"""
+        chave = (indice, float(percentual), float(spread))
+        if chave not in self._acumulados:
+            origem, deslocamentos, taxas = self._series[indice]
+            dias = int(deslocamentos[-1]) + 1
+            # Mesma convenção de calcular_taxa_diaria: juros compostos em base 252
+            diaria = (1 + taxas / 100) ** (1 / 252) - 1
+            fator_util = (1 + percentual / 100 * diaria) * (1 + spread / 100) ** (1 / 252)
+            fator_por_dia = np.repeat(fator_util, np.diff(np.append(deslocamentos, dias)))
+            ordinais = np.arange(origem, origem + dias)
+            fator_por_dia[self._calendario.contar(ordinais, ordinais + 1) == 0] = 1.0
+            acumulado = np.concatenate(([1.0], np.cumprod(fator_por_dia)))
+            self._acumulados[chave] = (origem, acumulado, np.log(fator_util[0]), np.log(fator_util[-1]))
+        return self._acumulados[chave]
+
+    def fatores(self, indice, inicios, fins, percentual=100.0, spread=0.0):
+        """
+        Fator de valorização de cada início até o fim correspondente
+        
+        Args:
+            indice: 'cdi', 'selic' ou 'ipca'
+            inicios, fins: datas como ordinais (date.toordinal), arrays ou escalares
+            percentual: percentual do índice (ex.: 110 para 110% do CDI)
+            spread: taxa anual somada ao índice de forma composta (ex.: IPCA + 6%)
+        
+        Returns:
+            np.ndarray com acumulado(fim) / acumulado(início)
+        """
+        acumulado = self._acumulado(indice, percentual, spread)
+        return self._posicao(acumulado, np.asarray(fins, dtype=np.int64)) \
+            / self._posicao(acumulado, np.asarray(inicios, dtype=np.int64))
+
+    def _posicao(self, acumulado, ordinais):
+        # Dentro da série: gather; fora dela, a taxa da ponta composta pelos dias úteis excedentes
+        origem, acumulado, log_primeiro, log_ultimo = acumulado
+        ultimo = origem + len(acumulado) - 1
+        dentro = acumulado[np.clip(ordinais - origem, 0, len(acumulado) - 1)]
+        antes = np.exp(-self._calendario.contar(np.minimum(ordinais, origem), origem) * log_primeiro)
+        depois = np.exp(self._calendario.contar(ultimo, np.maximum(ordinais, ultimo)) * log_ultimo)
+        return dentro * antes * depois
+
+
+@lru_cache(maxsize=1)
+def historico_padrao():
+    """Histórico de Config.TAXAS_HISTORICAS_CSV (carregado uma vez por processo) ou
+    None, se não configurado ou ausente: aí valem as taxas constantes de constants.py
+    """
+    caminho = Config.TAXAS_HISTORICAS_CSV
+    if not caminho or not os.path.exists(caminho):
+        return None
+    historico = HistoricoTaxas.de_csv(caminho)
+    log.info('Histórico de taxas carregado', caminho=caminho, indices=','.join(historico.indices()))
+    return historico
@@ -0,0 +1,56 @@
+"""
+Fixtures compartilhadas pelos testes que usam o PostgreSQL
+
+banco pula o teste quando o PostgreSQL está indisponível. user_id cria um
+usuário descartável (nome = <prefixo>_<aleatório>, o prefixo é o nome do
+módulo sem "test_", ou o parâmetro em parametrize(..., indirect=True)) e o
+remove no fim com todos os seus dados, cartões inclusive. criar_usuario é a
+fábrica por trás dele, para testes que precisam de mais de um usuário.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+@pytest.fixture
+def banco():
+    try:
+        db.init_db()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+
+
+def _remover_usuario(uid):
+    # delete_user não remove cartões (e as faturas apontam para eles)
+    with db.get_conn() as conn:
+        conn.cursor().execute("DELETE FROM cartoes WHERE user_id = %s", (uid,))
+    db.delete_user(uid)
+
+
+@pytest.fixture
+def criar_usuario(banco):
+    """criar_usuario(prefixo='teste', senha='senha', is_admin=0, nome=None) -> id"""
+    criados = []
+
+    def criar(prefixo='teste', senha='senha', is_admin=0, nome=None):
+        uid = db.create_user(nome or f"{prefixo}_{uuid.uuid4().hex[:8]}", senha, is_admin=is_admin)
+        criados.append(uid)
+        return uid
+
+    try:
+        yield criar
+    finally:
+        for uid in reversed(criados):
+            _remover_usuario(uid)
+
+
+@pytest.fixture
+def user_id(request, criar_usuario):
+    prefixo = getattr(request, 'param', None) or request.module.__name__.rsplit('.', 1)[-1].removeprefix('test_')
+    return criar_usuario(prefixo)
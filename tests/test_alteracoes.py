@@ -0,0 +1,113 @@
+"""
+Testes do diff colunar das tabelas de extratos (utils.alteracoes) contra a
+regra escalar normalizar_linha aplicada linha a linha
+Execute com: python -m pytest tests/test_alteracoes.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.alteracoes import OPCIONAIS, diff_transacoes, normalizar_linha, normalizar_transacoes
+
+VALORES = {
+    'Valor': [10.0, 10, '10', '10,5', ' 7.25 ', '-', '', None, np.nan, 'abc', 3.0],
+    'Fixo': [1, 0, '1', 'Sim', ' não ', 'N', 1.0, None, np.nan, '', 'talvez'],
+    'Data': ['2024-01-05', '2024-02-29', '2024-02-30', '2024-01-05 10:00:00', '2024-1-5', '', '-', None, np.nan, 'x'],
+    'Categoria': ['Lazer', ' Casa ', 'Casa', '-', '', None, np.nan, 1.5],
+    'Descrição': ['tv', ' tv ', 'Tv', '', None, np.nan, '-', 7],
+    'Efetuado': [1, 0, 'Sim', 'Não', '1', None, np.nan, 'talvez'],
+    'Status': ['Pago', 'A vencer', 'Vencido', 'pago', '', None, np.nan],
+    'forma_pagamento': ['cartao', 'cartao', 'dinheiro', '-', '', None, np.nan, 'Cartao'],
+    'cartao_id': [3, '3', 3.0, '4', '', '-', None, np.nan, 'x', 0, '0'],
+}
+COLUNAS_TABELA = {
+    'receitas': ['Valor', 'Fixo', 'Data', 'Categoria', 'Descrição', 'Efetuado'],
+    'despesas': ['Valor', 'Fixo', 'Data', 'Categoria', 'Descrição', 'Status', 'forma_pagamento', 'cartao_id'],
+}
+
+
+def _linhas(table, rows, seed):
+    rng = np.random.default_rng(seed)
+    linhas = []
+    for i in range(rows):
+        linha = {'id': i + 1}
+        for coluna in COLUNAS_TABELA[table]:
+            pool = VALORES[coluna]
+            linha[coluna] = pool[rng.integers(len(pool))]
+        linhas.append(linha)
+    return linhas
+
+
+def _sem_nan(linha):
+    return {k: (None if not isinstance(v, str) and pd.isna(v) else v) for k, v in linha.items()}
+
+
+@pytest.mark.parametrize('table', ['receitas', 'despesas'])
+def test_normalizacao_colunar_equivale_a_linha(table):
+    linhas = _linhas(table, 3000, seed=1)
+    obtido = normalizar_transacoes(pd.DataFrame(linhas), table).to_dict('records')
+    for linha, normalizada in zip(linhas, obtido):
+        esperado = normalizar_linha(_sem_nan(linha))
+        # None nas opcionais = chave ausente na regra escalar
+        assert {k: v for k, v in normalizada.items() if v is not None or k not in OPCIONAIS} == \
+            {k: esperado.get(k) for k in normalizada if esperado.get(k) is not None or k not in OPCIONAIS}
+
+
+@pytest.mark.parametrize('table', ['receitas', 'despesas'])
+def test_changeset_equivale_ao_diff_por_linha(table):
+    originais = _linhas(table, 2000, seed=2)
+    editadas = _linhas(table, 2000, seed=3)
+    # Metade das linhas sem edição (mesmos valores, às vezes em outro formato)
+    for i in range(0, 2000, 2):
+        editadas[i] = dict(originais[i])
+        if originais[i]['Valor'] == 10.0:
+            editadas[i]['Valor'] = '10'
+
+    esperado = {}
+    for nova, antiga in zip(editadas, originais):
+        n, o = normalizar_linha(_sem_nan(nova)), normalizar_linha(_sem_nan(antiga))
+        mudancas = {k: v for k, v in n.items() if v != o.get(k)}
+        if mudancas:
+            esperado[nova['id']] = mudancas
+
+    # Originais como DataFrame (store), editadas como lista de dicts (DataTable)
+    changeset = diff_transacoes(editadas, pd.DataFrame(originais), table)
+    assert changeset['alteradas'] == esperado
+    assert list(changeset['alteradas']) == sorted(esperado)
+    assert changeset['inseridas'] == [] and changeset['removidas'] == []
+
+
+def test_inseridas_removidas_e_ids_invalidos():
+    originais = pd.DataFrame([
+        {'id': 1, 'Valor': 10.0, 'Fixo': 0, 'Data': '2024-01-05', 'Categoria': 'Casa', 'Descrição': 'luz', 'Efetuado': 1},
+        {'id': 2, 'Valor': 20.0, 'Fixo': 0, 'Data': '2024-01-06', 'Categoria': 'Casa', 'Descrição': 'água', 'Efetuado': 0},
+        {'id': 3, 'Valor': 30.0, 'Fixo': 1, 'Data': '2024-01-07', 'Categoria': 'Casa', 'Descrição': 'gás', 'Efetuado': 1},
+    ])
+    editadas = [
+        # Formatos da DataTable: Sim/Não, '-' para vazio, id em texto
+        {'id': '3', 'Valor': '30', 'Fixo': 'Sim', 'Data': '2024-01-07', 'Categoria': 'Casa', 'Descrição': 'gás', 'Efetuado': 'Sim'},
+        {'id': 1, 'Valor': 12.5, 'Fixo': 'Não', 'Data': '2024-01-05', 'Categoria': '-', 'Descrição': 'luz', 'Efetuado': 'talvez'},
+        {'id': 9, 'Valor': 1.0, 'Fixo': 'Não', 'Data': '2024-01-08', 'Categoria': 'x', 'Descrição': 'nova', 'Efetuado': 'Sim'},
+        {'id': '', 'Valor': 5.0},
+        {'Valor': 5.0},
+    ]
+    changeset = diff_transacoes(editadas, originais, 'receitas')
+    # Efetuado inválido fica de fora (não vira NULL); Categoria '-' vira NULL
+    assert changeset == {'alteradas': {1: {'Valor': 12.5, 'Categoria': None}}, 'inseridas': [9], 'removidas': [2]}
+    assert diff_transacoes([], [], 'despesas') == {'alteradas': {}, 'inseridas': [], 'removidas': []}
+
+
+def test_fatura_acompanha_cartao_e_data():
+    original = {'id': 1, 'Valor': 50.0, 'Fixo': 0, 'Data': '2024-01-20', 'Categoria': 'Lazer', 'Descrição': 'tv',
+                'Status': 'Pago', 'forma_pagamento': 'cartao', 'cartao_id': 3.0}
+    editada = dict(original, Data='2024-03-02', cartao_id='')
+    assert diff_transacoes([dict(original, Data='2024-03-02')], [original], 'despesas')['alteradas'] == \
+        {1: {'Data': '2024-03-02', 'fatura_mes': 3}}
+    # Sem cartão a fatura sai do payload e update_transacao limpa os campos
+    assert diff_transacoes([editada], [original], 'despesas')['alteradas'] == \
+        {1: {'Data': '2024-03-02', 'cartao_id': None}}
@@ -0,0 +1,59 @@
+"""
+Testes do calendário de dias úteis (calendario.CalendarioDiasUteis) contra a
+contagem dia a dia
+Execute com: python -m pytest tests/test_calendario.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendario import CalendarioDiasUteis, calendario_padrao
+
+FERIADOS = [date(2024, 1, 1), date(2024, 2, 12), date(2024, 2, 13), date(2024, 11, 20), date(2024, 12, 25)]
+CALENDARIO = CalendarioDiasUteis(FERIADOS, inicio=date(2023, 1, 1), fim=date(2026, 1, 1))
+
+
+def _dia_a_dia(inicio, fim):
+    sinal, (inicio, fim) = (1, (inicio, fim)) if inicio <= fim else (-1, (fim, inicio))
+    total, dia = 0, inicio
+    while dia < fim:
+        total += dia.weekday() < 5 and dia not in FERIADOS
+        dia += timedelta(days=1)
+    return sinal * total
+
+
+def test_equivale_a_contagem_dia_a_dia():
+    rng = np.random.default_rng(3)
+    base = date(2022, 6, 1).toordinal()  # parte dos pares cai fora do intervalo pré-calculado
+    inicios = base + rng.integers(0, 1500, 2000)
+    fins = inicios + rng.integers(-40, 400, 2000)
+    contagens = CALENDARIO.contar(inicios, fins)
+    esperado = [_dia_a_dia(date.fromordinal(int(i)), date.fromordinal(int(f))) for i, f in zip(inicios, fins)]
+    assert contagens.tolist() == esperado
+
+
+def test_datas_isoladas():
+    assert CALENDARIO.dias_uteis(date(2024, 2, 9), date(2024, 2, 15)) == 2   # sexta, Carnaval, quarta
+    assert CALENDARIO.dias_uteis(date(2024, 2, 15), date(2024, 2, 9)) == -2
+    assert CALENDARIO.dias_uteis(date(2030, 1, 7), date(2030, 1, 14)) == 5  # fora do intervalo
+    assert not CALENDARIO.eh_dia_util(date(2024, 11, 20))
+    assert CALENDARIO.eh_dia_util(date(2023, 11, 20))
+
+
+def test_calendario_padrao():
+    calendario = calendario_padrao()
+    assert calendario.dias_uteis(date(2025, 1, 1), date(2026, 1, 1)) == 252
+    assert not calendario.eh_dia_util(date(2025, 4, 18))  # Sexta-feira Santa
+    assert not calendario.eh_dia_util(date(2026, 6, 4))   # Corpus Christi
+
+
+def test_csv_sem_coluna_data(tmp_path):
+    caminho = tmp_path / 'feriados.csv'
+    caminho.write_text("dia,nome\n2024-01-01,Ano novo\n")
+    with pytest.raises(ValueError):
+        CalendarioDiasUteis.de_csv(caminho)
@@ -0,0 +1,246 @@
+"""
+Testes das cotações (quote_service, endpoints /api/investimentos/cotacao e
+/api/investimentos/cotacoes e o callback do aporte) contra um servidor HTTP
+local que imita as páginas do Status Invest (sem acesso à rede)
+Execute com: python -m pytest tests/test_cotacao.py
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from dash import html
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import db
+import quote_cache
+import quote_service
+import security
+from config import Config
+from security import rate_limiter
+
+PAGINA_NAO_ENCONTRADA = "<html><h1>OPS. . .</h1><p>Não encontramos o que você está procurando</p></html>"
+
+
+def _pagina_ativo(ticker, preco):
+    return (f'<html><head><title>{ticker} - Status Invest</title></head>'
+            f'<body><div data-code="{ticker}"><strong class="value">{preco}</strong></div></body></html>')
+
+
+# caminho -> (atraso em segundos, status, corpo)
+ROTAS = {
+    '/fundos-imobiliarios/petr4': (0.8, 200, PAGINA_NAO_ENCONTRADA),
+    '/acoes/petr4': (0.05, 200, _pagina_ativo('PETR4', '38,45')),
+    '/fundos-imobiliarios/mxrf11': (0.05, 200, _pagina_ativo('MXRF11', '9,87')),
+    '/acoes/mxrf11': (0.0, 404, 'not found'),
+    '/acoes/erro3': (0.0, 500, 'Internal Server Error'),
+}
+ATRASO_PADRAO = (0.8, 200, PAGINA_NAO_ENCONTRADA)
+
+
+TICKERS = ('PETR4', 'MXRF11', 'XXXX3', 'ERRO3')
+
+requisicoes = []
+
+
+class _StatusInvestFalso(BaseHTTPRequestHandler):
+    def do_GET(self):
+        requisicoes.append(self.path)
+        atraso, status, corpo = ROTAS.get(self.path, ATRASO_PADRAO)
+        time.sleep(atraso)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(corpo.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+def _esquecer_tickers():
+    try:
+        for ticker in TICKERS:
+            db.remover_categoria_ticker(ticker)
+    except Exception:
+        pass  # sem banco o endpoint só não usa o índice de tickers
+
+
+@pytest.fixture
+def client(monkeypatch):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _StatusInvestFalso)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(quote_service, 'STATUS_INVEST_BASE_URL', f"http://127.0.0.1:{servidor.server_address[1]}")
+    monkeypatch.setattr(Config, 'QUOTE_DEADLINE_SECONDS', 3.0)
+    quote_cache.clear()
+    requisicoes.clear()
+    _esquecer_tickers()
+    rate_limiter.reset('127.0.0.1')
+    if app_module.app.layout is None:  # o Dash recusa requisições sem layout (myindex não foi importado)
+        app_module.app.layout = html.Div()
+    try:
+        yield app_module.server.test_client()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def _consultar(client, ticker):
+    t0 = time.perf_counter()
+    resposta = client.get(f'/api/investimentos/cotacao?ticker={ticker}')
+    return resposta, time.perf_counter() - t0
+
+
+def test_primeira_pagina_valida_sem_esperar_as_lentas(client):
+    resposta, segundos = _consultar(client, 'petr4')
+    assert resposta.status_code == 200
+    assert resposta.get_json()['price'] == 38.45
+    assert resposta.get_json()['url'].endswith('/acoes/petr4')
+    # As outras cinco páginas levam 0,8 s cada; em sequência seriam 4 s
+    assert segundos < 0.6
+
+    resposta, _ = _consultar(client, 'MXRF11')
+    assert resposta.get_json()['price'] == 9.87
+
+
+def test_ticker_inexistente(client):
+    resposta, segundos = _consultar(client, 'XXXX3')
+    assert resposta.status_code == 404
+    assert segundos < 2.0  # as seis páginas em paralelo, não 6 x 0,8 s
+
+    # Cache negativo: a próxima consulta não vai ao Status Invest
+    requisicoes.clear()
+    resposta, _ = _consultar(client, 'XXXX3')
+    assert resposta.status_code == 404
+    assert requisicoes == []
+
+
+def test_falha_na_busca_nao_entra_no_cache(client, monkeypatch):
+    # Uma página com erro 500: o ticker pode existir nela, então não é 404
+    resposta, _ = _consultar(client, 'ERRO3')
+    assert resposta.status_code == 502
+    assert quote_cache.get('ERRO3') is None
+
+    # Status Invest fora do ar (porta sem servidor)
+    monkeypatch.setattr(quote_service, 'STATUS_INVEST_BASE_URL', 'http://127.0.0.1:9')
+    resposta, _ = _consultar(client, 'XXXX3')
+    assert resposta.status_code == 502
+    assert quote_cache.get('XXXX3') is None
+
+
+def test_prazo_total(client, monkeypatch):
+    monkeypatch.setattr(Config, 'QUOTE_DEADLINE_SECONDS', 0.3)
+    resposta, segundos = _consultar(client, 'XXXX3')
+    assert resposta.status_code == 504
+    assert segundos < 0.7
+
+
+def test_categoria_conhecida_busca_uma_pagina(client):
+    try:
+        db.init_db()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+    _consultar(client, 'PETR4')
+    assert db.get_categoria_ticker('PETR4') == 'acoes'
+
+    quote_cache.clear()
+    requisicoes.clear()
+    resposta, _ = _consultar(client, 'PETR4')
+    assert resposta.get_json()['price'] == 38.45
+    assert requisicoes == ['/acoes/petr4']
+
+    # Categoria desatualizada: volta às demais páginas e corrige o índice
+    db.salvar_categoria_ticker('MXRF11', 'acoes', 'x')
+    resposta, _ = _consultar(client, 'MXRF11')
+    assert resposta.get_json()['price'] == 9.87
+    assert db.get_categoria_ticker('MXRF11') == 'fundos-imobiliarios'
+
+    # Erro na página conhecida não apaga a categoria; a página "não
+    # encontramos" apaga
+    db.salvar_categoria_ticker('ERRO3', 'acoes', 'x')
+    assert _consultar(client, 'ERRO3')[0].status_code == 502
+    assert db.get_categoria_ticker('ERRO3') == 'acoes'
+    db.salvar_categoria_ticker('XXXX3', 'acoes', 'x')
+    assert _consultar(client, 'XXXX3')[0].status_code == 404
+    assert db.get_categoria_ticker('XXXX3') is None
+    _esquecer_tickers()
+
+
+def test_lote(client):
+    quote_cache.put('VALE3', {'ticker': 'VALE3', 'price': 61.2, 'currency': 'BRL'})
+    resposta = client.post('/api/investimentos/cotacoes', json={'tickers': ['petr4', ' PETR4', 'MXRF11', 'XXXX3', 'vale3']})
+    assert resposta.status_code == 200
+    resultados = resposta.get_json()['results']
+    assert set(resultados) == {'PETR4', 'MXRF11', 'XXXX3', 'VALE3'}
+    assert (resultados['PETR4']['status'], resultados['PETR4']['price']) == (200, 38.45)
+    assert (resultados['MXRF11']['status'], resultados['MXRF11']['price']) == (200, 9.87)
+    assert resultados['XXXX3']['status'] == 404
+    assert resultados['VALE3']['price'] == 61.2          # do cache, sem buscar
+    assert not any('vale3' in caminho for caminho in requisicoes)
+    assert requisicoes.count('/acoes/petr4') == 1        # tickers repetidos: uma busca
+
+    resposta = client.get('/api/investimentos/cotacoes?tickers=PETR4,MXRF11')
+    assert {t: r['status'] for t, r in resposta.get_json()['results'].items()} == {'PETR4': 200, 'MXRF11': 200}
+
+
+def test_lote_invalido(client, monkeypatch):
+    assert client.get('/api/investimentos/cotacoes').status_code == 400
+    assert client.post('/api/investimentos/cotacoes', json={'tickers': 'PETR4'}).status_code == 400
+    monkeypatch.setattr(Config, 'QUOTE_BATCH_MAX_TICKERS', 2)
+    assert client.get('/api/investimentos/cotacoes?tickers=A,B,C').status_code == 400
+
+
+def test_lote_limite_por_ip(client, monkeypatch):
+    monkeypatch.setattr(security.Config, 'RATE_LIMIT_ENABLED', True)
+    limite = Config.QUOTE_BATCH_RATE_LIMIT_PER_MINUTE
+    status = []
+    try:
+        for _ in range(limite + 1):
+            status.append(client.get('/api/investimentos/cotacoes').status_code)
+            # Chamadas a outro endpoint com limite não zeram o contador do lote
+            client.get('/admin/metricas/callbacks')
+            rate_limiter.reset('127.0.0.1', 'api_metricas_callbacks')
+    finally:
+        rate_limiter.reset('127.0.0.1')
+    assert status == [400] * limite + [429]
+
+
+def test_lotes_simultaneos_dividem_o_pool(monkeypatch):
+    # Dois lotes ao mesmo tempo: no processo, no máximo QUOTE_BATCH_CONCURRENCY buscas
+    quote_cache.clear()
+    em_andamento = {'agora': 0, 'maximo': 0}
+    lock = threading.Lock()
+
+    def busca_lenta(ticker, deadline_seconds=None):
+        with lock:
+            em_andamento['agora'] += 1
+            em_andamento['maximo'] = max(em_andamento['maximo'], em_andamento['agora'])
+        time.sleep(0.05)
+        with lock:
+            em_andamento['agora'] -= 1
+        return 200, {'ticker': ticker}
+
+    monkeypatch.setattr(quote_service, '_fetch_quote', busca_lenta)
+    resultados = []
+    lotes = [threading.Thread(target=lambda p=prefixo: resultados.append(
+                 quote_service.get_quotes([f'{p}{i}' for i in range(6)])))
+             for prefixo in ('LOTEA', 'LOTEB')]
+    for lote in lotes:
+        lote.start()
+    for lote in lotes:
+        lote.join()
+    assert sorted(len(r) for r in resultados) == [6, 6]
+    assert em_andamento['maximo'] <= Config.QUOTE_BATCH_CONCURRENCY
+
+
+def test_callback_do_aporte_sem_requisicao_http_ao_app(client):
+    from components.planos import buscar_cotacao_aporte
+    preco, mensagem = buscar_cotacao_aporte(1, ' petr4 ')
+    assert preco == 38.45
+    assert 'PETR4' in mensagem
+    _, mensagem = buscar_cotacao_aporte(1, 'XXXX3')
+    assert 'não encontrado' in mensagem
@@ -0,0 +1,93 @@
+"""
+Testes do modelo derivado do dashboard (dashboard_model)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_dashboard_model.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import data_access
+import dashboard_model
+
+RECEITAS = [
+    {'Valor': 1000.0, 'Efetuado': 1, 'Data': '2024-01-05', 'Categoria': 'Salário', 'plano_id': None},
+    {'Valor': 200.0, 'Efetuado': 0, 'Data': '2024-01-10', 'Categoria': 'Extra', 'plano_id': None},
+    {'Valor': 300.0, 'Efetuado': 1, 'Data': '2024-01-15', 'Categoria': 'Extra', 'plano_id': 7},
+    {'Valor': 50.0, 'Efetuado': 'sim', 'Data': '2024-02-01', 'Categoria': 'Extra', 'plano_id': None},
+]
+DESPESAS = [
+    {'Valor': 100.0, 'Status': 'Pago', 'Data': '2024-01-03', 'Categoria': 'Casa', 'forma_pagamento': 'dinheiro', 'eh_fatura': 0},
+    {'Valor': 40.0, 'Status': 'pago', 'Data': '2024-01-04', 'Categoria': 'Lazer', 'forma_pagamento': 'cartao', 'eh_fatura': 0},
+    {'Valor': 400.0, 'Status': 'Pago', 'Data': '2024-01-20', 'Categoria': 'Cartão', 'forma_pagamento': 'cartao', 'eh_fatura': 1},
+    {'Valor': 25.0, 'Status': 'A vencer', 'Data': '2024-01-25', 'Categoria': 'Casa', 'forma_pagamento': 'dinheiro', 'eh_fatura': 0},
+    {'Valor': 10.0, 'Status': None, 'Data': '2024-02-02', 'Categoria': 'Lazer', 'forma_pagamento': 'pix', 'eh_fatura': 0},
+]
+
+
+def test_regras_de_saldo():
+    model = dashboard_model.get_model(DESPESAS, RECEITAS)
+
+    # 1000 + 50 efetivadas sem plano; 100 em dinheiro + 400 de fatura pagas
+    assert model.saldo_transacoes() == pytest.approx(1050.0 - 500.0)
+
+    categorias, valor = model.resumo_receitas('2024-01-01', '2024-01-31')
+    assert categorias == ['Salário'] and valor == pytest.approx(1000.0)
+
+    categorias, total, abertas = model.resumo_despesas('2024-01-01', '2024-01-31')
+    assert categorias == ['Casa', 'Lazer', 'Cartão']
+    assert total == pytest.approx(565.0) and abertas == pytest.approx(25.0)
+
+    assert model.gastos_por_categoria(1, 2024) == {'Cartão': 400.0, 'Casa': 125.0, 'Lazer': 40.0}
+    assert model.pizza('despesas', ['Lazer'])['Valor'].tolist() == [10.0]
+    assert model.serie_receitas([])['Acumulo'].tolist() == [1000.0, 1050.0]
+
+
+def test_recortes_sao_memoizados():
+    model = dashboard_model.get_model(DESPESAS, RECEITAS)
+    antes = dashboard_model.model_info()
+
+    primeiro = model.barras('2024-01-01', '2024-01-31', ['Salário'], ['Casa'])
+    segundo = model.barras('2024-01-01', '2024-01-31', ['Salário'], ['Casa'])
+
+    depois = dashboard_model.model_info()
+    assert segundo is primeiro
+    assert depois['derived_builds'] == antes['derived_builds'] + 1
+    assert depois['derived_hits'] == antes['derived_hits'] + 1
+    assert sorted(primeiro['Valor'].tolist()) == [25.0, 1000.0]
+
+
+@pytest.fixture
+def user_id(user_id):
+    data_access.invalidate_user()
+    dashboard_model.invalidate_models()
+    yield user_id
+    data_access.invalidate_user()
+    dashboard_model.invalidate_models()
+
+
+def test_modelo_construido_uma_vez_por_versao(user_id):
+    db.insert_transacao('receitas', 100.0, 1, 0, '2024-01-10', 'Salário', 'jan', user_id)
+    db.insert_transacao('despesas', 30.0, 'Pago', 0, '2024-01-11', 'Casa', 'luz', user_id)
+    dados = data_access.load_user_data(user_id, atualizar_vencidos=False)
+
+    antes = dashboard_model.model_info()
+    # Uma atualização do dashboard: os callbacks pedem o modelo várias vezes
+    modelos = [dashboard_model.get_model(dados['despesas'], dados['receitas']) for _ in range(8)]
+    depois = dashboard_model.model_info()
+
+    assert all(m is modelos[0] for m in modelos)
+    assert depois['builds'] == antes['builds'] + 1
+    assert depois['hits'] == antes['hits'] + 7
+    assert modelos[0].saldo_transacoes() == pytest.approx(70.0)
+
+    # Escrita gera nova versão e novo modelo; o antigo sai do cache
+    db.insert_transacao('receitas', 5.0, 1, 0, '2024-01-12', 'Extra', 'pix', user_id)
+    dados = data_access.load_user_data(user_id, atualizar_vencidos=False)
+    novo = dashboard_model.get_model(dados['despesas'], dados['receitas'])
+    assert novo is not modelos[0]
+    assert novo.saldo_transacoes() == pytest.approx(75.0)
+    assert dashboard_model.model_info()['entries'] == 1
@@ -0,0 +1,68 @@
+"""
+Testes do cache de receitas/despesas por (user_id, data_version)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_data_access.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import data_access
+
+
+@pytest.fixture
+def user_id(user_id):
+    data_access.invalidate_user()
+    yield user_id
+    data_access.invalidate_user()
+
+
+def test_store_guarda_apenas_token(user_id):
+    db.insert_transacao('receitas', 100.0, 1, 0, '2024-01-10', 'Salário', 'jan', user_id)
+    dados = data_access.load_user_data(user_id, atualizar_vencidos=False)
+
+    token = dados['receitas']
+    assert data_access.is_token(token)
+    assert token['user_id'] == user_id
+
+    df = data_access.resolve_frame(token, 'receitas')
+    assert df['Valor'].tolist() == [100.0]
+    assert 'id' in df.columns
+
+
+def test_resolve_usa_cache_e_devolve_copia(user_id):
+    db.insert_transacao('despesas', 50.0, 'A vencer', 0, '2024-01-10', 'Casa', 'luz', user_id)
+    token = data_access.load_user_data(user_id, atualizar_vencidos=False)['despesas']
+
+    df = data_access.resolve_frame(token, 'despesas')
+    df['Valor'] = 0
+    loads = data_access.cache_info()['loads']
+
+    df2 = data_access.resolve_frame(token, 'despesas')
+    assert data_access.cache_info()['loads'] == loads
+    assert df2['Valor'].tolist() == [50.0]
+
+
+def test_escrita_invalida_cache(user_id):
+    db.insert_transacao('despesas', 50.0, 'A vencer', 0, '2024-01-10', 'Casa', 'luz', user_id)
+    token = data_access.load_user_data(user_id, atualizar_vencidos=False)['despesas']
+    df = data_access.resolve_frame(token, 'despesas')
+    rid = int(df['id'].iloc[0])
+
+    db.update_transacao('despesas', rid, {'Valor': 75.0}, user_id)
+    novo_token = data_access.load_user_data(user_id, atualizar_vencidos=False)['despesas']
+    assert novo_token['version'] > token['version']
+    assert data_access.resolve_frame(novo_token, 'despesas')['Valor'].tolist() == [75.0]
+
+    # Token antigo (ex.: outra aba) também enxerga a versão atual
+    db.delete_transacao('despesas', rid, user_id)
+    assert data_access.resolve_frame(token, 'despesas').empty
+
+
+def test_resolve_aceita_registros():
+    df = data_access.resolve_frame([{'Valor': 1.0, 'Categoria': 'X'}])
+    assert df['Valor'].tolist() == [1.0]
+    assert data_access.resolve_frame({}).empty
@@ -0,0 +1,104 @@
+"""
+Testes do pool de conexões compartilhado (db.get_engine / connect_db / get_conn)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_db_pool.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+def _backend_pid(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT pg_backend_pid()")
+    return cur.fetchone()[0]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def _requer_postgres():
+    try:
+        with db.get_conn() as conn:
+            _backend_pid(conn)
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+
+
+def test_connect_db_reutiliza_conexao_do_pool():
+    conn = db.connect_db()
+    pid = _backend_pid(conn)
+    conn.close()
+
+    conn = db.connect_db()
+    try:
+        assert _backend_pid(conn) == pid
+    finally:
+        conn.close()
+
+
+def test_engine_e_helpers_compartilham_o_pool():
+    pool = db.get_engine().pool
+    with db.get_conn():
+        assert pool.checkedout() >= 1
+    assert pool.checkedout() == 0
+
+
+def test_get_conn_commit_e_rollback():
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("CREATE TABLE IF NOT EXISTS _pool_test (v INTEGER)")
+        cur.execute("DELETE FROM _pool_test")
+
+    with db.get_conn() as conn:
+        conn.cursor().execute("INSERT INTO _pool_test (v) VALUES (1)")
+
+    with pytest.raises(RuntimeError):
+        with db.get_conn() as conn:
+            conn.cursor().execute("INSERT INTO _pool_test (v) VALUES (2)")
+            raise RuntimeError("falha simulada")
+
+    try:
+        with db.get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT v FROM _pool_test ORDER BY v")
+            assert [r[0] for r in cur.fetchall()] == [1]
+    finally:
+        with db.get_conn() as conn:
+            conn.cursor().execute("DROP TABLE IF EXISTS _pool_test")
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="fork indisponível")
+def test_worker_apos_fork_nao_reutiliza_conexao_do_pai():
+    conn = db.connect_db()
+    pid_pai = _backend_pid(conn)
+    conn.close()
+
+    r, w = os.pipe()
+    child = os.fork()
+    if child == 0:
+        status = 1
+        try:
+            os.close(r)
+            c = db.connect_db()
+            os.write(w, str(_backend_pid(c)).encode())
+            c.close()
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(w)
+    pid_filho = int(os.read(r, 32).decode() or 0)
+    os.close(r)
+    _, status = os.waitpid(child, 0)
+    assert status == 0
+    assert pid_filho and pid_filho != pid_pai
+
+    # A conexão do pai continua utilizável após o fork
+    conn = db.connect_db()
+    try:
+        assert _backend_pid(conn) == pid_pai
+    finally:
+        conn.close()
@@ -0,0 +1,176 @@
+"""
+Testes da paginação no servidor dos extratos (db.get_pagina_transacoes,
+utils.filtros_tabela e os callbacks das DataTables)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_extratos.py
+"""
+import os
+import sys
+
+import dash
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from utils.filtros_tabela import parse_filter_query
+
+
+@pytest.fixture
+def user_id(user_id):
+    with db.get_conn() as conn:
+        # 53 receitas com valores e datas repetidos (desempate por id) e algumas sem Data
+        conn.cursor().execute("""
+            INSERT INTO receitas (Valor, Efetuado, Fixo, Data, Categoria, Descrição, user_id)
+            SELECT (g %% 7) * 10.5, g %% 2, 0,
+                   CASE WHEN g %% 11 = 0 THEN NULL ELSE DATE '2024-01-01' + (g %% 5) END,
+                   'Cat' || (g %% 3), 'receita ' || g, %s
+            FROM generate_series(1, 53) AS g
+        """, (user_id,))
+    return user_id
+
+
+def test_parse_filter_query():
+    assert parse_filter_query('{Valor} >= 10 && {Categoria} icontains Lazer') == [
+        ('Valor', '>=', '10'), ('Categoria', 'contains', 'Lazer')]
+    assert parse_filter_query('{Descrição} contains "a && b" && {Fixo} = Sim') == [
+        ('Descrição', 'contains', 'a && b'), ('Fixo', '=', 'Sim')]
+    assert parse_filter_query(r'{Descrição} contains "diz \"oi\""') == [('Descrição', 'contains', 'diz "oi"')]
+    assert parse_filter_query('{Data} datestartswith 2024-01 && {Status} s= "A vencer"') == [
+        ('Data', 'datestartswith', '2024-01'), ('Status', '=', 'A vencer')]
+    assert parse_filter_query('{Fixo} eq Sim && lixo') == [('Fixo', '=', 'Sim')]
+    assert parse_filter_query('') == [] and parse_filter_query(None) == []
+
+
+@pytest.mark.parametrize('ordenacao', [None, ('Data', 'desc'), ('Valor', 'desc'), ('Categoria', 'asc'), ('id', 'asc')])
+def test_keyset_percorre_as_mesmas_linhas_do_offset(user_id, ordenacao):
+    por_keyset, cursor = [], None
+    for pagina in range(6):
+        resultado = db.get_pagina_transacoes('receitas', user_id, 10, ordenacao=ordenacao, cursor=cursor, pagina=pagina)
+        assert resultado['total'] == 53
+        por_keyset += [linha['id'] for linha in resultado['linhas']]
+        cursor = resultado['cursor']
+
+    por_offset = []
+    for pagina in range(6):
+        por_offset += [linha['id'] for linha in
+                       db.get_pagina_transacoes('receitas', user_id, 10, ordenacao=ordenacao, pagina=pagina)['linhas']]
+    assert por_keyset == por_offset
+    assert len(set(por_keyset)) == 53
+
+
+def test_filtros_e_periodo_no_banco(user_id):
+    todas = db.get_pagina_transacoes('receitas', user_id, 100)['linhas']
+    assert [linha['Data'] for linha in todas][-4:] == [None] * 4   # sem Data ficam no fim
+
+    filtros = [('Valor', '>=', '31,5'), ('Categoria', 'contains', 'cat1'), ('Data', 'datestartswith', '2024-01-0'),
+               ('Valor', '=', 'abc'), ('coluna_inexistente', '=', '1')]   # os dois últimos são ignorados
+    resultado = db.get_pagina_transacoes('receitas', user_id, 100, filtros=filtros)
+    esperado = [linha for linha in todas if linha['Valor'] >= 31.5 and linha['Categoria'] == 'Cat1'
+                and (linha['Data'] or '').startswith('2024-01-0')]
+    assert resultado['linhas'] == esperado and resultado['total'] == len(esperado) > 0
+
+    # Curingas do LIKE no valor do filtro são literais
+    assert db.get_pagina_transacoes('receitas', user_id, 100, filtros=[('Descrição', 'contains', '%')])['total'] == 0
+
+    periodo = db.get_pagina_transacoes('receitas', user_id, 100, data_inicio='2024-01-02', data_fim='2024-01-03')
+    assert {linha['Data'] for linha in periodo['linhas']} == {'2024-01-02', '2024-01-03'}
+
+
+def test_callback_entrega_so_a_pagina(user_id):
+    from components import extratos
+
+    usuario = {'id': user_id}
+    dados, page_count, _, cursores = extratos.atualizar_dados_receitas(
+        {}, None, None, 0, 10, [{'column_id': 'Valor', 'direction': 'desc'}], '{Efetuado} s= Sim', usuario, {})
+    assert len(dados) == 10 and page_count == 3   # 27 receitas efetuadas
+    assert {linha['Efetuado'] for linha in dados} == {'Sim'}
+    assert set(cursores['paginas']) == {'1'}
+
+    # Página seguinte pelo cursor guardado = mesma página por OFFSET
+    seguinte, _, _, cursores = extratos.atualizar_dados_receitas(
+        {}, None, None, 1, 10, [{'column_id': 'Valor', 'direction': 'desc'}], '{Efetuado} s= Sim', usuario, cursores)
+    por_offset = db.get_pagina_transacoes('receitas', user_id, 10, filtros=[('Efetuado', '=', 1)],
+                                          ordenacao=('Valor', 'desc'), pagina=1)['linhas']
+    assert [linha['id'] for linha in seguinte] == [linha['id'] for linha in por_offset]
+    assert set(cursores['paginas']) == {'1', '2'}
+
+    # Mesma versão dos dados: o total guardado é reaproveitado (sem COUNT)
+    token = {'table': 'receitas', 'user_id': user_id, 'version': db.get_user_data_version(user_id)}
+    _, _, _, cursores = extratos.atualizar_dados_receitas(
+        token, None, None, 1, 10, [{'column_id': 'Valor', 'direction': 'desc'}], '{Efetuado} s= Sim', usuario, cursores)
+    cursores['total'] = 99
+    _, page_count, _, _ = extratos.atualizar_dados_receitas(
+        token, None, None, 0, 10, [{'column_id': 'Valor', 'direction': 'desc'}], '{Efetuado} s= Sim', usuario, cursores)
+    assert page_count == 10
+    _, page_count, _, cursores = extratos.atualizar_dados_receitas(
+        {**token, 'version': token['version'] + 1}, None, None, 0, 10,
+        [{'column_id': 'Valor', 'direction': 'desc'}], '{Efetuado} s= Sim', usuario, cursores)
+    assert page_count == 3
+
+    # Outro filtro descarta os cursores
+    _, page_count, _, cursores = extratos.atualizar_dados_receitas(
+        {}, None, None, 0, 10, [], '{Fixo} = Não', usuario, cursores)
+    assert page_count == 6 and set(cursores['paginas']) == {'1'}
+
+
+def test_callback_volta_a_primeira_pagina_e_limita_a_ultima(user_id):
+    from components import extratos
+
+    usuario = {'id': user_id}
+    token = {'table': 'receitas', 'user_id': user_id, 'version': db.get_user_data_version(user_id)}
+    cursores = {}
+    for pagina in range(6):
+        dados, page_count, pagina_entregue, cursores = extratos.atualizar_dados_receitas(
+            token, None, None, pagina, 10, [], '', usuario, cursores)
+    assert (page_count, pagina_entregue) == (6, dash.no_update) and len(dados) == 3
+
+    # Na página 6, um filtro que cabe em uma página leva de volta à primeira
+    dados, page_count, pagina_entregue, cursores = extratos.atualizar_dados_receitas(
+        token, None, None, 5, 10, [], '{Categoria} s= Cat0 && {Efetuado} s= Sim', usuario, cursores)
+    assert (page_count, pagina_entregue) == (1, 0) and len(dados) > 0
+
+    # Exclusões que encolhem o total: a página pedida passa da última
+    cursores = {}
+    for pagina in range(6):
+        *_, cursores = extratos.atualizar_dados_receitas(token, None, None, pagina, 10, [], '', usuario, cursores)
+    with db.get_conn() as conn:
+        conn.cursor().execute(
+            "DELETE FROM receitas WHERE id IN (SELECT id FROM receitas WHERE user_id = %s ORDER BY id LIMIT 20)",
+            (user_id,))
+    token = {**token, 'version': db.get_user_data_version(user_id)}
+    dados, page_count, pagina_entregue, cursores = extratos.atualizar_dados_receitas(
+        token, None, None, 5, 10, [], '', usuario, cursores)
+    assert (page_count, pagina_entregue) == (4, 3) and len(dados) == 3
+
+    # Nova versão dos dados: os cursores das páginas visitadas são descartados
+    # (a página 2 lida de novo bate com o OFFSET sobre os dados atuais)
+    assert set(cursores['paginas']) == {'4'}
+    dados, *_ = extratos.atualizar_dados_receitas(token, None, None, 2, 10, [], '', usuario, cursores)
+    por_offset = db.get_pagina_transacoes('receitas', user_id, 10, pagina=2)['linhas']
+    assert [linha['id'] for linha in dados] == [linha['id'] for linha in por_offset]
+
+
+def test_salvar_grava_so_o_changeset_da_pagina(user_id):
+    from components import extratos
+
+    usuario = {'id': user_id}
+    token = {'table': 'receitas', 'user_id': user_id, 'version': db.get_user_data_version(user_id)}
+    dados, _, _, cursores = extratos.atualizar_dados_receitas(token, None, None, 0, 10, [], '', usuario, {})
+    assert cursores['ids'] == [linha['id'] for linha in dados]
+
+    # Edita uma célula, remove uma linha (X) e deixa o resto como a DataTable entregou
+    editada, removida = dados[0]['id'], dados[1]['id']
+    dados[0]['Descrição'] = 'editada'
+    pagina = [dados[0]] + dados[2:]
+    _, _, deleted = extratos.sync_receitas(1, pagina, [removida], token, usuario, 0, cursores)
+    assert deleted == []
+
+    registros = {linha['id']: linha for linha in db.get_pagina_transacoes('receitas', user_id, 100)['linhas']}
+    assert removida not in registros and len(registros) == 52
+    assert registros[editada]['Descrição'] == 'editada'
+
+    # Página reenviada sem mudanças: nada é gravado
+    token = {**token, 'version': db.get_user_data_version(user_id)}
+    dados, _, _, cursores = extratos.atualizar_dados_receitas(token, None, None, 0, 10, [], '', usuario, {})
+    _, mensagem, deleted = extratos.sync_receitas(1, dados, [], token, usuario, 0, cursores)
+    assert deleted is dash.no_update and 'Nenhuma alteração' in str(mensagem.children)
@@ -0,0 +1,216 @@
+"""
+Testes do recálculo de faturas em lote (db.atualizar_todas_faturas) contra o
+caminho por período (db.gerar_fatura_cartao)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_faturas.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+def _compra(cur, user_id, cartao_id, valor, status, mes, ano, eh_fatura=0):
+    cur.execute(
+        """INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id,
+               forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+           VALUES (%s, %s, 0, %s, 'Lazer', 'compra', %s, 'cartao', %s, %s, %s, %s)""",
+        (valor, status, f"{ano}-{mes:02d}-10", user_id, cartao_id, mes, ano, eh_fatura)
+    )
+
+
+def _faturas_antigas(user_id, nubank):
+    """Faturas já gravadas: uma desatualizada e uma de período sem compras pagas"""
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM despesas WHERE user_id = %s AND eh_fatura = 1", (user_id,))
+        for valor, mes in ((1.0, 1), (99.0, 3)):
+            cur.execute(
+                """INSERT INTO despesas (Valor, Status, Fixo, Data, Categoria, Descrição, user_id,
+                       forma_pagamento, cartao_id, fatura_mes, fatura_ano, eh_fatura)
+                   VALUES (%s, 'A vencer', 0, '2024-01-01', 'x', 'x', %s, 'dinheiro', %s, %s, 2024, 1)""",
+                (valor, user_id, nubank, mes)
+            )
+
+
+def _faturas(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """SELECT cartao_id, fatura_mes, fatura_ano, Valor, Data, Categoria, Descrição, Status
+               FROM despesas WHERE user_id = %s AND eh_fatura = 1
+               ORDER BY cartao_id, fatura_ano, fatura_mes""",
+            (user_id,)
+        )
+        return cur.fetchall()
+
+
+def test_lote_equivale_ao_caminho_por_periodo(user_id):
+    nubank = db.create_cartao('Nubank', user_id, dia_vencimento=31)
+    inter = db.create_cartao('Inter', user_id, dia_vencimento=5)
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        _compra(cur, user_id, nubank, 100.0, 'Pago', 1, 2024)
+        _compra(cur, user_id, nubank, 50.25, 'Pago', 1, 2024)
+        _compra(cur, user_id, nubank, 70.0, 'A vencer', 1, 2024)
+        _compra(cur, user_id, nubank, 30.0, 'A vencer', 3, 2024)   # só compras não pagas
+        _compra(cur, user_id, nubank, 10.0, 'Pago', 12, 2024)      # vence em janeiro/2025
+        _compra(cur, user_id, inter, 20.0, 'Pago', 1, 2024)        # vence em 05/02 (fevereiro limita o dia 31)
+
+    _faturas_antigas(user_id, nubank)
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT DISTINCT cartao_id, fatura_mes, fatura_ano FROM despesas
+                       WHERE user_id = %s AND cartao_id IS NOT NULL AND eh_fatura = 0""", (user_id,))
+        periodos = cur.fetchall()
+    for cartao_id, mes, ano in periodos:
+        db.gerar_fatura_cartao(user_id, cartao_id, mes, ano)
+    esperado = _faturas(user_id)
+
+    _faturas_antigas(user_id, nubank)
+    resultado = db.atualizar_todas_faturas(user_id)
+    assert resultado == {'removidas': 1, 'atualizadas': 1, 'criadas': 2}
+    assert _faturas(user_id) == esperado
+
+    datas = {(c, m): str(d) for c, m, _, _, d, _, _, _ in esperado}
+    assert datas[(nubank, 1)] == '2024-02-29'
+    assert datas[(nubank, 12)] == '2025-01-31'
+    assert datas[(inter, 1)] == '2024-02-05'
+
+    # Idempotente: rodar de novo só reescreve os mesmos valores
+    assert db.atualizar_todas_faturas(user_id) == {'removidas': 0, 'atualizadas': 3, 'criadas': 0}
+    assert _faturas(user_id) == esperado
+
+
+def _valores(user_id):
+    return {(c, m, a): v for c, m, a, v, *_ in _faturas(user_id)}
+
+
+def test_compras_com_eh_fatura_nulo(user_id):
+    # Linhas antigas, de antes da coluna eh_fatura ter padrão, contam como compra
+    nubank = db.create_cartao('Nubank', user_id, dia_vencimento=10)
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        _compra(cur, user_id, nubank, 40.0, 'Pago', 2, 2024, eh_fatura=None)     # período só com nulos
+        _compra(cur, user_id, nubank, 10.0, 'Pago', 4, 2024, eh_fatura=None)
+        _compra(cur, user_id, nubank, 5.5, 'Pago', 4, 2024)
+        _compra(cur, user_id, nubank, 7.0, 'A vencer', 6, 2024, eh_fatura=None)  # nada pago
+
+    for mes in (2, 4, 6):
+        db.gerar_fatura_cartao(user_id, nubank, mes, 2024)
+    esperado = _faturas(user_id)
+    assert _valores(user_id) == {(nubank, 2, 2024): 40.0, (nubank, 4, 2024): 15.5}
+
+    with db.get_conn() as conn:
+        conn.cursor().execute("DELETE FROM despesas WHERE user_id = %s AND eh_fatura = 1", (user_id,))
+    assert db.atualizar_todas_faturas(user_id) == {'removidas': 0, 'atualizadas': 0, 'criadas': 2}
+    assert _faturas(user_id) == esperado
+
+
+def test_escritas_ajustam_fatura_por_delta(user_id):
+    nubank = db.create_cartao('Nubank', user_id, dia_vencimento=10)
+    inter = db.create_cartao('Inter', user_id, dia_vencimento=10)
+
+    db.insert_despesa_com_cartao(100.0, 'Pago', 0, '2024-01-05', 'Lazer', 'tv', user_id,
+                                 'cartao', nubank, 1, 2024)
+    db.insert_despesa_parcelada(50.0, 'Pago', 1, '2024-01-15', 'Casa', 'sofá', user_id, 3,
+                                forma_pagamento='cartao', cartao_id=nubank, fatura_mes=1, fatura_ano=2024)
+    assert _valores(user_id) == {(nubank, 1, 2024): 150.0, (nubank, 2, 2024): 50.0, (nubank, 3, 2024): 50.0}
+
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM despesas WHERE user_id = %s AND Descrição = 'tv'", (user_id,))
+        tv = cur.fetchone()[0]
+        cur.execute("SELECT id FROM despesas WHERE user_id = %s AND Descrição LIKE 'sofá - Parcela 2%%'", (user_id,))
+        parcela = cur.fetchone()[0]
+
+    db.update_transacao('despesas', tv, {'Valor': 120.0}, user_id)
+    assert _valores(user_id)[(nubank, 1, 2024)] == 170.0
+
+    # Troca de cartão: sai de uma fatura e entra na outra (período pela Data gravada)
+    db.update_transacao('despesas', tv, {'cartao_id': inter}, user_id)
+    assert _valores(user_id)[(nubank, 1, 2024)] == 50.0
+    assert _valores(user_id)[(inter, 1, 2024)] == 120.0
+
+    db.update_transacao('despesas', tv, {'Status': 'A vencer'}, user_id)
+    assert (inter, 1, 2024) not in _valores(user_id)
+
+    db.delete_transacao('despesas', parcela, user_id)
+    esperado = {(nubank, 1, 2024): 50.0, (nubank, 3, 2024): 50.0}
+    assert _valores(user_id) == esperado
+
+    # Os deltas deixam as faturas iguais ao recálculo completo
+    assert db.atualizar_todas_faturas(user_id) == {'removidas': 0, 'atualizadas': 2, 'criadas': 0}
+    assert _valores(user_id) == esperado
+
+
+def _despesas(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT Descrição, Valor, Status, Fixo, Data, Categoria, forma_pagamento,
+                              cartao_id IS NOT NULL, fatura_mes, fatura_ano
+                       FROM despesas WHERE user_id = %s AND eh_fatura = 0 ORDER BY Descrição""", (user_id,))
+        return cur.fetchall()
+
+
+def _seed_lote(user_id):
+    """Despesas no cartão em dois meses e uma em dinheiro; retorna ids por descrição"""
+    nubank = db.create_cartao('Nubank', user_id, dia_vencimento=10)
+    inter = db.create_cartao('Inter', user_id, dia_vencimento=10)
+    for valor, data, descricao in ((100.0, '2024-01-05', 'tv'), (40.0, '2024-01-20', 'livro'),
+                                   (60.0, '2024-02-03', 'fone')):
+        db.insert_despesa_com_cartao(valor, 'Pago', 0, data, 'Lazer', descricao, user_id, 'cartao', nubank, *map(int, data.split('-')[1::-1]))
+    db.insert_transacao('despesas', 30.0, 'A vencer', 0, '2024-01-10', 'Casa', 'luz', user_id)
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT Descrição, id FROM despesas WHERE user_id = %s AND eh_fatura = 0", (user_id,))
+        return dict(cur.fetchall()), nubank, inter
+
+
+@pytest.fixture
+def outro_user_id(criar_usuario):
+    return criar_usuario('faturas')
+
+
+def test_lote_equivale_a_update_transacao_linha_a_linha(user_id, outro_user_id):
+    def alteracoes(ids, inter):
+        return [
+            (ids['tv'], {'Valor': 120.0, 'Descrição': 'tv'}),
+            (ids['livro'], {'Status': 'A vencer'}),                               # sai da fatura
+            (ids['fone'], {'forma_pagamento': 'cartao', 'cartao_id': str(inter)}),  # troca de cartão
+            (ids['luz'], {'Valor': 35.5, 'Fixo': 1, 'Data': '2024-01-11'}),
+        ]
+
+    ids, _, inter = _seed_lote(user_id)
+    for row_id, fields in alteracoes(ids, inter):
+        db.update_transacao('despesas', row_id, dict(fields), user_id)
+
+    ids_lote, _, inter_lote = _seed_lote(outro_user_id)
+    resultados = db.update_transacoes_lote('despesas', alteracoes(ids_lote, inter_lote) + [
+        (ids['tv'], {'Valor': 1.0}),            # linha de outro usuário
+        ('abc', {'Valor': 1.0}),
+        (ids_lote['luz'], {'coluna': 'x'}),
+    ], outro_user_id)
+    assert [r['resultado'] for r in resultados] == ['atualizada'] * 4 + ['nao_encontrada', 'ignorada', 'ignorada']
+
+    assert _despesas(outro_user_id) == _despesas(user_id)
+    # A fatura de fevereiro do Nubank ficou sem compras e é removida nos dois caminhos
+    assert _faturas(outro_user_id)[0][1:] == _faturas(user_id)[0][1:]
+    assert sorted((c == inter_lote, m, v) for c, m, _, v, *_ in _faturas(outro_user_id)) == \
+        sorted((c == inter, m, v) for c, m, _, v, *_ in _faturas(user_id)) == [(False, 1, 120.0), (True, 2, 60.0)]
+
+    # As faturas ajustadas pelo lote são as do recálculo completo
+    antes = _valores(outro_user_id)
+    db.atualizar_todas_faturas(outro_user_id)
+    assert _valores(outro_user_id) == antes
+
+
+def test_lote_desfeito_por_inteiro_em_erro(user_id):
+    ids, _, _ = _seed_lote(user_id)
+    antes = _despesas(user_id), _faturas(user_id)
+    with pytest.raises(Exception):
+        db.update_transacoes_lote('despesas', [(ids['tv'], {'Valor': 5.0}), (ids['luz'], {'Data': 'não é data'})], user_id)
+    assert (_despesas(user_id), _faturas(user_id)) == antes
@@ -0,0 +1,74 @@
+"""
+Testes do logging da aplicação (logs.py)
+Execute com: python -m pytest tests/test_logs.py
+"""
+import io
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logs
+from config import Config
+
+
+class Caro:
+    """Campo que conta quantas vezes foi formatado"""
+
+    def __init__(self):
+        self.formatado = 0
+
+    def __str__(self):
+        self.formatado += 1
+        return 'caro'
+
+    __repr__ = __str__
+
+
+@pytest.fixture
+def saida():
+    stream = io.StringIO()
+    logs.configurar_logging('INFO', stream)
+    yield stream
+    logs.configurar_logging(Config.LOG_LEVEL, sys.stderr)
+
+
+def test_campos_estruturados(saida):
+    log = logs.get_logger('db')
+    log.info('Fatura ajustada', cartao_id=3, mes=5, delta=-12.5)
+    linha = saida.getvalue().strip()
+    assert ' - finance_app.db - INFO - Fatura ajustada | cartao_id=3 mes=5 delta=-12.5' in linha
+
+    # Argumentos do logging continuam funcionando; traceback vem depois dos campos
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception('Falhou', user_id=7)
+    primeira, traceback = saida.getvalue().strip().split('\n')[1], saida.getvalue()
+    assert primeira.endswith('ERROR - Falhou | user_id=7') and 'ZeroDivisionError' in traceback
+
+    log.warning('Sem campos %s', 'formatado')
+    assert saida.getvalue().strip().split('\n')[-1].endswith('WARNING - Sem campos formatado')
+
+
+def test_debug_desligado_nao_formata(saida):
+    log = logs.get_logger('db')
+    caro = Caro()
+    log.debug('payload %s', caro, payload=caro)
+    assert caro.formatado == 0 and saida.getvalue() == ''
+    assert not log.isEnabledFor(logging.DEBUG)
+
+    logs.configurar_logging('DEBUG')
+    log.debug('payload %s', caro, payload=caro)
+    assert caro.formatado > 0 and saida.getvalue().strip().endswith('payload caro | payload=caro')
+
+
+def test_nivel_e_hierarquia():
+    assert logs.get_logger('components.extratos').logger.name == 'finance_app.components.extratos'
+    raiz = logging.getLogger(logs.RAIZ)
+    assert raiz.level == logging.getLevelName(Config.LOG_LEVEL.upper())
+    assert not raiz.propagate
+    assert len([h for h in raiz.handlers if isinstance(h.formatter, logs.FormatterEstruturado)]) == 1
@@ -0,0 +1,124 @@
+"""
+Testes das métricas dos callbacks (metricas.py, db.tempo_db e o endpoint
+/admin/metricas/callbacks)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_metricas.py
+"""
+import base64
+import json
+import os
+import sys
+import uuid
+
+import dash
+import pytest
+from dash import html
+from dash.dependencies import Input, Output
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import metricas
+from config import Config
+
+
+@pytest.fixture
+def cliente():
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id='entrada'), html.Div(id='saida'), html.Div(id='consulta')])
+
+    @app.callback(Output('saida', 'children'), Input('entrada', 'children'))
+    def eco(valor):
+        if valor is None:
+            raise dash.exceptions.PreventUpdate
+        return valor * 1000
+
+    @app.callback(Output('consulta', 'children'), Input('entrada', 'title'))
+    def consulta(_):
+        with db.get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT pg_sleep(0.02)")
+            cur.execute("SELECT 1")
+        return 'ok'
+
+    metricas.instrumentar(app)
+    metricas.zerar()
+    yield app.server.test_client()
+    metricas.zerar()
+
+
+def _chamar(cliente, saida, entrada, valor):
+    corpo = {
+        'output': f'{saida}.children',
+        'outputs': {'id': saida, 'property': 'children'},
+        'inputs': [{'id': 'entrada', 'property': entrada, 'value': valor}],
+        'changedPropIds': [f'entrada.{entrada}'],
+        'state': [],
+    }
+    return cliente.post(metricas.CAMINHO_CALLBACK, data=json.dumps(corpo), content_type='application/json')
+
+
+def test_tempo_e_bytes_por_callback(cliente):
+    for valor in ('a', 'bb', None):
+        _chamar(cliente, 'saida', 'children', valor)
+    cliente.get('/')   # fora dos callbacks: não entra
+
+    callbacks = metricas.resumo()['callbacks']
+    assert [c['id'] for c in callbacks] == ['saida.children']
+    eco = callbacks[0]
+    assert eco['funcao'] == 'eco' and eco['chamadas'] == 3 and eco['sem_atualizacao'] == 1 and eco['erros'] == 0
+    assert eco['bytes_saida_max'] > 2000 > eco['bytes_entrada_max'] > 0   # 'bb' * 1000 na saída
+    assert eco['ms_max'] >= eco['ms_p95'] >= eco['ms_p50'] > 0
+
+    metricas.zerar()
+    assert metricas.resumo()['callbacks'] == []
+
+
+def test_tempo_no_banco(banco, cliente):
+    _chamar(cliente, 'consulta', 'title', 'x')
+    consulta = metricas.resumo()['callbacks'][0]
+    assert consulta['funcao'] == 'consulta' and consulta['consultas_db_media'] >= 2
+    assert consulta['ms_medio'] >= consulta['ms_db_medio'] >= 20
+
+
+def test_endpoint_so_para_admin(criar_usuario):
+    from app import app, server
+
+    if app.layout is None:   # o layout é definido em myindex
+        app.layout = html.Div()
+    nome = f"metricas_{uuid.uuid4().hex[:8]}"
+    criar_usuario(nome=nome, senha='senha-admin', is_admin=1)
+    criar_usuario(nome=nome + '_u', senha='senha-comum')
+    cliente = server.test_client()
+
+    def auth(usuario, senha):
+        return {'Authorization': 'Basic ' + base64.b64encode(f'{usuario}:{senha}'.encode()).decode()}
+
+    assert cliente.get('/admin/metricas/callbacks').status_code == 401
+    assert cliente.get('/admin/metricas/callbacks', headers=auth(nome, 'errada')).status_code == 401
+    assert cliente.get('/admin/metricas/callbacks', headers=auth(nome + '_u', 'senha-comum')).status_code == 401
+
+    resposta = cliente.get('/admin/metricas/callbacks', headers=auth(nome, 'senha-admin'))
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert 'callbacks' in corpo and set(corpo['caches']) == {'dados', 'dashboard', 'cotacoes'}
+    assert cliente.delete('/admin/metricas/callbacks', headers=auth(nome, 'senha-admin')).status_code == 204
+
+
+def test_limite_de_senha_nao_zera_com_outro_endpoint(monkeypatch):
+    import security
+    from app import app, server
+
+    if app.layout is None:
+        app.layout = html.Div()
+    monkeypatch.setattr(security.Config, 'RATE_LIMIT_ENABLED', True)
+    security.rate_limiter.reset('127.0.0.1')
+    try:
+        cliente = server.test_client()
+        status = []
+        for _ in range(10):
+            status.append(cliente.get('/admin/metricas/callbacks').status_code)
+            cliente.get('/api/investimentos/cotacoes')   # outro endpoint com limite (400, sem tickers)
+    finally:
+        security.rate_limiter.reset('127.0.0.1')
+    limite = Config.RATE_LIMIT_LOGIN_ATTEMPTS
+    assert status == [401] * limite + [429] * (10 - limite)
@@ -0,0 +1,139 @@
+"""
+Testes das migrações versionadas (db.run_migrations) em um schema isolado
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_migrations.py
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+SCHEMA = 'test_migrations'
+
+
+@pytest.fixture
+def conn_legado():
+    """Conexão com search_path num schema com receitas/despesas no layout antigo"""
+    try:
+        conn = db.connect_db()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("CREATE TABLE users (id SERIAL PRIMARY KEY, username TEXT, saldo_inicial REAL DEFAULT 0)")
+    cur.execute("INSERT INTO users (id, username) VALUES (1, 'teste')")
+    cur.execute("""CREATE TABLE receitas (
+        id SERIAL PRIMARY KEY, Valor REAL, Efetuado INTEGER, Fixo INTEGER, Data TEXT,
+        Categoria TEXT, Descrição TEXT, user_id INTEGER, plano_id INTEGER, username TEXT
+    )""")
+    cur.execute("""CREATE TABLE despesas (
+        id SERIAL PRIMARY KEY, Valor REAL, Status TEXT, Fixo INTEGER, Data TEXT,
+        Categoria TEXT, Descrição TEXT, user_id INTEGER, username TEXT,
+        forma_pagamento TEXT DEFAULT 'dinheiro', cartao_id INTEGER,
+        fatura_mes INTEGER, fatura_ano INTEGER, eh_fatura INTEGER DEFAULT 0
+    )""")
+    cur.execute("""INSERT INTO despesas (Valor, Status, Data, user_id) VALUES
+        (10.1, 'Pago', '2024-01-05', 1),
+        (20.005, 'A vencer', '05/02/2024', 1),
+        (30, 'Vencido', '', 1),
+        (40, 'Pago', 'não é data', 1),
+        (50, 'Pago', '2024-02-30', 1)""")
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute("RESET search_path")
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def test_migracoes_convertem_tipos_e_criam_indices(conn_legado):
+    aplicadas = db.run_migrations(conn_legado)
+    assert aplicadas == [version for version, _, _ in db.MIGRATIONS]
+
+    cur = conn_legado.cursor()
+    assert db._column_type(cur, 'despesas', 'data') == 'date'
+    assert db._column_type(cur, 'despesas', 'valor') == 'numeric'
+    assert db._column_type(cur, 'receitas', 'valor') == 'numeric'
+
+    cur.execute("SELECT Valor, Data FROM despesas ORDER BY id")
+    assert cur.fetchall() == [
+        (10.1, date(2024, 1, 5)),
+        (20.01, date(2024, 2, 5)),
+        (30.0, None),
+        (40.0, None),
+        (50.0, None),
+    ]
+
+    cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s", (SCHEMA,))
+    indices = {row[0] for row in cur.fetchall()}
+    assert {'idx_receitas_user_data_id', 'idx_despesas_user_data_id', 'idx_despesas_fatura',
+            'idx_despesas_a_vencer', 'idx_receitas_user_plano'} <= indices
+    # Substituídos pelos índices (user_id, data, id) da 007
+    assert not {'idx_receitas_user_data', 'idx_despesas_user_data'} & indices
+
+
+def test_migracoes_sao_idempotentes(conn_legado):
+    db.run_migrations(conn_legado)
+    assert db.run_migrations(conn_legado) == []
+
+    # Datas em string continuam aceitas na escrita e na comparação
+    cur = conn_legado.cursor()
+    cur.execute("INSERT INTO despesas (Valor, Status, Data, user_id) VALUES (%s, %s, %s, %s)",
+                (12.5, 'A vencer', '2024-03-10', 1))
+    cur.execute("SELECT COUNT(*) FROM despesas WHERE Data >= %s AND Data <= %s", ('2024-03-01', '2024-03-31'))
+    assert cur.fetchone()[0] == 1
+
+
+def test_escritas_incrementam_data_version(conn_legado):
+    db.run_migrations(conn_legado)
+    cur = conn_legado.cursor()
+
+    def versao():
+        cur.execute("SELECT data_version FROM users WHERE id = 1")
+        return cur.fetchone()[0]
+
+    inicial = versao()
+    cur.execute("INSERT INTO receitas (Valor, Efetuado, Data, user_id) VALUES (100, 1, '2024-01-01', 1)")
+    assert versao() == inicial + 1
+    cur.execute("UPDATE despesas SET Status = 'Pago' WHERE user_id = 1")
+    assert versao() == inicial + 2
+    cur.execute("DELETE FROM receitas WHERE user_id = 1")
+    assert versao() == inicial + 3
+    # Statement sem linhas afetadas não muda a versão
+    cur.execute("DELETE FROM receitas WHERE user_id = 1")
+    assert versao() == inicial + 3
+
+
+def test_saldos_usuarios_mantido_por_trigger(conn_legado):
+    db.run_migrations(conn_legado)
+    cur = conn_legado.cursor()
+
+    def saldo():
+        cur.execute("SELECT receitas, despesas FROM saldos_usuarios WHERE user_id = 1")
+        return cur.fetchone()
+
+    # Preenchimento inicial: despesas 'Pago' do layout antigo (10.1 + 40 + 50)
+    assert saldo() == (0.0, 100.1)
+
+    cur.execute("""INSERT INTO receitas (Valor, Efetuado, Data, user_id, plano_id) VALUES
+        (100, 1, '2024-01-01', 1, NULL), (50, 0, '2024-01-02', 1, NULL), (70, 1, '2024-01-03', 1, 9)""")
+    cur.execute("""INSERT INTO despesas (Valor, Status, Data, user_id, forma_pagamento, eh_fatura) VALUES
+        (30, 'pago', '2024-01-04', 1, 'cartao', 0), (300, 'Pago', '2024-01-05', 1, 'cartao', 1)""")
+    assert saldo() == (100.0, 400.1)
+
+    cur.execute("UPDATE receitas SET Efetuado = 1 WHERE Valor = 50")
+    cur.execute("UPDATE despesas SET Status = 'A vencer' WHERE Valor = 300")
+    assert saldo() == (150.0, 100.1)
+
+    cur.execute("DELETE FROM despesas WHERE user_id = 1")
+    assert saldo() == (150.0, 0.0)
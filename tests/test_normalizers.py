@@ -0,0 +1,76 @@
+"""
+Testes de equivalência da normalização vetorizada (utils.normalizers)
+com as regras escalares aplicadas linha a linha
+Execute com: python -m pytest tests/test_normalizers.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import StatusDespesa
+from utils.normalizers import (
+    normalize_status_value, normalize_efetuado_value,
+    normalize_status_series, normalize_efetuado_series,
+    status_from_efetuado, yesno_to_int_series, validate_status_series
+)
+from utils.validators import yesno_to_int, validate_status
+
+STATUS = ['Pago', 'pago', ' PAGO ', 'paid', 'sim', 'A vencer', 'avencer', 'Pendente',
+          'Vencido', 'vencida', 'ATRASADO', '2', 2, 1, 0, True, False, StatusDespesa.PAGO,
+          None, np.nan, '', 'qualquer coisa']
+EFETUADO = [1, 0, '1', '0', 1.0, 0.0, '1.0', True, False, 'Sim', ' S ', 'não', 'N',
+            'recebido', 'pendente', None, np.nan, '', 'talvez', 3]
+
+
+def _mista(valores, rows=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    amostra = np.empty(len(valores), dtype=object)
+    amostra[:] = valores
+    return pd.Series(amostra[rng.integers(0, len(valores), rows)], dtype=object)
+
+
+@pytest.mark.parametrize('escalar, vetorizada, valores', [
+    (normalize_status_value, normalize_status_series, STATUS),
+    (normalize_efetuado_value, normalize_efetuado_series, EFETUADO),
+    (yesno_to_int, yesno_to_int_series, EFETUADO),
+    (validate_status, validate_status_series, STATUS),
+])
+def test_equivale_ao_apply(escalar, vetorizada, valores):
+    serie = _mista(valores)
+    serie.index = serie.index * 3  # índice não sequencial é preservado
+    esperado = serie.apply(escalar)
+    obtido = vetorizada(serie)
+    assert obtido.index.equals(serie.index)
+    # apply converte None em NaN quando o resultado é numérico
+    assert obtido.tolist() == [None if pd.isna(v) else v for v in esperado.astype(object)]
+
+
+@pytest.mark.parametrize('dtype', ['str', 'float64', 'category'])
+def test_equivale_com_dtypes_do_banco(dtype):
+    if dtype == 'str':
+        serie = pd.Series(['Pago', 'a vencer', None, 'Vencido'] * 50, dtype='str')
+        esperado = serie.astype(object).apply(normalize_status_value)
+        assert normalize_status_series(serie).tolist() == esperado.tolist()
+    elif dtype == 'float64':
+        serie = pd.Series([1.0, 0.0, np.nan] * 50)
+        assert normalize_efetuado_series(serie).tolist() == serie.apply(normalize_efetuado_value).tolist()
+    else:
+        serie = pd.Series(['Pago', 'pago', None] * 50, dtype='category')
+        esperado = serie.astype(object).apply(normalize_status_value)
+        assert normalize_status_series(serie).tolist() == esperado.tolist()
+
+
+def test_status_comparavel_com_str():
+    status = normalize_status_series(pd.Series(['pago', 'Vencido', None]))
+    assert (status == StatusDespesa.PAGO.value).tolist() == [True, False, False]
+    assert status_from_efetuado(pd.Series([1, 0])).tolist() == ['Pago', 'A vencer']
+
+
+def test_serie_vazia():
+    assert normalize_status_series(pd.Series([], dtype=object)).empty
+    assert normalize_efetuado_series(pd.Series([], dtype=object)).dtype == np.int64
@@ -0,0 +1,105 @@
+"""
+Testes do cache de cotações (quote_cache) nos dois backends: memória do
+processo e arquivo SQLite compartilhado entre workers
+Execute com: python -m pytest tests/test_quote_cache.py
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_cache
+from config import Config
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path, monkeypatch):
+    relogio = {'agora': 1_000.0}
+    monkeypatch.setattr(quote_cache, '_now', lambda: relogio['agora'])
+    monkeypatch.setattr(Config, 'QUOTE_CACHE_TTL_SECONDS', 60)
+    monkeypatch.setattr(Config, 'QUOTE_CACHE_NEGATIVE_TTL_SECONDS', 600)
+    monkeypatch.setattr(Config, 'QUOTE_CACHE_MAX_ENTRIES', 3)
+    caminho = str(tmp_path / 'cotacoes.sqlite') if request.param == 'sqlite' else None
+    quote_cache.configure(caminho)
+    yield relogio, caminho
+    quote_cache.configure(None)
+
+
+def _cotacao(ticker, preco):
+    return {'ticker': ticker, 'price': preco, 'currency': 'BRL'}
+
+
+def test_ttl_e_cache_negativo(cache):
+    relogio, _ = cache
+    assert quote_cache.get('PETR4') is None
+    quote_cache.put('PETR4', _cotacao('PETR4', 38.45))
+    quote_cache.put('XXXX3', {'error': 'Ticker não encontrado', 'ticker': 'XXXX3'}, 404)
+    assert quote_cache.get('PETR4') == (200, _cotacao('PETR4', 38.45))
+    assert quote_cache.get('XXXX3')[0] == 404
+
+    relogio['agora'] += 61  # a cotação expira, o 404 continua valendo
+    assert quote_cache.get('PETR4') is None
+    assert quote_cache.get('XXXX3')[0] == 404
+    relogio['agora'] += 600
+    assert quote_cache.get('XXXX3') is None
+
+    info = quote_cache.cache_info()
+    assert (info['hits'], info['negative_hits'], info['misses']) == (1, 2, 3)
+
+
+def test_limite_lru(cache):
+    for ticker in ('A', 'B', 'C'):
+        quote_cache.put(ticker, _cotacao(ticker, 1.0))
+    # Passos maiores que TOUCH_INTERVAL_SECONDS: o hit atualiza o LRU no SQLite
+    cache[0]['agora'] += 10
+    assert quote_cache.get('A') is not None  # A passa a ser o mais recente
+    cache[0]['agora'] += 10
+    quote_cache.put('D', _cotacao('D', 1.0))
+    assert quote_cache.get('B') is None
+    assert all(quote_cache.get(ticker) is not None for ticker in ('A', 'C', 'D'))
+    assert quote_cache.cache_info()['entries'] == 3
+    assert quote_cache.cache_info()['evictions'] == 1
+
+
+def test_sqlite_compartilhado_entre_processos(cache):
+    _, caminho = cache
+    if caminho is None:
+        pytest.skip("só o backend SQLite é compartilhado")
+    quote_cache.put('PETR4', _cotacao('PETR4', 38.45))
+    # Outro worker: um backend novo apontando para o mesmo arquivo
+    outro_worker = quote_cache._SQLiteBackend(caminho)
+    assert outro_worker.get('PETR4', quote_cache._now()) == (200, _cotacao('PETR4', 38.45))
+    assert quote_cache.cache_info()['backend'] == 'sqlite'
+
+
+def test_sqlite_travado_vira_miss(cache, monkeypatch):
+    relogio, caminho = cache
+    if caminho is None:
+        pytest.skip("só o backend SQLite usa arquivo")
+    monkeypatch.setattr(quote_cache._SQLiteBackend, 'BUSY_TIMEOUT_SECONDS', 0.05)
+    quote_cache.configure(caminho)
+    quote_cache.put('PETR4', _cotacao('PETR4', 38.45))
+
+    # Outro worker segura o lock de escrita do arquivo
+    outro_worker = sqlite3.connect(caminho, isolation_level=None)
+    outro_worker.execute("BEGIN IMMEDIATE")
+    try:
+        relogio['agora'] += 10
+        assert quote_cache.get('PETR4') == (200, _cotacao('PETR4', 38.45))  # sem atualizar o LRU
+        quote_cache.put('VALE3', _cotacao('VALE3', 61.2))                    # descartado
+    finally:
+        outro_worker.execute("ROLLBACK")
+        outro_worker.close()
+    assert quote_cache.get('VALE3') is None
+
+    # Erro do backend na leitura conta como miss
+    def travado(*args):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(quote_cache._get_backend(), 'get', travado)
+    misses = quote_cache.cache_info()['misses']
+    assert quote_cache.get('PETR4') is None
+    assert quote_cache.cache_info()['misses'] == misses + 1
@@ -0,0 +1,51 @@
+"""
+Testes da extração de cotação (quote_parser) nas páginas salvas em
+tests/fixtures/status_invest
+Execute com: python -m pytest tests/test_quote_parser.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_parser import extract_price, extract_price_full, is_not_found_page, is_ticker_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'status_invest')
+
+
+def _pagina(nome):
+    with open(os.path.join(FIXTURES, nome), encoding='utf-8') as arquivo:
+        return arquivo.read()
+
+
+@pytest.mark.parametrize('nome, ticker, preco', [
+    ('acao_petr4.html', 'PETR4', 38.45),    # class="value" logo após o ticker
+    ('fii_mxrf11.html', 'MXRF11', 9.87),    # fragmento JSON "price"
+    ('bdr_aapl34.html', 'AAPL34', 45.10),   # só a busca completa (entidades HTML)
+])
+def test_preco_igual_a_busca_completa(nome, ticker, preco):
+    html = _pagina(nome)
+    assert extract_price(html, ticker) == preco
+    assert extract_price_full(html) == preco
+    assert is_ticker_page(html, ticker)
+    assert is_ticker_page(html, ticker.lower())
+    assert not is_ticker_page(html, 'XPTO11')
+
+
+def test_pagina_nao_encontrada():
+    html = _pagina('nao_encontrado.html')
+    assert is_not_found_page(html)
+    assert not is_ticker_page(html, 'OPS')
+    assert not is_not_found_page(_pagina('acao_petr4.html'))
+    assert extract_price('<html>sem preço</html>', 'PETR4') is None
+
+
+def test_varredura_direcionada():
+    # "price" fora do padrão é ignorado e a próxima ocorrência é usada
+    assert extract_price('{"price": null, "x": 1} {"price": "12,34"}') == 12.34
+    # class="value" antes da menção ao ticker não conta na varredura direcionada
+    html = '<strong class="value">1,00</strong> PETR4 <strong class="value">38,45</strong>'
+    assert extract_price(html, 'PETR4') == 38.45
+    assert extract_price_full(html) == 1.0
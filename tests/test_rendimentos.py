@@ -0,0 +1,93 @@
+"""
+Testes do motor vetorizado de rendimentos (rendimentos.valorizar_investimentos)
+contra o cálculo por aporte (calcular_rendimento_investimento)
+Execute com: python -m pytest tests/test_rendimentos.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from calendario import calendario_padrao
+from constants import TipoRendimento
+from rendimentos import (calcular_rendimento_investimento, calcular_rendimento_periodo,
+                         valorizar_aportes, valorizar_investimentos)
+from taxas_historicas import historico_padrao
+
+TIPOS = [t.value for t in TipoRendimento] + [None, 'tipo desconhecido']
+HOJE = date(2025, 6, 30)
+
+
+def _escalar(valor, dias, tipo, taxa, hoje=None):
+    dias_uteis = None if hoje is None else calendario_padrao().dias_uteis(hoje - timedelta(days=dias), hoje)
+    resultado = calcular_rendimento_investimento(valor, tipo or "Sem rendimento", taxa or 0, dias, dias_uteis)
+    return resultado['valor_liquido'], resultado['iof_descontado']
+
+
+def test_aportes_equivalem_ao_calculo_escalar():
+    rng = np.random.default_rng(11)
+    n = 20_000
+    valores = np.round(rng.uniform(0.01, 200_000, n), 2)
+    dias = np.where(rng.random(n) < 0.3, rng.integers(0, 31, n), rng.integers(0, 5000, n))
+    tipos = [TIPOS[i] for i in rng.integers(0, len(TIPOS), n)]
+    taxas = [[None, 0, 100.0, 110.5, 12.3, 6.0, 95.25][i] for i in rng.integers(0, 7, n)]
+
+    valor_liquido, iof = valorizar_aportes(valores, dias, tipos, taxas)
+    esperado = [_escalar(float(v), int(d), t, x) for v, d, t, x in zip(valores, dias, tipos, taxas)]
+    assert valor_liquido.tolist() == [v for v, _ in esperado]
+    assert iof.tolist() == [i for _, i in esperado]
+
+
+def test_meio_centavo_usa_caminho_escalar():
+    # Valores exatamente a meio centavo, onde o arredondamento é sensível ao último bit
+    valores = [1.005, 2.675, 0.125, 1234.565]
+    dias = [10, 0, 400, 15]
+    tipos = ["Sem rendimento", "Sem rendimento", "Sem rendimento", "% do CDI"]
+    valor_liquido, iof = valorizar_aportes(valores, dias, tipos, [0, 0, 0, 100.0])
+    esperado = [_escalar(v, d, t, 100.0) for v, d, t in zip(valores, dias, tipos)]
+    assert list(zip(valor_liquido.tolist(), iof.tolist())) == esperado
+
+
+def test_investimentos_consolidados():
+    resultado = valorizar_investimentos(
+        [7, 7, 7, 9],
+        ["% do CDI"] * 3 + ["Taxa fixa (% a.a.)"],
+        [100.0] * 3 + [12.0],
+        [1000.0, 500.0, 250.0, 300.0],
+        ['2025-01-02', '2025-06-20', 'data inválida', '2025-6-1'],  # '2025-6-1' é aceito por strptime
+        HOJE
+    )
+    v1, i1 = _escalar(1000.0, 179, "% do CDI", 100.0, HOJE)
+    v2, i2 = _escalar(500.0, 10, "% do CDI", 100.0, HOJE)
+    v3, i3 = _escalar(300.0, 29, "Taxa fixa (% a.a.)", 12.0, HOJE)
+    assert resultado == {7: (round(v1 + v2, 2), round(i1 + i2, 2)), 9: (v3, i3)}
+    assert valorizar_investimentos([], [], [], [], [], HOJE) == {}
+
+
+def test_atualizar_valores_investimentos(user_id):
+    hoje = date.today()
+    inicio = (hoje - timedelta(days=400)).isoformat()
+    cdi = db.insert_montante('Banco', 'CDB', 'CDB', 0, "% do CDI", 110.0, inicio, 1000.0, user_id)
+    sem_data = db.insert_montante('Banco', 'Caixa', 'Outro', 55.0, "Sem rendimento", 0, '', 100.0, user_id)
+    db.insert_montante_aporte(cdi, 200.0, (hoje - timedelta(days=12)).isoformat(), user_id)
+    db.insert_montante_aporte(cdi, 300.0, (hoje - timedelta(days=90)).isoformat(), user_id)
+
+    resultado = db.atualizar_valores_investimentos(user_id)
+
+    # Valorização pelo histórico de taxas distribuído com o app
+    esperado = [calcular_rendimento_periodo(valor, "% do CDI", 110.0, hoje - timedelta(days=dias), hoje,
+                                            historico_padrao())
+                for valor, dias in ((1000.0, 400), (300.0, 90), (200.0, 12))]
+    valor = round(sum(r['valor_liquido'] for r in esperado), 2)
+    iof = round(sum(r['iof_descontado'] for r in esperado), 2)
+    assert resultado == {cdi: (valor, iof)}
+
+    montantes = {m['id']: m for m in db.get_montantes_by_user(user_id)}
+    assert montantes[cdi]['valor'] == pytest.approx(valor)
+    assert montantes[cdi]['iof_descontado'] == pytest.approx(iof)
+    assert montantes[sem_data]['valor'] == 55.0  # sem data de início: não é recalculado
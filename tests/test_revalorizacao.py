@@ -0,0 +1,62 @@
+"""
+Testes da revalorização diária dos investimentos (scheduler.py e a marcação
+users.investimentos_valorizados_em)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_revalorizacao.py
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import scheduler
+
+
+def _valorizado_em(user_id):
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT investimentos_valorizados_em FROM users WHERE id = %s", (user_id,))
+        return cur.fetchone()[0]
+
+
+def _montante(user_id):
+    return db.insert_montante('Banco', 'CDB', 'Renda Fixa', 1000.0, 'CDI', 100.0,
+                              '2024-01-02', 1000.0, user_id)
+
+
+def test_leitura_so_recalcula_uma_vez_por_dia(user_id):
+    montante_id = _montante(user_id)
+    assert _valorizado_em(user_id) is None
+
+    assert db.garantir_valores_investimentos(user_id) is True
+    assert _valorizado_em(user_id) == date.today()
+    assert db.garantir_valores_investimentos(user_id) is False
+
+    # Um novo aporte invalida a marcação do dia
+    db.insert_montante_aporte(montante_id, 500.0, '2024-06-03', user_id)
+    assert _valorizado_em(user_id) is None
+    assert db.garantir_valores_investimentos(user_id) is True
+
+
+def test_passada_agendada_valoriza_pendentes(user_id):
+    _montante(user_id)
+    assert user_id in db.get_usuarios_valorizacao_pendente(10_000)
+
+    resultado = scheduler.revalorizar_investimentos(lote=1)
+    assert resultado['usuarios'] >= 1 and resultado['investimentos'] >= 1
+    assert _valorizado_em(user_id) == date.today()
+    assert user_id not in db.get_usuarios_valorizacao_pendente(10_000)
+
+
+def test_passada_concorrente_desiste(user_id):
+    _montante(user_id)
+    conn = db.connect_db()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (scheduler._REVALORIZACAO_LOCK_ID,))
+        assert scheduler.revalorizar_investimentos() is None
+        assert _valorizado_em(user_id) is None
+        cur.execute("SELECT pg_advisory_unlock(%s)", (scheduler._REVALORIZACAO_LOCK_ID,))
+    finally:
+        conn.close()
@@ -0,0 +1,62 @@
+"""
+Testes do saldo mantido em saldos_usuarios (db.get_saldo)
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_saldo.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import data_access
+import dashboard_model
+
+
+@pytest.fixture
+def user_id(user_id):
+    yield user_id
+    data_access.invalidate_user(user_id)
+
+
+def _saldo_modelo(uid):
+    dados = data_access.load_user_data(uid, atualizar_vencidos=False)
+    return dashboard_model.get_model(dados['despesas'], dados['receitas']).saldo_transacoes()
+
+
+def test_get_saldo_acompanha_escritas(user_id):
+    with db.get_conn() as conn:
+        conn.cursor().execute("UPDATE users SET saldo_inicial = 1000 WHERE id = %s", (user_id,))
+    assert db.get_saldo(user_id)['saldo'] == pytest.approx(1000.0)
+
+    db.insert_transacao('receitas', 500.0, 1, 0, '2024-01-05', 'Salário', 'jan', user_id)
+    db.insert_transacao('receitas', 80.0, 0, 0, '2024-01-06', 'Extra', 'pendente', user_id)
+    db.insert_despesa_com_cartao(45.5, 'Pago', 0, '2024-01-07', 'Casa', 'luz', user_id,
+                                 'dinheiro', None, None, None)
+    db.insert_despesa_com_cartao(200.0, 'Pago', 0, '2024-01-08', 'Lazer', 'show', user_id,
+                                 'cartao', None, 1, 2024)
+
+    saldo = db.get_saldo(user_id)
+    assert saldo == db.calcular_saldo(user_id)
+    assert saldo['saldo'] == pytest.approx(1000 + 500 - 45.5)
+    assert saldo['saldo'] - 1000 == pytest.approx(_saldo_modelo(user_id))
+
+    receita = data_access.resolve_frame(data_access.load_user_data(user_id, False)['receitas'], 'receitas')
+    rid = int(receita.loc[receita['Valor'] == 80.0, 'id'].iloc[0])
+    db.update_transacao('receitas', rid, {'Efetuado': 1}, user_id)
+    assert db.get_saldo(user_id)['saldo'] == pytest.approx(1000 + 580 - 45.5)
+
+    db.delete_transacao('receitas', rid, user_id)
+    assert db.get_saldo(user_id) == db.calcular_saldo(user_id)
+
+
+def test_recalcular_saldo(user_id):
+    db.insert_transacao('receitas', 10.0, 1, 0, '2024-01-05', 'Salário', 'jan', user_id)
+    with db.get_conn() as conn:
+        conn.cursor().execute("UPDATE saldos_usuarios SET receitas = 999 WHERE user_id = %s", (user_id,))
+    assert db.get_saldo(user_id)['receitas'] == pytest.approx(999.0)
+
+    db.recalcular_saldo(user_id)
+    assert db.get_saldo(user_id) == db.calcular_saldo(user_id)
+    assert db.get_saldo(user_id)['receitas'] == pytest.approx(10.0)
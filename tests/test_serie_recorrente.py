@@ -0,0 +1,60 @@
+"""
+Testes da API de séries recorrentes (db.insert_serie_recorrente) usada por
+insert_despesa_parcelada e disponível para receitas fixas
+Execute com: DATABASE_URL=postgresql://... python -m pytest tests/test_serie_recorrente.py
+"""
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+@pytest.mark.parametrize('inicio', ['2024-01-31', '2023-11-30', '2024-02-29', '2024-03-15'])
+def test_datas_equivalem_a_relativedelta(inicio):
+    base = datetime.strptime(inicio, '%Y-%m-%d')
+    esperado = [(base + relativedelta(months=i)).date() for i in range(25)]
+    assert db.datas_serie_mensal(inicio, 25) == esperado
+    assert db.datas_serie_mensal(date.fromisoformat(inicio), 3) == esperado[:3]
+
+
+def test_parcelas_no_cartao(user_id):
+    nubank = db.create_cartao('Nubank', user_id, dia_vencimento=10)
+    db.insert_despesa_parcelada(100.0, 'Pago', 1, '2024-12-31', 'Casa', 'geladeira', user_id, 3,
+                                forma_pagamento='cartao', cartao_id=nubank)
+
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT Data, Descrição, fatura_mes, fatura_ano FROM despesas
+                       WHERE user_id = %s AND eh_fatura = 0 ORDER BY Data""", (user_id,))
+        parcelas = [(str(d), desc, m, a) for d, desc, m, a in cur.fetchall()]
+        cur.execute("""SELECT fatura_mes, fatura_ano, Valor FROM despesas
+                       WHERE user_id = %s AND eh_fatura = 1 ORDER BY fatura_ano, fatura_mes""", (user_id,))
+        faturas = cur.fetchall()
+
+    assert parcelas == [
+        ('2024-12-31', 'geladeira - Parcela 1/3', 12, 2024),
+        ('2025-01-31', 'geladeira - Parcela 2/3', 1, 2025),
+        ('2025-02-28', 'geladeira - Parcela 3/3', 2, 2025),
+    ]
+    assert faturas == [(12, 2024, 100.0), (1, 2025, 100.0), (2, 2025, 100.0)]
+    assert db.atualizar_todas_faturas(user_id) == {'removidas': 0, 'atualizadas': 3, 'criadas': 0}
+
+
+def test_receitas_fixas(user_id):
+    ids = db.insert_serie_recorrente('receitas', user_id, '2024-01-05', 12, {
+        'Valor': 3000.0, 'Efetuado': 0, 'Fixo': 1, 'Categoria': 'Salário', 'Descrição': 'salário',
+    }, sufixo_parcela=False)
+    assert len(ids) == 12
+
+    df = db.table_to_df('receitas', user_id=user_id)
+    assert set(df['Descrição']) == {'salário'}
+    assert df['Valor'].sum() == 36000.0
+    assert db.insert_serie_recorrente('receitas', user_id, '2024-01-05', 0, {'Valor': 1.0}) == []
+    with pytest.raises(ValueError):
+        db.insert_serie_recorrente('cartoes', user_id, '2024-01-05', 2, {})
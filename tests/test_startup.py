@@ -0,0 +1,53 @@
+"""
+Teste de inicialização: importar myindex (boot de um worker) não deve ler
+receitas/despesas do banco e deve caber no orçamento de tempo.
+Execute com: python -m pytest tests/test_startup.py
+
+Sem PostgreSQL, o import roda no modo --sem-banco de bench_startup (init_db
+vira no-op e qualquer outra conexão falha e é registrada), então o teste
+também vale no CI. O orçamento pode ser ajustado via STARTUP_BUDGET_SECONDS
+(padrão 20s).
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from bench_startup import medir_startup
+
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', 20))
+
+
+def _banco_disponivel():
+    import db
+    try:
+        with db.get_conn() as conn:
+            conn.cursor().execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope='module')
+def startup():
+    return medir_startup(sem_banco=not _banco_disponivel())
+
+
+def test_import_nao_carrega_transacoes(startup):
+    assert startup['reads'] == []
+
+
+def test_import_sem_banco_nao_abre_conexoes():
+    # Fora o init_db do boot, o import não pode depender do banco
+    resultado = medir_startup(sem_banco=True)
+    assert resultado['reads'] == []
+    assert resultado['connections'] == [], resultado['connections'][0]
+
+
+def test_import_dentro_do_orcamento(startup):
+    print(f"import myindex: {startup['seconds']:.2f}s, RSS {startup['max_rss_kb'] / 1024:.1f} MiB")
+    assert startup['seconds'] < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,94 @@
+"""
+Testes do histórico de taxas (taxas_historicas.HistoricoTaxas) e da
+valorização de aportes por período (rendimentos.calcular_rendimento_periodo)
+Execute com: python -m pytest tests/test_taxas_historicas.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendario import calendario_padrao
+from config import Config
+from rendimentos import calcular_rendimento_investimento, calcular_rendimento_periodo, valorizar_investimentos
+from taxas_historicas import HistoricoTaxas, historico_padrao
+
+HISTORICO = HistoricoTaxas({
+    'cdi': [(date(2024, 1, 1), 11.65), (date(2024, 3, 21), 10.65), (date(2024, 9, 19), 10.40)],
+    'ipca': [(date(2024, 1, 1), 4.83)],
+})
+
+
+def _fator_dia_a_dia(historico, indice, inicio, fim, percentual=100.0, spread=0.0):
+    fator, dia = 1.0, inicio
+    while dia < fim:
+        if calendario_padrao().eh_dia_util(dia):
+            diaria = (1 + historico.taxa_em(indice, dia) / 100) ** (1 / 252) - 1
+            fator *= (1 + percentual / 100 * diaria) * (1 + spread / 100) ** (1 / 252)
+        dia += timedelta(days=1)
+    return fator
+
+
+@pytest.mark.parametrize('inicio, fim', [
+    (date(2024, 1, 1), date(2024, 1, 1)),
+    (date(2024, 2, 10), date(2024, 11, 3)),
+    (date(2023, 10, 1), date(2024, 2, 1)),     # começa antes da série
+    (date(2024, 6, 1), date(2025, 8, 15)),     # termina depois da última taxa
+    (date(2023, 1, 1), date(2023, 6, 1)),      # inteiro antes da série
+])
+def test_fator_equivale_ao_produto_diario(inicio, fim):
+    fator = HISTORICO.fatores('cdi', [inicio.toordinal()], [fim.toordinal()], 110.0)[0]
+    assert fator == pytest.approx(_fator_dia_a_dia(HISTORICO, 'cdi', inicio, fim, 110.0), rel=1e-12)
+    fator_ipca = HISTORICO.fatores('ipca', [inicio.toordinal()], [fim.toordinal()], spread=6.0)[0]
+    assert fator_ipca == pytest.approx(_fator_dia_a_dia(HISTORICO, 'ipca', inicio, fim, spread=6.0), rel=1e-12)
+
+
+def test_csv(tmp_path):
+    caminho = tmp_path / 'taxas.csv'
+    caminho.write_text("# comentário\ndata,indice,taxa_anual\n2024-03-21,CDI,10.65\n2024-01-01,cdi,11.65\n")
+    historico = HistoricoTaxas.de_csv(caminho)
+    assert historico.indices() == ['cdi']
+    assert historico.taxa_em('cdi', date(2024, 3, 20)) == 11.65
+    assert historico.taxa_em('cdi', date(2030, 1, 1)) == 10.65
+
+    caminho.write_text("data,indice,taxa_anual\n2024-01-01,dolar,5\n")
+    with pytest.raises(ValueError):
+        HistoricoTaxas.de_csv(caminho)
+
+    # O histórico distribuído com o app carrega todos os índices
+    assert HistoricoTaxas.de_csv(Config.TAXAS_HISTORICAS_CSV).indices() == ['cdi', 'ipca', 'selic']
+    assert historico_padrao() is not None
+
+
+def test_vetorizado_equivale_ao_periodo():
+    rng = np.random.default_rng(5)
+    n = 20_000
+    hoje = date(2025, 3, 10)
+    tipos = [["% do CDI", "IPCA + (% a.a.)", "100% da Selic", "Taxa fixa (% a.a.)"][i] for i in rng.integers(0, 4, n)]
+    taxas = [[100.0, 110.0, 6.0, 12.5][i] for i in rng.integers(0, 4, n)]
+    valores = np.round(rng.uniform(0.01, 100_000, n), 2)
+    inicios = [hoje - timedelta(days=int(d)) for d in
+               np.where(rng.random(n) < 0.3, rng.integers(0, 31, n), rng.integers(0, 900, n))]
+
+    resultado = valorizar_investimentos(list(range(n)), tipos, taxas, valores,
+                                        [d.isoformat() for d in inicios], hoje, HISTORICO)
+    for i in range(n):
+        esperado = calcular_rendimento_periodo(float(valores[i]), tipos[i], taxas[i], inicios[i], hoje, HISTORICO)
+        assert resultado[i] == (esperado['valor_liquido'], esperado['iof_descontado'])
+
+
+def test_tipos_sem_indice_usam_taxa_constante():
+    inicio, hoje = date(2024, 1, 2), date(2024, 7, 1)
+    dias = (hoje - inicio).days
+    dias_uteis = calendario_padrao().dias_uteis(inicio, hoje)
+    for tipo, taxa in (("Taxa fixa (% a.a.)", 12.0), ("100% da Selic", 0)):  # sem série de Selic em HISTORICO
+        esperado = calcular_rendimento_investimento(1000.0, tipo, taxa, dias, dias_uteis)
+        assert calcular_rendimento_periodo(1000.0, tipo, taxa, inicio, hoje, HISTORICO)['valor_liquido'] \
+            == esperado['valor_liquido']
+    # Com o histórico, o CDI acompanha a taxa vigente em cada dia
+    assert calcular_rendimento_periodo(1000.0, "% do CDI", 100.0, inicio, hoje, HISTORICO)['valor_atual'] \
+        > calcular_rendimento_investimento(1000.0, "% do CDI", 100.0, dias, dias_uteis)['valor_atual']
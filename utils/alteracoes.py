@@ -0,0 +1,222 @@
+"""
+Detecção de alterações nas tabelas de extratos (receitas/despesas)
+
+A página editada na DataTable e os registros originais (store) são
+normalizados coluna a coluna, alinhados por id e comparados de uma vez;
+o resultado é um changeset compacto: só as colunas que mudaram, por id,
+mais os ids inseridos e removidos. As colunas de baixa cardinalidade
+usam os normalizadores vetorizados de utils.normalizers; Valor e Data têm
+caminho rápido para os formatos que o banco e a DataTable já entregam
+(números e 'YYYY-MM-DD') e só o resto passa pela regra escalar.
+
+normalizar_linha é a regra escalar (uma linha por vez) e continua sendo a
+referência de equivalência. Valores ausentes (None/NaN) são tratados
+igualmente como vazios.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from constants import EMPTY_VALUES
+from utils.normalizers import _map_unique, validate_status_series, yesno_to_int_series
+from utils.validators import (
+    yesno_to_int, parse_float_value, normalize_date, normalize_string, validate_status
+)
+
+# Colunas normalizadas de cada tabela (chaves do payload de update_transacao)
+COLUNAS = {
+    'receitas': ('Valor', 'Fixo', 'Data', 'Categoria', 'Descrição', 'Efetuado'),
+    'despesas': ('Valor', 'Fixo', 'Data', 'Categoria', 'Descrição', 'Status',
+                 'forma_pagamento', 'cartao_id', 'fatura_mes', 'fatura_ano'),
+}
+
+# Colunas que ficam fora do payload quando o valor normalizado é None
+# (Efetuado/Status inválidos, fatura sem cartão): não são gravadas como NULL
+OPCIONAIS = {'Efetuado', 'Status', 'fatura_mes', 'fatura_ano'}
+
+_DATA_ISO = r'\d{4}-\d{2}-\d{2}'
+
+
+# ========= Regra escalar (referência) ========= #
+
+def _cartao_id(valor):
+    if valor and str(valor).strip() and valor != '-':
+        try:
+            return int(valor)
+        except (ValueError, TypeError):
+            return None
+    return None
+
+
+def normalizar_linha(row):
+    """
+    Normaliza uma linha de dados para atualização no banco
+
+    Args:
+        row: Registro da DataTable ou do store (dict)
+
+    Returns:
+        Dict com as colunas do payload de update_transacao; Efetuado, Status
+        e fatura_mes/fatura_ano só aparecem quando válidos
+    """
+    result = {
+        "Valor": parse_float_value(row.get("Valor")),
+        "Fixo": yesno_to_int(row.get("Fixo")),
+        "Data": normalize_date(row.get("Data")),
+        "Categoria": normalize_string(row.get("Categoria")),
+        "Descrição": normalize_string(row.get("Descrição")),
+    }
+
+    # Efetuado existe só em receitas; Status só em despesas
+    efetuado = yesno_to_int(row.get("Efetuado"))
+    if efetuado is not None:
+        result["Efetuado"] = efetuado
+    status = validate_status(row.get("Status"))
+    if status is not None:
+        result["Status"] = status
+
+    # Forma de pagamento e cartão (despesas)
+    if 'forma_pagamento' in row:
+        forma_pag = row.get('forma_pagamento', 'dinheiro')
+        result["forma_pagamento"] = forma_pag if forma_pag and forma_pag != '-' else 'dinheiro'
+        result["cartao_id"] = _cartao_id(row.get('cartao_id')) if forma_pag == 'cartao' else None
+
+        # Fatura do mês da compra
+        if result["cartao_id"] is not None and result["Data"]:
+            data_obj = datetime.strptime(result["Data"], "%Y-%m-%d")
+            result["fatura_mes"] = data_obj.month
+            result["fatura_ano"] = data_obj.year
+    return result
+
+
+# ========= Versão colunar ========= #
+
+def _sem_ausentes(series):
+    """Coluna object com None no lugar de NaN/NA/NaT"""
+    valores = series.to_numpy(dtype=object, copy=True)
+    valores[pd.isna(valores)] = None
+    return pd.Series(valores, index=series.index, dtype=object)
+
+
+def _valor_series(series):
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return _sem_ausentes(series.astype(float))
+    return _map_unique(_sem_ausentes(series), parse_float_value, None)
+
+
+def _data_series(series):
+    series = _sem_ausentes(series)
+    texto = series.where(series.map(type) == str)
+    iso = texto.str.fullmatch(_DATA_ISO).fillna(False).astype(bool)
+    iso = iso.to_numpy()
+    resultado = np.full(len(series), None, dtype=object)
+    if iso.any():
+        datas = pd.to_datetime(texto[iso], format='%Y-%m-%d', errors='coerce')
+        resultado[iso] = _sem_ausentes(datas.dt.strftime('%Y-%m-%d')).to_numpy()
+    if (~iso).any():
+        resultado[~iso] = _map_unique(series[~iso], normalize_date, None).to_numpy(dtype=object)
+    return pd.Series(resultado, index=series.index, dtype=object)
+
+
+def _texto_series(series):
+    series = _sem_ausentes(series)
+    vazios = series.isin([v for v in EMPTY_VALUES if v is not None]) | series.isna()
+    resultado = series.map(str).str.strip().to_numpy(dtype=object, copy=True)
+    resultado[vazios.to_numpy()] = None
+    return pd.Series(resultado, index=series.index, dtype=object)
+
+
+def _coluna(df, nome):
+    if nome in df.columns:
+        return df[nome]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def normalizar_transacoes(df, table):
+    """
+    Normaliza um DataFrame de receitas/despesas coluna a coluna
+
+    Args:
+        df: Linhas da DataTable ou do store
+        table: 'receitas' ou 'despesas'
+
+    Returns:
+        DataFrame object com as colunas de COLUNAS[table] (None = ausente),
+        equivalente a normalizar_linha aplicada a cada linha
+    """
+    out = pd.DataFrame(index=df.index)
+    out['Valor'] = _valor_series(_coluna(df, 'Valor'))
+    out['Fixo'] = yesno_to_int_series(_sem_ausentes(_coluna(df, 'Fixo')))
+    out['Data'] = _data_series(_coluna(df, 'Data'))
+    out['Categoria'] = _texto_series(_coluna(df, 'Categoria'))
+    out['Descrição'] = _texto_series(_coluna(df, 'Descrição'))
+
+    if table == 'receitas':
+        out['Efetuado'] = yesno_to_int_series(_sem_ausentes(_coluna(df, 'Efetuado')))
+        return out
+
+    out['Status'] = validate_status_series(_sem_ausentes(_coluna(df, 'Status')))
+    forma = _sem_ausentes(_coluna(df, 'forma_pagamento'))
+    out['forma_pagamento'] = _map_unique(forma, lambda f: f if f and f != '-' else 'dinheiro', 'dinheiro')
+    cartao = _map_unique(_sem_ausentes(_coluna(df, 'cartao_id')), _cartao_id, None).to_numpy(dtype=object, copy=True)
+    cartao[(forma != 'cartao').to_numpy()] = None
+    out['cartao_id'] = pd.Series(cartao, index=df.index, dtype=object)
+
+    com_fatura = (pd.notna(cartao) & out['Data'].notna()).to_numpy()
+    for coluna, inicio, fim in (('fatura_mes', 5, 7), ('fatura_ano', 0, 4)):
+        fatura = np.full(len(df), None, dtype=object)
+        if com_fatura.any():
+            fatura[com_fatura] = out['Data'][com_fatura].str[inicio:fim].astype(int).to_numpy(dtype=object)
+        out[coluna] = pd.Series(fatura, index=df.index, dtype=object)
+    return out
+
+
+def _por_id(linhas, table):
+    """DataFrame normalizado indexado pelo id (linhas sem id válido ficam de fora)"""
+    df = linhas if isinstance(linhas, pd.DataFrame) else pd.DataFrame(list(linhas or []))
+    if df.empty or 'id' not in df.columns:
+        return pd.DataFrame(columns=COLUNAS[table], index=pd.Index([], dtype=np.int64))
+    ids = pd.to_numeric(_sem_ausentes(df['id']), errors='coerce')
+    df = df[ids.notna().to_numpy()]
+    normalizado = normalizar_transacoes(df, table)
+    normalizado.index = ids[ids.notna()].astype(np.int64).to_numpy()
+    return normalizado[~normalizado.index.duplicated(keep='last')]
+
+
+def diff_transacoes(editadas, originais, table):
+    """
+    Changeset entre a tabela editada e os registros originais, alinhados por id
+
+    Args:
+        editadas: Linhas da DataTable (lista de dicts ou DataFrame)
+        originais: Registros originais das mesmas linhas (store)
+        table: 'receitas' ou 'despesas'
+
+    Returns:
+        {'alteradas': {id: {coluna: valor novo}}, 'inseridas': [ids],
+         'removidas': [ids]}; em 'alteradas' só entram as colunas que mudaram
+        (pronto para update_transacoes_lote), na ordem da tabela editada
+    """
+    novas = _por_id(editadas, table)
+    antigas = _por_id(originais, table)
+
+    comuns = novas.index[novas.index.isin(antigas.index)]
+    inseridas = [int(i) for i in novas.index[~novas.index.isin(antigas.index)]]
+    removidas = [int(i) for i in antigas.index[~antigas.index.isin(novas.index)]]
+
+    novas, antigas = novas.loc[comuns], antigas.loc[comuns]
+    mudancas = {}
+    for coluna in COLUNAS[table]:
+        a = novas[coluna].to_numpy(dtype=object)
+        b = antigas[coluna].to_numpy(dtype=object)
+        mudou = a != b
+        if coluna in OPCIONAIS:
+            mudou &= pd.notna(a)
+        for i in np.flatnonzero(mudou):
+            valor = a[i]
+            mudancas.setdefault(int(comuns[i]), {})[coluna] = valor.item() if isinstance(valor, np.generic) else valor
+
+    alteradas = {int(rid): mudancas[int(rid)] for rid in comuns if int(rid) in mudancas}
+    return {'alteradas': alteradas, 'inseridas': inseridas, 'removidas': removidas}
@@ -0,0 +1,66 @@
+"""
+Leitura do filter_query das DataTables com filter_action='custom'
+
+A DataTable manda os filtros digitados no cabeçalho como uma expressão
+('{Valor} > 100 && {Categoria} contains Lazer'); aqui ela vira uma lista de
+termos (coluna, operador, valor) que db.get_pagina_transacoes traduz para
+SQL parametrizado. Termos que não seguem a sintaxe são ignorados, como a
+DataTable faz com filtros inválidos no modo nativo.
+"""
+
+import re
+
+# Operadores aceitos -> operador normalizado (os prefixos s/i, de
+# sensível/insensível a maiúsculas, são descartados)
+OPERADORES = {
+    '=': '=', 'eq': '=',
+    '!=': '!=', 'ne': '!=',
+    '<': '<', 'lt': '<',
+    '<=': '<=', 'le': '<=',
+    '>': '>', 'gt': '>',
+    '>=': '>=', 'ge': '>=',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+# Um termo: {coluna} operador valor, com valor entre aspas (que pode conter
+# ' && ') ou sem aspas até o próximo ' && '
+_TERMO = re.compile(
+    r'\s*\{(?P<coluna>[^}]+)\}\s+[si]?'
+    r'(?P<operador>>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith)\s+'
+    r'(?P<valor>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|(?:(?!\s+&&\s).)+?)'
+    r'\s*(?:&&|$)',
+    re.DOTALL
+)
+
+
+def parse_filter_query(filter_query):
+    """
+    Converte o filter_query da DataTable em termos de filtro
+
+    Args:
+        filter_query: Expressão da DataTable (termos unidos por ' && ')
+
+    Returns:
+        Lista de (coluna, operador, valor), com operador normalizado
+        ('=', '!=', '<', '<=', '>', '>=', 'contains', 'datestartswith') e
+        valor sem as aspas
+    """
+    filter_query = filter_query or ''
+    termos = []
+    pos = 0
+    while pos < len(filter_query):
+        match = _TERMO.match(filter_query, pos)
+        if not match:
+            # Termo fora da sintaxe: pula até o próximo ' && '
+            proximo = filter_query.find(' && ', pos)
+            if proximo == -1:
+                break
+            pos = proximo + 4
+            continue
+        valor = match.group('valor')
+        if len(valor) >= 2 and valor[0] == valor[-1] and valor[0] in ('"', "'", '`'):
+            valor = valor[1:-1].replace('\\' + valor[0], valor[0])
+        termos.append((match.group('coluna'), OPERADORES[match.group('operador')], valor))
+        pos = match.end()
+    return termos
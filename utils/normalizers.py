@@ -0,0 +1,163 @@
+"""
+Normalização vetorizada de colunas (Status, Efetuado, Sim/Não)
+Mapeia colunas inteiras de uma vez, em vez de Series.apply linha a linha
+
+As colunas têm poucos valores distintos ("Pago", "pago", 1, None...), então
+cada coluna é fatorada (pd.factorize) e a regra escalar roda apenas sobre os
+valores únicos; o resultado volta para as linhas por indexação dos códigos.
+As regras escalares continuam disponíveis e são a referência de equivalência.
+"""
+
+import numpy as np
+import pandas as pd
+
+from constants import StatusDespesa
+from utils.validators import yesno_to_int, validate_status
+
+# Status como str simples: no pandas 3 a coluna vira dtype str e a
+# comparação com o membro do Enum (StatusDespesa.PAGO) nunca casa.
+PAGO = StatusDespesa.PAGO.value
+A_VENCER = StatusDespesa.A_VENCER.value
+VENCIDO = StatusDespesa.VENCIDO.value
+
+STATUS_PAGO_WORDS = {"pago", "paga", "paid", "1", "true", "sim", "yes"}
+STATUS_VENCIDO_WORDS = {"vencido", "vencida", "overdue", "atrasado", "2"}
+STATUS_A_VENCER_WORDS = {"a vencer", "avencer", "aberto", "pendente", "0", "false", "nao", "não", "no"}
+
+EFETUADO_SIM_WORDS = {"1", "true", "sim", "s", "yes", "y", "pago", "recebido"}
+EFETUADO_NAO_WORDS = {"0", "false", "nao", "não", "n", "no", "pendente"}
+
+
+# ========= Regras escalares (referência) ========= #
+
+def normalize_status_value(value):
+    """
+    Normaliza um status de despesa
+
+    Args:
+        value: Status em qualquer grafia ("Pago", "pago", 1, "atrasado"...)
+
+    Returns:
+        "Pago", "Vencido" ou "A vencer" (padrão para vazios e desconhecidos)
+    """
+    if pd.isna(value):
+        return A_VENCER
+
+    # str.strip em subclasses de str (StatusDespesa) devolve o valor, não 'StatusDespesa.PAGO'
+    text = (value if isinstance(value, str) else str(value)).strip().lower()
+
+    if text in STATUS_PAGO_WORDS:
+        return PAGO
+    if text in STATUS_VENCIDO_WORDS:
+        return VENCIDO
+    if text in STATUS_A_VENCER_WORDS:
+        return A_VENCER
+
+    return A_VENCER
+
+
+def normalize_efetuado_value(value):
+    """
+    Normaliza o campo Efetuado de uma receita
+
+    Args:
+        value: Valor em qualquer grafia (1, "sim", "recebido", 1.0...)
+
+    Returns:
+        1 se efetivado, 0 caso contrário
+    """
+    if pd.isna(value):
+        return 0
+
+    text = (value if isinstance(value, str) else str(value)).strip().lower()
+    if text in EFETUADO_SIM_WORDS:
+        return 1
+    if text in EFETUADO_NAO_WORDS:
+        return 0
+
+    try:
+        return 1 if float(text) == 1 else 0
+    except Exception:
+        return 0
+
+
+# ========= Versões vetorizadas ========= #
+
+def _map_unique(series, func, na_value, dtype=None):
+    """Aplica func apenas aos valores distintos da coluna e expande por código"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # Representante de cada código tirado da própria coluna: o factorize
+    # converte subclasses de str (ex.: StatusDespesa.PAGO) em texto nos uniques
+    valores = series.to_numpy(dtype=object)
+    primeiro = np.zeros(len(uniques), dtype=np.intp)
+    validos = np.flatnonzero(codes >= 0)[::-1]
+    primeiro[codes[validos]] = validos
+    mapped = np.array([func(v) for v in valores[primeiro]] + [na_value], dtype=dtype or object)
+    # código -1 (NaN/None) cai no último elemento: na_value
+    return pd.Series(mapped[codes], index=series.index, name=series.name, dtype=mapped.dtype)
+
+
+def normalize_status_series(series):
+    """
+    Normaliza uma coluna de status (equivale a series.apply(normalize_status_value))
+
+    Args:
+        series: pd.Series com status em qualquer grafia
+
+    Returns:
+        pd.Series de str com "Pago", "Vencido" ou "A vencer"
+    """
+    return _map_unique(series, normalize_status_value, A_VENCER)
+
+
+def normalize_efetuado_series(series):
+    """
+    Normaliza uma coluna Efetuado (equivale a series.apply(normalize_efetuado_value))
+
+    Args:
+        series: pd.Series com valores Sim/Não em qualquer grafia
+
+    Returns:
+        pd.Series int64 com 1/0
+    """
+    return _map_unique(series, normalize_efetuado_value, 0, dtype=np.int64)
+
+
+def status_from_efetuado(series):
+    """
+    Deriva o status de despesas antigas a partir de Efetuado já normalizado
+
+    Args:
+        series: pd.Series com 1/0
+
+    Returns:
+        pd.Series de str com "Pago" (1) ou "A vencer"
+    """
+    values = np.where(series.to_numpy() == 1, PAGO, A_VENCER).astype(object)
+    return pd.Series(values, index=series.index, name=series.name, dtype=object)
+
+
+def yesno_to_int_series(series):
+    """
+    Converte uma coluna Sim/Não para 1/0 (equivale a series.apply(yesno_to_int))
+
+    Args:
+        series: pd.Series com valores Sim/Não
+
+    Returns:
+        pd.Series object com 1, 0 ou None para inválidos
+    """
+    return _map_unique(series, yesno_to_int, yesno_to_int(None))
+
+
+def validate_status_series(series):
+    """
+    Valida uma coluna de status (equivale a series.apply(validate_status))
+
+    Args:
+        series: pd.Series de status
+
+    Returns:
+        pd.Series object com o status válido ou None
+    """
+    return _map_unique(series, validate_status, validate_status(None))